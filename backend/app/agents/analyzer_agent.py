@@ -1,11 +1,151 @@
 from typing import Dict, List, Optional, Any
 from .base_agent import Agent, Message
-from ..utils.llm_client import LLMClient
-import re
+from .parser_agent import parse_log_text
+from ..utils.llm_client import LLMClient, StructuredOutputError
+from ..utils.llm_governor import CircuitOpenError, get_governor
+from ..utils.log_templates import TemplateMiner
+from ..utils.prompt_builder import PromptBuilder
+from ..utils.anomaly import RateAnomalyDetector, classify_event
+from ..utils.timestamps import MISSING_MS, to_epoch_ms
+from ..utils.sharding import ShardedAnalyzer, fleet_summary, is_error_like
+from ..utils.input_classifier import InputClassifier
+from ..utils.intent_matcher import IntentMatcher
+from ..utils.executors import get_execution_layer
+from ..utils.metrics import span
+from ..utils.singleflight import SingleFlight, flight_key, normalize_text, scope_of
+from ..utils.event_store import get_event_store, persist_in_background
+from ..utils.fingerprint import incident_features, trim_analysis
+from ..utils.structured_logging import get_logger
+from collections import Counter
+import asyncio
+import os
 import json
+import time
+import numpy as np
+
+log = get_logger(__name__)
+
+_SEVERITY_RANK = {'info': 0, 'low': 0, 'warning': 1, 'medium': 1, 'critical': 2, 'high': 2}
+
+_STRING_LIST = {'type': 'array', 'items': {'type': 'string'}}
+
+# JSON schemas for the provider's structured-output mode
+SLICE_SCHEMA = {
+    'type': 'object',
+    'properties': {
+        'summary': {'type': 'string'},
+        'findings': _STRING_LIST,
+        'recommendations': _STRING_LIST,
+        'severity': {'type': 'string', 'enum': ['critical', 'warning', 'info']},
+    },
+    'required': ['summary', 'findings', 'recommendations', 'severity'],
+    'additionalProperties': False,
+}
+ANALYSIS_SCHEMA = {
+    **SLICE_SCHEMA,
+    'properties': {**SLICE_SCHEMA['properties'], 'patterns': _STRING_LIST},
+    'required': SLICE_SCHEMA['required'] + ['patterns'],
+}
+ROOT_CAUSE_SCHEMA = {
+    'type': 'object',
+    'properties': {
+        'root_cause': {'type': 'string'},
+        'recommendations': _STRING_LIST,
+        'severity': {'type': 'string', 'enum': ['High', 'Medium', 'Low']},
+    },
+    'required': ['root_cause', 'recommendations', 'severity'],
+    'additionalProperties': False,
+}
+
+
+def _normalize_severity(value: Any, default: str = 'info') -> str:
+    """Map model severities (any case, High/Medium/Low) onto critical/warning/info."""
+    rank = _SEVERITY_RANK.get(str(value or '').strip().lower())
+    if rank is None:
+        return default
+    return ('info', 'warning', 'critical')[rank]
+
+
+def detect_rate_anomalies(structured_data: Dict, window_seconds: int = 60) -> List[Dict]:
+    """Stream parsed events through a RateAnomalyDetector, keyed by (device, mnemonic)."""
+    messages = structured_data.get('message') or []
+    timestamps = structured_data.get('timestamp') or []
+    if not timestamps:
+        return []
+    devices = structured_data.get('device') or [None] * len(messages)
+    mnemonics = structured_data.get('mnemonic') or [None] * len(messages)
+
+    epoch_ms = structured_data.get('epoch_ms')
+    if epoch_ms is None or len(epoch_ms) != len(messages):
+        epoch_ms = to_epoch_ms(timestamps)
+    if hasattr(epoch_ms, 'tolist'):
+        epoch_ms = epoch_ms.tolist()
+
+    detector = RateAnomalyDetector(window_seconds=window_seconds)
+    for message, ms, device, mnemonic in zip(messages, epoch_ms, devices, mnemonics):
+        if ms == MISSING_MS:
+            continue
+        detector.observe(device, mnemonic or classify_event(None, message), ms / 1000, message)
+    detector.flush()
+
+    anomalies = sorted(detector.anomalies, key=lambda a: a['count'], reverse=True)
+    for a in anomalies:
+        a['description'] = (
+            f"{a['count']} {a['type']} events ({a['mnemonic']}) on {a['device']} within "
+            f"{a['window_seconds']}s starting {time.strftime('%Y-%m-%d %H:%M:%S', time.gmtime(a['window_start']))} UTC "
+            f"(baseline {a['baseline']})"
+        )
+    return anomalies
+
+
+def rule_based_analysis(structured_data: Dict, focus_query: Optional[str] = None, window_seconds: int = 60) -> Dict:
+    """Simple deterministic analysis based on counts and keywords.
+
+    Module-level so large inputs can run on the execution layer's process pool.
+    """
+    findings = []
+    recommendations = []
+
+    raw = structured_data.get('raw_text', '')
+    messages = structured_data.get('message', [])
+
+    # Count errors and link-down events
+    error_count = len([m for m in messages if is_error_like(m)])
+    info_count = len(messages) - error_count
+
+    if error_count > 0:
+        findings.append(f"Detected {error_count} error-like or down events in the sample.")
+        recommendations.append("Investigate the affected interfaces and check recent configuration or hardware changes.")
+
+    if 'cpu' in raw.lower() or 'high cpu' in raw.lower():
+        findings.append("Possible CPU-related issue detected.")
+        recommendations.append("Check process CPU usage on devices and consider rebooting or updating firmware if recurring.")
+
+    anomalies = detect_rate_anomalies(structured_data, window_seconds)
+    for a in anomalies[:5]:
+        findings.append(f"Burst detected: {a['description']}.")
+    if anomalies:
+        recommendations.append("Review the flagged time windows for flapping links or resetting peers.")
+
+    if not findings and messages:
+        findings.append("No obvious critical issues found in the sample; logs look informational.")
+        recommendations.append("Collect more logs over a longer time window for trend analysis.")
+
+    summary = ' '.join(findings[:2]) if findings else 'No significant issues identified.'
+    severity = 'critical' if error_count > 5 else 'warning' if error_count > 0 or anomalies else 'info'
+
+    return {
+        'summary': summary,
+        'severity': severity,
+        'findings': findings,
+        'recommendations': recommendations,
+        'patterns': structured_data.get('patterns', []),
+        'anomalies': anomalies
+    }
+
 
 class AnalyzerAgent(Agent):
-    def __init__(self):
+    def __init__(self, incident_store: Optional[Any] = None):
         super().__init__(name="analyzer_agent",
                          system_message="""You are an expert network log analyzer agent.
             Your role is to analyze network logs, identify patterns, detect anomalies,
@@ -13,9 +153,35 @@ class AnalyzerAgent(Agent):
         # Do not create LLM client at init; create per-call so requests can
         # provide API key headers.
         self.llm_client = None
+        # Keeps prompt size bounded regardless of how much log text is pasted
+        self.prompt_builder = PromptBuilder()
+        self.input_classifier = InputClassifier()
+        self.intent_matcher = IntentMatcher.from_file()
+        # Map-reduce analysis settings for inputs larger than one prompt can hold
+        self.mapreduce_min_lines = int(os.getenv('WIZRAVEN_MAPREDUCE_MIN_LINES', '20000'))
+        self.mapreduce_chunk_lines = int(os.getenv('WIZRAVEN_MAPREDUCE_CHUNK_LINES', '5000'))
+        self.mapreduce_concurrency = int(os.getenv('WIZRAVEN_MAPREDUCE_CONCURRENCY', '4'))
+        self.anomaly_window_seconds = int(os.getenv('WIZRAVEN_ANOMALY_WINDOW_SECONDS', '60'))
+        # How far back the event store is consulted for the paste's devices
+        self.history_days = int(os.getenv('WIZRAVEN_HISTORY_DAYS', '30'))
+        # Per-device shards are analyzed in parallel worker processes
+        self.sharded_analyzer = ShardedAnalyzer(window_seconds=self.anomaly_window_seconds)
+        # Identical pastes arriving together (e.g. during an outage) share one analysis
+        self._mixed_flights = SingleFlight('analyze_mixed_input')
+        # Where incident fingerprints are looked up and recorded (the knowledge
+        # agent or its KB-server client); None turns incident matching off
+        self.incident_store = incident_store
         
-    async def analyze_logs(self, structured_data: Dict, focus_query: Optional[str] = None, request_context: Optional[Dict] = None) -> Dict:
-        """Analyze structured log data for patterns and insights."""
+    async def analyze_logs(self, structured_data: Dict, focus_query: Optional[str] = None, request_context: Optional[Dict] = None,
+                           rule_result: Optional[Dict] = None) -> Dict:
+        """Analyze structured log data for patterns and insights.
+
+        ``rule_result`` is a precomputed ``rule_results()`` output (e.g. from
+        the session cache); the rule pass is skipped when it is given.
+        """
+        if self._wants_hierarchical(structured_data, request_context):
+            return await self.analyze_logs_hierarchical(structured_data, focus_query=focus_query,
+                                                        request_context=request_context)
         try:
             # Prepare context for LLM
             context = {
@@ -24,26 +190,12 @@ class AnalyzerAgent(Agent):
                 "focus_query": focus_query
             }
             
-            # Build analysis prompt
-            prompt = f"""Analyze these network logs:
-            
-            Format: {context['format']}
-            Number of entries: {context['log_count']}
-            
-            Raw logs:
-            {structured_data.get('raw_text', '')[:1000]}
-            
-            {f'Focus on: {focus_query}' if focus_query else 'Provide a comprehensive analysis including:'}
-            1. Key patterns and trends
-            2. Potential issues or anomalies
-            3. Security implications
-            4. Performance insights
-            5. Actionable recommendations
-            """
-            
             # First, run a deterministic rule-based analysis so we always have
             # useful output even when an LLM call fails or API key is missing.
-            rule_result = self._rule_based_analysis(structured_data, focus_query)
+            if rule_result is not None:
+                rule_result = dict(rule_result)
+            else:
+                rule_result = await self.rule_results(structured_data, focus_query)
 
             # Get analysis from LLM (create client per-call)
             # Merge structured-data-derived context with request_context so callers can provide API keys
@@ -53,46 +205,53 @@ class AnalyzerAgent(Agent):
             api_key = merged_context.get('cerebras_api_key') or merged_context.get('api_key')
             client = LLMClient(api_key=api_key)
 
-            # Prefer asking LLM to return structured JSON for easier parsing
-            json_prompt = f"""Analyze the following network logs and structured data. Return ONLY a JSON object with keys: summary (string), findings (list of strings), recommendations (list of strings), severity (one of critical/warning/info), patterns (list).\n\nStructured data:\n{structured_data}\n\nIf you cannot produce JSON, return plain text."""
-
-            # If no API key, return the rule-based result immediately
-            if not api_key:
+            # If no API key, or the provider is failing, return the rule-based result immediately
+            if not api_key or not get_governor().available():
                 return rule_result
 
-            analysis_raw = None
-            try:
-                analysis_raw = await client.analyze_text(json_prompt, merged_context)
-            except Exception:
-                # Fallback to plain prompt
-                try:
-                    analysis_raw = await client.analyze_text(prompt, merged_context)
-                except Exception:
-                    # If LLM calls fail, return rule-based result
-                    return rule_result
-
-            # Try to parse JSON from LLM
-            import json
+            # One structured-output call; the structured summary already carries
+            # the mined templates, so the model sees the whole log
+            focus = f"Focus on: {focus_query}\n" if focus_query else ''
+            history = self._history_lines(rule_result.get('history'))
+            json_prompt = (
+                "Analyze the following network logs and structured data. Return ONLY a JSON object with keys: "
+                "summary (string), findings (list of strings), recommendations (list of strings), "
+                "severity (one of critical/warning/info), patterns (list of strings).\n\n"
+                f"{focus}"
+                f"Structured data:\n{self.prompt_builder.summarize_structured(structured_data)}"
+                f"{history}"
+            )
+
             try:
-                parsed = json.loads(analysis_raw)
-                # Merge: prefer LLM fields but fall back to rule_result values
-                analysis_results = {
-                    "summary": parsed.get('summary', rule_result.get('summary', '')),
-                    "severity": parsed.get('severity', rule_result.get('severity', 'info')),
-                    "findings": parsed.get('findings', rule_result.get('findings', [])),
-                    "recommendations": parsed.get('recommendations', rule_result.get('recommendations', [])),
-                    "patterns": parsed.get('patterns', rule_result.get('patterns', []))
-                }
-            except Exception:
-                # If parsing fails, return rule-based result augmented with LLM freeform text
-                analysis = analysis_raw or ''
-                analysis_results = {
+                parsed = await client.analyze_json(json_prompt, merged_context, schema=ANALYSIS_SCHEMA)
+            except StructuredOutputError as e:
+                # Model answered in prose: keep the rule-based result plus its text
+                analysis = e.raw or ''
+                return {
                     "summary": analysis[:200] + ('...' if len(analysis) > 200 else ''),
                     "severity": self._determine_severity(analysis),
                     "findings": rule_result.get('findings', []),
                     "recommendations": rule_result.get('recommendations', []),
-                    "patterns": rule_result.get('patterns', [])
+                    "patterns": rule_result.get('patterns', []),
+                    "anomalies": rule_result.get('anomalies', []),
+                    "fleet": rule_result.get('fleet'),
+                    "history": rule_result.get('history')
                 }
+            except Exception:
+                # Upstream failures were already retried by the governor
+                return rule_result
+
+            # Merge: prefer LLM fields but fall back to rule_result values
+            analysis_results = {
+                "summary": parsed.get('summary') or rule_result.get('summary', ''),
+                "severity": _normalize_severity(parsed.get('severity'), rule_result.get('severity', 'info')),
+                "findings": parsed.get('findings') or rule_result.get('findings', []),
+                "recommendations": parsed.get('recommendations') or rule_result.get('recommendations', []),
+                "patterns": parsed.get('patterns') or rule_result.get('patterns', []),
+                "anomalies": rule_result.get('anomalies', []),
+                "fleet": rule_result.get('fleet'),
+                "history": rule_result.get('history')
+            }
 
             return analysis_results
             
@@ -100,49 +259,322 @@ class AnalyzerAgent(Agent):
             await self.send_message(f"Error analyzing logs: {str(e)}")
             return {}
         
+    async def rule_results(self, structured_data: Dict, focus_query: Optional[str] = None) -> Dict:
+        """Deterministic rule analysis plus the fleet summary and device history, without the LLM."""
+        result, history = await asyncio.gather(self._run_rules(structured_data, focus_query),
+                                               self.history_context(structured_data))
+        # The rule pass already ran the anomaly detector over every device
+        result['fleet'] = await self.analyze_fleet(structured_data, anomalies=result.get('anomalies'))
+        result['history'] = history
+        if history:
+            result['findings'] = list(result.get('findings') or []) + [
+                f"{r['device']}: {r['mnemonic']} also seen {r['count']} times in the previous {history['days']} days"
+                for r in history['recurring'][:5]
+            ]
+        return result
+
+    async def history_context(self, structured_data: Dict, top_devices: int = 10) -> Optional[Dict]:
+        """Earlier events for the paste's busiest devices, from the event store.
+
+        Covers the ``history_days`` before the paste's first timestamp, so
+        the paste itself is not counted. ``recurring`` lists the device /
+        mnemonic pairs of this paste that were seen before. None when the
+        store is off (WIZRAVEN_EVENT_STORE unset) or has nothing for them.
+        """
+        store = get_event_store()
+        devices = structured_data.get('device') or []
+        busiest = [d for d, _ in Counter(d for d in devices if d).most_common(top_devices)]
+        if store is None or not busiest or self.history_days <= 0:
+            return None
+        epoch = structured_data.get('epoch_ms')
+        dated = np.asarray(epoch if epoch is not None else [], dtype=np.int64)
+        dated = dated[dated != MISSING_MS]
+        end_ms = int(dated.min()) if dated.size else int(time.time() * 1000)
+        start_ms = end_ms - self.history_days * 86400000
+        try:
+            with span('history', devices=len(busiest)):
+                history = await get_execution_layer().run('io', store.device_history, busiest, start_ms, end_ms)
+        except Exception as e:
+            log.warning('analyzer.history_failed', error=str(e))
+            return None
+        if not history:
+            return None
+
+        current = Counter((d, m) for d, m in zip(devices, structured_data.get('mnemonic') or []) if d and m)
+        recurring = [{'device': d, 'mnemonic': m, 'count': history[d][m]['count'],
+                      'last_ms': history[d][m]['last_ms']}
+                     for d, m in current if m in history.get(d, {})]
+        recurring.sort(key=lambda r: -r['count'])
+        return {
+            'days': self.history_days,
+            'devices': {d: sorted(({'mnemonic': m, **stats} for m, stats in by_mnemonic.items()),
+                                  key=lambda r: -r['count'])[:5]
+                        for d, by_mnemonic in history.items()},
+            'recurring': recurring[:10],
+        }
+
+    @staticmethod
+    def _history_lines(history: Optional[Dict]) -> str:
+        if not history:
+            return ''
+        lines = [f"\n\nHistory (previous {history['days']} days, same devices):"]
+        for device, top in history['devices'].items():
+            lines.append(f"- {device}: " + ', '.join(f"{r['mnemonic']} x{r['count']}" for r in top))
+        return '\n'.join(lines)
+
+    async def analyze_fleet(self, structured_data: Dict, fleet: Optional[Dict] = None, top: int = 5,
+                            anomalies: Optional[List[Dict]] = None, keep_shards: bool = False) -> Optional[Dict]:
+        """Per-device sharded analysis merged into a fleet summary.
+
+        Returns None for single-device input unless the ``shards`` state of a
+        previous result is passed as ``fleet`` to be extended incrementally.
+        That state (per-device template maps and anomaly lists) is only
+        included with ``keep_shards``; responses and session entries carry the
+        summary alone. ``anomalies`` are the rule pass's, reused per device.
+        """
+        devices = {d for d in structured_data.get('device') or [] if d}
+        if len(devices) < 2 and fleet is None:
+            return None
+        shards = await self.sharded_analyzer.analyze(structured_data, fleet=fleet, anomalies=anomalies)
+        summary = fleet_summary(shards, top=top)
+        if keep_shards:
+            summary['shards'] = shards
+        return summary
+
+    def _wants_hierarchical(self, structured_data: Dict, request_context: Optional[Dict]) -> bool:
+        ctx = request_context if isinstance(request_context, dict) else {}
+        mode = ctx.get('analysis_mode')
+        if mode:
+            return mode == 'hierarchical'
+        has_key = bool(ctx.get('cerebras_api_key') or ctx.get('api_key'))
+        return has_key and len(structured_data.get('message') or []) >= self.mapreduce_min_lines
+
+    def _split_chunks(self, structured_data: Dict, chunk_by: str = 'auto') -> List[Dict]:
+        """Split parsed columns into chunks by device or by contiguous time range.
+
+        ``auto`` shards by device when more than one device is present and
+        falls back to time ranges otherwise. Device shards larger than the
+        chunk size are further split by time.
+        """
+        messages = structured_data.get('message') or []
+        timestamps = structured_data.get('timestamp') or [None] * len(messages)
+        devices = structured_data.get('device') or [None] * len(messages)
+        size = max(1, self.mapreduce_chunk_lines)
+
+        if chunk_by == 'auto':
+            chunk_by = 'device' if len({d for d in devices if d}) > 1 else 'time'
+
+        groups: Dict[Optional[str], List[int]] = {}
+        if chunk_by == 'device':
+            for i, dev in enumerate(devices):
+                groups.setdefault(dev, []).append(i)
+        else:
+            groups[None] = list(range(len(messages)))
+
+        chunks = []
+        for dev, idxs in groups.items():
+            for start in range(0, len(idxs), size):
+                part = idxs[start:start + size]
+                lines = [messages[i] for i in part]
+                ts = [timestamps[i] for i in part]
+                known_ts = [t for t in ts if t is not None]
+                label = (dev or 'unknown-device') if chunk_by == 'device' else 'lines'
+                if known_ts:
+                    label = f"{label} {known_ts[0]} - {known_ts[-1]}"
+                else:
+                    label = f"{label} {part[0] + 1}-{part[-1] + 1}"
+                chunks.append({
+                    'label': label,
+                    'raw_text': '\n'.join(lines),
+                    'message': lines,
+                    'timestamp': ts,
+                    'device': [devices[i] for i in part],
+                })
+        return chunks
+
+    async def analyze_logs_hierarchical(self, structured_data: Dict, focus_query: Optional[str] = None,
+                                        request_context: Optional[Dict] = None, chunk_by: str = 'auto',
+                                        progress_callback: Optional[Any] = None) -> Dict:
+        """Map-reduce analysis for logs larger than the model's context window.
+
+        Chunks (see ``_split_chunks``) are analyzed concurrently, at most
+        ``mapreduce_concurrency`` at a time, then a reduce step merges the
+        per-chunk findings into the usual summary/findings/recommendations/
+        severity/patterns schema. ``progress_callback(completed, total, chunk)``
+        is invoked (sync or async) as each chunk finishes. The result also
+        carries ``chunks`` (per-chunk timing) and ``progress``.
+        """
+        started = time.perf_counter()
+        ctx = dict(request_context) if isinstance(request_context, dict) else {}
+        api_key = ctx.get('cerebras_api_key') or ctx.get('api_key')
+        client = LLMClient(api_key=api_key) if api_key else None
+        focus = f"Focus on: {focus_query}\n" if focus_query else ''
+
+        chunks = self._split_chunks(structured_data, chunk_by)
+        total = len(chunks)
+        semaphore = asyncio.Semaphore(max(1, self.mapreduce_concurrency))
+        completed = 0
+
+        async def _map(index: int, chunk: Dict) -> Dict:
+            nonlocal completed
+            async with semaphore:
+                chunk_start = time.perf_counter()
+                result = await self._run_rules(chunk, focus_query)
+                source = 'rules'
+                error = None
+                if client is not None:
+                    prompt = (
+                        f"Analyze this slice ({chunk['label']}) of a larger network log. Return ONLY a JSON object with keys: "
+                        "summary (string), findings (list of strings), recommendations (list of strings), "
+                        "severity (one of critical/warning/info).\n\n"
+                        f"{focus}"
+                        f"Log data:\n{self.prompt_builder.summarize_lines(chunk['message'])}"
+                    )
+                    try:
+                        parsed = await client.analyze_json(prompt, ctx, schema=SLICE_SCHEMA)
+                        result = {key: parsed.get(key, result.get(key)) for key in ('summary', 'findings', 'recommendations', 'severity')}
+                        source = 'llm'
+                    except Exception as e:
+                        error = str(e)
+
+                completed += 1
+                chunk_result = {
+                    'index': index,
+                    'label': chunk['label'],
+                    'lines': len(chunk['message']),
+                    'elapsed_ms': round((time.perf_counter() - chunk_start) * 1000, 2),
+                    'source': source,
+                    'summary': result.get('summary', ''),
+                    'findings': result.get('findings') or [],
+                    'recommendations': result.get('recommendations') or [],
+                    'severity': str(result.get('severity') or 'info').lower(),
+                }
+                if error:
+                    chunk_result['error'] = error
+                if progress_callback is not None:
+                    ret = progress_callback(completed, total, chunk_result)
+                    if asyncio.iscoroutine(ret):
+                        await ret
+                return chunk_result
+
+        chunk_results = await asyncio.gather(*[_map(i, c) for i, c in enumerate(chunks)])
+        map_ms = round((time.perf_counter() - started) * 1000, 2)
+
+        reduce_start = time.perf_counter()
+        merged = self._merge_chunk_results(chunk_results)
+        merged['patterns'] = [t['template'] for t in self._extract_patterns(structured_data)]
+        merged['anomalies'] = self._detect_anomalies(structured_data)
+        if client is not None and chunk_results:
+            digest = '\n'.join(
+                f"- [{c['severity']}] {c['label']}: {c['summary']} | findings: {'; '.join(map(str, c['findings'][:3]))}"
+                for c in chunk_results
+            )
+            reduce_prompt = (
+                "You analyzed a large network log in slices. Merge the per-slice results below into one analysis. "
+                "Return ONLY a JSON object with keys: summary (string), findings (list of strings), "
+                "recommendations (list of strings), severity (one of critical/warning/info).\n\n"
+                f"{focus}"
+                f"Per-slice results:\n{self.prompt_builder.compact_text(digest)}"
+            )
+            try:
+                parsed = await client.analyze_json(reduce_prompt, ctx, schema=SLICE_SCHEMA)
+                for key in ('summary', 'findings', 'recommendations', 'severity'):
+                    if parsed.get(key):
+                        merged[key] = parsed[key]
+            except Exception:
+                # Keep the deterministic merge
+                pass
+
+        merged['chunks'] = [
+            {key: c[key] for key in ('index', 'label', 'lines', 'elapsed_ms', 'source', 'severity')}
+            for c in chunk_results
+        ]
+        merged['progress'] = {
+            'total': total,
+            'completed': completed,
+            'llm_failed': sum(1 for c in chunk_results if c.get('error')),
+        }
+        merged['timing'] = {
+            'map_ms': map_ms,
+            'reduce_ms': round((time.perf_counter() - reduce_start) * 1000, 2),
+            'total_ms': round((time.perf_counter() - started) * 1000, 2),
+        }
+        return merged
+
+    def _merge_chunk_results(self, chunk_results: List[Dict]) -> Dict:
+        """Deterministically merge per-chunk results: worst severity wins, findings are de-duplicated."""
+        severity = 'info'
+        findings: List[str] = []
+        recommendations: List[str] = []
+        for c in chunk_results:
+            if _SEVERITY_RANK.get(c['severity'], 0) > _SEVERITY_RANK.get(severity, 0):
+                severity = c['severity']
+            for f in c['findings']:
+                entry = f"{c['label']}: {f}"
+                if entry not in findings:
+                    findings.append(entry)
+            for r in c['recommendations']:
+                if r not in recommendations:
+                    recommendations.append(r)
+
+        worst = [c for c in chunk_results if c['severity'] == severity]
+        summary = f"Analyzed {len(chunk_results)} log chunks; overall severity {severity}."
+        if worst and worst[0]['summary']:
+            summary += f" Most affected: {worst[0]['label']} - {worst[0]['summary']}"
+        return {
+            'summary': summary,
+            'severity': severity,
+            'findings': findings,
+            'recommendations': recommendations,
+        }
+
     async def identify_anomalies(self, data: Dict) -> List[Dict]:
-        """Identify anomalies in the log data."""
+        """Identify anomalies in the log data.
+
+        Bursts are found deterministically by ``_detect_anomalies``; the LLM
+        (when an API key is available) is only asked to explain the flagged
+        windows.
+        """
         try:
-            # Use LLM to identify anomalies
-            prompt = f"""Review these log patterns and identify potential anomalies:
-            
-            Log data:
-            {str(data)[:1000]}
-            
-            Focus on:
-            1. Unusual patterns
-            2. Error frequencies
-            3. Timing irregularities
-            4. Security concerns
-            5. Performance issues
-            
-            Format findings as:
-            - Type: [anomaly type]
-            - Severity: [high/medium/low]
-            - Description: [details]
-            """
-            
+            anomalies = self._detect_anomalies(data)
+
             api_key = None
             if isinstance(data, dict) and data.get('context'):
                 ctx = data.get('context')
                 api_key = ctx.get('cerebras_api_key') or ctx.get('api_key')
+            if not anomalies or not api_key:
+                return anomalies
+
+            flagged = '\n'.join(f"{i + 1}. {a['description']}" for i, a in enumerate(anomalies[:20]))
+            prompt = f"""These time windows were flagged as anomalous bursts in network logs:
+
+            {flagged}
+
+            For each numbered window, explain the likely cause in one sentence.
+            Return ONLY a JSON array of strings, one per window, in order.
+            """
             client = LLMClient(api_key=api_key)
-            analysis = await client.analyze_text(prompt)
-            
-            # Parse the response into structured anomalies
-            # TODO: Implement proper parsing of LLM response
-            return [
-                {
-                    "type": "sample_anomaly",
-                    "severity": "medium",
-                    "description": analysis
-                }
-            ]
-            
+            try:
+                per_window = await client.analyze_json(prompt, expect=list)
+                if len(per_window) != len(anomalies[:20]):
+                    raise StructuredOutputError('unexpected explanation shape', json.dumps(per_window))
+                for anomaly, text in zip(anomalies, per_window):
+                    anomaly['explanation'] = str(text)
+            except StructuredOutputError as e:
+                for anomaly in anomalies[:20]:
+                    anomaly['explanation'] = e.raw
+            except Exception:
+                return anomalies
+            return anomalies
+
         except Exception as e:
             await self.send_message(f"Error identifying anomalies: {str(e)}")
             return []
-            
+
+    def _detect_anomalies(self, structured_data: Dict) -> List[Dict]:
+        """Stream parsed events through a RateAnomalyDetector, keyed by (device, mnemonic)."""
+        return detect_rate_anomalies(structured_data, self.anomaly_window_seconds)
+
     async def process_message(self, message: Message) -> None:
         """Process incoming messages and generate responses."""
         try:
@@ -183,76 +615,95 @@ class AnalyzerAgent(Agent):
         return [line.strip() for line in analysis.split("\n") if "recommend" in line.lower()]
         
     def _extract_patterns(self, data: Dict) -> List[Dict]:
-        """Extract patterns from structured data."""
-        # TODO: Implement pattern detection
-        return []
-
-    def _rule_based_analysis(self, structured_data: Dict, focus_query: Optional[str] = None) -> Dict:
-        """Simple deterministic analysis based on counts and keywords."""
-        findings = []
-        recommendations = []
+        """Extract log templates from structured data.
 
-        raw = structured_data.get('raw_text', '')
-        messages = structured_data.get('message', [])
-
-        # Count errors and link-down events
-        error_count = len([m for m in messages if 'error' in m.lower() or 'down' in m.lower() or 'fail' in m.lower()])
-        info_count = len(messages) - error_count
-
-        if error_count > 0:
-            findings.append(f"Detected {error_count} error-like or down events in the sample.")
-            recommendations.append("Investigate the affected interfaces and check recent configuration or hardware changes.")
-
-        if 'cpu' in raw.lower() or 'high cpu' in raw.lower():
-            findings.append("Possible CPU-related issue detected.")
-            recommendations.append("Check process CPU usage on devices and consider rebooting or updating firmware if recurring.")
-
-        if not findings and messages:
-            findings.append("No obvious critical issues found in the sample; logs look informational.")
-            recommendations.append("Collect more logs over a longer time window for trend analysis.")
+        Reuses templates already mined by the parser; otherwise mines the
+        ``message`` lines (or ``raw_text``) on the fly.
+        """
+        if data.get('templates'):
+            return data['templates']
 
-        summary = ' '.join(findings[:2]) if findings else 'No significant issues identified.'
-        severity = 'critical' if error_count > 5 else 'warning' if error_count > 0 else 'info'
+        lines = data.get('message') or (data.get('raw_text') or '').splitlines()
+        miner = TemplateMiner()
+        for line in lines:
+            line = line.strip()
+            if line:
+                miner.add(line)
+        return miner.to_dicts()
 
-        return {
-            'summary': summary,
-            'severity': severity,
-            'findings': findings,
-            'recommendations': recommendations,
-            'patterns': structured_data.get('patterns', [])
-        }
+    def _rule_based_analysis(self, structured_data: Dict, focus_query: Optional[str] = None) -> Dict:
+        """Simple deterministic analysis based on counts and keywords."""
+        return rule_based_analysis(structured_data, focus_query, self.anomaly_window_seconds)
+
+    async def _run_rules(self, structured_data: Dict, focus_query: Optional[str] = None) -> Dict:
+        """``_rule_based_analysis`` off the event loop for inputs large enough to be worth it."""
+        lines = len(structured_data.get('message') or [])
+        with span('rules', lines=lines):
+            layer = get_execution_layer()
+            if layer.should_offload(lines):
+                return await layer.run('cpu', rule_based_analysis, structured_data, focus_query,
+                                       self.anomaly_window_seconds)
+            return self._rule_based_analysis(structured_data, focus_query)
+
+    async def _parse_logs(self, text: str) -> Dict:
+        """``parse_log_text`` on pasted text, on the ``cpu`` pool when it is large."""
+        layer = get_execution_layer()
+        if layer.should_offload(text.count('\n') + 1):
+            return await layer.run('cpu', parse_log_text, text)
+        return parse_log_text(text)
 
     async def analyze_mixed_input(self, text: str, api_key: Optional[str], context: Optional[List[dict]] = None) -> Dict[str, Any]:
         """Analyze mixed input which may contain logs and/or conceptual questions.
 
         Returns combined JSON with optional log_analysis and qa_response.
+        Concurrent calls with the same normalized text, API key and history
+        await a single analysis.
         """
+        key = flight_key(normalize_text(text), scope_of(api_key), json.dumps(context or [], sort_keys=True, default=str))
+        return await self._mixed_flights.do(key, self._analyze_mixed_input, text, api_key, context)
+
+    async def similar_incidents(self, features: List[str]) -> List[Dict]:
+        """Past incidents with a fingerprint like ``features``; [] when there is no store or it fails."""
+        if self.incident_store is None or not features:
+            return []
         try:
-            if not text or not text.strip():
-                return {"error": "Empty text"}
+            return await self.incident_store.similar_incidents(features)
+        except Exception as e:
+            log.warning('incidents.lookup_failed', error=str(e))
+            return []
 
-            lines = [l.strip() for l in text.splitlines() if l.strip()]
+    async def record_incident(self, features: List[str], analysis: Dict, structured_data: Dict) -> None:
+        """Remember an analyzed paste's fingerprint with its analysis; failures are only logged.
 
-            # Simple heuristics to detect logs vs questions
-            log_pattern = re.compile(r"(%[A-Z]+-|Interface|line protocol|LINK-|LINEPROTO|\d{2}:\d{2}:\d{2})", re.I)
-            log_hits = sum(1 for l in lines if log_pattern.search(l))
-            logs_present = log_hits > 0 or (len(lines) > 2 and any(re.search(r"\d{2}:\d{2}:\d{2}", l) for l in lines[:5]))
+        Only the trimmed analysis (``fingerprint.trim_analysis``) is sent, so
+        fleet shards and the like never cross the KB socket.
+        """
+        analysis = trim_analysis(analysis)
+        if self.incident_store is None or not features or not analysis:
+            return
+        devices = [d for d, _ in Counter(d for d in structured_data.get('device') or [] if d).most_common(5)]
+        meta = {'lines': len(structured_data.get('message') or []), 'format': structured_data.get('format'),
+                'devices': devices}
+        try:
+            await self.incident_store.record_incident(features, analysis, meta)
+        except Exception as e:
+            log.warning('incidents.record_failed', error=str(e))
 
-            # Expanded question detection to include conversational patterns
-            question_pattern = re.compile(r"\b(how|why|what|when|where|explain|recommend|should|could|help|hi|hello|issue|problem|trouble|connectivity|configure|setup|can|does|is|are|will)\b", re.I)
-            question_present = bool(question_pattern.search(text) or '?' in text)
-            
-            # Also treat short conversational inputs as questions
-            conversational = len(text.strip()) < 100 and not logs_present
-            
-            # If it's clearly conversational or a question, treat as question
-            if conversational or question_present:
-                question_present = True
+    async def _analyze_mixed_input(self, text: str, api_key: Optional[str], context: Optional[List[dict]] = None) -> Dict[str, Any]:
+        try:
+            if not text or text.isspace():
+                return {"error": "Empty text"}
+
+            # Classifier is built once at start-up and samples large inputs
+            classification = self.input_classifier.classify(text)
+            logs_present = classification['logs_present']
+            question_present = classification['question_present']
 
             result: Dict[str, Any] = {
                 "log_analysis": None,
                 "qa_response": None,
-                "follow_up_needed": False
+                "follow_up_needed": False,
+                "input_classification": classification
             }
 
             # If no clear signal, ask follow-up
@@ -270,20 +721,26 @@ class AnalyzerAgent(Agent):
             if api_key:
                 merged_context['cerebras_api_key'] = api_key
 
+            # Large pastes are sent to the LLM as a template summary, not verbatim
+            prompt_text = self.prompt_builder.compact_text(text) if client is not None else text
+
             # Logs: do deterministic analysis first, then try LLM for root-cause/recommendations
             if logs_present:
-                structured = {
-                    'raw_text': text,
-                    'message': lines,
-                    'patterns': []
-                }
-
-                rule = self._rule_based_analysis(structured)
+                structured = await self._parse_logs(text)
+                # Past incidents with the same template/mnemonic fingerprint (no embedding call)
+                features = sorted(incident_features(structured))
+                # Rules plus device history; persisted after, so the paste isn't its own history
+                rule, incidents = await asyncio.gather(self.rule_results(structured),
+                                                       self.similar_incidents(features))
+                persist_in_background(structured)
+                history = rule.get('history')
 
                 log_analysis = {
                     'root_cause': rule.get('summary', ''),
                     'recommendations': '\n'.join(rule.get('recommendations', [])) if rule.get('recommendations') else '',
-                    'severity': rule.get('severity', 'info')
+                    'severity': rule.get('severity', 'info'),
+                    'history': history,
+                    'similar_incidents': incidents
                 }
 
                 # If API key and client available, ask Cerebras for structured root-cause
@@ -294,16 +751,18 @@ class AnalyzerAgent(Agent):
                         "You are a network engineer assistant. Given the following network logs, "
                         "return a JSON object with keys: root_cause (string), recommendations (list of strings), severity (High/Medium/Low). "
                         "If uncertain, be conservative and include follow-up questions.\n\n"
-                        f"Logs:\n{text}\n"
+                        f"Logs:\n{prompt_text}\n"
+                        f"{self._history_lines(history)}"
                     )
                     try:
-                        raw = await client.analyze_text(prompt, merged_context)
-                        parsed = json.loads(raw)
+                        parsed = await client.analyze_json(prompt, merged_context, schema=ROOT_CAUSE_SCHEMA)
                         # Normalize
                         log_analysis = {
                             'root_cause': parsed.get('root_cause', log_analysis['root_cause']),
                             'recommendations': '\n'.join(parsed.get('recommendations', [])) if isinstance(parsed.get('recommendations', []), list) else parsed.get('recommendations', ''),
-                            'severity': parsed.get('severity', log_analysis['severity']).capitalize()
+                            'severity': parsed.get('severity', log_analysis['severity']).capitalize(),
+                            'history': history,
+                            'similar_incidents': incidents
                         }
                     except Exception as e:
                         # Capture error and keep rule-based analysis
@@ -312,6 +771,13 @@ class AnalyzerAgent(Agent):
                             api_key_invalid = True
 
                 result['log_analysis'] = log_analysis
+                await self.record_incident(features, {
+                    'summary': rule.get('summary'),
+                    'root_cause': log_analysis['root_cause'],
+                    'severity': log_analysis['severity'],
+                    'findings': rule.get('findings'),
+                    'recommendations': [r for r in log_analysis['recommendations'].splitlines() if r.strip()],
+                }, structured)
                 if llm_error:
                     # Attach a small non-sensitive hint indicating LLM failure
                     result.setdefault('hints', {})
@@ -322,11 +788,22 @@ class AnalyzerAgent(Agent):
                 qa_text = None
                 # If the logs LLM call already set llm_error/api_key_invalid, reuse that information
                 if client is not None:
+                    question_text = text
+                    if prompt_text is not text:
+                        # Keep the non-log lines (the actual question) verbatim
+                        question_lines = [l.strip() for l in text.splitlines()
+                                          if l.strip() and not self.input_classifier.is_log_line(l)]
+                        question_text = '\n'.join(question_lines) + "\n\nLog context:\n" + prompt_text
                     qprompt = (
-                        "You are an expert networking engineer. Answer the following question concisely and provide steps if applicable:\n\n" + text
+                        "You are an expert networking engineer. Answer the following question concisely and provide steps if applicable:\n\n" + question_text
                     )
                     try:
                         qa_text = await client.analyze_text(qprompt, merged_context)
+                    except CircuitOpenError:
+                        # Provider is down: answer from the local intents instead
+                        qa_text = self._generate_fallback_response(text)
+                        result.setdefault('hints', {})
+                        result['hints']['llm_error_hint'] = 'LLM temporarily unavailable; showing offline guidance'
                     except Exception as e:
                         llm_err_text = str(e)
                         # Detect API key issues
@@ -354,106 +831,9 @@ class AnalyzerAgent(Agent):
             return {"error": str(e)}
 
     def _generate_fallback_response(self, text: str) -> str:
-        """Generate helpful fallback responses for common networking questions when no API key is available."""
-        text_lower = text.lower()
-        
-        # Greetings and casual conversation
-        if any(greeting in text_lower for greeting in ['hi', 'hello', 'hey', 'good morning', 'good afternoon']):
-            return "Hello! I'm your networking assistant. I can help you with BGP, OSPF, switching, routing, troubleshooting, and network configuration questions. For enhanced AI responses, you can provide a Cerebras API key. How can I assist you today?"
-        
-        # BGP related questions
-        if 'bgp' in text_lower:
-            if any(word in text_lower for word in ['connectivity', 'connection', 'issue', 'problem', 'trouble', 'down', 'not working']):
-                return """BGP connectivity issues are common. Here are the key troubleshooting steps:
-
-1. **Check BGP neighbor status**: `show ip bgp summary`
-2. **Verify connectivity**: Ping the neighbor IP
-3. **Check routing**: Ensure routes to neighbor exist
-4. **Verify configuration**: AS numbers, router IDs, authentication
-5. **Check BGP state**: Look for Idle, Connect, Active states
-6. **Review logs**: Look for BGP error messages
-
-Common causes:
-- Incorrect AS numbers
-- Authentication mismatch  
-- Network connectivity issues
-- Firewall blocking TCP 179
-- BGP timers mismatch
-
-Would you like me to help with specific BGP configuration or provide more detailed troubleshooting steps?"""
-            else:
-                return """BGP (Border Gateway Protocol) is the routing protocol of the internet. I can help with:
-
-- BGP configuration and setup
-- Neighbor relationships and peering
-- Route advertisement and filtering
-- Troubleshooting connectivity issues
-- Best path selection
-- Route maps and policies
-
-What specific BGP topic would you like help with?"""
-        
-        # OSPF related
-        if 'ospf' in text_lower:
-            return """OSPF (Open Shortest Path First) is a link-state routing protocol. Common topics include:
-
-- OSPF areas and hierarchy
-- LSA types and database synchronization  
-- Neighbor adjacencies and DR/BDR election
-- Authentication and security
-- Troubleshooting convergence issues
+        """Generate helpful fallback responses for common networking questions when no API key is available.
 
-What OSPF topic can I help you with?"""
-        
-        # General networking issues
-        if any(word in text_lower for word in ['issue', 'problem', 'trouble', 'help', 'broken', 'not working']):
-            return """I'm here to help with networking issues! To provide better assistance, please tell me:
-
-1. What type of network problem are you experiencing?
-2. What devices/protocols are involved? (routers, switches, BGP, OSPF, etc.)
-3. Any error messages or symptoms you're seeing?
-
-Common networking issues I can help with:
-- Routing protocol problems (BGP, OSPF, EIGRP)
-- Switching issues (VLANs, STP, trunking)
-- Connectivity troubleshooting
-- Configuration questions
-- Performance optimization
-
-For enhanced troubleshooting with AI analysis, you can provide a Cerebras API key."""
-        
-        # Configuration questions
-        if any(word in text_lower for word in ['configure', 'configuration', 'setup', 'config']):
-            return """I can help with network device configuration! Common configuration topics include:
-
-- Router configuration (BGP, OSPF, static routes)
-- Switch configuration (VLANs, trunking, port security)
-- Interface configuration and IP addressing
-- Access control lists (ACLs)
-- Quality of Service (QoS)
-- Security features
-
-What specific configuration do you need help with?"""
-        
-        # Generic networking question
-        if any(word in text_lower for word in ['network', 'networking', 'router', 'switch', 'protocol']):
-            return """I'm a networking expert assistant! I can help with:
-
-**Routing Protocols**: BGP, OSPF, EIGRP, RIP
-**Switching**: VLANs, STP, trunking, port security  
-**Troubleshooting**: Connectivity, performance, configuration issues
-**Configuration**: Router/switch setup, security, QoS
-**Network Design**: Architecture, best practices, optimization
-
-What networking topic would you like to explore?"""
-        
-        # Default response for unclear questions
-        return """I'm your networking assistant! I can help with network troubleshooting, configuration, and technical questions about:
-
-• Routing protocols (BGP, OSPF, EIGRP)
-• Switching technologies (VLANs, STP, trunking)
-• Network troubleshooting and diagnostics
-• Device configuration and best practices
-• Performance optimization
-
-Please feel free to ask any networking question or describe the issue you're facing. For enhanced AI-powered responses, you can optionally provide a Cerebras API key."""
\ No newline at end of file
+        Intents and responses live in ``app/data/fallback_intents.json`` (or
+        ``WIZRAVEN_INTENTS_PATH``) and are matched in a single keyword pass.
+        """
+        return self.intent_matcher.respond(text)
@@ -1,5 +1,9 @@
 from typing import Any, Dict, Optional
 
+from ..utils.structured_logging import get_logger
+
+log = get_logger(__name__)
+
 class Message:
     def __init__(self, content: str, context: Optional[Dict[str, Any]] = None):
         self.content = content
@@ -12,8 +16,8 @@ class Agent:
 
     async def send_message(self, content: str, metadata: Optional[Dict[str, Any]] = None):
         """Placeholder send_message - agents should override or the app will collect responses."""
-        # In this simplified replacement we just print; the main app can wire this to real transports.
-        print(f"[{self.name}] {content}")
+        # In this simplified replacement we just log; the main app can wire this to real transports.
+        log.info('agent.message', agent=self.name, content=content)
 
     async def process_message(self, message: Message) -> None:
         raise NotImplementedError()
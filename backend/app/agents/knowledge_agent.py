@@ -1,7 +1,20 @@
-from typing import Dict, List, Optional, Any
+from typing import Dict, List, NamedTuple, Optional, Any, Tuple
 from .base_agent import Agent, Message
+from ..utils.executors import get_execution_layer
+from ..utils.fingerprint import IncidentIndex
+from ..utils.metrics import span
+from ..utils.startup import lazy_import
+from ..utils.singleflight import SingleFlight, flight_key, normalize_text, scope_of
+from ..utils.structured_logging import get_logger
+import asyncio
+import contextlib
+import heapq
+import os
+import time
 import numpy as np
 
+log = get_logger(__name__)
+
 # Defer optional heavy imports (langchain Google embeddings, faiss) until runtime
 # so the app can start even if those packages are not installed. If KB methods
 # are used without the packages installed, clear runtime errors will be raised.
@@ -9,21 +22,210 @@ GoogleGenerativeAIEmbeddings = None
 faiss = None
 
 
+def _load_faiss():
+    # Lazy import faiss to avoid requiring it at app import time
+    global faiss
+    if faiss is None:
+        try:
+            faiss = lazy_import('faiss')
+        except Exception as e:
+            raise ValueError('faiss is required for KnowledgeAgent but is not installed') from e
+    return faiss
+
+
+def _load_embeddings_class():
+    # Lazy import of the embeddings client class, shared by requests and warm-up
+    global GoogleGenerativeAIEmbeddings
+    if GoogleGenerativeAIEmbeddings is None:
+        try:
+            GoogleGenerativeAIEmbeddings = lazy_import('langchain_google_genai').GoogleGenerativeAIEmbeddings
+        except Exception as e:
+            raise ValueError('langchain_google_genai is required for KnowledgeAgent but is not installed') from e
+    return GoogleGenerativeAIEmbeddings
+
+
+class _Doc(NamedTuple):
+    text: str
+    doc_id: int
+    kind: str
+    added_at: float
+    expires_at: Optional[float]
+
+
+class _Buffer:
+    """One of the writer's two copies of the index, and the searches reading it."""
+
+    __slots__ = ('index', 'readers', '_idle')
+
+    def __init__(self, index):
+        self.index = index
+        self.readers = 0
+        self._idle: Optional[asyncio.Future] = None
+
+    @contextlib.contextmanager
+    def reading(self):
+        self.readers += 1
+        try:
+            yield self.index
+        finally:
+            self.readers -= 1
+            if not self.readers and self._idle is not None and not self._idle.done():
+                self._idle.set_result(None)
+
+    async def drained(self) -> None:
+        while self.readers:
+            self._idle = asyncio.get_running_loop().create_future()
+            await self._idle
+
+
+class _KBView:
+    """What searches read: a published copy of the index at a given version.
+
+    The writer keeps two copies of the index. It appends a write batch to
+    the copy that is not published, publishes that one, and brings the
+    other up to date only once the searches still reading it have
+    finished, so a search never sees an index mid-append and nothing is
+    cloned per write. The document maps are shared with the writer and
+    changed in place; ``version`` tells a search which tombstones
+    postdate its view. ``search_filter`` caches the FAISS parameters that
+    exclude the view's tombstoned and expired keys.
+    """
+
+    __slots__ = ('buffer', 'version', 'next_key', 'search_filter')
+
+    def __init__(self, buffer: Optional[_Buffer] = None, version: int = 0, next_key: int = 0):
+        self.buffer = buffer
+        self.version = version
+        self.next_key = next_key
+        self.search_filter: Optional[Tuple] = None
+
+    @property
+    def index(self):
+        return self.buffer.index if self.buffer is not None else None
+
+
+def _new_index(dim: int):
+    _faiss = _load_faiss()
+    return _faiss.IndexIDMap2(_faiss.IndexFlatL2(dim))
+
+
+def _live_vectors(index, dead: List[int]) -> Tuple[np.ndarray, np.ndarray]:
+    """(vectors, keys) of an id-mapped flat index, without the ``dead`` keys."""
+    _faiss = _load_faiss()
+    keys = _faiss.vector_to_array(index.id_map).astype(np.int64)
+    vectors = _faiss.downcast_index(index.index).reconstruct_n(0, index.ntotal)
+    if dead:
+        keep = ~np.isin(keys, np.asarray(dead, dtype=np.int64))
+        keys, vectors = keys[keep], vectors[keep]
+    return vectors, keys
+
+
+def _copy_vectors(source, target, keys: List[int]) -> None:
+    if keys:
+        target.add_with_ids(np.vstack([source.reconstruct(key) for key in keys]), np.array(keys, dtype=np.int64))
+
+
+def _log_compaction_failure(task: asyncio.Future) -> None:
+    if not task.cancelled() and task.exception() is not None:
+        log.warning('kb.compaction_failed', error=str(task.exception()))
+
+
+def parse_retention(value: Optional[str]) -> Dict[str, float]:
+    """``incident=30,log=7`` (days per document kind) -> seconds per kind."""
+    policies: Dict[str, float] = {}
+    for part in (value or '').split(','):
+        kind, _, days = part.partition('=')
+        if kind.strip() and days.strip():
+            policies[kind.strip()] = float(days) * 86400
+    return policies
+
+
 class KnowledgeAgent(Agent):
     """MVP KnowledgeAgent that always uses Cerebras embeddings via LangChain
     (langchain_google_genai.GoogleGenerativeAIEmbeddings) and FAISS.
 
     API key must be provided per call (do not use environment variables).
+
+    Writes go through a single writer task: ``add_to_kb``, ``update_kb``
+    and ``delete_from_kb`` queue an operation and wait; the writer drains
+    whatever is queued (up to ``write_batch_size``), appends it in place
+    to the copy of the index no search reads and publishes that copy
+    (``_KBView``), so a write costs the size of its batch, not of the KB.
+    Searches read whichever view is current and never wait on writes.
+    Embedding calls and FAISS work run on the execution layer's
+    ``embedding`` and ``faiss`` pools rather than on the event loop.
+
+    Once tombstones make up ``compact_ratio`` of the index (and at least
+    ``compact_min_tombstones``), a background compaction rebuilds it from
+    the live vectors of the published view and hands the result to the writer,
+    which replays whatever was added meanwhile. Documents added with a
+    ``kind`` that has a retention policy (WIZRAVEN_KB_RETENTION, e.g.
+    ``incident=30`` days) expire: searches skip them at once and a sweeper
+    deletes them every ``retention_interval`` seconds.
     """
 
     def __init__(self):
         super().__init__(name="knowledge_agent",
                          system_message="""Manage an in-memory FAISS-backed KB of log text using Cerebras embeddings.""")
 
-        # Store raw documents in a list; FAISS index will store vectors in same order
-        self.documents: List[str] = []
-        self.index = None
-        self.dim: Optional[int] = None
+        self._view = _KBView()
+        # The unpublished copy of the index (None until it is needed), and the
+        # adds it is missing: only the writer touches either
+        self._spare: Optional[_Buffer] = None
+        self._lag: List[Tuple[np.ndarray, np.ndarray]] = []
+        self._entries: Dict[int, _Doc] = {}  # vector key -> document, tombstoned keys until compaction
+        self._docs: Dict[int, int] = {}  # live doc id -> key of its current vector
+        self._dead: Dict[int, int] = {}  # tombstoned key -> version it was tombstoned in
+        self._dim: Optional[int] = None
+        self._next_id = 0
+        self._next_key = 0
+        # Keys searches must skip (tombstoned as of the published view, or
+        # expired), and a heap of (expires_at, key) not yet marked expired
+        self._excluded = np.zeros(0, dtype=bool)
+        self._expiring: List[Tuple[float, int]] = []
+        self.write_batch_size = int(os.getenv('WIZRAVEN_KB_WRITE_BATCH', '64'))
+        self.compact_ratio = float(os.getenv('WIZRAVEN_KB_COMPACT_RATIO', '0.25'))
+        self.compact_min_tombstones = int(os.getenv('WIZRAVEN_KB_COMPACT_MIN', '64'))
+        self.retention = parse_retention(os.getenv('WIZRAVEN_KB_RETENTION'))
+        self.retention_interval = float(os.getenv('WIZRAVEN_KB_RETENTION_INTERVAL', '3600'))
+        self.compactions = 0
+        # Created on first write, bound to the running event loop
+        self._write_queue: Optional[asyncio.Queue] = None
+        self._writer_task: Optional[asyncio.Task] = None
+        self._sweeper_task: Optional[asyncio.Task] = None
+        self._compaction: Optional[asyncio.Task] = None
+        self._search_flights = SingleFlight('search_kb')
+        # Fingerprints of analyzed pastes, for "seen this before?" without embeddings
+        self.incidents = IncidentIndex()
+
+    # Read-only views of the current state
+    @property
+    def documents(self) -> Dict[int, str]:
+        return {doc_id: self._entries[key].text for doc_id, key in self._docs.items()}
+
+    @property
+    def index(self):
+        return self._view.index
+
+    @property
+    def dim(self) -> Optional[int]:
+        return self._dim
+
+    @property
+    def tombstone_ratio(self) -> float:
+        total = self.index.ntotal if self.index is not None else 0
+        return len(self._dead) / total if total else 0.0
+
+    async def stats(self) -> Dict[str, Any]:
+        index = self.index
+        return {
+            'documents': len(self._docs),
+            'vectors': index.ntotal if index is not None else 0,
+            'tombstones': len(self._dead),
+            'tombstone_ratio': round(self.tombstone_ratio, 4),
+            'compactions': self.compactions,
+            'incidents': len(self.incidents),
+        }
 
     def _require_key(self, api_key: Optional[str]):
         if not api_key:
@@ -32,88 +234,402 @@ class KnowledgeAgent(Agent):
     def _make_embeddings(self, api_key: str):
         # Import lazily to avoid import-time failures when the optional
         # langchain_google_genai package isn't installed in the environment.
-        global GoogleGenerativeAIEmbeddings
-        if GoogleGenerativeAIEmbeddings is None:
-            try:
-                from langchain_google_genai import GoogleGenerativeAIEmbeddings as _GGAE  # type: ignore
-                GoogleGenerativeAIEmbeddings = _GGAE
-            except Exception as e:
-                raise ValueError('langchain_google_genai is required for KnowledgeAgent but is not installed') from e
+        embeddings_class = _load_embeddings_class()
 
         try:
-            return GoogleGenerativeAIEmbeddings(api_key=api_key)  # type: ignore
+            return embeddings_class(api_key=api_key)  # type: ignore
         except Exception as e:
             # Re-raise as ValueError to keep the contract simple
             raise ValueError(f'Unable to construct Cerebras embeddings client: {e}')
 
-    async def add_to_kb(self, log_text: str, api_key: str) -> Dict[str, Any]:
+    async def _embed_document(self, text: str, api_key: str) -> np.ndarray:
+        emb_client = self._make_embeddings(api_key)
+        try:
+            with span('embedding', bytes_in=len(text)):
+                vecs = await get_execution_layer().run('embedding', emb_client.embed_documents, [text])
+        except Exception as e:
+            raise ValueError(f'Embedding failure: {e}')
+        return np.array(vecs[0], dtype=np.float32)
+
+    def _ensure_writer(self) -> asyncio.Queue:
+        loop = asyncio.get_running_loop()
+        task = self._writer_task
+        if task is None or task.done() or task.get_loop() is not loop:
+            self._write_queue = asyncio.Queue()
+            self._writer_task = loop.create_task(self._writer_loop(self._write_queue))
+            if self.retention and self.retention_interval > 0:
+                self._sweeper_task = loop.create_task(self._sweeper_loop())
+        return self._write_queue
+
+    async def _submit(self, op: str, args: Tuple) -> Any:
+        queue = self._ensure_writer()
+        future = asyncio.get_running_loop().create_future()
+        with span('kb_write'):
+            await queue.put((op, args, future))
+            return await future
+
+    async def _writer_loop(self, queue: asyncio.Queue) -> None:
+        """Sole mutator of the KB: apply queued operations in batches."""
+        while True:
+            batch = [await queue.get()]
+            while len(batch) < self.write_batch_size and not queue.empty():
+                batch.append(queue.get_nowait())
+            try:
+                results = await self._apply_ops(batch)
+            except Exception as e:
+                for _, _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+            for (_, _, future), result in zip(batch, results):
+                if future.done():
+                    continue
+                if isinstance(result, Exception):
+                    future.set_exception(result)
+                else:
+                    future.set_result(result)
+            self._maybe_compact()
+
+    async def _apply_ops(self, batch: List[Tuple[str, Tuple, Any]]) -> List[Any]:
+        """Apply ``batch`` in order and publish the result as the next view.
+
+        Ops are ``('add', (text, vec, kind, expires_at))``, ``('update',
+        (doc_id, text, vec))``, ``('delete', (doc_ids,))`` and ``('compact',
+        (base, dead_keys, (index, twin)))``: two identical rebuilt copies, one
+        to publish and one to become the writer's spare. Document maps change here, on the
+        event loop; only the index appends go to the ``faiss`` pool.
+        Returns a result or a ValueError per op.
+        """
+        version = self._view.version + 1
+        entries, docs, dead = self._entries, self._docs, self._dead
+        pending_keys: List[int] = []
+        pending_vecs: List[np.ndarray] = []
+        added: List[Tuple[np.ndarray, np.ndarray]] = []
+        tombstoned: List[int] = []
+        replaced: Optional[_Buffer] = None
+        results: List[Any] = []
+        now = time.time()
+
+        async def flush():
+            if not pending_keys:
+                return
+            vecs, keys = np.vstack(pending_vecs), np.array(pending_keys, dtype=np.int64)
+            pending_keys.clear()
+            pending_vecs.clear()
+            index = await self._writable()
+            await get_execution_layer().run('faiss', index.add_with_ids, vecs, keys)
+            added.append((vecs, keys))
+
+        def check_dim(vec: np.ndarray) -> Optional[ValueError]:
+            if self._dim is None:
+                self._dim = vec.shape[0]
+            if vec.shape[0] != self._dim:
+                return ValueError(f'Embedding dimension mismatch (expected {self._dim}, got {vec.shape[0]})')
+            return None
+
+        def new_key(doc: _Doc, vec: np.ndarray) -> None:
+            key, self._next_key = self._next_key, self._next_key + 1
+            entries[key] = doc
+            docs[doc.doc_id] = key
+            if doc.expires_at is not None:
+                heapq.heappush(self._expiring, (doc.expires_at, key))
+            pending_keys.append(key)
+            pending_vecs.append(vec)
+
+        for op, args, _ in batch:
+            if op == 'add':
+                text, vec, kind, expires_at = args
+                error = check_dim(vec)
+                if error:
+                    results.append(error)
+                    continue
+                doc_id, self._next_id = self._next_id, self._next_id + 1
+                new_key(_Doc(text, doc_id, kind, now, expires_at), vec)
+                results.append(doc_id)
+            elif op == 'update':
+                doc_id, text, vec = args
+                old_key = docs.get(doc_id)
+                error = check_dim(vec) if old_key is not None else ValueError(f'Unknown document id {doc_id}')
+                if error:
+                    results.append(error)
+                    continue
+                dead[old_key] = version
+                tombstoned.append(old_key)
+                new_key(entries[old_key]._replace(text=text), vec)
+                results.append(doc_id)
+            elif op == 'delete':
+                deleted = []
+                for doc_id in args[0]:
+                    key = docs.pop(doc_id, None)
+                    if key is not None:
+                        dead[key] = version
+                        tombstoned.append(key)
+                        deleted.append(doc_id)
+                results.append(deleted)
+            elif op == 'compact':
+                base, dead_keys, (compacted, twin) = args
+                await flush()
+                # Vectors written since ``base`` was taken are not in the rebuilt copies yet
+                late = [key for key in range(base.next_key, self._next_key) if key in entries]
+                source = await self._writable()
+                for target in (compacted, twin):
+                    await get_execution_layer().run('faiss', _copy_vectors, source, target, late)
+                for key in dead_keys:
+                    dead.pop(key, None)
+                    entries.pop(key, None)
+                # Later adds in this batch go to ``compacted`` and are replayed onto the twin
+                added.clear()
+                self._spare, replaced = _Buffer(compacted), _Buffer(twin)
+                results.append(len(dead_keys))
+            else:
+                results.append(ValueError(f'Unknown KB operation: {op}'))
+
+        await flush()
+        self._publish(version, added, replaced, tombstoned)
+        return results
+
+    async def _writable(self):
+        """The unpublished copy of the index, brought up to date with the published one."""
+        spare = self._spare
+        if spare is None:
+            # No second copy yet (first writes, or just after a compaction)
+            current = self._view.index
+            index = await get_execution_layer().run('faiss', _load_faiss().clone_index, current) \
+                if current is not None else _new_index(self._dim)
+            self._spare, self._lag = _Buffer(index), []
+            return index
+        await spare.drained()
+        for vecs, keys in self._lag:
+            await get_execution_layer().run('faiss', spare.index.add_with_ids, vecs, keys)
+        self._lag = []
+        return spare.index
+
+    def _publish(self, version: int, added: List[Tuple[np.ndarray, np.ndarray]], replaced: Optional[_Buffer],
+                 tombstoned: List[int]) -> None:
+        """Publish the spare copy; ``replaced`` is a compaction's twin, which becomes the next spare."""
+        self._exclude(tombstoned)
+        old = self._view
+        if not added and replaced is None:
+            # Tombstones only: same copy of the index, newer version
+            self._view = _KBView(old.buffer, version, self._next_key)
+            return
+        self._view = _KBView(self._spare, version, self._next_key)
+        if replaced is not None:
+            self._spare, self._lag = replaced, added
+        elif old.buffer is None:
+            self._spare, self._lag = None, []
+        else:
+            self._spare, self._lag = old.buffer, added
+
+    def _exclude(self, keys: List[int]) -> None:
+        if self._next_key > len(self._excluded):
+            grown = np.zeros(max(self._next_key, 2 * len(self._excluded)), dtype=bool)
+            grown[:len(self._excluded)] = self._excluded
+            self._excluded = grown
+        if keys:
+            self._excluded[np.asarray(keys, dtype=np.int64)] = True
+
+    def _search_params(self, view: _KBView, now: float):
+        """FAISS parameters excluding ``view``'s tombstoned and expired keys, or None if there are none.
+
+        Built from a packed bitmap over the view's key range on first use
+        and kept on the view until another document expires.
+        """
+        expired = []
+        while self._expiring and self._expiring[0][0] <= now:
+            expired.append(heapq.heappop(self._expiring)[1])
+        if expired:
+            self._exclude(expired)
+            view.search_filter = None
+        if view.search_filter is None:
+            excluded = self._excluded[:view.next_key]
+            if not excluded.any():
+                view.search_filter = (None,)
+            else:
+                _faiss = _load_faiss()
+                bitmap = np.packbits(excluded, bitorder='little')
+                inner = _faiss.IDSelectorBitmap(view.next_key, _faiss.swig_ptr(bitmap))
+                selector = _faiss.IDSelectorNot(inner)
+                # The selectors point into ``bitmap`` and each other: keep them all alive
+                view.search_filter = (_faiss.SearchParameters(sel=selector), selector, inner, bitmap)
+        return view.search_filter[0]
+
+    def _start_compaction(self) -> asyncio.Future:
+        self._compaction = asyncio.ensure_future(self._compact())
+        self._compaction.add_done_callback(_log_compaction_failure)
+        return self._compaction
+
+    def _maybe_compact(self) -> None:
+        if self._compaction is not None and not self._compaction.done():
+            return
+        if len(self._dead) >= max(1, self.compact_min_tombstones) and self.tombstone_ratio >= self.compact_ratio:
+            self._start_compaction()
+
+    def _dead_at(self, version: int) -> List[int]:
+        return [key for key, died in self._dead.items() if died <= version]
+
+    async def _compact(self) -> int:
+        base = self._view
+        if not self._dead or base.buffer is None:
+            return 0
+        started = time.perf_counter()
+        dead_keys = self._dead_at(base.version)
+        layer = get_execution_layer()
+        with span('kb_compact'):
+            # Pin the published copy only while its live vectors are copied out,
+            # so writes (which wait for readers to drain) aren't held up by the rebuild
+            with base.buffer.reading() as index:
+                vectors, keys = await layer.run('faiss', _live_vectors, index, dead_keys)
+            # Two copies, so the writer has a spare and doesn't clone on the next write
+            compacted = await layer.run('faiss', self._build_compacted, vectors, keys, self._dim)
+            twin = await layer.run('faiss', self._build_compacted, vectors, keys, self._dim)
+            dropped = await self._submit('compact', (base, dead_keys, (compacted, twin)))
+        self.compactions += 1
+        log.info('kb.compacted', dropped=dropped, vectors=self.index.ntotal,
+                 ms=round((time.perf_counter() - started) * 1000, 2))
+        return dropped
+
+    @staticmethod
+    def _build_compacted(vectors: np.ndarray, keys: np.ndarray, dim: int):
+        compacted = _new_index(dim)
+        if len(keys):
+            compacted.add_with_ids(vectors, keys)
+        return compacted
+
+    async def compact(self) -> int:
+        """Rebuild the index without tombstoned vectors now; returns how many were dropped."""
+        if self._compaction is not None and not self._compaction.done():
+            await self._compaction
+        return await self._start_compaction()
+
+    async def _sweeper_loop(self) -> None:
+        while True:
+            await asyncio.sleep(self.retention_interval)
+            try:
+                await self.apply_retention()
+            except Exception as e:
+                log.warning('kb.retention_failed', error=str(e))
+
+    async def apply_retention(self, now: Optional[float] = None) -> List[int]:
+        """Delete every document past its retention; returns their ids."""
+        now = time.time() if now is None else now
+        expired = [doc_id for doc_id, key in self._docs.items()
+                   if self._entries[key].expires_at is not None and self._entries[key].expires_at <= now]
+        if not expired:
+            return []
+        deleted = await self._submit('delete', (expired,))
+        log.info('kb.retention', deleted=len(deleted))
+        return deleted
+
+    async def add_to_kb(self, log_text: str, api_key: str, kind: str = 'doc',
+                        ttl_days: Optional[float] = None) -> Dict[str, Any]:
         """Embed `log_text` using Cerebras embeddings and add to FAISS index.
 
+        ``kind`` selects the retention policy (WIZRAVEN_KB_RETENTION);
+        ``ttl_days`` overrides it for this document.
+
         Returns: {'ok': True, 'id': int}
         Raises ValueError if api_key missing/invalid.
         """
         self._require_key(api_key)
         if not log_text:
             raise ValueError('log_text must be non-empty')
+        _load_faiss()
 
-        emb_client = self._make_embeddings(api_key)
-        try:
-            vecs = emb_client.embed_documents([log_text])
-        except Exception as e:
-            raise ValueError(f'Embedding failure: {e}')
+        vec = await self._embed_document(log_text, api_key)
+        ttl = ttl_days * 86400 if ttl_days is not None else self.retention.get(kind)
+        expires_at = time.time() + ttl if ttl is not None else None
+        doc_id = await self._submit('add', (log_text, vec, kind, expires_at))
+        return {"ok": True, "id": doc_id}
 
-        vec = np.array(vecs[0], dtype=np.float32)
-        # Initialize FAISS index lazily with detected dimension
-        if self.index is None:
-            # Lazy import faiss to avoid requiring it at app import time
-            global faiss
-            if faiss is None:
-                try:
-                    import faiss as _faiss  # type: ignore
-                    faiss = _faiss
-                except Exception as e:
-                    raise ValueError('faiss is required for KnowledgeAgent but is not installed') from e
-
-            self.dim = vec.shape[0]
-            self.index = faiss.IndexFlatL2(self.dim)
-
-        if vec.shape[0] != self.dim:
-            raise ValueError(f'Embedding dimension mismatch (expected {self.dim}, got {vec.shape[0]})')
-
-        # Add to index and store document
-        self.index.add(vec.reshape(1, -1))
-        doc_id = len(self.documents)
-        self.documents.append(log_text)
+    async def update_kb(self, doc_id: int, log_text: str, api_key: str) -> Dict[str, Any]:
+        """Replace document ``doc_id``'s text (re-embedded); it keeps its id, kind and expiry.
 
+        Raises ValueError if api_key is missing or the id is unknown.
+        """
+        self._require_key(api_key)
+        if not log_text:
+            raise ValueError('log_text must be non-empty')
+        if doc_id not in self._docs:
+            raise ValueError(f'Unknown document id {doc_id}')
+        _load_faiss()
+
+        vec = await self._embed_document(log_text, api_key)
+        await self._submit('update', (doc_id, log_text, vec))
         return {"ok": True, "id": doc_id}
 
+    async def delete_from_kb(self, doc_ids: List[int], api_key: str) -> Dict[str, Any]:
+        """Delete documents by id; unknown ids are reported, not raised.
+
+        Returns: {'ok': True, 'deleted': [ids], 'missing': [ids]}
+        """
+        self._require_key(api_key)
+        deleted = await self._submit('delete', (list(doc_ids),))
+        return {"ok": True, "deleted": deleted, "missing": [i for i in doc_ids if i not in deleted]}
+
     async def search_kb(self, query: str, api_key: str, k: int = 3) -> str:
         """Embed `query` using Cerebras embeddings and return top-k document texts as a single string.
 
-        Raises ValueError if api_key missing/invalid.
+        Raises ValueError if api_key missing/invalid. Concurrent identical
+        searches against the same KB version share one embedding call and search.
         """
         self._require_key(api_key)
-        if self.index is None or len(self.documents) == 0:
+        key = flight_key(normalize_text(query), scope_of(api_key), k, self._view.version)
+        return await self._search_flights.do(key, self._search, query, api_key, k)
+
+    async def _search(self, query: str, api_key: str, k: int) -> str:
+        if self._view.index is None or not self._docs:
             return ''
 
         emb_client = self._make_embeddings(api_key)
         try:
-            qvec = np.array(emb_client.embed_query(query), dtype=np.float32)
+            with span('embedding', bytes_in=len(query or '')):
+                qvec = np.array(await get_execution_layer().run('embedding', emb_client.embed_query, query),
+                                dtype=np.float32)
         except Exception as e:
             raise ValueError(f'Embedding failure: {e}')
 
-        if qvec.shape[0] != self.dim:
+        if qvec.shape[0] != self._dim:
             raise ValueError('Query embedding dimension does not match index')
 
-        D, I = self.index.search(qvec.reshape(1, -1), min(k, len(self.documents)))
+        # Taken after the embedding call so a slow provider never holds up the writer
+        view = self._view
+        now = time.time()
+        # Tombstoned and expired keys are filtered inside FAISS, so k results are k live documents
+        params = self._search_params(view, now)
+        with span('faiss'), view.buffer.reading() as index:
+            D, I = await get_execution_layer().run('faiss', index.search, qvec.reshape(1, -1),
+                                                   min(k, index.ntotal), params=params)
         texts = []
-        for idx in I[0]:
-            if idx < 0 or idx >= len(self.documents):
+        for key in I[0]:
+            key = int(key)
+            if key < 0:
+                break
+            doc = self._entries.get(key)
+            if doc is None or self._dead.get(key, view.version + 1) <= view.version:
                 continue
-            texts.append(self.documents[idx])
+            if doc.expires_at is not None and doc.expires_at <= now:
+                continue
+            texts.append(doc.text)
+            if len(texts) == k:
+                break
 
         return '\n\n'.join(texts)
 
+    async def record_incident(self, features: List[str], analysis: Optional[Dict[str, Any]] = None,
+                              meta: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """Fingerprint an analyzed paste (``fingerprint.incident_features``) with its analysis.
+
+        Returns: {'ok': True, 'id': int}
+        """
+        return {"ok": True, "id": self.incidents.add(features, analysis, meta)}
+
+    async def similar_incidents(self, features: List[str], k: int = 3,
+                                min_similarity: Optional[float] = None) -> List[Dict[str, Any]]:
+        """Past incidents whose fingerprint resembles ``features``, most similar first."""
+        with span('incident_lookup'):
+            return self.incidents.query(features, k=k, min_similarity=min_similarity)
+
     async def process_message(self, message: Message) -> None:
         """Simple handler: commands 'ADD: <text>' and 'SEARCH: <query>' using message.context['cerebras_api_key']."""
         try:
@@ -148,7 +664,8 @@ class KnowledgeAgent(Agent):
             return []
 
         try:
-            text = await self.search_kb(query, api_key=api_key, k=k)
+            with span('kb_query'):
+                text = await self.search_kb(query, api_key=api_key, k=k)
         except Exception:
             # On any embedding/index error, surface no results rather than raise
             return []
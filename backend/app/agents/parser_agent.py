@@ -1,6 +1,149 @@
-from typing import Dict, Optional, Any
+from typing import Dict, Optional, Any, Tuple
 from .base_agent import Agent, Message
+from ..utils.log_templates import TemplateMiner
+from ..utils.log_formats import detect_format
+from ..utils.timestamps import TimestampNormalizer
+from ..utils.executors import get_execution_layer
+from ..utils.metrics import span
 import re
+import numpy as np
+
+# Generic cleaner patterns, compiled once
+_BULLET_RE = re.compile(r'^\*+\s*')
+_PRIORITY_RE = re.compile(r'^<\d+>\s*')
+_SYSLOG_TS_RE = re.compile(r'^\*?\s*(\w{3}\s+\d{1,2}\s+\d{2}:\d{2}:\d{2}(?:\.\d+)?)[:\s-]*')
+_ISO_TS_RE = re.compile(r'^(\d{4}-\d{2}-\d{2}\s+\d{2}:\d{2}:\d{2})[\s-]*')
+_HOST_RE = re.compile(r'^([A-Za-z][\w.\-]*)\s+(?=%[A-Z]|[\w\-/]+(?:\[\d+\])?:\s)')
+_CISCO_MNEMONIC_RE = re.compile(r'%([A-Z][A-Z0-9_]*-\d-[A-Z0-9_]+)')
+_JUNOS_TAG_RE = re.compile(r'\b([A-Z][A-Z0-9]+(?:_[A-Z0-9]+)+):')
+_HEADER_MARK_RE = re.compile(r'%[A-Z0-9\-]+')
+_HEADER_WORD_RE = re.compile(r'^[A-Z0-9_\-]{2,}$')
+_SPACES_RE = re.compile(r'\s+')
+
+
+def clean_line(line: str) -> Tuple[str, Optional[str], Optional[str], Optional[str]]:
+    """Generic cleaner for lines no vendor extractor matched.
+
+    Returns (message, timestamp, device, mnemonic).
+    """
+    # strip leading asterisks or bullets common in pasted logs
+    line = _BULLET_RE.sub('', line)
+
+    # remove syslog numeric priority like <13>
+    line = _PRIORITY_RE.sub('', line)
+
+    # remove ISO or syslog timestamps at start of line, remembering
+    # the stripped value for template first/last-seen tracking
+    timestamp = None
+    device = None
+    ts_match = _SYSLOG_TS_RE.match(line) or _ISO_TS_RE.match(line)
+    if ts_match:
+        timestamp = ts_match.group(1)
+        line = line[ts_match.end():]
+        # syslog layout: hostname follows the timestamp, then a %MNEMONIC or process tag
+        host_match = _HOST_RE.match(line)
+        if host_match:
+            device = host_match.group(1)
+
+    mnemonic = None
+    mn_match = _CISCO_MNEMONIC_RE.search(line) or _JUNOS_TAG_RE.search(line)
+    if mn_match:
+        mnemonic = mn_match.group(1)
+
+    # If the line contains device-priority markers like %LINK-3-UPDOWN:, keep text after the first ':'
+    if ':' in line:
+        parts = line.split(':', 1)
+        # If the left part looks like a header (contains % or uppercase-with-dash), drop it
+        if _HEADER_MARK_RE.search(parts[0]) or _HEADER_WORD_RE.match(parts[0].strip()):
+            line = parts[1].strip()
+
+    # collapse multiple spaces
+    line = _SPACES_RE.sub(' ', line).strip()
+    return line, timestamp, device, mnemonic
+
+
+def parse_log_text(raw_logs: str, format_probe_chars: int = 4096) -> Dict:
+    """Clean and normalize raw log text (the body of ``ParserAgent.process_logs``).
+
+    Module-level and free of agent state so large inputs can be parsed in
+    the execution layer's process pool.
+
+    The vendor format is detected once from the first few KB (see
+    ``app.utils.log_formats``) and its precompiled extractor is used for
+    every line; lines it can't match, and inputs of unknown format, go
+    through the generic cleaner.
+
+    Returns a dict with:
+      - clean_logs: the cleaned log text
+      - original_length: length of the raw input (chars)
+      - format: detected vendor format name, or 'unknown'
+      - message: list of cleaned log lines
+      - timestamp: per-line timestamp text as found in the log (or None)
+      - epoch_ms: int64 NumPy array of per-line epoch milliseconds
+        (``timestamps.MISSING_MS`` where the line has no usable timestamp)
+      - device: per-line originating hostname when present (or None)
+      - mnemonic: per-line Cisco %FAC-SEV-MNEMONIC or Junos event tag (or None)
+      - patterns: mined log templates, most frequent first
+      - templates: template details (id, count, first/last seen, samples)
+      - template_id: int32 NumPy array of each line's template id (0 when
+        the line has none), so later passes count templates without re-mining
+
+    This function intentionally does not call any LLM.
+    """
+    original_length = len(raw_logs or "")
+
+    # Normalize newlines and strip leading/trailing whitespace
+    text = (raw_logs or '').replace('\r\n', '\n').strip()
+
+    log_format = detect_format(text, format_probe_chars)
+    extract = log_format.extract if log_format is not None else None
+
+    lines = []
+    timestamps = []
+    devices = []
+    mnemonics = []
+    template_ids = []
+    miner = TemplateMiner()
+    for raw_line in text.split('\n'):
+        raw_line = raw_line.strip()
+        if not raw_line:
+            continue
+
+        record = extract(raw_line) if extract is not None else None
+        if record is not None:
+            line = _SPACES_RE.sub(' ', record['message']).strip()
+            timestamp, device, mnemonic = record['timestamp'], record['device'], record['mnemonic']
+        else:
+            line, timestamp, device, mnemonic = clean_line(raw_line)
+
+        if line:
+            lines.append(line)
+            timestamps.append(timestamp)
+            devices.append(device)
+            mnemonics.append(mnemonic)
+            template = miner.add(line, timestamp)
+            template_ids.append(template.template_id if template is not None else 0)
+
+    clean_logs = '\n'.join(lines)
+    templates = miner.to_dicts()
+
+    return {
+        "clean_logs": clean_logs,
+        "original_length": original_length,
+        "format": log_format.name if log_format is not None else 'unknown',
+        "message": lines,
+        "timestamp": timestamps,
+        "epoch_ms": TimestampNormalizer().to_epoch_ms(timestamps),
+        "device": devices,
+        "mnemonic": mnemonics,
+        "patterns": [t["template"] for t in templates],
+        "templates": templates,
+        "template_id": np.array(template_ids, dtype=np.int32),
+    }
+
+
+def _empty_result(raw_logs: str) -> Dict:
+    return {"clean_logs": '', "original_length": len(raw_logs or ''), "format": 'unknown', "message": [], "timestamp": [], "epoch_ms": TimestampNormalizer().to_epoch_ms([]), "device": [], "mnemonic": [], "patterns": [], "templates": [], "template_id": np.zeros(0, dtype=np.int32)}
 
 
 class ParserAgent(Agent):
@@ -9,78 +152,40 @@ class ParserAgent(Agent):
                          system_message="""You are an expert log parser agent specialized in network logs.
             Your role is to preprocess and clean raw log text into a consistent form.""")
 
-        # Predefined simple patterns to help with lightweight format detection
-        self.log_patterns = {
-            'cisco': r'(\w{3}\s+\d{1,2}\s+\d{2}:\d{2}:\d{2}).*?%([A-Z0-9\-]+)-',
-            'juniper': r'(\d{4}-\d{2}-\d{2}\s+\d{2}:\d{2}:\d{2})',
-            'syslog': r'<\d+>',
-        }
+        # Bytes of input handed to the vendor format probes
+        self.format_probe_chars = 4096
 
     async def process_logs(self, raw_logs: str, context: Optional[Dict[str, Any]] = None) -> Dict:
-        """Clean and normalize raw log text.
+        """Clean and normalize raw log text; see ``parse_log_text`` for the result keys.
 
-        Returns a dict with:
-          - clean_logs: the cleaned log text
-          - original_length: length of the raw input (chars)
+        Inputs of at least ``WIZRAVEN_OFFLOAD_MIN_LINES`` lines are parsed on
+        the execution layer's ``cpu`` process pool so a large paste doesn't
+        freeze the event loop; smaller ones are parsed inline.
 
         This function intentionally does not call any LLM.
         """
         try:
-            original_length = len(raw_logs or "")
-
-            # Normalize newlines and strip leading/trailing whitespace
-            text = (raw_logs or '').replace('\r\n', '\n').strip()
-
-            lines = []
-            for raw_line in text.split('\n'):
-                line = raw_line.strip()
-                if not line:
-                    continue
-
-                # strip leading asterisks or bullets common in pasted logs
-                line = re.sub(r'^\*+\s*', '', line)
-
-                # remove syslog numeric priority like <13>
-                line = re.sub(r'^<\d+>\s*', '', line)
-
-                # remove ISO or syslog timestamps at start of line
-                line = re.sub(r'^\*?\s*\w{3}\s+\d{1,2}\s+\d{2}:\d{2}:\d{2}(?:\.\d+)?[:\s-]*', '', line)
-                line = re.sub(r'^\d{4}-\d{2}-\d{2}\s+\d{2}:\d{2}:\d{2}[\s-]*', '', line)
-
-                # If the line contains device-priority markers like %LINK-3-UPDOWN:, keep text after the first ':'
-                if ':' in line:
-                    parts = line.split(':', 1)
-                    # If the left part looks like a header (contains % or uppercase-with-dash), drop it
-                    if re.search(r'%[A-Z0-9\-]+', parts[0]) or re.match(r'^[A-Z0-9_\-]{2,}$', parts[0].strip()):
-                        line = parts[1].strip()
-
-                # collapse multiple spaces
-                line = re.sub(r'\s+', ' ', line).strip()
-
-                if line:
-                    lines.append(line)
-
-            clean_logs = '\n'.join(lines)
-
-            return {
-                "clean_logs": clean_logs,
-                "original_length": original_length,
-            }
+            with span('parse', bytes_in=len(raw_logs or '')) as s:
+                layer = get_execution_layer()
+                if layer.should_offload((raw_logs or '').count('\n') + 1):
+                    result = await layer.run('cpu', parse_log_text, raw_logs, self.format_probe_chars)
+                else:
+                    result = parse_log_text(raw_logs, self.format_probe_chars)
+                s.set(bytes_out=len(result['clean_logs']), lines=len(result['message']))
+            return result
 
         except Exception as e:
             # On failure, return a minimal structure
-            return {"clean_logs": '', "original_length": len(raw_logs or '')}
+            return _empty_result(raw_logs)
 
     async def identify_log_format(self, sample_logs: str, context: Optional[Dict[str, Any]] = None) -> str:
-        """Identify the format/type of the provided logs using simple regex checks.
+        """Identify the format/type of the provided logs using the registered vendor probes.
 
         This function intentionally avoids calling any external LLM.
         """
         try:
-            for format_name, pattern in self.log_patterns.items():
-                if re.search(pattern, sample_logs or ''):
-                    return format_name
-            return 'unknown'
+            log_format = detect_format(sample_logs or '', self.format_probe_chars)
+            return log_format.name if log_format is not None else 'unknown'
         except Exception:
             return 'unknown'
 
@@ -1,5 +1,14 @@
-from typing import List
-from sentence_transformers import SentenceTransformer
+import os
+from typing import Any, Dict, List, Optional, Tuple
+
+from ..utils.startup import lazy_import
+
+# sentence_transformers pulls in torch; it is imported when the first
+# manager is built (or during startup warm-up), not when this module loads.
+_MANAGERS: Dict[Tuple[str, str], Any] = {}
+
+# 'torch' (sentence-transformers) or 'onnx' (exported int8 model on onnxruntime)
+BACKENDS = ('torch', 'onnx')
 
 class EmbeddingManager:
     def __init__(self, model_name: str = 'all-MiniLM-L6-v2'):
@@ -9,7 +18,7 @@ class EmbeddingManager:
         Args:
             model_name (str): Name of the sentence transformer model to use
         """
-        self.model = SentenceTransformer(model_name)
+        self.model = lazy_import('sentence_transformers').SentenceTransformer(model_name)
         
     def encode_text(self, text: str) -> List[float]:
         """
@@ -33,4 +42,25 @@ class EmbeddingManager:
         Returns:
             List[List[float]]: List of embedding vectors
         """
-        return self.model.encode(texts).tolist()
\ No newline at end of file
+        return self.model.encode(texts).tolist()
+
+
+def get_embedding_manager(model_name: str = 'all-MiniLM-L6-v2', backend: Optional[str] = None) -> Any:
+    """Process-wide manager per model and backend, so the model is loaded once.
+
+    ``backend`` defaults to WIZRAVEN_EMBEDDING_BACKEND (``torch``). The
+    ``onnx`` backend exports the model on first use if it has not been
+    exported yet (see ``onnx_embeddings.export_onnx``).
+    """
+    backend = (backend or os.getenv('WIZRAVEN_EMBEDDING_BACKEND', 'torch')).lower()
+    if backend not in BACKENDS:
+        raise ValueError(f'Unknown embedding backend {backend!r} (expected one of {", ".join(BACKENDS)})')
+    manager = _MANAGERS.get((backend, model_name))
+    if manager is None:
+        if backend == 'onnx':
+            from .onnx_embeddings import load_onnx_manager
+            manager = load_onnx_manager(model_name)
+        else:
+            manager = EmbeddingManager(model_name)
+        _MANAGERS[(backend, model_name)] = manager
+    return manager
@@ -0,0 +1,205 @@
+import json
+import os
+from typing import Any, Dict, List, Optional, Sequence
+
+import numpy as np
+
+from ..utils.startup import lazy_import
+from ..utils.structured_logging import get_logger
+
+log = get_logger(__name__)
+
+# Written next to the exported model; records how to pool and what was checked
+CONFIG_FILE = 'wizraven_onnx.json'
+FP32_FILE = 'model.onnx'
+INT8_FILE = 'model.int8.onnx'
+
+# Log-flavoured sentences the exported model is checked against torch on
+CALIBRATION_TEXTS = (
+    'Interface GigabitEthernet0/1, changed state to down',
+    'Line protocol on Interface GigabitEthernet0/1, changed state to up',
+    '%BGP-5-ADJCHANGE: neighbor 10.0.0.2 Down BGP Notification sent',
+    'OSPF neighbor 10.1.1.1 on ge-0/0/0.0 changed from Full to Init',
+    'kernel: eth0: link down',
+    'sshd[1234]: Failed password for root from 203.0.113.7 port 52211',
+    'CPU utilization for five seconds: 98%/12%; one minute: 85%',
+    'Power supply 2 failed, system running on redundant supply',
+    'high latency on uplink',
+    'disk full',
+)
+
+
+def default_model_dir(model_name: str) -> str:
+    base = os.getenv('WIZRAVEN_ONNX_DIR') or os.path.join(os.path.expanduser('~'), '.cache', 'wizraven', 'onnx')
+    return os.path.join(base, model_name.replace('/', '__'))
+
+
+def cosine_agreement(reference: Sequence[Sequence[float]], candidate: Sequence[Sequence[float]]) -> Dict[str, float]:
+    """Row-wise cosine similarity between two embedding sets (same texts, same order)."""
+    a = np.asarray(reference, dtype=np.float32)
+    b = np.asarray(candidate, dtype=np.float32)
+    if a.shape != b.shape:
+        raise ValueError(f'Embedding shapes differ: {a.shape} vs {b.shape}')
+    norms = np.linalg.norm(a, axis=1) * np.linalg.norm(b, axis=1)
+    cos = np.sum(a * b, axis=1) / np.maximum(norms, 1e-12)
+    return {'mean': round(float(cos.mean()), 5), 'min': round(float(cos.min()), 5), 'n': int(len(cos))}
+
+
+def export_onnx(model_name: str = 'all-MiniLM-L6-v2', out_dir: Optional[str] = None, quantize: bool = True,
+                min_cosine: Optional[float] = None, opset: int = 14) -> Dict[str, Any]:
+    """Export a sentence-transformers model to ONNX, int8-quantize it and check it against torch.
+
+    Needs torch and sentence-transformers (export only; serving needs
+    onnxruntime and tokenizers). The quantized model must agree with the
+    torch embeddings on ``CALIBRATION_TEXTS`` to at least ``min_cosine``
+    (WIZRAVEN_ONNX_MIN_COSINE, default 0.95) or a ValueError is raised.
+    Returns the config written to ``CONFIG_FILE``.
+    """
+    torch = lazy_import('torch')
+    out_dir = out_dir or default_model_dir(model_name)
+    os.makedirs(out_dir, exist_ok=True)
+    min_cosine = min_cosine if min_cosine is not None else float(os.getenv('WIZRAVEN_ONNX_MIN_COSINE', '0.95'))
+
+    st = lazy_import('sentence_transformers').SentenceTransformer(model_name, device='cpu')
+    st.tokenizer.save_pretrained(out_dir)  # tokenizer.json, loaded by `tokenizers` at serve time
+    modules = list(st)
+    pooling = next((m for m in modules if type(m).__name__ == 'Pooling'), None)
+    mode = 'cls' if pooling is not None and getattr(pooling, 'pooling_mode_cls_token', False) else 'mean'
+
+    sample = st.tokenizer(list(CALIBRATION_TEXTS[:2]), padding=True, return_tensors='pt')
+    input_names = [n for n in ('input_ids', 'attention_mask', 'token_type_ids') if n in sample]
+
+    class _Encoder(torch.nn.Module):
+        # Token embeddings only; pooling happens in numpy so padding can be masked per batch
+        def __init__(self, model):
+            super().__init__()
+            self.model = model
+
+        def forward(self, *inputs):
+            return self.model(**dict(zip(input_names, inputs)))[0]
+
+    fp32_path = os.path.join(out_dir, FP32_FILE)
+    with torch.no_grad():
+        torch.onnx.export(_Encoder(modules[0].auto_model).eval(), tuple(sample[n] for n in input_names), fp32_path,
+                          input_names=input_names, output_names=['token_embeddings'],
+                          dynamic_axes={n: {0: 'batch', 1: 'sequence'} for n in input_names + ['token_embeddings']},
+                          opset_version=opset)
+    model_file = FP32_FILE
+    if quantize:
+        quantization = lazy_import('onnxruntime.quantization')
+        quantization.quantize_dynamic(fp32_path, os.path.join(out_dir, INT8_FILE),
+                                      weight_type=quantization.QuantType.QInt8)
+        model_file = INT8_FILE
+
+    config = {
+        'model_name': model_name,
+        'model_file': model_file,
+        'pooling': mode,
+        'normalize': any(type(m).__name__ == 'Normalize' for m in modules),
+        'max_seq_length': int(st.max_seq_length or 256),
+        'dim': int(st.get_sentence_embedding_dimension()),
+    }
+    reference = st.encode(list(CALIBRATION_TEXTS))
+    candidate = OnnxEmbeddingManager(out_dir, config=config).encode_batch(list(CALIBRATION_TEXTS))
+    config['agreement'] = agreement = cosine_agreement(reference, candidate)
+    log.info('embeddings.onnx_exported', model=model_name, path=out_dir, file=model_file, **agreement)
+    if agreement['min'] < min_cosine:
+        raise ValueError(f'ONNX export of {model_name} disagrees with torch: min cosine {agreement["min"]} '
+                         f'< {min_cosine}')
+    # Written last: its presence marks a usable export
+    with open(os.path.join(out_dir, CONFIG_FILE), 'w', encoding='utf-8') as f:
+        json.dump(config, f, indent=2)
+    return config
+
+
+class OnnxEmbeddingManager:
+    """``EmbeddingManager`` backend running an exported (int8) model on onnxruntime.
+
+    Same ``encode_text``/``encode_batch`` interface. Batches are formed
+    from texts of similar token length (sorted, then chunked) and padded
+    only to the longest text in their batch, so a few long lines don't
+    pad every short one; results come back in input order. ``threads``
+    sets onnxruntime's intra-op thread count (WIZRAVEN_ONNX_THREADS,
+    0 leaves it to onnxruntime); ``bucket=False`` keeps input order in
+    batches (for comparison).
+    """
+
+    def __init__(self, model_dir: str, threads: Optional[int] = None, batch_size: Optional[int] = None,
+                 session: Any = None, tokenizer: Any = None, config: Optional[Dict[str, Any]] = None,
+                 bucket: bool = True):
+        if config is None:
+            with open(os.path.join(model_dir, CONFIG_FILE), encoding='utf-8') as f:
+                config = json.load(f)
+        self.config = config
+        self.model_dir = model_dir
+        self.batch_size = batch_size or int(os.getenv('WIZRAVEN_ONNX_BATCH_SIZE', '32'))
+        self.threads = threads if threads is not None else int(os.getenv('WIZRAVEN_ONNX_THREADS', '0'))
+        self.bucket = bucket
+        self.tokenizer = tokenizer if tokenizer is not None else self._load_tokenizer()
+        self.session = session if session is not None else self._load_session()
+        self.input_names = [i.name for i in self.session.get_inputs()]
+
+    def _load_tokenizer(self) -> Any:
+        tokenizer = lazy_import('tokenizers').Tokenizer.from_file(os.path.join(self.model_dir, 'tokenizer.json'))
+        tokenizer.no_padding()
+        tokenizer.enable_truncation(max_length=self.config.get('max_seq_length', 256))
+        return tokenizer
+
+    def _load_session(self) -> Any:
+        ort = lazy_import('onnxruntime')
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        options.execution_mode = ort.ExecutionMode.ORT_SEQUENTIAL
+        options.intra_op_num_threads = self.threads
+        options.inter_op_num_threads = 1
+        path = os.path.join(self.model_dir, self.config.get('model_file', INT8_FILE))
+        return ort.InferenceSession(path, sess_options=options, providers=['CPUExecutionProvider'])
+
+    def _run_batch(self, encodings: List[Any]) -> np.ndarray:
+        width = max(len(e.ids) for e in encodings)
+        input_ids = np.zeros((len(encodings), width), dtype=np.int64)
+        mask = np.zeros((len(encodings), width), dtype=np.int64)
+        for row, enc in enumerate(encodings):
+            input_ids[row, :len(enc.ids)] = enc.ids
+            mask[row, :len(enc.ids)] = 1
+        feeds = {'input_ids': input_ids, 'attention_mask': mask, 'token_type_ids': np.zeros_like(input_ids)}
+        tokens = self.session.run(None, {n: feeds[n] for n in self.input_names})[0]
+        if self.config.get('pooling') == 'cls':
+            pooled = tokens[:, 0]
+        else:
+            weights = mask[:, :, None].astype(tokens.dtype)
+            pooled = (tokens * weights).sum(axis=1) / np.maximum(weights.sum(axis=1), 1e-9)
+        if self.config.get('normalize', True):
+            pooled = pooled / np.maximum(np.linalg.norm(pooled, axis=1, keepdims=True), 1e-12)
+        return pooled.astype(np.float32)
+
+    def embed(self, texts: List[str]) -> np.ndarray:
+        """(len(texts), dim) float32 embeddings, in input order."""
+        if not texts:
+            return np.zeros((0, self.config.get('dim', 0)), dtype=np.float32)
+        encodings = self.tokenizer.encode_batch(list(texts))
+        order = list(range(len(texts)))
+        if self.bucket:
+            order.sort(key=lambda i: len(encodings[i].ids))
+        out: Optional[np.ndarray] = None
+        for start in range(0, len(order), self.batch_size):
+            idx = order[start:start + self.batch_size]
+            vecs = self._run_batch([encodings[i] for i in idx])
+            if out is None:
+                out = np.empty((len(texts), vecs.shape[1]), dtype=np.float32)
+            out[idx] = vecs
+        return out
+
+    def encode_text(self, text: str) -> List[float]:
+        return self.embed([text])[0].tolist()
+
+    def encode_batch(self, texts: List[str]) -> List[List[float]]:
+        return self.embed(texts).tolist()
+
+
+def load_onnx_manager(model_name: str = 'all-MiniLM-L6-v2', model_dir: Optional[str] = None) -> OnnxEmbeddingManager:
+    """Manager for ``model_name``'s exported model, exporting it first if it isn't there yet."""
+    model_dir = model_dir or default_model_dir(model_name)
+    if not os.path.exists(os.path.join(model_dir, CONFIG_FILE)):
+        export_onnx(model_name, model_dir)
+    return OnnxEmbeddingManager(model_dir)
@@ -1,4 +1,9 @@
+import time
+_IMPORT_STARTED = time.perf_counter()
+
+from contextlib import asynccontextmanager
 from fastapi import FastAPI, HTTPException
+from fastapi.responses import JSONResponse, PlainTextResponse
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
 from typing import List, Optional, Dict
@@ -6,12 +11,53 @@ from .agents.parser_agent import ParserAgent
 from .agents.analyzer_agent import AnalyzerAgent
 from .agents.knowledge_agent import KnowledgeAgent
 from .agents.crawler_agent import CrawlerAgent
-from fastapi import Header, Request
+from fastapi import Header, Query, Request
+from .utils.kb_service import KBClient
+from .utils.event_store import get_event_store, persist_in_background
+from .utils.executors import get_execution_layer
+from .utils.fingerprint import incident_features
+from .utils.llm_governor import get_governor
+from .utils.metrics import REGISTRY, start_trace
+from .utils.responses import COMPRESSION, CompressionMiddleware, json_response, shape_metadata
+from .utils.session_cache import SessionCache
+from .utils.startup import REPORT as STARTUP, Lazy, configured_steps, warm_up
+from .utils.structured_logging import configure_logging, get_logger, mask_secret
+import asyncio
+import logging
+import os
+import uuid
+
+configure_logging()
+log = get_logger(__name__)
+
+# Warm-up runs in the background by default so the process answers liveness
+# checks at once; /ready flips to 200 when it is done. WIZRAVEN_WARMUP_BLOCKING=1
+# holds startup until warm-up finishes instead.
+_WARMUP_BLOCKING = os.getenv('WIZRAVEN_WARMUP_BLOCKING', '').lower() in ('1', 'true', 'yes')
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    steps = configured_steps()
+    task = None
+    if steps:
+        task = asyncio.ensure_future(warm_up(_warmup_steps(), steps))
+        if _WARMUP_BLOCKING:
+            await task
+    else:
+        STARTUP.ready = True
+    try:
+        yield
+    finally:
+        if task is not None and not task.done():
+            task.cancel()
+
 
 app = FastAPI(
     title="Wizraven API",
     description="AI-powered network log analysis API",
-    version="0.1.0"
+    version="0.1.0",
+    lifespan=lifespan
 )
 
 # Configure CORS
@@ -24,11 +70,97 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Initialize agents
-parser_agent = ParserAgent()
-analyzer_agent = AnalyzerAgent()
-knowledge_agent = KnowledgeAgent()
-crawler_agent = CrawlerAgent()
+# gzip/zstd for large responses, negotiated from Accept-Encoding (WIZRAVEN_COMPRESSION=1)
+if COMPRESSION:
+    app.add_middleware(CompressionMiddleware)
+
+# Per-request tracing: every request gets a trace that agent spans attach to.
+# Stage timings are returned in a Server-Timing header when WIZRAVEN_TIMING_HEADER
+# is set or the client sends X-Wizraven-Timing.
+_TIMING_HEADER = os.getenv('WIZRAVEN_TIMING_HEADER', '').lower() in ('1', 'true', 'yes')
+
+
+def _route_label(request: Request) -> str:
+    # The matched route template, not the raw path: ids in paths (and scanners
+    # probing random URLs) would otherwise create a histogram series each
+    route = request.scope.get('route')
+    return getattr(route, 'path', None) or 'unmatched'
+
+
+@app.middleware("http")
+async def trace_requests(request: Request, call_next):
+    trace = start_trace()
+    started = time.perf_counter()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+    finally:
+        REGISTRY.observe('wizraven_request_duration_seconds', time.perf_counter() - started,
+                         help='HTTP request latency.', method=request.method, path=_route_label(request),
+                         status=status)
+    if _TIMING_HEADER or request.headers.get('x-wizraven-timing'):
+        response.headers['Server-Timing'] = trace.server_timing()
+    return response
+
+
+REGISTRY.register_collector(lambda: get_execution_layer().metrics_samples())
+REGISTRY.register_collector(lambda: get_governor().metrics_samples())
+
+# Parser columns kept as NumPy arrays for the analyzer and left out of responses
+_ANALYZER_COLUMNS = ('epoch_ms', 'template_id')
+
+# Agents are built on first use (or by warm-up), not at import time
+parser_agent = Lazy(ParserAgent)
+# With WIZRAVEN_KB_SOCKET set, all workers share one KB server process
+# (python -m app.utils.kb_service) instead of each holding its own index
+knowledge_agent = Lazy(lambda: KBClient() if os.getenv('WIZRAVEN_KB_SOCKET') else KnowledgeAgent(),
+                       name='KnowledgeAgent')
+# Incident fingerprints are kept with the knowledge base
+analyzer_agent = Lazy(lambda: AnalyzerAgent(incident_store=knowledge_agent), name='AnalyzerAgent')
+crawler_agent = Lazy(CrawlerAgent)
+# First-turn artifacts per conversation_id, so follow-ups only send the question
+session_cache = SessionCache()
+REGISTRY.register_collector(session_cache.metrics_samples)
+REGISTRY.register_collector(STARTUP.metrics_samples)
+
+
+def _warm_agents() -> None:
+    for agent in (parser_agent, analyzer_agent, knowledge_agent, crawler_agent):
+        agent.get()
+
+
+def _warm_llm_sdk() -> None:
+    from .utils.llm_client import load_cerebras_sdk
+    load_cerebras_sdk()
+
+
+def _warm_faiss():
+    if os.getenv('WIZRAVEN_KB_SOCKET'):
+        return False  # the KB server process owns the index
+    from .agents.knowledge_agent import _load_embeddings_class, _load_faiss
+    _load_faiss()
+    _load_embeddings_class()
+
+
+def _warm_embeddings():
+    model = os.getenv('WIZRAVEN_EMBEDDING_MODEL')
+    if not model:
+        return False
+    from .knowledge.embeddings import get_embedding_manager
+    get_embedding_manager(model)
+
+
+async def _warm_pools() -> None:
+    # Opt-in (WIZRAVEN_WARMUP=...,pools): start the layer's worker processes now
+    # rather than on the first large paste. Parsing offload and fleet sharding
+    # both run on its 'cpu' pool, so this covers them at their configured size
+    await get_execution_layer().warm()
+
+
+def _warmup_steps():
+    return {'agents': _warm_agents, 'llm_sdk': _warm_llm_sdk, 'faiss': _warm_faiss,
+            'embeddings': _warm_embeddings, 'pools': _warm_pools}
 
 class Message(BaseModel):
     content: str
@@ -42,16 +174,47 @@ class AgentResponse(BaseModel):
 
 class KBAddRequest(BaseModel):
     text: str
+    kind: Optional[str] = 'doc'
+    ttl_days: Optional[float] = None
+
+
+class KBUpdateRequest(BaseModel):
+    id: int
+    text: str
+
+
+class KBDeleteRequest(BaseModel):
+    ids: List[int]
 
 
 class KBSearchRequest(BaseModel):
     query: str
     k: Optional[int] = 3
 
+
 @app.get("/")
 async def root():
     return {"message": "Hello Wizraven!"}
 
+
+@app.get("/ready")
+async def ready():
+    """Readiness: 200 once warm-up has finished, 503 before. Body carries import and warm-up timings."""
+    report = STARTUP.as_dict()
+    return JSONResponse(report, status_code=200 if report['ready'] else 503)
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    """Prometheus text exposition of per-stage, per-request and pool metrics."""
+    return PlainTextResponse(REGISTRY.render(), media_type='text/plain; version=0.0.4')
+
+
+@app.get("/api/executors")
+async def executor_stats():
+    """Queue depth, wait and run times for each execution-layer pool."""
+    return get_execution_layer().stats()
+
 @app.post("/api/analyze")
 async def analyze_logs(message: Message, request: Request, x_cerebras_api_key: Optional[str] = Header(None)):
     """Analyzer-only endpoint for the Cerebras-only MVP.
@@ -63,26 +226,17 @@ async def analyze_logs(message: Message, request: Request, x_cerebras_api_key: O
         raise HTTPException(status_code=400, detail='Missing required field: text')
 
     # Debug: log whether header or context provided an API key (mask value)
-    try:
-        header_present = bool(x_cerebras_api_key)
+    if log.isEnabledFor(logging.DEBUG):
         ctx_key = None
         if message.context and isinstance(message.context, dict):
             ctx_key = message.context.get('cerebras_api_key') or message.context.get('api_key')
-        # Mask key for logs
-        def _mask(k: Optional[str]) -> Optional[str]:
-            if not k:
-                return None
-            if len(k) <= 6:
-                return '***'
-            return k[:3] + '...' + k[-3:]
-        print(f"[DEBUG] X-Cerebras-Api-Key header present: {header_present}, header_mask={_mask(x_cerebras_api_key)}, context_has_key={bool(ctx_key)}, context_key_mask={_mask(ctx_key)}")
-
-    except Exception:
-        pass
+        log.debug('analyze.api_key', header_present=bool(x_cerebras_api_key),
+                  header_mask=mask_secret(x_cerebras_api_key), context_has_key=bool(ctx_key),
+                  context_key_mask=mask_secret(ctx_key), sample=20)
 
     # API key is optional - if not provided, use a fallback or demo mode
     if not x_cerebras_api_key:
-        print("[INFO] No API key provided, continuing with demo/fallback mode")
+        log.info('analyze.demo_mode', reason='no API key provided', sample=100)
 
     try:
         context = message.context if isinstance(message.context, list) else message.context or []
@@ -126,10 +280,11 @@ async def kb_add(req: KBAddRequest, request: Request, x_cerebras_api_key: Option
     try:
         api_key = x_cerebras_api_key
         if not api_key:
-            print("[INFO] No API key provided for KB add, using demo mode")
+            log.info('kb.add.demo_mode', reason='no API key provided', sample=100)
             api_key = "demo-key"
 
-        res = await knowledge_agent.add_to_kb(req.text, api_key=api_key)
+        res = await knowledge_agent.add_to_kb(req.text, api_key=api_key, kind=req.kind or 'doc',
+                                              ttl_days=req.ttl_days)
         return res
     except HTTPException:
         raise
@@ -137,13 +292,49 @@ async def kb_add(req: KBAddRequest, request: Request, x_cerebras_api_key: Option
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@app.post('/api/kb/update')
+async def kb_update(req: KBUpdateRequest, request: Request, x_cerebras_api_key: Optional[str] = Header(None)):
+    """Replace a knowledge base document's text, keeping its id."""
+    api_key = x_cerebras_api_key
+    if not api_key:
+        log.info('kb.update.demo_mode', reason='no API key provided', sample=100)
+        api_key = "demo-key"
+    try:
+        return await knowledge_agent.update_kb(req.id, req.text, api_key=api_key)
+    except ValueError as e:
+        if 'Unknown document id' in str(e):
+            raise HTTPException(status_code=404, detail=str(e))
+        raise HTTPException(status_code=500, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@app.post('/api/kb/delete')
+async def kb_delete(req: KBDeleteRequest, request: Request, x_cerebras_api_key: Optional[str] = Header(None)):
+    """Delete knowledge base documents by id; searches stop returning them at once."""
+    api_key = x_cerebras_api_key
+    if not api_key:
+        log.info('kb.delete.demo_mode', reason='no API key provided', sample=100)
+        api_key = "demo-key"
+    try:
+        return await knowledge_agent.delete_from_kb(req.ids, api_key=api_key)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@app.get('/api/kb/stats')
+async def kb_stats():
+    """Document, vector and tombstone counts of the knowledge base."""
+    return await knowledge_agent.stats()
+
+
 @app.post('/api/kb/search')
 async def kb_search(req: KBSearchRequest, request: Request, x_cerebras_api_key: Optional[str] = Header(None)):
     """Search the knowledge base for a query using Cerebras embeddings and FAISS."""
     try:
         api_key = x_cerebras_api_key
         if not api_key:
-            print("[INFO] No API key provided for KB search, using demo mode")
+            log.info('kb.search.demo_mode', reason='no API key provided', sample=100)
             api_key = "demo-key"
 
         results = await knowledge_agent.search_kb(req.query, api_key=api_key, k=req.k or 3)
@@ -154,9 +345,17 @@ async def kb_search(req: KBSearchRequest, request: Request, x_cerebras_api_key:
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.post("/api/analyze/interactive")
-async def interactive_analysis(message: Message, request: Request, x_cerebras_api_key: Optional[str] = Header(None)) -> List[AgentResponse]:
+async def interactive_analysis(message: Message, request: Request, x_cerebras_api_key: Optional[str] = Header(None),
+                               metadata: str = Query('full', pattern='^(full|none)$'),
+                               omit: Optional[str] = None, page: int = Query(0, ge=0),
+                               page_size: Optional[int] = Query(None, ge=1)) -> List[AgentResponse]:
     """
     Handle interactive analysis requests with context-aware responses.
+
+    Query parameters trim the echoed metadata: ``metadata=none`` drops it
+    (``conversation_id`` is always kept), ``omit=clean_logs,message`` drops
+    keys, and ``page``/``page_size`` slice list values. Later pages of the
+    parsed log come from ``/api/sessions/{conversation_id}/parsed``.
     """
     try:
         responses = []
@@ -169,6 +368,14 @@ async def interactive_analysis(message: Message, request: Request, x_cerebras_ap
 
         # If this is a follow-up question
         if context.get("conversation_id"):
+            conversation_id = context["conversation_id"]
+            session = await session_cache.get(conversation_id)
+            if session is None and context.get("parsed_data"):
+                # Older clients send the parsed log back; keep it so later turns need not
+                session = {"parsed_data": context["parsed_data"]}
+                await session_cache.put(conversation_id, session)
+            session = session or {}
+
             # Query knowledge base first
             kb_results = await knowledge_agent.query_knowledge_base(
                 message.content, 
@@ -188,10 +395,16 @@ async def interactive_analysis(message: Message, request: Request, x_cerebras_ap
             # If it's a technical question, get analyzer's input
             if any(keyword in message.content.lower() 
                   for keyword in ["why", "how", "what's causing", "debug"]):
+                parsed_data = session.get("parsed_data", {})
+                rules = session.get("rules")
+                if rules is None and parsed_data:
+                    rules = await analyzer_agent.rule_results(parsed_data)
+                    await session_cache.update(conversation_id, rules=rules)
                 analysis = await analyzer_agent.analyze_logs(
-                    context.get("parsed_data", {}),
+                    parsed_data,
                     focus_query=message.content,
-                    request_context=context
+                    request_context=context,
+                    rule_result=rules
                 )
                 
                 analyzer_content = analysis.get('summary', "Here's my analysis of the logs.")
@@ -207,15 +420,32 @@ async def interactive_analysis(message: Message, request: Request, x_cerebras_ap
         elif len(message.content.split('\n')) > 1:  # Heuristic for log content
             # Start with parsing
             parsed_data = await parser_agent.process_logs(message.content, context=context)
+            conversation_id = uuid.uuid4().hex
             parser_content = f"Parsed {len(parsed_data.get('message', []))} messages. Patterns: {', '.join(parsed_data.get('patterns', [])) or 'none'}."
+            # NumPy columns for the analyzer, not part of the response
+            parser_metadata = {k: v for k, v in parsed_data.items() if k not in _ANALYZER_COLUMNS}
+            # Follow-ups send this back as context.conversation_id instead of parsed_data
+            parser_metadata["conversation_id"] = conversation_id
             responses.append(
                 AgentResponse(
                     agent_type="parser",
                     content=parser_content,
-                    metadata=parsed_data
+                    metadata=parser_metadata
                 )
             )
 
+            # Past incidents with the same template/mnemonic fingerprint (no embedding call)
+            features = sorted(incident_features(parsed_data))
+            incidents = await analyzer_agent.similar_incidents(features)
+            if incidents:
+                responses.append(
+                    AgentResponse(
+                        agent_type="knowledge",
+                        content=f"Found {len(incidents)} similar past incidents.",
+                        metadata={"incidents": incidents}
+                    )
+                )
+
             # Query knowledge base for related documents (if API key present)
             kb_results = await knowledge_agent.query_knowledge_base(message.content, context=context)
             if kb_results:
@@ -228,8 +458,18 @@ async def interactive_analysis(message: Message, request: Request, x_cerebras_ap
                     )
                 )
 
-            # Then analyze
-            analysis = await analyzer_agent.analyze_logs(parsed_data, request_context=context)
+            # Then analyze, keeping the rule pass for follow-up questions
+            rules = await analyzer_agent.rule_results(parsed_data)
+            # After the rule pass, so the paste isn't part of its own history
+            persist_in_background(parsed_data)
+            await session_cache.put(conversation_id, {
+                "parsed_data": parsed_data,
+                "templates": parsed_data.get("templates", []),
+                "rules": rules,
+                "kb_results": kb_results,
+            })
+            analysis = await analyzer_agent.analyze_logs(parsed_data, request_context=context, rule_result=rules)
+            await analyzer_agent.record_incident(features, analysis, parsed_data)
             analyzer_content = analysis.get('summary', "Here's my analysis of the logs.")
             responses.append(
                 AgentResponse(
@@ -239,7 +479,50 @@ async def interactive_analysis(message: Message, request: Request, x_cerebras_ap
                 )
             )
 
-        return responses
+        omitted = [k for k in (omit or '').split(',') if k]
+        return json_response([
+            {"agent_type": r.agent_type, "content": r.content,
+             "metadata": shape_metadata(r.metadata, metadata, omitted, page, page_size)}
+            for r in responses
+        ])
 
     except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@app.get("/api/sessions/{conversation_id}/parsed")
+async def session_parsed_data(conversation_id: str, page: int = Query(0, ge=0),
+                              page_size: int = Query(1000, ge=1, le=100000), fields: Optional[str] = None):
+    """Page through a conversation's cached parsed log instead of receiving it all inline."""
+    session = await session_cache.get(conversation_id)
+    if session is None:
+        raise HTTPException(status_code=404, detail='Unknown or expired conversation_id')
+    parsed = {k: v for k, v in session.get("parsed_data", {}).items() if k not in _ANALYZER_COLUMNS}
+    if fields:
+        wanted = set(fields.split(','))
+        parsed = {k: v for k, v in parsed.items() if k in wanted}
+    return json_response(shape_metadata(parsed, page=page, page_size=page_size))
+
+
+@app.get("/api/events")
+async def query_events(device: Optional[str] = None, mnemonic: Optional[str] = None,
+                       start_ms: Optional[int] = None, end_ms: Optional[int] = None,
+                       fields: Optional[str] = None, limit: int = Query(1000, ge=0, le=100000)):
+    """Query persisted events by time range (epoch ms, end exclusive), devices and mnemonics.
+
+    ``device`` and ``mnemonic`` take comma-separated lists; ``fields``
+    picks columns. Returns the most recent ``limit`` matches, oldest first.
+    """
+    store = get_event_store()
+    if store is None:
+        raise HTTPException(status_code=404, detail='Event store is not enabled (WIZRAVEN_EVENT_STORE)')
+    try:
+        result = await get_execution_layer().run(
+            'io', store.query, start_ms, end_ms, device.split(',') if device else None,
+            mnemonic.split(',') if mnemonic else None, fields.split(',') if fields else None, limit)
+    except (KeyError, ValueError) as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return json_response(result)
+
+
+STARTUP.record_import('app.main', (time.perf_counter() - _IMPORT_STARTED) * 1000)
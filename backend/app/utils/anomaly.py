@@ -0,0 +1,162 @@
+import math
+from collections import OrderedDict, deque
+from typing import Any, Deque, Dict, Iterable, List, Optional, Tuple
+
+Key = Tuple[str, str]
+
+
+def classify_event(mnemonic: Optional[str], message: str = '') -> str:
+    """Map a mnemonic/message to a coarse event kind used in anomaly reports."""
+    tag = (mnemonic or '').upper()
+    text = message.lower()
+    if 'BGP' in tag or 'bgp' in text:
+        return 'bgp_reset'
+    if 'OSPF' in tag or 'ospf' in text:
+        return 'ospf_adjacency'
+    if 'UPDOWN' in tag or 'SNMP_TRAP_LINK' in tag or 'changed state to' in text:
+        return 'interface_flap'
+    return 'event_burst'
+
+
+class _KeyState:
+    __slots__ = ('bucket', 'count', 'mean', 'var', 'windows', 'kind')
+
+    def __init__(self, bucket: int, kind: str):
+        self.bucket = bucket
+        self.count = 0
+        self.mean = 0.0
+        self.var = 0.0
+        self.windows = 0
+        self.kind = kind
+
+
+class RateAnomalyDetector:
+    """Incremental burst detector over fixed time windows.
+
+    Events are counted per (device, mnemonic) key in ``window_seconds``
+    buckets. When a bucket closes its count is compared with an EWMA
+    baseline of previous buckets for that key; once ``warmup`` windows have
+    built the baseline it is flagged when the z-score reaches
+    ``z_threshold``, before that when the count reaches ``burst_count``
+    and rises above the windows seen so far. A steady high rate is the
+    baseline, not a burst. Only per-key rolling statistics are
+    kept, so memory is O(keys) and bounded by ``max_keys`` (LRU); a key's
+    open window is still evaluated when it is evicted. ``anomalies`` keeps
+    the most recent ``max_anomalies`` flagged windows.
+
+    Events are expected in roughly chronological order per key; late events
+    are counted into the key's current window.
+    """
+
+    # Idle gaps longer than this many windows decay the baseline in one step
+    _MAX_GAP_STEPS = 64
+
+    def __init__(self, window_seconds: int = 60, alpha: float = 0.3, z_threshold: float = 3.0,
+                 min_count: int = 3, burst_count: int = 10, warmup: int = 3, max_keys: int = 10000,
+                 max_anomalies: int = 10000):
+        self.window_seconds = window_seconds
+        self.alpha = alpha
+        self.z_threshold = z_threshold
+        self.min_count = min_count
+        self.burst_count = burst_count
+        self.warmup = warmup
+        self.max_keys = max_keys
+        self._state: 'OrderedDict[Key, _KeyState]' = OrderedDict()
+        self.anomalies: Deque[Dict[str, Any]] = deque(maxlen=max_anomalies or None)
+
+    def observe(self, device: Optional[str], mnemonic: Optional[str], timestamp: float,
+                message: str = '') -> List[Dict[str, Any]]:
+        """Count one event; returns anomalies for any window this event closed (or evicted)."""
+        key = (device or 'unknown', mnemonic or 'unknown')
+        bucket = int(timestamp // self.window_seconds)
+        flagged: List[Dict[str, Any]] = []
+
+        state = self._state.get(key)
+        if state is None:
+            if self.max_keys and len(self._state) >= self.max_keys:
+                evicted = self._close(*self._state.popitem(last=False))
+                if evicted:
+                    flagged.append(evicted)
+            state = _KeyState(bucket, classify_event(mnemonic, message))
+            self._state[key] = state
+        else:
+            self._state.move_to_end(key)
+            if bucket > state.bucket:
+                anomaly = self._close(key, state)
+                if anomaly:
+                    flagged.append(anomaly)
+                self._decay(state, bucket - state.bucket - 1)
+                state.bucket = bucket
+                state.count = 0
+
+        state.count += 1
+        return flagged
+
+    def flush(self) -> List[Dict[str, Any]]:
+        """Close every open window (end of stream) and return the anomalies found."""
+        flagged = []
+        for key, state in self._state.items():
+            anomaly = self._close(key, state)
+            if anomaly:
+                flagged.append(anomaly)
+            state.count = 0
+        return flagged
+
+    def _close(self, key: Key, state: _KeyState) -> Optional[Dict[str, Any]]:
+        count = state.count
+        if count == 0:
+            return None
+
+        std = math.sqrt(state.var)
+        z = (count - state.mean) / std if std > 0 else (float('inf') if count > state.mean else 0.0)
+        reason = None
+        if state.windows >= self.warmup:
+            if count >= self.min_count and z >= self.z_threshold:
+                reason = 'zscore'
+        elif count >= self.burst_count and (state.windows == 0 or count > state.mean):
+            # No usable baseline yet: a large count above what little has been seen
+            reason = 'burst'
+
+        anomaly = None
+        if reason:
+            anomaly = {
+                'device': key[0],
+                'mnemonic': key[1],
+                'type': state.kind,
+                'window_start': state.bucket * self.window_seconds,
+                'window_seconds': self.window_seconds,
+                'count': count,
+                'baseline': round(state.mean, 3),
+                'zscore': None if math.isinf(z) else round(z, 2),
+                'reason': reason,
+                'severity': 'high' if count >= 2 * self.burst_count else 'medium',
+            }
+            self.anomalies.append(anomaly)
+
+        self._update(state, count)
+        return anomaly
+
+    def _update(self, state: _KeyState, value: float) -> None:
+        if state.windows == 0:
+            state.mean = float(value)
+            state.var = 0.0
+        else:
+            diff = value - state.mean
+            incr = self.alpha * diff
+            state.mean += incr
+            state.var = (1 - self.alpha) * (state.var + diff * incr)
+        state.windows += 1
+
+    def _decay(self, state: _KeyState, empty_windows: int) -> None:
+        for _ in range(min(empty_windows, self._MAX_GAP_STEPS)):
+            self._update(state, 0)
+
+
+def detect_anomalies(events: Iterable[Tuple[Optional[str], Optional[str], float, str]],
+                     **detector_kwargs: Any) -> List[Dict[str, Any]]:
+    """Run a fresh detector over ``(device, mnemonic, epoch_seconds, message)`` events."""
+    detector = RateAnomalyDetector(**detector_kwargs)
+    for device, mnemonic, ts, message in events:
+        detector.observe(device, mnemonic, ts, message)
+    detector.flush()
+    return list(detector.anomalies)
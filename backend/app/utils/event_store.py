@@ -0,0 +1,471 @@
+import asyncio
+import hashlib
+import json
+import os
+import time
+import uuid
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Set, Tuple
+from urllib.parse import quote
+
+import numpy as np
+
+from .executors import get_execution_layer
+from .startup import lazy_import
+from .structured_logging import get_logger
+from .timestamps import MISSING_MS
+
+log = get_logger(__name__)
+
+# Columns stored in each Parquet file; day and device are hive partition keys
+# (directory names), not file columns
+COLUMNS = ('epoch_ms', 'timestamp', 'mnemonic', 'message', 'format', 'batch')
+PARTITION_KEYS = ('day', 'device')
+# Partition values for events without a timestamp / hostname
+UNDATED = 'undated'
+UNKNOWN_DEVICE = '_unknown'
+# Compacted files are ``merged-<token>.parquet`` next to a ``merged-<token>.json``
+# manifest naming the batches (and older merged files) they replace
+MERGED_PREFIX = 'merged-'
+LOCK_NAME = '.compact.lock'
+# A lock older than this belongs to a compaction that died; it is broken
+STALE_LOCK_SECONDS = 600
+
+
+def _schema():
+    pa = lazy_import('pyarrow')
+    return pa.schema([('epoch_ms', pa.int64()), ('timestamp', pa.string()), ('mnemonic', pa.string()),
+                      ('message', pa.string()), ('format', pa.string()), ('batch', pa.string())])
+
+
+def _partitioning():
+    pa = lazy_import('pyarrow')
+    return lazy_import('pyarrow.dataset').partitioning(
+        pa.schema([('day', pa.string()), ('device', pa.string())]), flavor='hive')
+
+
+def day_of(epoch_ms: int) -> str:
+    return str(np.datetime64(int(epoch_ms), 'ms').astype('datetime64[D]'))
+
+
+def batch_id(parsed: Dict[str, Any]) -> str:
+    """Content id of a parsed paste; appending the same paste twice is a no-op."""
+    return hashlib.sha256((parsed.get('clean_logs') or '').encode('utf-8', 'replace')).hexdigest()[:16]
+
+
+class EventStore:
+    """Append-only columnar store of parsed log events.
+
+    Parser output is written as Parquet under ``root``, partitioned by UTC
+    day and device (``day=2024-03-01/device=rtr1/part-<batch>.parquet``),
+    each file sorted by time so row-group statistics are tight. Queries
+    prune partitions from the directory names first (time range, devices),
+    then let Arrow push the remaining predicates and the column list down
+    to the Parquet reader, so a device's history reads a handful of small
+    files rather than the whole store.
+
+    Files are written to a dot-prefixed temp name and renamed, so readers
+    never see partial files. ``compact`` merges a partition's small part
+    files into one; its manifest is written before the merged file appears,
+    so a reader listing the partition mid-compaction skips whichever side
+    is superseded rather than counting events twice. Requires pyarrow.
+    """
+
+    def __init__(self, root: str):
+        self.root = root
+
+    # -- writing ------------------------------------------------------------
+
+    def append(self, parsed: Dict[str, Any], batch: Optional[str] = None) -> int:
+        """Persist a ``parse_log_text`` result; returns the number of events written."""
+        messages = parsed.get('message') or []
+        if not messages:
+            return 0
+        pa = lazy_import('pyarrow')
+        pq = lazy_import('pyarrow.parquet')
+        pd = lazy_import('pandas')
+        batch = batch or batch_id(parsed)
+        n = len(messages)
+
+        epoch = parsed.get('epoch_ms')
+        epoch = np.asarray(epoch, dtype=np.int64) if epoch is not None and len(epoch) == n \
+            else np.full(n, MISSING_MS, dtype=np.int64)
+        dated = epoch != MISSING_MS
+        days = np.full(n, UNDATED, dtype=object)
+        if dated.any():
+            days[dated] = epoch[dated].astype('datetime64[ms]').astype('datetime64[D]').astype(str)
+        epoch_column = pd.array(epoch, dtype='Int64')
+        epoch_column[~dated] = pd.NA
+        frame = pd.DataFrame({
+            'day': days,
+            'device': [d or UNKNOWN_DEVICE for d in (parsed.get('device') or [None] * n)],
+            'epoch_ms': epoch_column,
+            'timestamp': parsed.get('timestamp') or [None] * n,
+            'mnemonic': parsed.get('mnemonic') or [None] * n,
+            'message': messages,
+            'format': parsed.get('format') or 'unknown',
+            'batch': batch,
+        })
+
+        schema = _schema()
+        written = 0
+        groups = frame.groupby(['day', 'device'], sort=False)
+        for (day, device), part in groups:
+            directory = os.path.join(self.root, f'day={day}', f'device={quote(device, safe="")}')
+            path = os.path.join(directory, f'part-{batch}.parquet')
+            if os.path.exists(path) or batch in self._merged(directory)[0]:
+                continue
+            os.makedirs(directory, exist_ok=True)
+            table = pa.Table.from_pandas(part.sort_values('epoch_ms', kind='stable')[list(COLUMNS)],
+                                         schema=schema, preserve_index=False)
+            tmp = os.path.join(directory, f'.part-{batch}-{uuid.uuid4().hex[:8]}.tmp')
+            pq.write_table(table, tmp, compression='zstd')
+            os.replace(tmp, path)
+            written += len(part)
+        log.info('event_store.append', batch=batch, events=written, partitions=groups.ngroups)
+        return written
+
+    # -- reading ------------------------------------------------------------
+
+    def files(self, start_ms: Optional[int] = None, end_ms: Optional[int] = None,
+              devices: Optional[Iterable[str]] = None) -> List[str]:
+        """Parquet files whose partitions can hold matching events."""
+        return [path for paths in self._files_by_day(start_ms, end_ms, devices).values() for path in paths]
+
+    def _files_by_day(self, start_ms: Optional[int], end_ms: Optional[int],
+                      devices: Optional[Iterable[str]]) -> Dict[str, List[str]]:
+        if not os.path.isdir(self.root):
+            return {}
+        timed = start_ms is not None or end_ms is not None
+        first = day_of(start_ms) if start_ms is not None else None
+        last = day_of(end_ms) if end_ms is not None else None
+        wanted = {f'device={quote(d or UNKNOWN_DEVICE, safe="")}' for d in devices} if devices is not None else None
+        by_day: Dict[str, List[str]] = {}
+        for day_entry in os.scandir(self.root):
+            if not day_entry.is_dir() or not day_entry.name.startswith('day='):
+                continue
+            day = day_entry.name[4:]
+            if timed and (day == UNDATED or (first and day < first) or (last and day > last)):
+                continue
+            for device_entry in os.scandir(day_entry.path):
+                if wanted is not None and device_entry.name not in wanted:
+                    continue
+                files = self._partition_files(device_entry.path)
+                if files:
+                    by_day.setdefault(day, []).extend(files)
+        return by_day
+
+    def _partition_files(self, directory: str) -> List[str]:
+        """The partition's Parquet files, minus those a merged file supersedes."""
+        names = [name for name in os.listdir(directory) if name.endswith('.parquet') and not name.startswith('.')]
+        batches, replaced = self._merged(directory, names)
+        return [os.path.join(directory, name) for name in names
+                if name not in replaced and not (name.startswith('part-') and name[5:-8] in batches)]
+
+    def _merged(self, directory: str, names: Optional[List[str]] = None) -> Tuple[Set[str], Set[str]]:
+        """Batches held by the partition's merged files, and the merged files they replaced."""
+        if names is None:
+            try:
+                names = os.listdir(directory)
+            except FileNotFoundError:
+                return set(), set()
+        batches: Set[str] = set()
+        replaced: Set[str] = set()
+        for name in names:
+            if not (name.startswith(MERGED_PREFIX) and name.endswith('.parquet')):
+                continue
+            try:
+                with open(os.path.join(directory, name[:-8] + '.json')) as f:
+                    manifest = json.load(f)
+            except (OSError, ValueError):
+                continue
+            batches.update(manifest.get('batches', ()))
+            replaced.update(manifest.get('replaces', ()))
+        return batches, replaced
+
+    def scan(self, start_ms: Optional[int] = None, end_ms: Optional[int] = None,
+             devices: Optional[Iterable[str]] = None, mnemonics: Optional[Iterable[str]] = None,
+             columns: Optional[Sequence[str]] = None) -> Any:
+        """Matching events as a ``pyarrow.Table``; ``end_ms`` is exclusive."""
+        devices = list(devices) if devices is not None else None
+        columns = list(columns) if columns is not None else list(PARTITION_KEYS + COLUMNS)
+        for attempt in range(2):
+            try:
+                return self._read(self.files(start_ms, end_ms, devices), start_ms, end_ms, devices, mnemonics,
+                                  columns)
+            except FileNotFoundError:
+                # A compaction removed files after they were listed; the new listing has the merged file
+                if attempt:
+                    raise
+
+    def _read(self, files: List[str], start_ms: Optional[int], end_ms: Optional[int],
+              devices: Optional[List[str]], mnemonics: Optional[Iterable[str]], columns: List[str]) -> Any:
+        pa = lazy_import('pyarrow')
+        ds = lazy_import('pyarrow.dataset')
+        if not files:
+            schema = pa.schema([pa.field('day', pa.string()), pa.field('device', pa.string())] + list(_schema()))
+            return schema.empty_table().select(columns)
+
+        dataset = ds.dataset(files, format='parquet', schema=pa.schema(list(_schema()) + [
+            pa.field('day', pa.string()), pa.field('device', pa.string())]),
+            partitioning=_partitioning(), partition_base_dir=self.root)
+        conditions = []
+        if start_ms is not None:
+            conditions.append(ds.field('epoch_ms') >= start_ms)
+        if end_ms is not None:
+            conditions.append(ds.field('epoch_ms') < end_ms)
+        if devices is not None:
+            conditions.append(ds.field('device').isin([d or UNKNOWN_DEVICE for d in devices]))
+        if mnemonics is not None:
+            conditions.append(ds.field('mnemonic').isin(list(mnemonics)))
+        expression = None
+        for condition in conditions:
+            expression = condition if expression is None else expression & condition
+        return dataset.to_table(columns=columns, filter=expression)
+
+    def query(self, start_ms: Optional[int] = None, end_ms: Optional[int] = None,
+              devices: Optional[Iterable[str]] = None, mnemonics: Optional[Iterable[str]] = None,
+              columns: Optional[Sequence[str]] = None, limit: Optional[int] = None) -> Dict[str, List[Any]]:
+        """Matching events as parser-style columns (lists), oldest first; ``limit`` keeps the newest.
+
+        With a ``limit``, day partitions are read newest first and reading
+        stops once enough rows are in hand, so only those days are sorted.
+        """
+        columns = list(columns) if columns is not None else list(PARTITION_KEYS + COLUMNS)
+        read_columns = list(dict.fromkeys(columns + ['epoch_ms']))
+        if limit is None:
+            table = self.scan(start_ms, end_ms, devices, mnemonics, read_columns)
+        else:
+            table = self._scan_newest(start_ms, end_ms, devices, mnemonics, read_columns, limit)
+        if table.num_rows:
+            # Undated events sort first, so ``limit`` keeps the most recent dated ones
+            pc = lazy_import('pyarrow.compute')
+            table = table.take(pc.sort_indices(pc.fill_null(table['epoch_ms'], MISSING_MS)))
+        table = table.select(columns)
+        if limit is not None:
+            table = table.slice(max(0, table.num_rows - limit)) if limit else table.slice(0, 0)
+        result = table.to_pydict()
+        if 'device' in result:
+            result['device'] = [None if d == UNKNOWN_DEVICE else d for d in result['device']]
+        return result
+
+    def _scan_newest(self, start_ms: Optional[int], end_ms: Optional[int], devices: Optional[Iterable[str]],
+                     mnemonics: Optional[Iterable[str]], columns: List[str], limit: int) -> Any:
+        """Matching events from the newest day partitions holding at least ``limit`` of them."""
+        pa = lazy_import('pyarrow')
+        devices = list(devices) if devices is not None else None
+        for attempt in range(2):
+            by_day = self._files_by_day(start_ms, end_ms, devices)
+            # ISO days sort chronologically; undated events count as the oldest
+            days = sorted((day for day in by_day if day != UNDATED), reverse=True)
+            if UNDATED in by_day:
+                days.append(UNDATED)
+            tables = []
+            rows = 0
+            try:
+                for day in days:
+                    if rows >= limit:
+                        break
+                    table = self._read(by_day[day], start_ms, end_ms, devices, mnemonics, columns)
+                    tables.append(table)
+                    rows += table.num_rows
+            except FileNotFoundError:
+                if attempt:
+                    raise
+                continue
+            if not tables:
+                return self._read([], start_ms, end_ms, devices, mnemonics, columns)
+            return pa.concat_tables(tables)
+
+    def device_history(self, devices: Iterable[str], start_ms: Optional[int] = None,
+                       end_ms: Optional[int] = None) -> Dict[str, Dict[str, Dict[str, int]]]:
+        """Per device, per mnemonic: event count and first/last epoch_ms.
+
+        Reads only the device, mnemonic and epoch_ms columns.
+        """
+        table = self.scan(start_ms, end_ms, devices, columns=['device', 'mnemonic', 'epoch_ms'])
+        if not table.num_rows:
+            return {}
+        grouped = table.group_by(['device', 'mnemonic']).aggregate(
+            [('epoch_ms', 'count'), ('epoch_ms', 'min'), ('epoch_ms', 'max')]).to_pydict()
+        history: Dict[str, Dict[str, Dict[str, int]]] = {}
+        for device, mnemonic, count, first, last in zip(grouped['device'], grouped['mnemonic'],
+                                                        grouped['epoch_ms_count'], grouped['epoch_ms_min'],
+                                                        grouped['epoch_ms_max']):
+            if mnemonic is None:
+                continue
+            history.setdefault(device, {})[mnemonic] = {'count': count, 'first_ms': first, 'last_ms': last}
+        return history
+
+    # -- compaction ---------------------------------------------------------
+
+    def compact(self, min_files: int = 2) -> int:
+        """Merge every partition holding at least ``min_files`` files; returns how many files were merged."""
+        if not os.path.isdir(self.root):
+            return 0
+        merged = 0
+        for day_entry in os.scandir(self.root):
+            if not day_entry.is_dir() or not day_entry.name.startswith('day='):
+                continue
+            for device_entry in os.scandir(day_entry.path):
+                if device_entry.is_dir():
+                    merged += self.compact_partition(device_entry.path, min_files)
+        if merged:
+            log.info('event_store.compact', files=merged)
+        return merged
+
+    def compact_partition(self, directory: str, min_files: int = 2) -> int:
+        """Merge one partition's files into a single time-sorted file; returns how many were merged.
+
+        Skips the partition (returning 0) while another process compacts it.
+        """
+        if not self._lock(directory):
+            return 0
+        try:
+            self._remove_superseded(directory)
+            files = self._partition_files(directory)
+            if len(files) < max(min_files, 2):
+                return 0
+            pa = lazy_import('pyarrow')
+            pq = lazy_import('pyarrow.parquet')
+            pc = lazy_import('pyarrow.compute')
+            schema = _schema()
+            table = pa.concat_tables([pq.read_table(path, schema=schema) for path in files])
+            table = table.take(pc.sort_indices(pc.fill_null(table['epoch_ms'], MISSING_MS)))
+
+            names = [os.path.basename(path) for path in files]
+            replaces = [name for name in names if name.startswith(MERGED_PREFIX)]
+            batches = self._merged(directory, replaces)[0]
+            batches.update(name[5:-8] for name in names if name.startswith('part-'))
+            stem = os.path.join(directory, f'{MERGED_PREFIX}{uuid.uuid4().hex[:16]}')
+            # Manifest first: until the merged file is renamed into place it is inert
+            tmp = f'{stem}.json.tmp'
+            with open(tmp, 'w') as f:
+                json.dump({'batches': sorted(batches), 'replaces': replaces}, f)
+            os.replace(tmp, f'{stem}.json')
+            tmp = os.path.join(directory, f'.{os.path.basename(stem)}.tmp')
+            pq.write_table(table, tmp, compression='zstd')
+            os.replace(tmp, f'{stem}.parquet')
+
+            for path in files:
+                os.remove(path)
+            for name in replaces:
+                try:
+                    os.remove(os.path.join(directory, name[:-8] + '.json'))
+                except FileNotFoundError:
+                    pass
+            return len(files)
+        finally:
+            self._unlock(directory)
+
+    def _remove_superseded(self, directory: str) -> None:
+        """Delete files a crashed compaction merged but never removed.
+
+        Only files a merged manifest names (its batches' part files, the merged
+        files it replaces) are deleted; ``append`` doesn't take the lock, so a
+        part file missing from some listing may simply be new.
+        """
+        names = os.listdir(directory)
+        batches, replaced = self._merged(directory, names)
+        for name in names:
+            if name in replaced:
+                stale = [name, name[:-8] + '.json']
+            elif name.startswith('part-') and name.endswith('.parquet') and name[5:-8] in batches:
+                stale = [name]
+            else:
+                continue
+            for stale_name in stale:
+                try:
+                    os.remove(os.path.join(directory, stale_name))
+                except FileNotFoundError:
+                    pass
+
+    def _lock(self, directory: str) -> bool:
+        path = os.path.join(directory, LOCK_NAME)
+        for _ in range(2):
+            try:
+                os.close(os.open(path, os.O_CREAT | os.O_EXCL | os.O_WRONLY))
+                return True
+            except FileExistsError:
+                try:
+                    if time.time() - os.path.getmtime(path) < STALE_LOCK_SECONDS:
+                        return False
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+        return False
+
+    def _unlock(self, directory: str) -> None:
+        try:
+            os.remove(os.path.join(directory, LOCK_NAME))
+        except FileNotFoundError:
+            pass
+
+
+_STORE: Optional[EventStore] = None
+
+
+def get_event_store() -> Optional[EventStore]:
+    """Process-wide store rooted at WIZRAVEN_EVENT_STORE, or None when persistence is off."""
+    global _STORE
+    root = os.getenv('WIZRAVEN_EVENT_STORE')
+    if not root:
+        return None
+    if _STORE is None or _STORE.root != root:
+        _STORE = EventStore(root)
+    return _STORE
+
+
+# Background appends, kept here so they aren't collected mid-write
+_PERSIST_TASKS = set()
+_COMPACTOR: Optional[asyncio.Task] = None
+
+
+def persist_in_background(parsed: Dict[str, Any]) -> None:
+    """Append a parsed paste to the process-wide store on the ``io`` pool without waiting for it.
+
+    A no-op when persistence is off. Call it after the paste's history has
+    been read, so the paste isn't part of its own history.
+    """
+    store = get_event_store()
+    if store is None or not parsed.get('message'):
+        return
+    task = asyncio.ensure_future(get_execution_layer().run('io', store.append, parsed))
+    _PERSIST_TASKS.add(task)
+    task.add_done_callback(_persist_done)
+    _ensure_compactor()
+
+
+def _persist_done(task: asyncio.Future) -> None:
+    _PERSIST_TASKS.discard(task)
+    if not task.cancelled() and task.exception() is not None:
+        log.warning('event_store.append_failed', error=str(task.exception()))
+
+
+def _ensure_compactor() -> None:
+    """Start the periodic compaction loop on this event loop if it isn't running.
+
+    Every WIZRAVEN_EVENT_STORE_COMPACT_INTERVAL seconds (default 3600, 0 turns
+    it off) partitions with at least WIZRAVEN_EVENT_STORE_COMPACT_FILES files
+    (default 16) are merged. Workers sharing a store skip partitions another
+    one is compacting.
+    """
+    global _COMPACTOR
+    interval = float(os.getenv('WIZRAVEN_EVENT_STORE_COMPACT_INTERVAL', '3600'))
+    if interval <= 0:
+        return
+    loop = asyncio.get_running_loop()
+    if _COMPACTOR is None or _COMPACTOR.done() or _COMPACTOR.get_loop() is not loop:
+        _COMPACTOR = loop.create_task(_compaction_loop(interval))
+
+
+async def _compaction_loop(interval: float) -> None:
+    min_files = int(os.getenv('WIZRAVEN_EVENT_STORE_COMPACT_FILES', '16'))
+    while True:
+        await asyncio.sleep(interval)
+        store = get_event_store()
+        if store is None:
+            continue
+        try:
+            await get_execution_layer().run('io', store.compact, min_files)
+        except Exception as e:
+            log.warning('event_store.compact_failed', error=str(e))
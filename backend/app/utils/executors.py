@@ -0,0 +1,192 @@
+import asyncio
+import os
+import threading
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+# Work class -> (executor kind, default size). Sizes can be overridden per
+# class with WIZRAVEN_POOL_<CLASS> (e.g. WIZRAVEN_POOL_EMBEDDING=16).
+WORK_CLASSES: Dict[str, Tuple[str, int]] = {
+    # Regex parsing and rule scans over large inputs; GIL-bound, so processes
+    'cpu': ('process', os.cpu_count() or 1),
+    # Blocking embedding HTTP calls
+    'embedding': ('thread', 8),
+    # FAISS search and index builds (release the GIL)
+    'faiss': ('thread', os.cpu_count() or 1),
+    # Other blocking IO (files, sockets, SDK calls)
+    'io': ('thread', 16),
+}
+
+
+def _timed_call(fn: Callable, args: tuple, kwargs: dict) -> Tuple[float, Any]:
+    """Runs in the worker; reports when it actually started so the caller can measure queue wait."""
+    started = time.time()
+    return started, fn(*args, **kwargs)
+
+
+class WorkPool:
+    """A lazily created, fixed-size executor with queue and latency counters.
+
+    Queue depth is the number of submitted calls beyond what the workers can
+    run at once; wait time is measured from submission to the moment a
+    worker picks the call up. Process pools need module-level callables and
+    picklable arguments.
+    """
+
+    def __init__(self, name: str, kind: str = 'thread', max_workers: int = 4):
+        if kind not in ('thread', 'process'):
+            raise ValueError(f'Unknown pool kind: {kind}')
+        self.name = name
+        self.kind = kind
+        self.max_workers = max(1, max_workers)
+        self._executor: Optional[Executor] = None
+        self._lock = threading.Lock()
+        self.in_flight = 0
+        self.submitted = 0
+        self.completed = 0
+        self.failed = 0
+        self.wait_ms_total = 0.0
+        self.wait_ms_max = 0.0
+        self.run_ms_total = 0.0
+
+    def _get_executor(self) -> Executor:
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    if self.kind == 'process':
+                        self._executor = ProcessPoolExecutor(max_workers=self.max_workers)
+                    else:
+                        self._executor = ThreadPoolExecutor(max_workers=self.max_workers,
+                                                            thread_name_prefix=f'wizraven-{self.name}')
+        return self._executor
+
+    @property
+    def queue_depth(self) -> int:
+        return max(0, self.in_flight - self.max_workers)
+
+    async def run(self, fn: Callable, *args, **kwargs) -> Any:
+        """Run ``fn(*args, **kwargs)`` on this pool without blocking the event loop."""
+        loop = asyncio.get_running_loop()
+        submitted = time.time()
+        self.in_flight += 1
+        self.submitted += 1
+        ok = False
+        try:
+            started, result = await loop.run_in_executor(self._get_executor(), _timed_call, fn, args, kwargs)
+            ok = True
+        finally:
+            finished = time.time()
+            self.in_flight -= 1
+            if ok:
+                wait_ms = max(0.0, (started - submitted) * 1000)
+                self.completed += 1
+                self.wait_ms_total += wait_ms
+                self.wait_ms_max = max(self.wait_ms_max, wait_ms)
+                self.run_ms_total += max(0.0, (finished - started) * 1000)
+            else:
+                self.failed += 1
+        return result
+
+    async def warm(self) -> int:
+        """Start every worker process now rather than on first use; returns how many were started.
+
+        One no-op call per worker, submitted together, makes the executor
+        spawn all of them. Thread pools are left alone (their threads start
+        in microseconds). Warm-up calls are not counted in ``stats``.
+        """
+        if self.kind != 'process':
+            return 0
+        loop = asyncio.get_running_loop()
+        executor = self._get_executor()
+        await asyncio.gather(*[loop.run_in_executor(executor, os.getpid) for _ in range(self.max_workers)])
+        return self.max_workers
+
+    def stats(self) -> Dict[str, Any]:
+        done = self.completed or 1
+        return {
+            'kind': self.kind,
+            'max_workers': self.max_workers,
+            'in_flight': self.in_flight,
+            'queue_depth': self.queue_depth,
+            'submitted': self.submitted,
+            'completed': self.completed,
+            'failed': self.failed,
+            'wait_ms_avg': round(self.wait_ms_total / done, 3),
+            'wait_ms_max': round(self.wait_ms_max, 3),
+            'run_ms_avg': round(self.run_ms_total / done, 3),
+        }
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._executor = None
+
+
+class ExecutionLayer:
+    """One ``WorkPool`` per work class, so a slow embedding call can't starve FAISS or parsing.
+
+    Agents dispatch blocking work with ``await layer.run('<class>', fn, ...)``.
+    Inputs below ``offload_min_lines`` are cheaper to handle inline than to
+    ship to a process; ``should_offload`` lets callers apply that cut-off.
+    """
+
+    def __init__(self, sizes: Optional[Dict[str, int]] = None, offload_min_lines: Optional[int] = None):
+        sizes = sizes or {}
+        self.pools: Dict[str, WorkPool] = {}
+        for name, (kind, default) in WORK_CLASSES.items():
+            size = sizes.get(name) or int(os.getenv(f'WIZRAVEN_POOL_{name.upper()}', str(default)))
+            self.pools[name] = WorkPool(name, kind, size)
+        if offload_min_lines is None:
+            offload_min_lines = int(os.getenv('WIZRAVEN_OFFLOAD_MIN_LINES', '5000'))
+        self.offload_min_lines = offload_min_lines
+
+    def pool(self, work_class: str) -> WorkPool:
+        try:
+            return self.pools[work_class]
+        except KeyError:
+            raise ValueError(f'Unknown work class: {work_class}')
+
+    async def run(self, work_class: str, fn: Callable, *args, **kwargs) -> Any:
+        return await self.pool(work_class).run(fn, *args, **kwargs)
+
+    def should_offload(self, lines: int) -> bool:
+        return lines >= self.offload_min_lines
+
+    async def warm(self) -> Dict[str, int]:
+        """``WorkPool.warm`` on every pool, at its configured size; workers started per pool."""
+        counts = await asyncio.gather(*[pool.warm() for pool in self.pools.values()])
+        return dict(zip(self.pools, counts))
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        return {name: pool.stats() for name, pool in self.pools.items()}
+
+    def metrics_samples(self) -> List[Tuple[str, str, Dict[str, Any], float]]:
+        """Gauge samples for ``MetricsRegistry.register_collector``."""
+        samples = []
+        for name, pool in self.pools.items():
+            stats = pool.stats()
+            labels = {'pool': name}
+            samples.append(('wizraven_pool_queue_depth', 'Calls waiting for a worker.', labels, stats['queue_depth']))
+            samples.append(('wizraven_pool_in_flight', 'Calls submitted and not yet finished.', labels,
+                            stats['in_flight']))
+            samples.append(('wizraven_pool_wait_ms_avg', 'Average queue wait per call (ms).', labels,
+                            stats['wait_ms_avg']))
+            samples.append(('wizraven_pool_wait_ms_max', 'Longest queue wait seen (ms).', labels,
+                            stats['wait_ms_max']))
+        return samples
+
+    def shutdown(self) -> None:
+        for pool in self.pools.values():
+            pool.shutdown()
+
+
+_LAYER: Optional[ExecutionLayer] = None
+
+
+def get_execution_layer() -> ExecutionLayer:
+    """Process-wide execution layer, created on first use."""
+    global _LAYER
+    if _LAYER is None:
+        _LAYER = ExecutionLayer()
+    return _LAYER
@@ -0,0 +1,184 @@
+import heapq
+import os
+import re
+import time
+import zlib
+from collections import OrderedDict
+from typing import Any, Dict, FrozenSet, Iterable, List, Optional, Set, Tuple
+
+import numpy as np
+
+from .sharding import is_error_like
+
+_MERSENNE = np.uint64((1 << 61) - 1)
+_MAX_HASH = np.uint64((1 << 32) - 1)
+# Severity digit of a Cisco %FACILITY-SEVERITY-MNEMONIC
+_SEVERITY_RE = re.compile(r'^[A-Z0-9_]+-([0-7])-')
+
+# Analysis keys kept with a stored incident (fleet shards etc. are too large to keep)
+_ANALYSIS_KEYS = ('summary', 'severity', 'root_cause')
+_ANALYSIS_LISTS = ('findings', 'recommendations', 'patterns')
+
+
+def incident_features(parsed: Dict[str, Any]) -> Set[str]:
+    """The set an incident is fingerprinted by: its mnemonics and mined templates.
+
+    Error-like features are added twice (``e:`` as well) so they weigh
+    more in the similarity than routine chatter (logins, NTP) that most
+    pastes share: templates whose text or samples look like errors (the
+    template may have merged "down" into a wildcard) and Cisco mnemonics
+    of severity 3 or worse.
+    """
+    features: Set[str] = set()
+    for mnemonic in {m for m in parsed.get('mnemonic') or [] if m}:
+        features.add(f'm:{mnemonic}')
+        severity = _SEVERITY_RE.search(mnemonic)
+        if severity and int(severity.group(1)) <= 3:
+            features.add(f'e:m:{mnemonic}')
+    for template in parsed.get('templates') or []:
+        if isinstance(template, dict):
+            text, samples = template.get('template'), template.get('samples') or []
+        else:
+            text, samples = template, []
+        if not text:
+            continue
+        features.add(f't:{text}')
+        if is_error_like(text) or any(is_error_like(sample) for sample in samples):
+            features.add(f'e:{text}')
+    return features
+
+
+def trim_analysis(analysis: Optional[Dict[str, Any]], max_items: int = 10) -> Dict[str, Any]:
+    """The part of an analysis worth keeping with its incident."""
+    analysis = analysis or {}
+    trimmed = {k: analysis[k] for k in _ANALYSIS_KEYS if analysis.get(k)}
+    for key in _ANALYSIS_LISTS:
+        if analysis.get(key):
+            trimmed[key] = list(analysis[key])[:max_items]
+    return trimmed
+
+
+class MinHasher:
+    """MinHash signatures over string sets (CRC32 features, universal hashing mod 2^61-1)."""
+
+    def __init__(self, num_perm: int = 128, seed: int = 1):
+        rng = np.random.RandomState(seed)
+        self.num_perm = num_perm
+        self.a = rng.randint(1, int(_MERSENNE), size=num_perm, dtype=np.uint64)
+        self.b = rng.randint(0, int(_MERSENNE), size=num_perm, dtype=np.uint64)
+
+    def signature(self, features: Iterable[str]) -> np.ndarray:
+        hashes = np.fromiter((zlib.crc32(f.encode('utf-8')) for f in features), dtype=np.uint64)
+        if not hashes.size:
+            return np.full(self.num_perm, int(_MAX_HASH), dtype=np.uint32)
+        permuted = ((np.outer(hashes, self.a) + self.b) % _MERSENNE) & _MAX_HASH
+        return permuted.min(axis=0).astype(np.uint32)
+
+
+class IncidentIndex:
+    """LSH index of incident fingerprints, answering "have we seen this before?".
+
+    Each recorded incident is a feature set (``incident_features``) plus
+    its trimmed analysis. Signatures are split into ``bands`` bands;
+    incidents sharing any band are candidates, ranked by the exact Jaccard
+    similarity of their feature sets. With the default 32 bands of 4 rows,
+    pairs above ~0.4 similarity are almost always found. Recording the
+    same feature set again updates that incident instead of adding one.
+    Holds at most ``max_incidents`` (oldest evicted). No embedding or LLM
+    call is involved; a lookup is a few dict probes and set operations.
+
+    Like the KB's FAISS index it lives in process memory only: it starts
+    empty after a restart, and each worker has its own unless
+    WIZRAVEN_KB_SOCKET points them all at one KB server.
+    """
+
+    def __init__(self, num_perm: int = 128, bands: int = 32, max_incidents: Optional[int] = None,
+                 min_similarity: Optional[float] = None):
+        if num_perm % bands:
+            raise ValueError('num_perm must be a multiple of bands')
+        self.hasher = MinHasher(num_perm)
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.max_incidents = max_incidents if max_incidents is not None else \
+            int(os.getenv('WIZRAVEN_INCIDENTS_MAX', '10000'))
+        self.min_similarity = min_similarity if min_similarity is not None else \
+            float(os.getenv('WIZRAVEN_INCIDENT_MIN_SIMILARITY', '0.3'))
+        self._buckets: List[Dict[bytes, Set[int]]] = [{} for _ in range(bands)]
+        self._incidents: 'OrderedDict[int, Dict[str, Any]]' = OrderedDict()
+        self._by_features: Dict[FrozenSet[str], int] = {}
+        self._next_id = 0
+
+    def __len__(self) -> int:
+        return len(self._incidents)
+
+    def _band_keys(self, features: FrozenSet[str]) -> List[bytes]:
+        signature = self.hasher.signature(features)
+        return [signature[i * self.rows:(i + 1) * self.rows].tobytes() for i in range(self.bands)]
+
+    def add(self, features: Iterable[str], analysis: Optional[Dict[str, Any]] = None,
+            meta: Optional[Dict[str, Any]] = None) -> int:
+        features = frozenset(features)
+        now = time.time()
+        incident_id = self._by_features.get(features)
+        if incident_id is not None:
+            record = self._incidents[incident_id]
+            record['seen'] += 1
+            record['last_seen'] = now
+            record['analysis'] = trim_analysis(analysis) or record['analysis']
+            record['meta'] = meta or record['meta']
+            self._incidents.move_to_end(incident_id)
+            return incident_id
+
+        incident_id, self._next_id = self._next_id, self._next_id + 1
+        keys = self._band_keys(features)
+        for band, key in zip(self._buckets, keys):
+            band.setdefault(key, set()).add(incident_id)
+        self._incidents[incident_id] = {'features': features, 'keys': keys, 'analysis': trim_analysis(analysis),
+                                        'meta': meta or {}, 'seen': 1, 'first_seen': now, 'last_seen': now}
+        self._by_features[features] = incident_id
+        while len(self._incidents) > self.max_incidents:
+            self._evict()
+        return incident_id
+
+    def _evict(self) -> None:
+        incident_id, record = self._incidents.popitem(last=False)
+        self._by_features.pop(record['features'], None)
+        for band, key in zip(self._buckets, record['keys']):
+            members = band.get(key)
+            if members is not None:
+                members.discard(incident_id)
+                if not members:
+                    del band[key]
+
+    def query(self, features: Iterable[str], k: int = 3,
+              min_similarity: Optional[float] = None) -> List[Dict[str, Any]]:
+        """Most similar recorded incidents, best first, with their stored analyses."""
+        features = frozenset(features)
+        if not features or not self._incidents:
+            return []
+        threshold = self.min_similarity if min_similarity is None else min_similarity
+        empty: Set[int] = set()
+        candidates = set().union(*[band.get(key, empty) for band, key in zip(self._buckets, self._band_keys(features))])
+
+        size = len(features)
+        incidents = self._incidents
+        scored: List[Tuple[float, int]] = []
+        for incident_id in candidates:
+            stored = incidents[incident_id]['features']
+            shared = len(features & stored)
+            similarity = shared / (size + len(stored) - shared)
+            if similarity >= threshold:
+                scored.append((similarity, incident_id))
+        results = []
+        for similarity, incident_id in heapq.nlargest(k, scored):
+            record = self._incidents[incident_id]
+            results.append({
+                'id': incident_id,
+                'similarity': round(similarity, 3),
+                'analysis': record['analysis'],
+                'meta': record['meta'],
+                'seen': record['seen'],
+                'first_seen': record['first_seen'],
+                'last_seen': record['last_seen'],
+            })
+        return results
@@ -0,0 +1,102 @@
+import re
+from typing import Any, Dict, Iterator, List, Optional
+
+from .log_formats import detect_format
+
+# Compiled once at import; shared by every classifier instance
+_LOG_LINE_RE = re.compile(r"(%[A-Z]+-|Interface|line protocol|LINK-|LINEPROTO|\d{2}:\d{2}:\d{2})", re.I)
+_QUESTION_RE = re.compile(
+    r"\b(how|why|what|when|where|explain|recommend|should|could|help|hi|hello|issue|problem|trouble"
+    r"|connectivity|configure|setup|can|does|is|are|will)\b", re.I)
+
+
+class InputClassifier:
+    """Decide whether pasted text contains logs, a question, or both.
+
+    Built once at start-up. Inputs up to ``full_scan_chars`` are scanned in
+    full; larger ones are classified from ``sample_windows`` evenly spaced
+    windows of ``sample_chars`` each (always including head and tail), so
+    the cost is independent of input size. Scanning stops as soon as the
+    decision is certain: ``min_log_hits`` log-looking lines settle "logs",
+    and the first question word settles "question".
+    """
+
+    def __init__(self, full_scan_chars: int = 65536, sample_chars: int = 4096, sample_windows: int = 6,
+                 min_log_hits: int = 3, vendor_probe_chars: int = 8192):
+        self.full_scan_chars = full_scan_chars
+        self.sample_chars = sample_chars
+        self.sample_windows = max(2, sample_windows)
+        self.min_log_hits = min_log_hits
+        self.vendor_probe_chars = vendor_probe_chars
+
+    def is_log_line(self, line: str) -> bool:
+        return _LOG_LINE_RE.search(line) is not None
+
+    def classify(self, text: str) -> Dict[str, Any]:
+        """Return logs_present, question_present, conversational, vendor, confidence and scan stats."""
+        text = text or ''
+        sampled = len(text) > self.full_scan_chars
+        windows = self._windows(text) if sampled else [text]
+
+        log_hits = 0
+        lines_scanned = 0
+        for line in self._lines(windows):
+            lines_scanned += 1
+            if _LOG_LINE_RE.search(line):
+                log_hits += 1
+                if log_hits >= self.min_log_hits:
+                    break
+        logs_present = log_hits > 0
+
+        question_present = any('?' in w or _QUESTION_RE.search(w) for w in windows)
+        conversational = not sampled and not logs_present and len(text.strip()) < 100
+        if conversational:
+            question_present = True
+
+        scanned_chars = sum(len(w) for w in windows)
+        if log_hits >= self.min_log_hits or not sampled:
+            confidence = 1.0
+        elif logs_present:
+            confidence = log_hits / self.min_log_hits
+        else:
+            confidence = scanned_chars / len(text)
+
+        return {
+            'logs_present': logs_present,
+            'question_present': question_present,
+            'conversational': conversational,
+            'vendor': self.detect_vendor(text) if logs_present else None,
+            'confidence': round(confidence, 3),
+            'sampled': sampled,
+            'lines_scanned': lines_scanned,
+        }
+
+    def detect_vendor(self, text: str) -> Optional[str]:
+        log_format = detect_format(text, self.vendor_probe_chars)
+        return log_format.name if log_format is not None else None
+
+    def _windows(self, text: str) -> List[str]:
+        """Evenly spaced windows trimmed to whole lines (head and tail included)."""
+        n = len(text)
+        step = (n - self.sample_chars) / (self.sample_windows - 1)
+        windows = []
+        for i in range(self.sample_windows):
+            start = int(i * step)
+            chunk = text[start:start + self.sample_chars]
+            if start > 0:
+                nl = chunk.find('\n')
+                chunk = chunk[nl + 1:] if nl >= 0 else ''
+            if start + self.sample_chars < n:
+                nl = chunk.rfind('\n')
+                chunk = chunk[:nl] if nl >= 0 else ''
+            if chunk:
+                windows.append(chunk)
+        return windows
+
+    @staticmethod
+    def _lines(windows: List[str]) -> Iterator[str]:
+        for window in windows:
+            for line in window.splitlines():
+                line = line.strip()
+                if line:
+                    yield line
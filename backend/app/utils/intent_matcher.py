@@ -0,0 +1,101 @@
+import json
+import os
+import re
+from typing import Any, Dict, Iterable, List, Optional, Set
+
+DEFAULT_INTENTS_PATH = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'data', 'fallback_intents.json')
+
+
+class KeywordTrie:
+    """Multi-keyword substring matcher compiled from a trie.
+
+    The keyword trie is rendered as a single prefix-factored regular
+    expression, so one left-to-right scan (in C) reports the longest keyword
+    at each match position. Shorter keywords contained in a match are added
+    from a precomputed closure, and the scan only restarts inside a match
+    when some keyword could begin there and run past its end. The result is
+    identical to testing every keyword with ``in``, in a single pass.
+    """
+
+    def __init__(self, keywords: Iterable[str]):
+        self.keywords = sorted({k.lower() for k in keywords if k})
+        trie: Dict[str, Any] = {}
+        for word in self.keywords:
+            node = trie
+            for ch in word:
+                node = node.setdefault(ch, {})
+            node[''] = True
+        self._regex = re.compile(self._render(trie) if self.keywords else '(?!)')
+        # Keywords implied by each keyword (itself plus any keyword it contains)
+        self._closure = {k: {o for o in self.keywords if o in k} for k in self.keywords}
+        # Offset within a match where the scan must resume to catch overlapping keywords
+        self._restart = {k: self._restart_offset(k) for k in self.keywords}
+
+    def _restart_offset(self, keyword: str) -> int:
+        for i in range(1, len(keyword)):
+            suffix = keyword[i:]
+            if any(len(other) > len(suffix) and other.startswith(suffix) for other in self.keywords):
+                return i
+        return len(keyword)
+
+    def _render(self, node: Dict[str, Any]) -> str:
+        branches = [re.escape(ch) + self._render(child) for ch, child in sorted(node.items()) if ch]
+        if not branches:
+            return ''
+        body = branches[0] if len(branches) == 1 else '(?:' + '|'.join(branches) + ')'
+        if '' in node:
+            # Greedy optional suffix: prefer the longest keyword at this position
+            return '(?:' + body + ')?'
+        return body
+
+    def find(self, text: str) -> Set[str]:
+        """Return every keyword occurring in ``text`` (already lower-cased)."""
+        found: Set[str] = set()
+        search = self._regex.search
+        m = search(text)
+        while m is not None:
+            kw = m.group()
+            if kw not in found:
+                found |= self._closure[kw]
+            m = search(text, m.start() + self._restart[kw])
+        return found
+
+
+class IntentMatcher:
+    """Data-driven intent table for the no-API-key fallback responder.
+
+    Intents are evaluated in file order after a single keyword pass. An
+    intent matches when all of its ``all`` keywords and at least one of its
+    ``any`` keywords (if given) were found.
+    """
+
+    def __init__(self, intents: List[Dict[str, Any]], default: str = ''):
+        self.default = default
+        self.intents = []
+        keywords: Set[str] = set()
+        for intent in intents:
+            intent = dict(intent)
+            intent['all'] = frozenset(k.lower() for k in intent.get('all', []))
+            intent['any'] = frozenset(k.lower() for k in intent.get('any', []))
+            keywords.update(intent['all'])
+            keywords.update(intent['any'])
+            self.intents.append(intent)
+        self.trie = KeywordTrie(keywords)
+
+    @classmethod
+    def from_file(cls, path: Optional[str] = None) -> 'IntentMatcher':
+        path = path or os.getenv('WIZRAVEN_INTENTS_PATH') or DEFAULT_INTENTS_PATH
+        with open(path, 'r', encoding='utf-8') as f:
+            config = json.load(f)
+        return cls(config.get('intents', []), config.get('default', ''))
+
+    def match(self, text: str) -> Optional[Dict[str, Any]]:
+        found = self.trie.find(text.lower())
+        for intent in self.intents:
+            if intent['all'] <= found and (not intent['any'] or not intent['any'].isdisjoint(found)):
+                return intent
+        return None
+
+    def respond(self, text: str) -> str:
+        intent = self.match(text)
+        return intent['response'] if intent else self.default
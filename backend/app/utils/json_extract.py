@@ -0,0 +1,155 @@
+import json
+import re
+from typing import Any, List, Optional, Tuple
+
+_FENCE_RE = re.compile(r'```[ \t]*(?:json|JSON)?[ \t]*\n?(.*?)(?:```|$)', re.S)
+_CLOSERS = {'{': '}', '[': ']'}
+_decoder = json.JSONDecoder()
+
+
+class JSONExtractor:
+    """Pull the first JSON object (or array) out of model output, chunk by chunk.
+
+    Handles prose before/after the JSON, markdown fences and output cut
+    off mid-value (max_tokens): a truncated document is closed where it
+    stopped if that parses (``{"summary": "long te`` gives the partial
+    summary), otherwise at the last complete member. ``feed`` only scans
+    the new characters; ``value`` is the best parse of what has arrived.
+    """
+
+    def __init__(self, expect: Optional[type] = dict):
+        self.expect = expect
+        self.text = ''
+        self._start = -1
+        self._pos = 0
+        self._stack: List[str] = []
+        self._in_string = False
+        self._escape = False
+        # (cut index, open containers at that point); closing them there gives valid JSON
+        self._cuts: List[Tuple[int, str]] = []
+        self._done: Optional[int] = None
+
+    def feed(self, chunk: str) -> Optional[Any]:
+        self.text += chunk
+        self._scan()
+        return self.value
+
+    def _scan(self) -> None:
+        while self._done is None and self._pos < len(self.text):
+            self._scan_from_start()
+            if self._done is not None and self._parsed() is None:
+                # Braces in prose ("{interface}") rather than JSON; look further on
+                self._reset(self._start + 1)
+
+    def _reset(self, pos: int) -> None:
+        self._start = -1
+        self._pos = pos
+        self._stack = []
+        self._in_string = False
+        self._escape = False
+        self._cuts = []
+        self._done = None
+
+    def _parsed(self) -> Optional[Any]:
+        try:
+            return json.loads(self.text[self._start:self._done])
+        except ValueError:
+            return None
+
+    def _scan_from_start(self) -> None:
+        text = self.text
+        openers = '{[' if self.expect is None else ('{' if self.expect is dict else '[')
+        while self._start < 0 and self._pos < len(text):
+            if text[self._pos] in openers:
+                self._start = self._pos
+            else:
+                self._pos += 1
+        if self._start < 0:
+            return
+        i = self._pos
+        while i < len(text):
+            ch = text[i]
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif ch == '\\':
+                    self._escape = True
+                elif ch == '"':
+                    self._in_string = False
+            elif ch == '"':
+                self._in_string = True
+            elif ch in _CLOSERS:
+                self._stack.append(_CLOSERS[ch])
+                self._cuts.append((i + 1, ''.join(reversed(self._stack))))
+            elif ch in '}]':
+                if self._stack:
+                    self._stack.pop()
+                if not self._stack:
+                    self._done = i + 1
+                    self._pos = i + 1
+                    return
+                self._cuts.append((i + 1, ''.join(reversed(self._stack))))
+            elif ch == ',':
+                self._cuts.append((i, ''.join(reversed(self._stack))))
+            i += 1
+        self._pos = i
+
+    @property
+    def complete(self) -> bool:
+        return self._done is not None
+
+    @property
+    def value(self) -> Optional[Any]:
+        if self._start < 0:
+            return None
+        if self._done is not None:
+            return self._parsed()
+        body = self.text[self._start:self._pos]
+        closers = ''.join(reversed(self._stack))
+        # The cut-off value itself (e.g. a long summary string) is usually worth keeping
+        tail = body.rstrip().rstrip(',:')
+        for candidate in ((tail + '"' + closers) if self._in_string else None, tail + closers):
+            if candidate:
+                try:
+                    return json.loads(candidate)
+                except ValueError:
+                    pass
+        for cut, cut_closers in reversed(self._cuts):
+            try:
+                return json.loads(self.text[self._start:cut] + cut_closers)
+            except ValueError:
+                continue
+        return None
+
+
+def extract_json(text: Optional[str], expect: Optional[type] = dict) -> Optional[Any]:
+    """Best-effort JSON value from model output, or None when there is none.
+
+    Tries the whole text, then each markdown fence, then the first
+    brace-delimited span (repairing truncation). ``expect`` is ``dict``,
+    ``list`` or None for either.
+    """
+    if not text:
+        return None
+
+    def ok(value: Any) -> bool:
+        return expect is None or isinstance(value, expect)
+
+    stripped = text.strip()
+    try:
+        value = json.loads(stripped)
+        if ok(value):
+            return value
+    except ValueError:
+        pass
+    for block in _FENCE_RE.findall(stripped):
+        block = block.strip()
+        try:
+            value, _ = _decoder.raw_decode(block)
+            if ok(value):
+                return value
+        except ValueError:
+            pass
+    extractor = JSONExtractor(expect)
+    value = extractor.feed(stripped)
+    return value if value is not None and ok(value) else None
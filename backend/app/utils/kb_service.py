@@ -0,0 +1,314 @@
+import asyncio
+import itertools
+import json
+import os
+import re
+import sys
+from typing import Any, Dict, List, Optional
+
+from .metrics import span
+from .structured_logging import get_logger
+
+log = get_logger(__name__)
+
+DEFAULT_SOCKET_PATH = '/tmp/wizraven-kb.sock'
+
+# Frames are newline-delimited JSON; a frame is one request object or a list of them
+_FRAME_LIMIT = 64 * 1024 * 1024
+# Request ids salvaged from a frame that isn't valid JSON, so its callers get an error reply
+_ID_RE = re.compile(rb'"id"\s*:\s*(\d+)')
+
+
+def _encode(reply: Any) -> bytes:
+    """One reply frame; a reply that can't be serialized becomes an error for its request."""
+    try:
+        return json.dumps(reply).encode('utf-8')
+    except (TypeError, ValueError) as e:
+        if isinstance(reply, list):
+            return b'[' + b','.join(_encode(r) for r in reply) + b']'
+        return json.dumps({'id': reply.get('id'), 'error': f'Unserializable KB reply: {e}'}).encode('utf-8')
+
+
+class KBServer:
+    """Single process that owns the knowledge base (FAISS index + embedder).
+
+    API workers reach it over a Unix socket instead of each building their
+    own ``KnowledgeAgent``, so every worker sees the same index and the
+    model is loaded once. Requests on a connection are handled concurrently
+    and answered as they finish; a batched frame gets one batched reply.
+
+    Run standalone with ``python -m app.utils.kb_service [socket_path]``.
+    """
+
+    def __init__(self, agent=None, socket_path: Optional[str] = None):
+        if agent is None:
+            from ..agents.knowledge_agent import KnowledgeAgent
+            agent = KnowledgeAgent()
+        self.agent = agent
+        self.socket_path = socket_path or os.getenv('WIZRAVEN_KB_SOCKET') or DEFAULT_SOCKET_PATH
+        self._server: Optional[asyncio.AbstractServer] = None
+
+    async def start(self) -> None:
+        if os.path.exists(self.socket_path):
+            os.unlink(self.socket_path)
+        self._server = await asyncio.start_unix_server(self._handle, path=self.socket_path, limit=_FRAME_LIMIT)
+
+    async def serve_forever(self) -> None:
+        if self._server is None:
+            await self.start()
+        async with self._server:
+            await self._server.serve_forever()
+
+    async def close(self) -> None:
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+        if os.path.exists(self.socket_path):
+            os.unlink(self.socket_path)
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        write_lock = asyncio.Lock()
+        tasks = set()
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                task = asyncio.ensure_future(self._answer(line, writer, write_lock))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            if tasks:
+                await asyncio.gather(*tasks, return_exceptions=True)
+            writer.close()
+
+    async def _answer(self, line: bytes, writer: asyncio.StreamWriter, write_lock: asyncio.Lock) -> None:
+        try:
+            frame = json.loads(line)
+        except ValueError as e:
+            ids = [int(i) for i in _ID_RE.findall(line)]
+            log.warning('kb_service.bad_frame', error=str(e), ids=len(ids))
+            reply: Any = [{'id': i, 'error': f'Malformed KB request frame: {e}'} for i in ids]
+            if not reply:
+                return
+        else:
+            if isinstance(frame, list):
+                reply = await asyncio.gather(*[self.dispatch(req) for req in frame])
+            else:
+                reply = await self.dispatch(frame)
+        async with write_lock:
+            writer.write(_encode(reply) + b'\n')
+            try:
+                await writer.drain()
+            except ConnectionError:
+                pass
+
+    async def dispatch(self, request: Dict[str, Any]) -> Dict[str, Any]:
+        if not isinstance(request, dict):
+            return {'id': None, 'error': 'Malformed KB request: expected an object'}
+        req_id = request.get('id')
+        args = request.get('args') or {}
+        op = request.get('op')
+        try:
+            if op == 'add':
+                extra = {name: args[name] for name in ('kind', 'ttl_days') if args.get(name) is not None}
+                result: Any = await self.agent.add_to_kb(args.get('text'), api_key=args.get('api_key'), **extra)
+            elif op == 'update':
+                result = await self.agent.update_kb(int(args.get('doc_id')), args.get('text'),
+                                                    api_key=args.get('api_key'))
+            elif op == 'delete':
+                result = await self.agent.delete_from_kb([int(i) for i in args.get('doc_ids') or []],
+                                                         api_key=args.get('api_key'))
+            elif op == 'search':
+                result = await self.agent.search_kb(args.get('query'), api_key=args.get('api_key'),
+                                                    k=int(args.get('k') or 3))
+            elif op == 'record_incident':
+                result = await self.agent.record_incident(args.get('features') or [], args.get('analysis'),
+                                                          args.get('meta'))
+            elif op == 'similar_incidents':
+                result = await self.agent.similar_incidents(args.get('features') or [], k=int(args.get('k') or 3),
+                                                            min_similarity=args.get('min_similarity'))
+            elif op == 'stats':
+                result = await self.agent.stats()
+            else:
+                raise ValueError(f'Unknown KB operation: {op}')
+        except Exception as e:
+            return {'id': req_id, 'error': str(e)}
+        return {'id': req_id, 'result': result}
+
+
+class KBClient:
+    """Drop-in stand-in for ``KnowledgeAgent`` that forwards to a ``KBServer``.
+
+    One connection per process is opened lazily and shared by all requests.
+    Calls are pipelined: each gets an id and a future, requests issued in
+    the same event-loop tick are written as a single batched frame, and
+    replies are matched back by id in whatever order they arrive. Server
+    errors, requests that can't be serialized and calls unanswered after
+    ``timeout`` seconds (WIZRAVEN_KB_TIMEOUT, default 30) surface as
+    ``ValueError``, matching the local agent's contract.
+    """
+
+    def __init__(self, socket_path: Optional[str] = None, max_batch: int = 256, timeout: Optional[float] = None):
+        self.socket_path = socket_path or os.getenv('WIZRAVEN_KB_SOCKET') or DEFAULT_SOCKET_PATH
+        self.max_batch = max_batch
+        self.timeout = timeout if timeout is not None else float(os.getenv('WIZRAVEN_KB_TIMEOUT', '30'))
+        self.frames_sent = 0
+        self.requests_sent = 0
+        self._ids = itertools.count(1)
+        self._pending: Dict[int, asyncio.Future] = {}
+        self._outbox: List[Dict[str, Any]] = []
+        self._flush_scheduled = False
+        self._reader: Optional[asyncio.StreamReader] = None
+        self._writer: Optional[asyncio.StreamWriter] = None
+        self._reader_task: Optional[asyncio.Task] = None
+        self._connect_lock: Optional[asyncio.Lock] = None
+
+    async def _ensure_connected(self) -> None:
+        if self._writer is not None and not self._writer.is_closing():
+            return
+        if self._connect_lock is None:
+            self._connect_lock = asyncio.Lock()
+        async with self._connect_lock:
+            if self._writer is not None and not self._writer.is_closing():
+                return
+            try:
+                self._reader, self._writer = await asyncio.open_unix_connection(self.socket_path,
+                                                                                limit=_FRAME_LIMIT)
+            except OSError as e:
+                raise ValueError(f'KB service unavailable at {self.socket_path}: {e}')
+            self._reader_task = asyncio.ensure_future(self._read_replies(self._reader))
+
+    async def _read_replies(self, reader: asyncio.StreamReader) -> None:
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                frame = json.loads(line)
+                for reply in frame if isinstance(frame, list) else [frame]:
+                    future = self._pending.pop(reply.get('id'), None)
+                    if future is None or future.done():
+                        continue
+                    if 'error' in reply:
+                        future.set_exception(ValueError(reply['error']))
+                    else:
+                        future.set_result(reply.get('result'))
+        except (ConnectionError, ValueError):
+            pass
+        finally:
+            if self._reader is reader:
+                self._fail_pending('KB service connection closed')
+
+    def _fail_pending(self, reason: str) -> None:
+        pending, self._pending = self._pending, {}
+        for future in pending.values():
+            if not future.done():
+                future.set_exception(ValueError(reason))
+        if self._writer is not None:
+            self._writer.close()
+        self._writer = None
+
+    def _flush(self) -> None:
+        self._flush_scheduled = False
+        writer = self._writer
+        while self._outbox:
+            batch, self._outbox = self._outbox[:self.max_batch], self._outbox[self.max_batch:]
+            if writer is None or writer.is_closing():
+                self._fail(batch, 'KB service connection closed')
+                continue
+            sent = len(batch)
+            try:
+                data = json.dumps(batch if len(batch) > 1 else batch[0]).encode('utf-8')
+            except (TypeError, ValueError):
+                # Fail only the requests that can't be serialized; send the rest
+                encoded = []
+                for req in batch:
+                    try:
+                        encoded.append(json.dumps(req))
+                    except (TypeError, ValueError) as e:
+                        self._fail([req], f'Unserializable KB request: {e}')
+                if not encoded:
+                    continue
+                sent = len(encoded)
+                data = ('[' + ','.join(encoded) + ']').encode('utf-8')
+            writer.write(data + b'\n')
+            self.frames_sent += 1
+            self.requests_sent += sent
+
+    def _fail(self, batch: List[Dict[str, Any]], reason: str) -> None:
+        for req in batch:
+            future = self._pending.pop(req['id'], None)
+            if future is not None and not future.done():
+                future.set_exception(ValueError(reason))
+
+    async def _call(self, op: str, **args) -> Any:
+        await self._ensure_connected()
+        loop = asyncio.get_running_loop()
+        req_id = next(self._ids)
+        future = loop.create_future()
+        self._pending[req_id] = future
+        self._outbox.append({'id': req_id, 'op': op, 'args': args})
+        if not self._flush_scheduled:
+            self._flush_scheduled = True
+            loop.call_soon(self._flush)
+        with span('kb_rpc'):
+            try:
+                return await asyncio.wait_for(future, self.timeout if self.timeout > 0 else None)
+            except asyncio.TimeoutError:
+                self._pending.pop(req_id, None)
+                raise ValueError(f'KB service did not answer {op} within {self.timeout:g}s')
+
+    async def add_to_kb(self, log_text: str, api_key: str, kind: Optional[str] = None,
+                        ttl_days: Optional[float] = None) -> Dict[str, Any]:
+        return await self._call('add', text=log_text, api_key=api_key, kind=kind, ttl_days=ttl_days)
+
+    async def update_kb(self, doc_id: int, log_text: str, api_key: str) -> Dict[str, Any]:
+        return await self._call('update', doc_id=doc_id, text=log_text, api_key=api_key)
+
+    async def delete_from_kb(self, doc_ids: List[int], api_key: str) -> Dict[str, Any]:
+        return await self._call('delete', doc_ids=list(doc_ids), api_key=api_key)
+
+    async def search_kb(self, query: str, api_key: str, k: int = 3) -> str:
+        return await self._call('search', query=query, api_key=api_key, k=k)
+
+    async def record_incident(self, features: List[str], analysis: Optional[Dict[str, Any]] = None,
+                              meta: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        return await self._call('record_incident', features=list(features), analysis=analysis, meta=meta)
+
+    async def similar_incidents(self, features: List[str], k: int = 3,
+                                min_similarity: Optional[float] = None) -> List[Dict[str, Any]]:
+        return await self._call('similar_incidents', features=list(features), k=k, min_similarity=min_similarity)
+
+    async def stats(self) -> Dict[str, Any]:
+        return await self._call('stats')
+
+    async def query_knowledge_base(self, query: str, context: Optional[Dict[str, Any]] = None,
+                                   k: int = 3) -> List[str]:
+        """Same contract as ``KnowledgeAgent.query_knowledge_base``: never raises, [] on any failure."""
+        api_key = (context or {}).get('cerebras_api_key')
+        if not api_key:
+            return []
+        try:
+            text = await self.search_kb(query, api_key=api_key, k=k)
+        except Exception:
+            return []
+        if not text:
+            return []
+        return [d for d in text.split('\n\n') if d.strip()]
+
+    async def close(self) -> None:
+        if self._writer is not None:
+            self._writer.close()
+        if self._reader_task is not None:
+            await asyncio.gather(self._reader_task, return_exceptions=True)
+            self._reader_task = None
+
+
+if __name__ == '__main__':
+    from .structured_logging import configure_logging
+    configure_logging()
+    asyncio.run(KBServer(socket_path=sys.argv[1] if len(sys.argv) > 1 else None).serve_forever())
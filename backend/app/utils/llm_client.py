@@ -1,6 +1,14 @@
 import os
 import asyncio
-from typing import Dict, Any, Optional
+from typing import Dict, Any, Optional, Set
+
+from .executors import get_execution_layer
+from .json_extract import extract_json
+from .llm_governor import UpstreamError, get_governor, to_upstream_error
+from .metrics import span
+from .startup import lazy_import
+from .prompt_builder import estimate_tokens
+from .structured_logging import get_logger, mask_secret
 
 try:
     from dotenv import load_dotenv
@@ -9,6 +17,31 @@ except Exception:
     # dotenv not installed or .env not present — proceed without failing
     pass
 
+log = get_logger(__name__)
+
+# Models whose provider rejected ``response_format``; they get prompt-only JSON
+# for the rest of the process (clients are built per request, so not per client)
+_JSON_MODE_UNSUPPORTED: Set[str] = set()
+
+
+def load_cerebras_sdk():
+    """The Cerebras client class, imported on first use (or by startup warm-up)."""
+    # Try common package names for Cerebras SDK
+    for module in ('cerebras.cloud.sdk', 'cerebras_cloud_sdk'):
+        try:
+            return lazy_import(module).Cerebras
+        except ImportError:
+            continue
+    raise ImportError("Cerebras SDK not found. Please install with: pip install cerebras-cloud-sdk")
+
+
+class StructuredOutputError(ValueError):
+    """The model answered but no JSON could be extracted; ``raw`` is its output."""
+
+    def __init__(self, message: str, raw: Optional[str] = None):
+        super().__init__(message)
+        self.raw = raw
+
 
 class LLMClient:
     """Cerebras AI LLM client wrapper.
@@ -19,6 +52,9 @@ class LLMClient:
       is available, it attempts to construct a Cerebras LLM client.
     - The main method ``analyze_text`` is async but will run sync LLM calls in
       a threadpool so callers can await consistently.
+    - Every call goes through the process-wide ``LLMGovernor`` (adaptive
+      concurrency, per-key rate limit, retries, circuit breaker); failures
+      surface as ``UpstreamError`` / ``CircuitOpenError``.
     """
 
     def __init__(self, api_key: Optional[str] = None, llm: Optional[Any] = None):
@@ -37,37 +73,24 @@ class LLMClient:
 
         if not self.api_key:
             # nothing we can do here
-            print("[LLMClient DEBUG] No API key available to construct LLM")
+            log.debug('llm.no_api_key', sample=100)
             return
 
-        # helper to mask api key for logging
-        def _mask(k: str) -> str:
-            if not k:
-                return 'None'
-            if len(k) <= 6:
-                return '***'
-            return k[:3] + '...' + k[-3:]
-
-        print(f"[LLMClient DEBUG] Attempting to construct Cerebras LLM with api_key={_mask(self.api_key)})")
+        log.debug('llm.construct', api_key=mask_secret(self.api_key), sample=100)
 
         # Try to create a Cerebras LLM client
         try:
-            # Try common package names for Cerebras SDK
-            try:
-                from cerebras.cloud.sdk import Cerebras
-            except ImportError:
-                try:
-                    from cerebras_cloud_sdk import Cerebras
-                except ImportError:
-                    raise ImportError("Cerebras SDK not found. Please install with: pip install cerebras-cloud-sdk")
+            Cerebras = load_cerebras_sdk()
 
             class _CerebrasWrapper:
                 def __init__(self, api_key: str):
-                    self.client = Cerebras(api_key=api_key)
+                    # Retries are owned by the governor, not the SDK
+                    self.client = Cerebras(api_key=api_key, max_retries=0)
                     # Set a default model - you can make this configurable
                     self.model = os.getenv('CEREBRAS_MODEL', 'llama3.1-8b')
+                    self.json_mode = os.getenv('WIZRAVEN_LLM_JSON_MODE', '1').lower() not in ('0', 'false', 'no')
 
-                def __call__(self, prompt: str) -> str:
+                def _create(self, prompt: str, temperature: float = 0.7, **extra: Any) -> str:
                     try:
                         response = self.client.chat.completions.create(
                             model=self.model,
@@ -75,17 +98,41 @@ class LLMClient:
                                 {"role": "user", "content": prompt}
                             ],
                             max_tokens=1000,
-                            temperature=0.7
+                            temperature=temperature,
+                            **extra
                         )
                         return response.choices[0].message.content
                     except Exception as e:
-                        raise RuntimeError(f'Cerebras API call failed: {e}')
+                        error = to_upstream_error(e)
+                        error.args = (f'Cerebras API call failed: {e}',)
+                        raise error from e
+
+                def __call__(self, prompt: str) -> str:
+                    return self._create(prompt)
+
+                def complete_json(self, prompt: str, schema: Optional[Dict[str, Any]] = None) -> str:
+                    """Completion constrained to JSON (json_schema when given, else json_object)."""
+                    if self.json_mode and self.model not in _JSON_MODE_UNSUPPORTED:
+                        if schema:
+                            fmt = {'type': 'json_schema',
+                                   'json_schema': {'name': 'response', 'strict': True, 'schema': schema}}
+                        else:
+                            fmt = {'type': 'json_object'}
+                        try:
+                            return self._create(prompt, temperature=0.2, response_format=fmt)
+                        except UpstreamError as e:
+                            if e.status not in (400, 422):
+                                raise
+                            # Model or account without structured outputs; prompt-only JSON from here on
+                            log.info('llm.json_mode_unsupported', model=self.model, error=str(e))
+                            _JSON_MODE_UNSUPPORTED.add(self.model)
+                    return self._create(prompt, temperature=0.2)
 
             self._llm = _CerebrasWrapper(self.api_key)
-            print('[LLMClient DEBUG] Constructed Cerebras wrapper successfully')
+            log.debug('llm.constructed', sample=100)
             return
         except Exception as e:
-            print(f"[LLMClient DEBUG] Cerebras construct failed: {e}")
+            log.warning('llm.construct_failed', error=str(e))
             # couldn't construct any LLM; leave _llm as None
             self._llm = None
 
@@ -97,26 +144,61 @@ class LLMClient:
         # ensure we have an LLM to call
         self._ensure_llm()
         if not self._llm:
-            print("[LLMClient DEBUG] No _llm available after _ensure_llm()")
+            log.debug('llm.unavailable', sample=100)
             raise ValueError('LLM client is not configured with an API key or an injectable llm')
 
-        prompt = self._build_prompt(text, context)
+        return await self._call(self._build_prompt(text, context))
+
+    async def analyze_json(self, prompt: str, context: Dict = None, schema: Optional[Dict[str, Any]] = None,
+                           expect: type = dict) -> Any:
+        """One completion parsed as JSON.
 
+        Uses the provider's structured-output mode when the LLM supports it
+        (``complete_json``), and extracts JSON tolerantly from whatever comes
+        back (prose, markdown fences, truncated output). ``prompt`` is sent
+        as-is. Raises ``StructuredOutputError`` (carrying ``raw``) when the
+        output holds no JSON of the expected type.
+        """
+        self._ensure_llm()
+        if not self._llm:
+            log.debug('llm.unavailable', sample=100)
+            raise ValueError('LLM client is not configured with an API key or an injectable llm')
+
+        raw = await self._call(prompt, schema=schema, json_mode=expect is dict)
+        parsed = extract_json(raw if isinstance(raw, str) else str(raw), expect)
+        if parsed is None:
+            log.info('llm.json_missing', chars=len(raw or ''), sample=10)
+            raise StructuredOutputError('Model output contained no JSON', raw)
+        return parsed
+
+    async def _call(self, prompt: str, schema: Optional[Dict[str, Any]] = None, json_mode: bool = False) -> Any:
         # LangChain LLMs are typically sync callables (llm(prompt)) while some
         # newer implementations may be async. Normalize to an async call by
         # running sync calls in a threadpool.
         try:
-            if asyncio.iscoroutinefunction(self._llm.__call__):
-                return await self._llm(prompt)
-
-            loop = asyncio.get_event_loop()
-            result = await loop.run_in_executor(None, lambda: self._llm(prompt))
+            with span('llm', bytes_in=len(prompt), tokens_in=estimate_tokens(prompt)) as s:
+                result = await get_governor().call(lambda: self._invoke(prompt, schema, json_mode),
+                                                   api_key=self.api_key)
+                if isinstance(result, str):
+                    s.set(bytes_out=len(result), tokens_out=estimate_tokens(result))
             # many langchain LLMs return a string directly
             return result
         except Exception as e:
-            print(f"[LLMClient DEBUG] Exception while calling _llm: {e}")
+            log.warning('llm.call_failed', error=str(e))
             raise
 
+    async def _invoke(self, prompt: str, schema: Optional[Dict[str, Any]] = None, json_mode: bool = False) -> Any:
+        """One provider call, without retries."""
+        if json_mode and hasattr(self._llm, 'complete_json'):
+            fn = self._llm.complete_json
+            args = (prompt, schema)
+        else:
+            fn = self._llm
+            args = (prompt,)
+        if asyncio.iscoroutinefunction(fn) or asyncio.iscoroutinefunction(getattr(fn, '__call__', None)):
+            return await fn(*args)
+        return await get_execution_layer().run('io', fn, *args)
+
     def _build_prompt(self, text: str, context: Dict = None) -> str:
         # basic prompt; keep it simple and deterministic so tests can assert
         return f"""Analyze the following network log data:
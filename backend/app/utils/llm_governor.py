@@ -0,0 +1,333 @@
+import asyncio
+import collections
+import os
+import random
+import time
+from email.utils import parsedate_to_datetime
+from typing import Any, Awaitable, Callable, Deque, Dict, List, Optional, Tuple
+
+from .metrics import REGISTRY
+from .singleflight import scope_of
+from .structured_logging import get_logger
+
+log = get_logger(__name__)
+
+# Statuses that mean "provider is overloaded or failing", as opposed to a bad request or key
+RETRYABLE_STATUSES = frozenset({408, 409, 429, 500, 502, 503, 504, 529})
+
+
+class UpstreamError(RuntimeError):
+    """A failed provider call, with the HTTP status and Retry-After hint when known."""
+
+    def __init__(self, message: str, status: Optional[int] = None, retry_after: Optional[float] = None,
+                 retryable: Optional[bool] = None):
+        super().__init__(message)
+        self.status = status
+        self.retry_after = retry_after
+        self.retryable = retryable if retryable is not None else status in RETRYABLE_STATUSES
+
+
+class CircuitOpenError(UpstreamError):
+    """Raised without calling the provider while the circuit breaker is open."""
+
+    def __init__(self, retry_in: float):
+        super().__init__(f'LLM provider unavailable; retry in {retry_in:.0f}s', status=None, retryable=False)
+        self.retry_after = retry_in
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Retry-After as seconds: either delta-seconds or an HTTP date."""
+    if not value:
+        return None
+    value = str(value).strip()
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+def to_upstream_error(exc: BaseException) -> UpstreamError:
+    """Normalize an SDK/HTTP exception into an UpstreamError.
+
+    Understands the status/response attributes of httpx and the
+    Stainless-generated SDKs (Cerebras, OpenAI); connection failures and
+    timeouts without a status count as retryable.
+    """
+    if isinstance(exc, UpstreamError):
+        return exc
+    response = getattr(exc, 'response', None)
+    status = getattr(exc, 'status_code', None) or getattr(response, 'status_code', None)
+    headers = getattr(response, 'headers', None) or {}
+    retry_after = parse_retry_after(headers.get('retry-after') if hasattr(headers, 'get') else None)
+    if status is None:
+        retryable = isinstance(exc, (ConnectionError, TimeoutError, asyncio.TimeoutError)) or \
+            type(exc).__name__ in ('APIConnectionError', 'APITimeoutError', 'ConnectError', 'ReadTimeout',
+                                   'ConnectTimeout', 'RemoteProtocolError')
+        return UpstreamError(str(exc), None, retry_after, retryable)
+    return UpstreamError(str(exc), int(status), retry_after)
+
+
+class AIMDLimiter:
+    """Additive-increase / multiplicative-decrease cap on concurrent calls.
+
+    Each fast success grows the limit by ``1/limit`` (about +1 per round
+    of calls); an overload signal (429/5xx, timeout, or latency above
+    ``latency_target_ms``) multiplies it by ``backoff``, at most once per
+    ``cooldown`` seconds so one burst of failures counts once.
+    """
+
+    def __init__(self, initial: int = 8, min_limit: int = 1, max_limit: int = 64,
+                 latency_target_ms: float = 15000.0, backoff: float = 0.5, cooldown: float = 1.0):
+        self.min_limit = max(1, min_limit)
+        self.max_limit = max(self.min_limit, max_limit)
+        self.limit = float(min(self.max_limit, max(self.min_limit, initial)))
+        self.latency_target_ms = latency_target_ms
+        self.backoff = backoff
+        self.cooldown = cooldown
+        self.in_flight = 0
+        self._waiters: Deque[asyncio.Future] = collections.deque()
+        self._last_decrease = 0.0
+
+    async def acquire(self) -> None:
+        while self.in_flight >= int(self.limit):
+            waiter = asyncio.get_running_loop().create_future()
+            self._waiters.append(waiter)
+            try:
+                await waiter
+            except asyncio.CancelledError:
+                if waiter in self._waiters:
+                    self._waiters.remove(waiter)
+                raise
+        self.in_flight += 1
+
+    def release(self) -> None:
+        self.in_flight -= 1
+        self._wake()
+
+    def _wake(self) -> None:
+        free = int(self.limit) - self.in_flight
+        while free > 0 and self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                free -= 1
+
+    def on_success(self, latency_ms: float) -> None:
+        if latency_ms > self.latency_target_ms:
+            self.on_overload()
+            return
+        self.limit = min(float(self.max_limit), self.limit + 1.0 / self.limit)
+        self._wake()
+
+    def on_overload(self) -> None:
+        now = time.monotonic()
+        if now - self._last_decrease < self.cooldown:
+            return
+        self._last_decrease = now
+        self.limit = max(float(self.min_limit), self.limit * self.backoff)
+
+
+class TokenBucket:
+    """``rate`` calls per second with bursts up to ``burst``; ``acquire`` waits for a token."""
+
+    def __init__(self, rate: float, burst: float):
+        self.rate = rate
+        self.burst = max(1.0, burst)
+        self.tokens = self.burst
+        self._updated = time.monotonic()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    async def acquire(self) -> float:
+        """Take a token; returns how long the caller waited."""
+        waited = 0.0
+        while True:
+            self._refill()
+            if self.tokens >= 1.0:
+                self.tokens -= 1.0
+                return waited
+            delay = (1.0 - self.tokens) / self.rate
+            waited += delay
+            await asyncio.sleep(delay)
+
+
+class CircuitBreaker:
+    """Opens after ``failure_threshold`` consecutive provider failures.
+
+    While open, calls fail fast for ``reset_seconds``; then a single probe
+    is let through (half-open). Its success closes the breaker, its
+    failure re-opens it; a probe that ends with neither (cancelled) is
+    released so the next call probes instead.
+    """
+
+    def __init__(self, failure_threshold: int = 5, reset_seconds: float = 30.0):
+        self.failure_threshold = max(1, failure_threshold)
+        self.reset_seconds = reset_seconds
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self._probing = False
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return 'closed'
+        if time.monotonic() - self.opened_at >= self.reset_seconds:
+            return 'half_open'
+        return 'open'
+
+    def retry_in(self) -> float:
+        if self.opened_at is None:
+            return 0.0
+        return max(0.0, self.reset_seconds - (time.monotonic() - self.opened_at))
+
+    def allow(self) -> bool:
+        state = self.state
+        if state == 'closed':
+            return True
+        if state == 'half_open' and not self._probing:
+            self._probing = True
+            return True
+        return False
+
+    def release_probe(self) -> None:
+        self._probing = False
+
+    def record_success(self) -> None:
+        self.failures = 0
+        self.opened_at = None
+        self._probing = False
+
+    def record_failure(self) -> None:
+        self.failures += 1
+        if self._probing or self.failures >= self.failure_threshold:
+            if self.opened_at is None or self._probing:
+                log.warning('llm.circuit_open', failures=self.failures, reset_seconds=self.reset_seconds)
+            self.opened_at = time.monotonic()
+            self._probing = False
+
+
+class LLMGovernor:
+    """Admission control for upstream LLM calls.
+
+    A call passes the circuit breaker, then the caller's per-key token
+    bucket, then takes a slot from the AIMD limiter. Retryable failures
+    (429/5xx/timeouts) shrink the limit, count against the breaker, and
+    are retried up to ``max_attempts`` with full-jitter exponential
+    backoff, waiting at least as long as the provider's Retry-After.
+    Settings come from WIZRAVEN_LLM_* environment variables.
+    """
+
+    def __init__(self, limiter: Optional[AIMDLimiter] = None, breaker: Optional[CircuitBreaker] = None,
+                 rate_per_key: Optional[float] = None, burst_per_key: Optional[float] = None,
+                 max_attempts: Optional[int] = None, backoff_base: Optional[float] = None,
+                 backoff_cap: Optional[float] = None):
+        self.limiter = limiter or AIMDLimiter(
+            initial=int(os.getenv('WIZRAVEN_LLM_CONCURRENCY', '8')),
+            max_limit=int(os.getenv('WIZRAVEN_LLM_MAX_CONCURRENCY', '64')),
+            latency_target_ms=float(os.getenv('WIZRAVEN_LLM_LATENCY_TARGET_MS', '15000')),
+        )
+        self.breaker = breaker or CircuitBreaker(
+            failure_threshold=int(os.getenv('WIZRAVEN_LLM_BREAKER_FAILURES', '5')),
+            reset_seconds=float(os.getenv('WIZRAVEN_LLM_BREAKER_RESET_SECONDS', '30')),
+        )
+        self.rate_per_key = rate_per_key if rate_per_key is not None else \
+            float(os.getenv('WIZRAVEN_LLM_RATE_PER_KEY', '10'))
+        self.burst_per_key = burst_per_key if burst_per_key is not None else \
+            float(os.getenv('WIZRAVEN_LLM_BURST_PER_KEY', '20'))
+        self.max_attempts = max(1, max_attempts or int(os.getenv('WIZRAVEN_LLM_MAX_ATTEMPTS', '3')))
+        self.backoff_base = backoff_base if backoff_base is not None else 0.5
+        self.backoff_cap = backoff_cap if backoff_cap is not None else 20.0
+        self._buckets: Dict[str, TokenBucket] = {}
+
+    def available(self) -> bool:
+        """False while the breaker is open; callers should go straight to their fallback."""
+        return self.breaker.state != 'open'
+
+    def _bucket(self, api_key: Optional[str]) -> Optional[TokenBucket]:
+        if self.rate_per_key <= 0:
+            return None
+        scope = scope_of(api_key)
+        bucket = self._buckets.get(scope)
+        if bucket is None:
+            bucket = self._buckets[scope] = TokenBucket(self.rate_per_key, self.burst_per_key)
+        return bucket
+
+    def backoff_delay(self, attempt: int, retry_after: Optional[float] = None) -> float:
+        delay = random.uniform(0, min(self.backoff_cap, self.backoff_base * (2 ** attempt)))
+        if retry_after is not None:
+            delay = max(delay, min(retry_after, self.backoff_cap))
+        return delay
+
+    async def call(self, fn: Callable[[], Awaitable[Any]], api_key: Optional[str] = None) -> Any:
+        """Run ``fn`` (an async thunk doing one provider call) under the governor."""
+        bucket = self._bucket(api_key)
+        for attempt in range(self.max_attempts):
+            probing = self.breaker.state == 'half_open'
+            if not self.breaker.allow():
+                REGISTRY.inc('wizraven_llm_rejected_total', help='LLM calls refused while the breaker was open.')
+                raise CircuitOpenError(self.breaker.retry_in())
+            try:
+                if bucket is not None:
+                    waited = await bucket.acquire()
+                    if waited:
+                        REGISTRY.inc('wizraven_llm_throttled_seconds_total', waited,
+                                     help='Time spent waiting on per-key rate limits.')
+                await self.limiter.acquire()
+                started = time.perf_counter()
+                try:
+                    result = await fn()
+                except Exception as e:
+                    error = to_upstream_error(e)
+                    if not error.retryable:
+                        # Bad request or key: the provider answered, so it counts as healthy
+                        self.breaker.record_success()
+                        raise error from e
+                    self.limiter.on_overload()
+                    self.breaker.record_failure()
+                    REGISTRY.inc('wizraven_llm_upstream_errors_total', help='Retryable LLM provider failures.',
+                                 status=error.status or 'network')
+                    if attempt + 1 >= self.max_attempts:
+                        raise error from e
+                    delay = self.backoff_delay(attempt, error.retry_after)
+                    log.info('llm.retry', attempt=attempt + 1, status=error.status, delay_s=round(delay, 3))
+                    REGISTRY.inc('wizraven_llm_retries_total', help='LLM calls retried after a provider failure.')
+                else:
+                    self.limiter.on_success((time.perf_counter() - started) * 1000)
+                    self.breaker.record_success()
+                    return result
+                finally:
+                    self.limiter.release()
+            except BaseException:
+                # Cancelled while queued or in flight: the probe never got an answer
+                if probing:
+                    self.breaker.release_probe()
+                raise
+            await asyncio.sleep(delay)
+
+    def metrics_samples(self) -> List[Tuple[str, str, Dict[str, Any], float]]:
+        """Gauge samples for ``MetricsRegistry.register_collector``."""
+        return [
+            ('wizraven_llm_concurrency_limit', 'Current adaptive cap on concurrent LLM calls.', {},
+             round(self.limiter.limit, 2)),
+            ('wizraven_llm_in_flight', 'LLM calls in progress.', {}, self.limiter.in_flight),
+            ('wizraven_llm_breaker_open', '1 while the LLM circuit breaker is open.', {},
+             1 if self.breaker.state == 'open' else 0),
+        ]
+
+
+_GOVERNOR: Optional[LLMGovernor] = None
+
+
+def get_governor() -> LLMGovernor:
+    """Process-wide governor, created on first use."""
+    global _GOVERNOR
+    if _GOVERNOR is None:
+        _GOVERNOR = LLMGovernor()
+    return _GOVERNOR
@@ -0,0 +1,137 @@
+import re
+from typing import Dict, List, Optional, Pattern
+
+_SYSLOG_TS = r'\w{3}\s+\d{1,2}\s+\d{2}:\d{2}:\d{2}(?:\.\d+)?'
+_ISO_TS = r'\d{4}-\d{2}-\d{2}[T\s]\d{2}:\d{2}:\d{2}(?:\.\d+)?(?:Z|[+-]\d{2}:?\d{2})?'
+_CISCO_MNEMONIC = r'[A-Z][A-Z0-9_]*-\d-[A-Z0-9_]+'
+
+
+class LogFormat:
+    """A vendor log layout: a cheap detection probe plus a precompiled line extractor.
+
+    ``line_re`` must define the named groups ``message`` and optionally
+    ``timestamp``, ``device`` and ``mnemonic``.
+    """
+
+    name = 'generic'
+    probe_re: Optional[Pattern] = None
+    line_re: Optional[Pattern] = None
+
+    def probe(self, sample: str) -> bool:
+        return bool(self.probe_re and self.probe_re.search(sample))
+
+    def extract(self, line: str) -> Optional[Dict[str, Optional[str]]]:
+        """Split one raw line into timestamp/device/mnemonic/message, or None if it doesn't fit."""
+        m = self.line_re.match(line) if self.line_re else None
+        if m is None:
+            return None
+        groups = m.groupdict()
+        return {
+            'timestamp': groups.get('timestamp'),
+            'device': groups.get('device'),
+            'mnemonic': groups.get('mnemonic'),
+            'message': groups.get('message') or '',
+        }
+
+
+_REGISTRY: List[LogFormat] = []
+
+
+def register_format(cls):
+    """Class decorator adding a format to the registry; probes run in registration order."""
+    _REGISTRY.append(cls())
+    return cls
+
+
+def registered_formats() -> List[LogFormat]:
+    return list(_REGISTRY)
+
+
+def get_format(name: str) -> Optional[LogFormat]:
+    for fmt in _REGISTRY:
+        if fmt.name == name:
+            return fmt
+    return None
+
+
+def detect_format(text: str, probe_chars: int = 4096) -> Optional[LogFormat]:
+    """Run each registered probe over the first ``probe_chars`` of ``text``."""
+    sample = (text or '')[:probe_chars]
+    for fmt in _REGISTRY:
+        if fmt.probe(sample):
+            return fmt
+    return None
+
+
+@register_format
+class RFC5424Format(LogFormat):
+    name = 'rfc5424'
+    probe_re = re.compile(r'^<\d{1,3}>1 \d{4}-\d{2}-\d{2}T', re.M)
+    line_re = re.compile(
+        r'^<\d{1,3}>1 (?P<timestamp>\S+) (?P<device>\S+) \S+ \S+ (?P<mnemonic>\S+) (?:-|(?:\[(?:[^\]\\]|\\.)*\])+)\s?(?P<message>.*)$')
+
+    def extract(self, line: str) -> Optional[Dict[str, Optional[str]]]:
+        record = super().extract(line)
+        if record is not None:
+            for key in ('timestamp', 'device', 'mnemonic'):
+                if record[key] == '-':
+                    record[key] = None
+        return record
+
+
+@register_format
+class AristaEOSFormat(LogFormat):
+    name = 'arista_eos'
+    probe_re = re.compile(r'\b(?:Ebra|Stp|Lag|Rib|Bgp|Lldp|ConfigAgent|SuperServer|Fhrp)(?:\[\d+\])?: %' + _CISCO_MNEMONIC)
+    line_re = re.compile(
+        rf'^(?:<\d+>)?(?P<timestamp>{_SYSLOG_TS}|{_ISO_TS})\s+(?P<device>\S+)\s+[A-Za-z][\w\-]*(?:\[\d+\])?:\s+'
+        rf'%(?P<mnemonic>{_CISCO_MNEMONIC}):\s*(?P<message>.*)$')
+
+
+@register_format
+class CiscoNXOSFormat(LogFormat):
+    name = 'cisco_nxos'
+    probe_re = re.compile(r'^(?:<\d+>)?\d{4} \w{3} +\d{1,2} \d{2}:\d{2}:\d{2}(?:\.\d+)? \S+ %', re.M)
+    line_re = re.compile(
+        rf'^(?:<\d+>)?(?P<timestamp>\d{{4}}\s+{_SYSLOG_TS})(?:\s+[A-Z]{{3,4}})?\s+(?P<device>\S+)\s+'
+        rf'%(?P<mnemonic>{_CISCO_MNEMONIC}):\s*(?P<message>.*)$')
+
+
+@register_format
+class JunosFormat(LogFormat):
+    name = 'junos'
+    probe_re = re.compile(r'\b[a-z][\w\-]*\[\d+\]: [A-Z][A-Z0-9]+(?:_[A-Z0-9]+)+:|\b(?:ge|xe|et)-\d+/\d+/\d+')
+    line_re = re.compile(
+        rf'^(?:<\d+>)?(?P<timestamp>{_SYSLOG_TS}|{_ISO_TS})\s+(?P<device>\S+)\s+[\w\-/]+(?:\[\d+\])?:\s+'
+        r'(?:(?P<mnemonic>[A-Z][A-Z0-9]+(?:_[A-Z0-9]+)+):\s*)?(?P<message>.*)$')
+
+
+@register_format
+class CiscoIOSFormat(LogFormat):
+    name = 'cisco_ios'
+    probe_re = re.compile(r'%' + _CISCO_MNEMONIC + ':')
+    # Optional syslog-relay prefix (timestamp + host), optional sequence number,
+    # then the device's own (possibly *-unsynced) timestamp and %FAC-SEV-MNEMONIC.
+    line_re = re.compile(
+        rf'^(?:<\d+>)?\s*(?:(?P<relay_ts>{_SYSLOG_TS})\s+(?P<device>[\w.\-]+):?\s+)?(?:\d+:\s*)?'
+        rf'[*.]?(?P<timestamp>(?:\d{{4}}\s+)?{_SYSLOG_TS})?(?:\s+[A-Z]{{3,4}})?:?\s*'
+        rf'%(?P<mnemonic>{_CISCO_MNEMONIC}):\s*(?P<message>.*)$')
+
+    def extract(self, line: str) -> Optional[Dict[str, Optional[str]]]:
+        m = self.line_re.match(line)
+        if m is None:
+            return None
+        return {
+            'timestamp': m.group('timestamp') or m.group('relay_ts'),
+            'device': m.group('device'),
+            'mnemonic': m.group('mnemonic'),
+            'message': m.group('message') or '',
+        }
+
+
+@register_format
+class RFC3164Format(LogFormat):
+    name = 'syslog'
+    probe_re = re.compile(r'^<\d{1,3}>\w{3}\s+\d{1,2} ', re.M)
+    line_re = re.compile(
+        rf'^<\d{{1,3}}>(?P<timestamp>{_SYSLOG_TS})\s+(?P<device>\S+)\s+(?:[\w\-/.]+(?:\[\d+\])?:\s*)?(?P<message>.*)$')
@@ -0,0 +1,169 @@
+import re
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, List, Optional
+
+# Parameter masks applied before clustering. Order matters: the more specific
+# network tokens (MACs, IPs, interface names) must be replaced before the
+# generic number mask eats their digits.
+_PARAM_MASKS = [
+    ('<MAC>', re.compile(r'\b(?:[0-9a-fA-F]{4}\.[0-9a-fA-F]{4}\.[0-9a-fA-F]{4}|(?:[0-9a-fA-F]{2}[:-]){5}[0-9a-fA-F]{2})\b')),
+    ('<TIME>', re.compile(r'\b\d{1,2}:\d{2}:\d{2}(?:\.\d+)?\b')),
+    ('<IP>', re.compile(r'\b(?:\d{1,3}\.){3}\d{1,3}(?:/\d{1,2})?\b')),
+    ('<IP>', re.compile(r'(?<![\w:])(?:[0-9a-fA-F]{1,4}:){1,7}:(?:[0-9a-fA-F]{1,4}(?::[0-9a-fA-F]{1,4})*)?(?:/\d{1,3})?(?![\w:])')),
+    ('<IF>', re.compile(
+        r'\b(?:(?:Ten|Forty|Hundred|TwentyFive)?GigabitEthernet|FastEthernet|GigE|Ethernet|Port-channel|Vlan|Loopback|Tunnel|Serial|Management'
+        r'|Gi|Fa|Te|Fo|Hu|Et|Po|Lo|Tu|Se|Ma|mgmt|ge-|xe-|et-|ae|irb|lo|em|fxp)\d+(?:[/.:]\d+)*\b')),
+    ('<HEX>', re.compile(r'\b0x[0-9a-fA-F]+\b')),
+    ('<NUM>', re.compile(r'(?<![\w<])[-+]?\d+(?:\.\d+)?(?![\w>])')),
+]
+
+WILDCARD = '<*>'
+
+
+def mask_parameters(line: str) -> str:
+    """Replace variable network tokens (IPs, interfaces, counters) with typed slots."""
+    for slot, pattern in _PARAM_MASKS:
+        line = pattern.sub(slot, line)
+    return line
+
+
+class LogTemplate:
+    """A mined log template with occurrence statistics."""
+
+    __slots__ = ('template_id', 'tokens', 'count', 'first_seen', 'last_seen', 'samples', '_leaf')
+
+    def __init__(self, template_id: int, tokens: List[str]):
+        self.template_id = template_id
+        self.tokens = tokens
+        self.count = 0
+        self.first_seen: Any = None
+        self.last_seen: Any = None
+        self.samples: List[str] = []
+        self._leaf: Optional[List['LogTemplate']] = None
+
+    @property
+    def template(self) -> str:
+        return ' '.join(self.tokens)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "id": self.template_id,
+            "template": self.template,
+            "count": self.count,
+            "first_seen": self.first_seen,
+            "last_seen": self.last_seen,
+            "samples": list(self.samples),
+        }
+
+
+class TemplateMiner:
+    """Online Drain-style log template miner.
+
+    Lines are masked, tokenized and routed through a fixed-depth prefix tree
+    (token count, then the first ``depth`` tokens) to a small leaf bucket of
+    candidate templates. A line joins the most similar template in its bucket
+    when the share of matching tokens reaches ``sim_threshold``; mismatching
+    positions become ``<*>``. Otherwise a new template is created.
+
+    Memory is bounded by ``max_templates``: when the cap is reached the least
+    recently seen template is evicted. Raw lines are never retained beyond
+    ``max_samples`` examples per template.
+    """
+
+    def __init__(self, depth: int = 2, sim_threshold: float = 0.5, max_children: int = 100,
+                 max_templates: int = 1000, max_samples: int = 3):
+        self.depth = max(1, depth)
+        self.sim_threshold = sim_threshold
+        self.max_children = max_children
+        self.max_templates = max_templates
+        self.max_samples = max_samples
+
+        self._root: Dict[int, Dict] = {}
+        # Templates ordered by recency of use; used for LRU eviction
+        self._templates: 'OrderedDict[int, LogTemplate]' = OrderedDict()
+        self._next_id = 1
+        self.total_lines = 0
+
+    def add(self, line: str, timestamp: Any = None) -> Optional[LogTemplate]:
+        """Feed one cleaned log line; returns the template it was assigned to."""
+        tokens = mask_parameters(line).split()
+        if not tokens:
+            return None
+        self.total_lines += 1
+
+        leaf = self._leaf_for(tokens)
+        template = self._best_match(leaf, tokens)
+        if template is None:
+            template = self._create(leaf, tokens)
+        else:
+            template.tokens = [t if t == n else WILDCARD for t, n in zip(template.tokens, tokens)]
+            self._templates.move_to_end(template.template_id)
+
+        template.count += 1
+        if template.first_seen is None:
+            template.first_seen = timestamp
+        if timestamp is not None:
+            template.last_seen = timestamp
+        if len(template.samples) < self.max_samples:
+            template.samples.append(line)
+        return template
+
+    def add_many(self, lines: Iterable[str], timestamps: Optional[Iterable[Any]] = None) -> None:
+        if timestamps is None:
+            for line in lines:
+                self.add(line)
+        else:
+            for line, ts in zip(lines, timestamps):
+                self.add(line, ts)
+
+    def templates(self, top: Optional[int] = None) -> List[LogTemplate]:
+        """Return templates sorted by descending occurrence count."""
+        ordered = sorted(self._templates.values(), key=lambda t: t.count, reverse=True)
+        return ordered[:top] if top is not None else ordered
+
+    def to_dicts(self, top: Optional[int] = None) -> List[Dict[str, Any]]:
+        return [t.to_dict() for t in self.templates(top)]
+
+    def __len__(self) -> int:
+        return len(self._templates)
+
+    def _leaf_for(self, tokens: List[str]) -> List[LogTemplate]:
+        node = self._root.setdefault(len(tokens), {})
+        for token in tokens[:self.depth]:
+            key = WILDCARD if any(c.isdigit() for c in token) else token
+            if key not in node:
+                # Cap fan-out so high-cardinality leading tokens share a wildcard branch
+                key = key if len(node) < self.max_children else WILDCARD
+            node = node.setdefault(key, {})
+        return node.setdefault(None, [])
+
+    def _best_match(self, leaf: List[LogTemplate], tokens: List[str]) -> Optional[LogTemplate]:
+        best = None
+        best_sim = -1.0
+        best_params = -1
+        for template in leaf:
+            same = 0
+            params = 0
+            for t, n in zip(template.tokens, tokens):
+                if t == WILDCARD:
+                    params += 1
+                elif t == n:
+                    same += 1
+            sim = same / len(tokens)
+            if sim > best_sim or (sim == best_sim and params > best_params):
+                best, best_sim, best_params = template, sim, params
+        if best is not None and best_sim >= self.sim_threshold:
+            return best
+        return None
+
+    def _create(self, leaf: List[LogTemplate], tokens: List[str]) -> LogTemplate:
+        if self.max_templates and len(self._templates) >= self.max_templates:
+            _, evicted = self._templates.popitem(last=False)
+            if evicted._leaf is not None:
+                evicted._leaf.remove(evicted)
+        template = LogTemplate(self._next_id, list(tokens))
+        template._leaf = leaf
+        self._next_id += 1
+        leaf.append(template)
+        self._templates[template.template_id] = template
+        return template
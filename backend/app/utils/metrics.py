@@ -0,0 +1,201 @@
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+# Seconds; covers sub-millisecond regex work up to slow LLM calls
+DURATION_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+LabelKey = Tuple[Tuple[str, str], ...]
+
+
+def _label_key(labels: Dict[str, Any]) -> LabelKey:
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+def _format_labels(key: LabelKey, extra: Optional[Tuple[str, str]] = None) -> str:
+    pairs = list(key) + ([extra] if extra else [])
+    if not pairs:
+        return ''
+    body = ','.join('{}="{}"'.format(k, v.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n'))
+                    for k, v in pairs)
+    return '{' + body + '}'
+
+
+def _format_value(value: float) -> str:
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class Histogram:
+    """Cumulative-bucket histogram in the Prometheus layout."""
+
+    __slots__ = ('buckets', 'counts', 'sum', 'count')
+
+    def __init__(self, buckets: Tuple[float, ...] = DURATION_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+class MetricsRegistry:
+    """In-process counters and histograms rendered as Prometheus text.
+
+    Collectors registered with ``register_collector`` are called at render
+    time and return gauge samples as ``(name, help, labels, value)``; they
+    are how pool and cache state get exported without extra bookkeeping.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._help: Dict[str, Tuple[str, str]] = {}
+        self._counters: Dict[str, Dict[LabelKey, float]] = {}
+        self._histograms: Dict[str, Dict[LabelKey, Histogram]] = {}
+        self._collectors: List[Callable[[], List[Tuple[str, str, Dict[str, Any], float]]]] = []
+
+    def inc(self, name: str, value: float = 1.0, help: str = '', **labels) -> None:
+        key = _label_key(labels)
+        with self._lock:
+            self._help.setdefault(name, ('counter', help))
+            series = self._counters.setdefault(name, {})
+            series[key] = series.get(key, 0.0) + value
+
+    def observe(self, name: str, value: float, help: str = '', buckets: Tuple[float, ...] = DURATION_BUCKETS,
+                **labels) -> None:
+        key = _label_key(labels)
+        with self._lock:
+            self._help.setdefault(name, ('histogram', help))
+            series = self._histograms.setdefault(name, {})
+            hist = series.get(key)
+            if hist is None:
+                hist = series[key] = Histogram(buckets)
+            hist.observe(value)
+
+    def register_collector(self, collector: Callable[[], List[Tuple[str, str, Dict[str, Any], float]]]) -> None:
+        self._collectors.append(collector)
+
+    def counter_value(self, name: str, **labels) -> float:
+        return self._counters.get(name, {}).get(_label_key(labels), 0.0)
+
+    def histogram(self, name: str, **labels) -> Optional[Histogram]:
+        return self._histograms.get(name, {}).get(_label_key(labels))
+
+    def render(self) -> str:
+        out: List[str] = []
+        with self._lock:
+            for name, series in sorted(self._counters.items()):
+                out.append(f'# HELP {name} {self._help[name][1]}')
+                out.append(f'# TYPE {name} counter')
+                for key, value in sorted(series.items()):
+                    out.append(f'{name}{_format_labels(key)} {_format_value(value)}')
+            for name, series in sorted(self._histograms.items()):
+                out.append(f'# HELP {name} {self._help[name][1]}')
+                out.append(f'# TYPE {name} histogram')
+                for key, hist in sorted(series.items()):
+                    cumulative = 0
+                    for bound, count in zip(hist.buckets + (float('inf'),), hist.counts):
+                        cumulative += count
+                        out.append(f'{name}_bucket{_format_labels(key, ("le", _format_value(bound)))} {cumulative}')
+                    out.append(f'{name}_sum{_format_labels(key)} {_format_value(hist.sum)}')
+                    out.append(f'{name}_count{_format_labels(key)} {hist.count}')
+        gauges: Dict[str, Tuple[str, List[str]]] = {}
+        for collector in self._collectors:
+            for name, help, labels, value in collector():
+                entry = gauges.setdefault(name, (help, []))
+                entry[1].append(f'{name}{_format_labels(_label_key(labels))} {_format_value(value)}')
+        for name, (help, lines) in sorted(gauges.items()):
+            out.append(f'# HELP {name} {help}')
+            out.append(f'# TYPE {name} gauge')
+            out.extend(lines)
+        return '\n'.join(out) + '\n'
+
+
+REGISTRY = MetricsRegistry()
+
+
+class Span:
+    """One timed stage of a request. Numeric attributes set on it become per-stage counters."""
+
+    __slots__ = ('stage', 'start', 'duration', 'attrs', 'error')
+
+    def __init__(self, stage: str, attrs: Dict[str, float]):
+        self.stage = stage
+        self.start = time.perf_counter()
+        self.duration = 0.0
+        self.attrs = dict(attrs)
+        self.error = False
+
+    def set(self, **attrs) -> None:
+        """Add to numeric attributes (bytes_in, bytes_out, lines, tokens_in, tokens_out, cache_hits, ...)."""
+        for k, v in attrs.items():
+            self.attrs[k] = self.attrs.get(k, 0) + v
+
+
+class Trace:
+    """Spans recorded while handling one request (shared by tasks spawned from it)."""
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.spans: List[Span] = []
+
+    def stage_totals(self) -> Dict[str, float]:
+        totals: Dict[str, float] = {}
+        for s in self.spans:
+            totals[s.stage] = totals.get(s.stage, 0.0) + s.duration
+        return totals
+
+    def server_timing(self) -> str:
+        """Render as a ``Server-Timing`` header value (milliseconds)."""
+        parts = [f'{stage};dur={seconds * 1000:.1f}' for stage, seconds in self.stage_totals().items()]
+        parts.append(f'total;dur={(time.perf_counter() - self.start) * 1000:.1f}')
+        return ', '.join(parts)
+
+
+_CURRENT_TRACE: ContextVar[Optional[Trace]] = ContextVar('wizraven_trace', default=None)
+
+
+def start_trace() -> Trace:
+    trace = Trace()
+    _CURRENT_TRACE.set(trace)
+    return trace
+
+
+def current_trace() -> Optional[Trace]:
+    return _CURRENT_TRACE.get()
+
+
+@contextmanager
+def span(stage: str, registry: Optional[MetricsRegistry] = None, **attrs) -> Iterator[Span]:
+    """Time a stage and record it on the current trace and in the metrics registry.
+
+    Usable around ``await`` expressions; the span closes when the block exits.
+    """
+    registry = registry or REGISTRY
+    s = Span(stage, attrs)
+    try:
+        yield s
+    except BaseException:
+        s.error = True
+        raise
+    finally:
+        s.duration = time.perf_counter() - s.start
+        registry.observe('wizraven_stage_duration_seconds', s.duration,
+                         help='Time spent per processing stage.', stage=stage)
+        if s.error:
+            registry.inc('wizraven_stage_errors_total', help='Stages that raised.', stage=stage)
+        for key, value in s.attrs.items():
+            if value:
+                registry.inc(f'wizraven_stage_{key}_total', value, help=f'Per-stage {key.replace("_", " ")}.',
+                             stage=stage)
+        trace = _CURRENT_TRACE.get()
+        if trace is not None:
+            trace.spans.append(s)
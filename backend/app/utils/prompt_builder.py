@@ -0,0 +1,119 @@
+import os
+import re
+from typing import Any, Dict, List, Optional
+
+from .log_templates import TemplateMiner
+
+_TOKEN_RE = re.compile(r"\w+|[^\w\s]")
+
+
+def estimate_tokens(text: str) -> int:
+    """Cheap local estimate of LLM token count.
+
+    Approximates BPE tokenizers: punctuation is one token each and words cost
+    roughly one token per four characters. Good enough for budgeting prompts
+    without shipping a tokenizer.
+    """
+    if not text:
+        return 0
+    total = 0
+    for tok in _TOKEN_RE.findall(text):
+        total += (len(tok) + 3) // 4
+    return total
+
+
+class PromptBuilder:
+    """Build bounded-size LLM prompts from arbitrarily large log input.
+
+    Inputs that already fit the token budget are passed through unchanged.
+    Larger inputs are summarized as deduplicated templates with counts and
+    first/last-seen times, followed by a few representative raw lines, so the
+    prompt size stays roughly constant whether the paste is 1k or 1M lines.
+    """
+
+    def __init__(self, token_budget: Optional[int] = None, max_samples: int = 5):
+        if token_budget is None:
+            token_budget = int(os.getenv('WIZRAVEN_PROMPT_TOKEN_BUDGET', '3000'))
+        self.token_budget = token_budget
+        self.max_samples = max_samples
+
+    def compact_text(self, text: str, budget: Optional[int] = None) -> str:
+        """Return ``text`` if it fits the budget, otherwise a template summary of it."""
+        budget = budget or self.token_budget
+        if estimate_tokens(text) <= budget:
+            return text
+        lines = [l.strip() for l in text.splitlines() if l.strip()]
+        return self.summarize_lines(lines, budget=budget)
+
+    def summarize_lines(self, lines: List[str], budget: Optional[int] = None) -> str:
+        miner = TemplateMiner()
+        for line in lines:
+            miner.add(line)
+        return self.summarize_templates(miner.to_dicts(), total_lines=miner.total_lines, budget=budget)
+
+    def summarize_templates(self, templates: List[Dict[str, Any]], total_lines: Optional[int] = None,
+                            budget: Optional[int] = None) -> str:
+        """Render templates (most frequent first) and sample lines within ``budget`` tokens."""
+        budget = budget or self.token_budget
+        if total_lines is None:
+            total_lines = sum(t.get('count', 0) for t in templates)
+
+        header = f"{total_lines} log lines collapsed into {len(templates)} templates (count, first-last seen, template):"
+        out = [header]
+        used = estimate_tokens(header)
+
+        # Reserve roughly a fifth of the budget for representative raw lines
+        sample_budget = budget // 5
+        template_budget = budget - sample_budget
+
+        shown = 0
+        for t in templates:
+            span = ''
+            if t.get('first_seen') is not None:
+                span = f" ({t['first_seen']} - {t['last_seen']})" if t.get('last_seen') != t['first_seen'] else f" ({t['first_seen']})"
+            entry = f"[{t.get('count', 0)}x]{span} {t['template']}"
+            cost = estimate_tokens(entry)
+            if used + cost > template_budget:
+                break
+            out.append(entry)
+            used += cost
+            shown += 1
+        if shown < len(templates):
+            omitted = sum(t.get('count', 0) for t in templates[shown:])
+            out.append(f"... {len(templates) - shown} rarer templates omitted ({omitted} lines)")
+
+        samples = []
+        for t in templates:
+            if len(samples) >= self.max_samples:
+                break
+            if t.get('samples'):
+                samples.append(t['samples'][0])
+        if samples:
+            out.append('Representative lines:')
+            for line in samples:
+                cost = estimate_tokens(line)
+                if used + cost > budget:
+                    break
+                out.append(line)
+                used += cost
+
+        return '\n'.join(out)
+
+    def summarize_structured(self, structured_data: Dict[str, Any], budget: Optional[int] = None) -> str:
+        """Summarize parser output for a prompt without echoing bulky columns."""
+        budget = budget or self.token_budget
+        fields = []
+        for key, value in structured_data.items():
+            if isinstance(value, (str, int, float, bool)) and key not in ('raw_text', 'clean_logs'):
+                fields.append(f"{key}: {value}")
+        head = '\n'.join(fields)
+
+        templates = structured_data.get('templates')
+        if templates:
+            body = self.summarize_templates(templates, total_lines=len(structured_data.get('message') or []) or None,
+                                            budget=max(1, budget - estimate_tokens(head)))
+        else:
+            lines = structured_data.get('message') or (structured_data.get('clean_logs') or structured_data.get('raw_text') or '').splitlines()
+            body = self.compact_text('\n'.join(lines), budget=max(1, budget - estimate_tokens(head)))
+
+        return f"{head}\n{body}" if head else body
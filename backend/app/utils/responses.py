@@ -0,0 +1,199 @@
+import gzip
+import json
+import os
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from fastapi.responses import JSONResponse
+
+from .executors import get_execution_layer
+
+# Optional accelerators: orjson for serialization, zstandard for zstd
+# responses. Without them the stdlib encoder and gzip are used.
+try:
+    import orjson  # type: ignore
+except Exception:  # pragma: no cover - depends on the environment
+    orjson = None
+
+try:
+    import zstandard  # type: ignore
+except Exception:  # pragma: no cover - depends on the environment
+    zstandard = None
+
+FAST_JSON = os.getenv('WIZRAVEN_FAST_JSON', '').lower() in ('1', 'true', 'yes')
+COMPRESSION = os.getenv('WIZRAVEN_COMPRESSION', '').lower() in ('1', 'true', 'yes')
+
+# Bodies at least this large are compressed on the io pool (zlib/zstd release the GIL)
+_OFFLOAD_BYTES = 1 << 20
+
+# Skipped by compression: already compressed, or streamed event by event
+_INCOMPRESSIBLE_TYPES = ('image/', 'video/', 'audio/', 'application/zip', 'application/gzip', 'text/event-stream')
+
+
+def _default(value: Any) -> Any:
+    # NumPy arrays/scalars and anything else the encoders don't know
+    if hasattr(value, 'tolist'):
+        return value.tolist()
+    return str(value)
+
+
+def dumps(content: Any) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(content, default=_default,
+                            option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS)
+    return json.dumps(content, ensure_ascii=False, separators=(',', ':'), default=_default).encode('utf-8')
+
+
+class FastJSONResponse(JSONResponse):
+    """JSONResponse rendered with orjson (stdlib json when it is missing).
+
+    Return it directly from an endpoint to skip FastAPI's ``jsonable_encoder``
+    pass as well, which is most of the cost for multi-MB payloads.
+    """
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+
+def json_response(content: Any, status_code: int = 200) -> Any:
+    """``FastJSONResponse`` when WIZRAVEN_FAST_JSON is set, else ``content`` for FastAPI to encode."""
+    if FAST_JSON:
+        return FastJSONResponse(content, status_code=status_code)
+    return content
+
+
+def shape_metadata(metadata: Optional[Dict[str, Any]], mode: str = 'full', omit: Iterable[str] = (),
+                   page: Optional[int] = None, page_size: Optional[int] = None,
+                   keep: Iterable[str] = ('conversation_id',)) -> Optional[Dict[str, Any]]:
+    """Trim response metadata as the client asked.
+
+    ``mode='none'`` drops everything but the ``keep`` keys; ``omit``
+    removes keys (e.g. ``clean_logs``); with ``page_size``, every list
+    value is cut to page ``page`` (0-based) and a ``page`` entry records
+    ``page``, ``page_size`` and the longest list's ``total``.
+    """
+    if metadata is None:
+        return None
+    if mode == 'none':
+        kept = {k: metadata[k] for k in keep if k in metadata}
+        return kept or None
+    omit = set(omit) - set(keep)
+    shaped = {k: v for k, v in metadata.items() if k not in omit}
+    if page_size:
+        page = max(0, page or 0)
+        start, stop = page * page_size, (page + 1) * page_size
+        total = 0
+        for key, value in shaped.items():
+            if isinstance(value, list):
+                total = max(total, len(value))
+                shaped[key] = value[start:stop]
+        shaped['page'] = {'page': page, 'page_size': page_size, 'total': total}
+    return shaped
+
+
+def _parse_accept_encoding(header: str) -> Dict[str, float]:
+    prefs: Dict[str, float] = {}
+    for part in header.split(','):
+        token, _, params = part.strip().partition(';')
+        if not token:
+            continue
+        q = 1.0
+        params = params.strip()
+        if params.startswith('q='):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        prefs[token.strip().lower()] = q
+    return prefs
+
+
+def choose_encoding(accept_encoding: str) -> Optional[str]:
+    """Best supported coding the client accepts: zstd (when installed), then gzip."""
+    prefs = _parse_accept_encoding(accept_encoding or '')
+    supported = (['zstd'] if zstandard is not None else []) + ['gzip']
+    wildcard = prefs.get('*', 0.0)
+    best, best_q = None, 0.0
+    for coding in supported:
+        q = prefs.get(coding, wildcard)
+        if q > best_q:
+            best, best_q = coding, q
+    return best
+
+
+def compress(body: bytes, coding: str, gzip_level: int = 6, zstd_level: int = 3) -> bytes:
+    if coding == 'zstd':
+        return zstandard.ZstdCompressor(level=zstd_level).compress(body)
+    return gzip.compress(body, compresslevel=gzip_level, mtime=0)
+
+
+class CompressionMiddleware:
+    """ASGI middleware compressing complete responses with gzip or zstd.
+
+    The coding is negotiated from Accept-Encoding. Bodies smaller than
+    ``minimum_size`` (WIZRAVEN_COMPRESS_MIN_BYTES), streamed responses,
+    already-encoded responses and media types are passed through.
+    """
+
+    def __init__(self, app, minimum_size: Optional[int] = None):
+        self.app = app
+        self.minimum_size = minimum_size if minimum_size is not None else \
+            int(os.getenv('WIZRAVEN_COMPRESS_MIN_BYTES', '4096'))
+
+    async def __call__(self, scope, receive, send) -> None:
+        if scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
+        headers = dict((k.lower(), v) for k, v in scope.get('headers') or [])
+        coding = choose_encoding(headers.get(b'accept-encoding', b'').decode('latin-1'))
+        if coding is None:
+            await self.app(scope, receive, send)
+            return
+
+        start: Optional[Dict[str, Any]] = None
+        passthrough = False
+
+        async def send_wrapper(message: Dict[str, Any]) -> None:
+            nonlocal start, passthrough
+            if message['type'] == 'http.response.start':
+                start = message
+                return
+            if message['type'] != 'http.response.body' or passthrough:
+                await send(message)
+                return
+            body = message.get('body', b'')
+            if start is not None and not message.get('more_body') and self._compressible(start, body):
+                if len(body) >= _OFFLOAD_BYTES:
+                    body = await get_execution_layer().run('io', compress, body, coding)
+                else:
+                    body = compress(body, coding)
+                response_headers = self._rewrite_headers(start['headers'], coding, len(body))
+                await send({**start, 'headers': response_headers})
+                await send({'type': 'http.response.body', 'body': body})
+                start = None
+                return
+            # Streamed or not worth compressing: forward untouched from here on
+            passthrough = True
+            if start is not None:
+                await send(start)
+                start = None
+            await send(message)
+
+        await self.app(scope, receive, send_wrapper)
+
+    def _compressible(self, start: Dict[str, Any], body: bytes) -> bool:
+        if len(body) < self.minimum_size:
+            return False
+        headers = dict((k.lower(), v) for k, v in start.get('headers') or [])
+        if b'content-encoding' in headers:
+            return False
+        content_type = headers.get(b'content-type', b'').decode('latin-1')
+        return not content_type.startswith(_INCOMPRESSIBLE_TYPES)
+
+    @staticmethod
+    def _rewrite_headers(headers: List[Tuple[bytes, bytes]], coding: str, length: int) -> List[Tuple[bytes, bytes]]:
+        kept = [(k, v) for k, v in headers if k.lower() not in (b'content-length', b'vary')]
+        vary = [v for k, v in headers if k.lower() == b'vary']
+        vary_value = b', '.join(vary + [b'Accept-Encoding']) if vary else b'Accept-Encoding'
+        return kept + [(b'content-encoding', coding.encode('latin-1')),
+                       (b'content-length', str(length).encode('latin-1')),
+                       (b'vary', vary_value)]
@@ -0,0 +1,227 @@
+import hashlib
+import os
+import pickle
+import sys
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from .executors import get_execution_layer
+from .structured_logging import get_logger
+
+log = get_logger(__name__)
+
+
+def estimate_bytes(value: Any) -> int:
+    """Rough in-memory size of a session value (arrays, strings, containers).
+
+    Walks containers instead of pickling so the estimate stays cheap for
+    large parsed columns.
+    """
+    if isinstance(value, np.ndarray):
+        return int(value.nbytes)
+    if isinstance(value, (str, bytes)):
+        return sys.getsizeof(value)
+    if isinstance(value, dict):
+        return sys.getsizeof(value) + sum(estimate_bytes(k) + estimate_bytes(v) for k, v in value.items())
+    if isinstance(value, (list, tuple, set)):
+        return sys.getsizeof(value) + sum(estimate_bytes(v) for v in value)
+    return sys.getsizeof(value)
+
+
+class _Entry:
+    __slots__ = ('value', 'size', 'expires')
+
+    def __init__(self, value: Dict[str, Any], size: int, expires: float):
+        self.value = value
+        self.size = size
+        self.expires = expires
+
+
+class SessionCache:
+    """Per-conversation artifacts (parsed columns, templates, rule results, KB hits).
+
+    Entries live in an LRU bounded by count (WIZRAVEN_SESSION_MAX) and
+    estimated size (WIZRAVEN_SESSION_MAX_BYTES), and expire after
+    WIZRAVEN_SESSION_TTL seconds without access. With
+    WIZRAVEN_SESSION_SPILL_DIR set, entries pushed out by the size or count
+    bound are pickled there (on the 'io' pool) and loaded back on the next
+    access instead of being dropped. Expired entries are never spilled.
+    """
+
+    def __init__(self, max_sessions: Optional[int] = None, max_bytes: Optional[int] = None,
+                 ttl_seconds: Optional[float] = None, spill_dir: Optional[str] = None):
+        self.max_sessions = max(1, max_sessions or int(os.getenv('WIZRAVEN_SESSION_MAX', '256')))
+        self.max_bytes = max_bytes or int(os.getenv('WIZRAVEN_SESSION_MAX_BYTES', str(256 * 1024 * 1024)))
+        self.ttl_seconds = ttl_seconds or float(os.getenv('WIZRAVEN_SESSION_TTL', '3600'))
+        self.spill_dir = spill_dir if spill_dir is not None else os.getenv('WIZRAVEN_SESSION_SPILL_DIR') or None
+        self._entries: 'OrderedDict[str, _Entry]' = OrderedDict()
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.spills = 0
+        self.spill_loads = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, conversation_id: str) -> bool:
+        entry = self._entries.get(conversation_id)
+        return entry is not None and entry.expires > time.monotonic()
+
+    # -- public API ---------------------------------------------------------
+
+    async def get(self, conversation_id: str) -> Optional[Dict[str, Any]]:
+        """Cached artifacts for a conversation, or None. Refreshes the TTL."""
+        if not conversation_id:
+            return None
+        now = time.monotonic()
+        entry = self._entries.get(conversation_id)
+        if entry is not None and entry.expires <= now:
+            self._drop(conversation_id)
+            self.expirations += 1
+            entry = None
+        if entry is None and self.spill_dir:
+            value = await self._load_spilled(conversation_id)
+            if value is not None:
+                self.spill_loads += 1
+                await self._store(conversation_id, value)
+                entry = self._entries.get(conversation_id)
+        if entry is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        entry.expires = now + self.ttl_seconds
+        self._entries.move_to_end(conversation_id)
+        return entry.value
+
+    async def put(self, conversation_id: str, value: Dict[str, Any]) -> None:
+        """Store (or replace) a conversation's artifacts."""
+        await self._store(conversation_id, dict(value))
+
+    async def update(self, conversation_id: str, **fields: Any) -> Optional[Dict[str, Any]]:
+        """Merge fields into an existing session; returns None if there is none."""
+        current = await self.get(conversation_id)
+        if current is None:
+            return None
+        merged = dict(current)
+        merged.update(fields)
+        await self._store(conversation_id, merged)
+        return merged
+
+    async def delete(self, conversation_id: str) -> bool:
+        found = self._drop(conversation_id)
+        if self.spill_dir:
+            path = self._spill_path(conversation_id)
+            found = await get_execution_layer().run('io', _remove_file, path) or found
+        return found
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'sessions': len(self._entries),
+            'bytes': self.bytes,
+            'max_sessions': self.max_sessions,
+            'max_bytes': self.max_bytes,
+            'ttl_seconds': self.ttl_seconds,
+            'spill_dir': self.spill_dir,
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'expirations': self.expirations,
+            'spills': self.spills,
+            'spill_loads': self.spill_loads,
+        }
+
+    def metrics_samples(self) -> List[Tuple[str, str, Dict[str, Any], float]]:
+        """Gauge samples for ``MetricsRegistry.register_collector``."""
+        return [
+            ('wizraven_session_cache_sessions', 'Conversations held in memory.', {}, len(self._entries)),
+            ('wizraven_session_cache_bytes', 'Estimated bytes held in memory.', {}, self.bytes),
+            ('wizraven_session_cache_hits', 'Follow-ups served from the session cache.', {}, self.hits),
+            ('wizraven_session_cache_misses', 'Follow-ups with no cached session.', {}, self.misses),
+            ('wizraven_session_cache_evictions', 'Sessions pushed out by the size/count bound.', {},
+             self.evictions),
+        ]
+
+    # -- internals ----------------------------------------------------------
+
+    async def _store(self, conversation_id: str, value: Dict[str, Any]) -> None:
+        self._drop(conversation_id)
+        size = estimate_bytes(value)
+        self._entries[conversation_id] = _Entry(value, size, time.monotonic() + self.ttl_seconds)
+        self.bytes += size
+        await self._evict(keep=conversation_id)
+
+    def _drop(self, conversation_id: str) -> bool:
+        entry = self._entries.pop(conversation_id, None)
+        if entry is None:
+            return False
+        self.bytes -= entry.size
+        return True
+
+    async def _evict(self, keep: str) -> None:
+        now = time.monotonic()
+        for cid in [cid for cid, e in self._entries.items() if e.expires <= now and cid != keep]:
+            self._drop(cid)
+            self.expirations += 1
+        # Oldest first; the entry just stored stays even if it alone exceeds the byte bound
+        while len(self._entries) > 1 and (len(self._entries) > self.max_sessions or self.bytes > self.max_bytes):
+            cid, entry = next(iter(self._entries.items()))
+            if cid == keep:
+                self._entries.move_to_end(cid)
+                continue
+            self._drop(cid)
+            self.evictions += 1
+            if self.spill_dir:
+                await self._spill(cid, entry)
+
+    def _spill_path(self, conversation_id: str) -> str:
+        name = hashlib.sha256(conversation_id.encode('utf-8')).hexdigest()
+        return os.path.join(self.spill_dir, name + '.pkl')
+
+    async def _spill(self, conversation_id: str, entry: _Entry) -> None:
+        # Wall-clock deadline on disk so the TTL survives a restart
+        deadline = time.time() + max(0.0, entry.expires - time.monotonic())
+        try:
+            await get_execution_layer().run('io', _write_spill, self._spill_path(conversation_id), deadline,
+                                            entry.value)
+            self.spills += 1
+        except Exception as e:
+            log.warning('session.spill_failed', conversation_id=conversation_id, error=str(e))
+
+    async def _load_spilled(self, conversation_id: str) -> Optional[Dict[str, Any]]:
+        try:
+            return await get_execution_layer().run('io', _read_spill, self._spill_path(conversation_id))
+        except Exception as e:
+            log.warning('session.spill_load_failed', conversation_id=conversation_id, error=str(e))
+            return None
+
+
+def _write_spill(path: str, deadline: float, value: Dict[str, Any]) -> None:
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = path + '.tmp'
+    with open(tmp, 'wb') as f:
+        pickle.dump((deadline, value), f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp, path)
+
+
+def _read_spill(path: str) -> Optional[Dict[str, Any]]:
+    """Load and remove a spilled session; None if absent or past its deadline."""
+    if not os.path.exists(path):
+        return None
+    with open(path, 'rb') as f:
+        deadline, value = pickle.load(f)
+    os.remove(path)
+    return value if deadline > time.time() else None
+
+
+def _remove_file(path: str) -> bool:
+    try:
+        os.remove(path)
+        return True
+    except FileNotFoundError:
+        return False
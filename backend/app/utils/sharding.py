@@ -0,0 +1,212 @@
+import asyncio
+import os
+from collections import Counter
+from typing import Any, Dict, List, Optional
+
+from .anomaly import RateAnomalyDetector, classify_event
+from .executors import ExecutionLayer, get_execution_layer
+from .log_templates import TemplateMiner
+from .timestamps import MISSING_MS, to_epoch_ms
+
+_COLUMNS = ('message', 'timestamp', 'device', 'mnemonic')
+
+
+def is_error_like(message: str) -> bool:
+    """Keyword test shared by the rule-based analysis paths."""
+    low = message.lower()
+    return 'error' in low or 'down' in low or 'fail' in low
+
+
+def partition_by_device(structured_data: Dict[str, Any]) -> Dict[str, Dict[str, List]]:
+    """Split parser columns into per-device shards (lines without a host go to ``unknown``).
+
+    The parser's ``epoch_ms`` and ``template_id`` columns, when present,
+    travel with the shard as plain lists so timestamps are not parsed and
+    templates not mined a second time.
+    """
+    messages = structured_data.get('message') or []
+    columns = {c: structured_data.get(c) or [None] * len(messages) for c in _COLUMNS}
+    for name in ('epoch_ms', 'template_id'):
+        values = structured_data.get(name)
+        if values is not None and len(values) == len(messages):
+            columns[name] = list(values.tolist() if hasattr(values, 'tolist') else values)
+    shards: Dict[str, Dict[str, List]] = {}
+    for i in range(len(messages)):
+        device = columns['device'][i] or 'unknown'
+        shard = shards.get(device)
+        if shard is None:
+            shard = shards[device] = {c: [] for c in columns}
+        for c in columns:
+            shard[c].append(columns[c][i])
+    return shards
+
+
+def analyze_shard(device: str, shard: Dict[str, List], window_seconds: int = 60,
+                  templates: Optional[Dict[int, str]] = None,
+                  anomalies: Optional[List[Dict[str, Any]]] = None) -> Dict[str, Dict[str, Any]]:
+    """Rule counts, template mining and anomaly detection for one device.
+
+    ``templates`` (the parser's template id -> text) lets the shard count
+    its ``template_id`` column instead of mining again, and ``anomalies``
+    (this device's from the rule pass) replaces running the detector.
+    Returns a fleet fragment ``{device: stats}`` that can be combined with
+    ``merge_fleet``. Module-level so it can run in a worker process.
+    """
+    template_ids = shard.get('template_id') if templates is not None else None
+    miner = TemplateMiner() if template_ids is None else None
+    detector = RateAnomalyDetector(window_seconds=window_seconds) if anomalies is None else None
+    errors = 0
+    cpu = 0
+    epoch_ms = shard.get('epoch_ms')
+    if epoch_ms is None and detector is not None:
+        epoch_ms = to_epoch_ms(shard['timestamp']).tolist()
+    for i, message in enumerate(shard['message']):
+        if miner is not None:
+            miner.add(message, shard['timestamp'][i])
+        if is_error_like(message):
+            errors += 1
+        if 'cpu' in message.lower():
+            cpu += 1
+        if detector is not None and epoch_ms[i] != MISSING_MS:
+            detector.observe(device, shard['mnemonic'][i] or classify_event(None, message), epoch_ms[i] / 1000,
+                             message)
+
+    if miner is not None:
+        counts = {t.template: t.count for t in miner.templates()}
+    else:
+        counts: Dict[str, int] = {}
+        for template_id, count in Counter(template_ids).items():
+            text = templates.get(template_id)
+            if text is not None:  # 0 (no template) or evicted by the parser's miner
+                counts[text] = counts.get(text, 0) + count
+    if detector is not None:
+        detector.flush()
+        anomalies = list(detector.anomalies)
+
+    return {
+        device: {
+            'lines': len(shard['message']),
+            'errors': errors,
+            'cpu_events': cpu,
+            'templates': counts,
+            'anomalies': list(anomalies),
+        }
+    }
+
+
+def merge_fleet(left: Dict[str, Dict[str, Any]], right: Dict[str, Dict[str, Any]]) -> Dict[str, Dict[str, Any]]:
+    """Combine two fleet fragments.
+
+    Counters add, template counts add per template and anomaly lists
+    concatenate, so the merge is associative and shards (or successive
+    batches of the same device) can be folded in any grouping.
+    """
+    merged = {device: _copy_stats(stats) for device, stats in left.items()}
+    for device, stats in right.items():
+        into = merged.get(device)
+        if into is None:
+            merged[device] = _copy_stats(stats)
+            continue
+        into['lines'] += stats['lines']
+        into['errors'] += stats['errors']
+        into['cpu_events'] += stats['cpu_events']
+        for template, count in stats['templates'].items():
+            into['templates'][template] = into['templates'].get(template, 0) + count
+        into['anomalies'].extend(stats['anomalies'])
+    return merged
+
+
+def _copy_stats(stats: Dict[str, Any]) -> Dict[str, Any]:
+    out = dict(stats)
+    out['templates'] = dict(stats['templates'])
+    out['anomalies'] = list(stats['anomalies'])
+    return out
+
+
+def device_score(stats: Dict[str, Any]) -> float:
+    """Rank devices: anomalous windows weigh more than individual error lines."""
+    return stats['errors'] + 10 * len(stats['anomalies']) + stats['cpu_events']
+
+
+def fleet_summary(fleet: Dict[str, Dict[str, Any]], top: int = 5) -> Dict[str, Any]:
+    ranked = sorted(fleet.items(), key=lambda kv: device_score(kv[1]), reverse=True)
+    top_devices = []
+    for device, stats in ranked[:top]:
+        if device_score(stats) == 0:
+            break
+        top_templates = sorted(stats['templates'].items(), key=lambda kv: kv[1], reverse=True)[:3]
+        severity = 'critical' if stats['errors'] > 5 or len(stats['anomalies']) > 1 else \
+            'warning' if stats['errors'] or stats['anomalies'] else 'info'
+        top_devices.append({
+            'device': device,
+            'lines': stats['lines'],
+            'errors': stats['errors'],
+            'anomalies': len(stats['anomalies']),
+            'severity': severity,
+            'top_templates': [{'template': t, 'count': c} for t, c in top_templates],
+        })
+    return {
+        'devices': len(fleet),
+        'lines': sum(s['lines'] for s in fleet.values()),
+        'errors': sum(s['errors'] for s in fleet.values()),
+        'anomalies': sum(len(s['anomalies']) for s in fleet.values()),
+        'top_devices': top_devices,
+    }
+
+
+class ShardedAnalyzer:
+    """Run ``analyze_shard`` per device on the execution layer's ``cpu`` pool and merge the results.
+
+    Small inputs, and layers whose ``cpu`` pool has a single worker, are
+    analyzed inline since process start-up and pickling would dominate.
+    """
+
+    def __init__(self, layer: Optional[ExecutionLayer] = None, min_parallel_lines: Optional[int] = None,
+                 window_seconds: int = 60):
+        self._layer = layer
+        if min_parallel_lines is None:
+            min_parallel_lines = int(os.getenv('WIZRAVEN_SHARD_MIN_PARALLEL_LINES', '20000'))
+        self.min_parallel_lines = min_parallel_lines
+        self.window_seconds = window_seconds
+
+    @property
+    def layer(self) -> ExecutionLayer:
+        return self._layer or get_execution_layer()
+
+    async def analyze(self, structured_data: Dict[str, Any], fleet: Optional[Dict[str, Dict[str, Any]]] = None,
+                      anomalies: Optional[List[Dict[str, Any]]] = None) -> Dict[str, Dict[str, Any]]:
+        """Analyze every device shard and fold the results into ``fleet`` (if given).
+
+        The parser's templates are reused when ``structured_data`` has its
+        ``template_id`` column; ``anomalies`` from a rule pass over the same
+        data (same window) are split by device instead of detected again.
+        """
+        shards = partition_by_device(structured_data)
+        result = dict(fleet or {})
+        total_lines = len(structured_data.get('message') or [])
+        layer = self.layer
+        templates = None
+        if 'template_id' in structured_data and structured_data.get('templates') is not None:
+            templates = {t['id']: t['template'] for t in structured_data['templates']}
+        by_device: Optional[Dict[str, List[Dict[str, Any]]]] = None
+        if anomalies is not None:
+            by_device = {}
+            for anomaly in anomalies:
+                by_device.setdefault(anomaly['device'], []).append(anomaly)
+
+        def args(device: str, shard: Dict[str, List]) -> tuple:
+            device_anomalies = by_device.get(device, []) if by_device is not None else None
+            return device, shard, self.window_seconds, templates, device_anomalies
+
+        if len(shards) < 2 or layer.pool('cpu').max_workers < 2 or total_lines < self.min_parallel_lines:
+            for device, shard in shards.items():
+                result = merge_fleet(result, analyze_shard(*args(device, shard)))
+            return result
+
+        fragments = await asyncio.gather(*[
+            layer.run('cpu', analyze_shard, *args(device, shard))
+            for device, shard in shards.items()
+        ])
+        for fragment in fragments:
+            result = merge_fleet(result, fragment)
+        return result
@@ -0,0 +1,79 @@
+import asyncio
+import copy
+import hashlib
+import os
+import re
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from .metrics import REGISTRY
+
+_TRAILING_WS_RE = re.compile(r'[ \t]+(?=\n|$)')
+
+
+def normalize_text(text: Optional[str]) -> str:
+    """Input as compared for deduplication: unified newlines, no trailing blanks."""
+    text = (text or '').replace('\r\n', '\n').replace('\r', '\n')
+    return _TRAILING_WS_RE.sub('', text).strip()
+
+
+def scope_of(api_key: Optional[str]) -> str:
+    """Hash of the API key, so callers with different keys never share a result."""
+    if not api_key:
+        return 'anon'
+    return hashlib.sha256(api_key.encode('utf-8')).hexdigest()[:16]
+
+
+def flight_key(*parts: Any) -> str:
+    digest = hashlib.sha256()
+    for part in parts:
+        digest.update(str(part).encode('utf-8'))
+        digest.update(b'\x00')
+    return digest.hexdigest()
+
+
+class SingleFlight:
+    """Collapse concurrent calls with the same key into one computation.
+
+    The first caller (the leader) starts the work as its own task; callers
+    arriving while it runs await that task instead of repeating it. The
+    work is shielded, so a disconnecting leader does not cancel it for
+    the others. Nothing is cached once the flight lands. Followers get a
+    deep copy of the result so no caller can mutate another's. Set
+    WIZRAVEN_SINGLEFLIGHT=0 to disable.
+    """
+
+    def __init__(self, name: str, enabled: Optional[bool] = None):
+        self.name = name
+        if enabled is None:
+            enabled = os.getenv('WIZRAVEN_SINGLEFLIGHT', '1').lower() not in ('0', 'false', 'no')
+        self.enabled = enabled
+        self._flights: Dict[str, 'asyncio.Task'] = {}
+        self.leaders = 0
+        self.shared = 0
+
+    def in_flight(self) -> int:
+        return len(self._flights)
+
+    async def do(self, key: str, fn: Callable[..., Awaitable[Any]], *args: Any, **kwargs: Any) -> Any:
+        if not self.enabled:
+            return await fn(*args, **kwargs)
+
+        task = self._flights.get(key)
+        if task is not None and not task.done():
+            self.shared += 1
+            REGISTRY.inc('wizraven_singleflight_shared_total', help='Calls served by an identical in-flight call.',
+                          flight=self.name)
+            return copy.deepcopy(await asyncio.shield(task))
+
+        self.leaders += 1
+        task = asyncio.ensure_future(fn(*args, **kwargs))
+        self._flights[key] = task
+        task.add_done_callback(lambda t, k=key: self._land(k, t))
+        return await asyncio.shield(task)
+
+    def _land(self, key: str, task: 'asyncio.Task') -> None:
+        if self._flights.get(key) is task:
+            del self._flights[key]
+        # Mark a failure seen when every caller has gone away
+        if not task.cancelled():
+            task.exception()
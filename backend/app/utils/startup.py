@@ -0,0 +1,159 @@
+import asyncio
+import importlib
+import os
+import sys
+import threading
+import time
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+from .structured_logging import get_logger
+
+log = get_logger(__name__)
+
+# Warm-up steps run by default, in the order they are reported; WIZRAVEN_WARMUP
+# picks a list (comma-separated), 'off' skips warm-up entirely. 'pools' (start
+# the worker processes of the execution layer's process pools) is opt-in: it
+# holds a process per CPU from boot whether or not large pastes ever arrive
+DEFAULT_WARMUP = ('agents', 'llm_sdk', 'faiss', 'embeddings')
+
+
+class StartupReport:
+    """Import and warm-up timings for this process, served by ``/ready``."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.imports_ms: Dict[str, float] = {}
+        self.steps: Dict[str, Dict[str, Any]] = {}
+        self.warmup_ms: Optional[float] = None
+        self.ready = False
+        self.started_at = time.time()
+
+    def record_import(self, name: str, ms: float) -> None:
+        with self._lock:
+            self.imports_ms[name] = round(ms, 2)
+
+    def record_step(self, name: str, ms: float, error: Optional[str] = None, skipped: bool = False) -> None:
+        entry: Dict[str, Any] = {'ms': round(ms, 2), 'ok': error is None}
+        if error:
+            entry['error'] = error
+        if skipped:
+            entry['skipped'] = True
+        with self._lock:
+            self.steps[name] = entry
+
+    def as_dict(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                'ready': self.ready,
+                'uptime_s': round(time.time() - self.started_at, 3),
+                'imports_ms': dict(self.imports_ms),
+                'warmup_ms': self.warmup_ms,
+                'steps': {k: dict(v) for k, v in self.steps.items()},
+            }
+
+    def metrics_samples(self) -> List[Tuple[str, str, Dict[str, Any], float]]:
+        """Gauge samples for ``MetricsRegistry.register_collector``."""
+        samples = [('wizraven_ready', '1 once warm-up has finished.', {}, 1 if self.ready else 0)]
+        with self._lock:
+            for name, ms in self.imports_ms.items():
+                samples.append(('wizraven_startup_import_ms', 'Import time per module at startup (ms).',
+                                {'module': name}, ms))
+            for name, step in self.steps.items():
+                samples.append(('wizraven_startup_warmup_ms', 'Warm-up time per step (ms).', {'step': name},
+                                step['ms']))
+        return samples
+
+
+REPORT = StartupReport()
+
+_import_lock = threading.Lock()
+
+
+def lazy_import(name: str) -> Any:
+    """Import ``name`` on first use and record how long it took."""
+    module = sys.modules.get(name)
+    if module is not None:
+        return module
+    with _import_lock:
+        started = time.perf_counter()
+        module = importlib.import_module(name)
+        REPORT.record_import(name, (time.perf_counter() - started) * 1000)
+    return module
+
+
+class Lazy:
+    """Proxy that builds its object on first attribute access.
+
+    Lets module-level singletons (the agents) keep their names and call
+    sites while moving construction out of import time. ``get()`` forces
+    construction, which is what warm-up does.
+    """
+
+    def __init__(self, factory: Callable[[], Any], name: Optional[str] = None):
+        self._factory = factory
+        self._name = name or getattr(factory, '__name__', 'object')
+        self._instance = None
+        self._lock = threading.Lock()
+
+    @property
+    def loaded(self) -> bool:
+        return self._instance is not None
+
+    def get(self) -> Any:
+        if self._instance is None:
+            with self._lock:
+                if self._instance is None:
+                    started = time.perf_counter()
+                    self._instance = self._factory()
+                    log.info('startup.constructed', object=self._name,
+                             ms=round((time.perf_counter() - started) * 1000, 2))
+        return self._instance
+
+    def __getattr__(self, attr: str) -> Any:
+        return getattr(self.get(), attr)
+
+    def __repr__(self) -> str:
+        state = repr(self._instance) if self._instance is not None else 'not constructed'
+        return f'<Lazy {self._name}: {state}>'
+
+
+def configured_steps(env: Optional[str] = None) -> List[str]:
+    value = (env if env is not None else os.getenv('WIZRAVEN_WARMUP', ','.join(DEFAULT_WARMUP))).strip().lower()
+    if value in ('', 'off', 'none', '0', 'false'):
+        return []
+    return [s.strip() for s in value.split(',') if s.strip()]
+
+
+async def warm_up(steps: Dict[str, Callable[[], Any]], only: Optional[Iterable[str]] = None,
+                  report: StartupReport = REPORT) -> StartupReport:
+    """Run warm-up steps in parallel, timing each; failures are recorded, not raised.
+
+    Sync steps run in threads (imports and model loads mostly release the
+    GIL or block on IO). A step returning False is recorded as skipped
+    (nothing configured for it).
+    """
+    wanted = list(only) if only is not None else list(steps)
+    started = time.perf_counter()
+
+    async def _run(name: str, fn: Callable[[], Any]) -> None:
+        t0 = time.perf_counter()
+        try:
+            if asyncio.iscoroutinefunction(fn):
+                result = await fn()
+            else:
+                result = await asyncio.get_running_loop().run_in_executor(None, fn)
+            report.record_step(name, (time.perf_counter() - t0) * 1000, skipped=result is False)
+        except Exception as e:
+            report.record_step(name, (time.perf_counter() - t0) * 1000, error=str(e))
+            log.warning('startup.warmup_failed', step=name, error=str(e))
+
+    await asyncio.gather(*[_run(name, steps[name]) for name in wanted if name in steps])
+    for name in wanted:
+        if name not in steps:
+            report.record_step(name, 0.0, error='unknown warm-up step')
+    report.warmup_ms = round((time.perf_counter() - started) * 1000, 2)
+    report.ready = True
+    log.info('startup.ready', warmup_ms=report.warmup_ms, imports_ms=report.imports_ms,
+             steps={k: v['ms'] for k, v in report.steps.items()},
+             failed=[k for k, v in report.steps.items() if not v['ok']])
+    return report
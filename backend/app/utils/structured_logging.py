@@ -0,0 +1,176 @@
+import atexit
+import json
+import logging
+import os
+import queue
+import sys
+import threading
+from logging.handlers import QueueHandler, QueueListener
+from typing import Any, Dict, Optional, Tuple
+
+# All application loggers live under this namespace (module __name__s start with it)
+ROOT_LOGGER = 'app'
+
+_RESERVED_KWARGS = ('exc_info', 'stack_info', 'stacklevel', 'extra')
+
+
+class StructuredLogger(logging.LoggerAdapter):
+    """Logger taking the event name as message and context as keyword fields.
+
+    ``log.info('kb.add', doc_id=3)`` becomes a JSON line with ``event`` and
+    ``doc_id``. ``sample=N`` lets only one in N occurrences of that event
+    through, for lines on the per-request hot path.
+    """
+
+    def __init__(self, logger: logging.Logger):
+        super().__init__(logger, {})
+
+    def process(self, msg: Any, kwargs: Dict[str, Any]) -> Tuple[Any, Dict[str, Any]]:
+        fields = {k: kwargs.pop(k) for k in list(kwargs) if k not in _RESERVED_KWARGS}
+        extra = dict(kwargs.get('extra') or {})
+        sample = fields.pop('sample', None)
+        if sample:
+            extra['sample'] = int(sample)
+        extra['fields'] = fields
+        kwargs['extra'] = extra
+        return msg, kwargs
+
+
+def get_logger(name: str) -> StructuredLogger:
+    return StructuredLogger(logging.getLogger(name))
+
+
+def mask_secret(value: Optional[str]) -> Optional[str]:
+    """Show only the ends of an API key in log output."""
+    if not value:
+        return None
+    if len(value) <= 6:
+        return '***'
+    return value[:3] + '...' + value[-3:]
+
+
+class SamplingFilter(logging.Filter):
+    """Pass the 1st, (N+1)th, (2N+1)th... occurrence of each sampled event.
+
+    Counting is per (logger, event), so a noisy event never hides a rare
+    one. Passed records carry ``sample_rate`` so readers can scale counts.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self._counts: Dict[Tuple[str, str], int] = {}
+        self._lock = threading.Lock()
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        rate = getattr(record, 'sample', 1) or 1
+        if rate <= 1:
+            return True
+        key = (record.name, str(record.msg))
+        with self._lock:
+            seen = self._counts.get(key, 0)
+            self._counts[key] = seen + 1
+        if seen % rate:
+            return False
+        record.sample_rate = rate
+        return True
+
+
+class JSONFormatter(logging.Formatter):
+    """One JSON object per line: ts, level, logger, event, then the event's fields."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry: Dict[str, Any] = {
+            'ts': round(record.created, 3),
+            'level': record.levelname.lower(),
+            'logger': record.name,
+            'event': record.getMessage(),
+        }
+        entry.update(getattr(record, 'fields', None) or {})
+        rate = getattr(record, 'sample_rate', None)
+        if rate:
+            entry['sample_rate'] = rate
+        if record.exc_info:
+            entry['exc'] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            entry['exc'] = record.exc_text
+        return json.dumps(entry, default=str)
+
+
+class TextFormatter(logging.Formatter):
+    """Human-readable fallback (LOG_FORMAT=text) for local development."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        fields = getattr(record, 'fields', None) or {}
+        tail = ' '.join(f'{k}={v}' for k, v in fields.items())
+        line = f'{self.formatTime(record)} {record.levelname} {record.name} {record.getMessage()}'
+        if tail:
+            line += ' ' + tail
+        if record.exc_text:
+            line += '\n' + record.exc_text
+        return line
+
+
+class _StructuredQueueHandler(QueueHandler):
+    """QueueHandler that keeps structured fields intact for the listener.
+
+    The stock ``prepare`` pre-formats the message, which would flatten the
+    fields into text; here only args and tracebacks are resolved (they may
+    not survive being handed to another thread).
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+_LISTENER: Optional[QueueListener] = None
+_HANDLER: Optional[QueueHandler] = None
+
+
+def configure_logging(level: Optional[str] = None, fmt: Optional[str] = None, stream=None) -> logging.Logger:
+    """Route ``app.*`` loggers through a queue to a background writer thread.
+
+    Request handlers only enqueue records; formatting and the stdout write
+    happen on the listener thread. ``level`` defaults to ``LOG_LEVEL``
+    (INFO) and ``fmt`` to ``LOG_FORMAT`` ('json', or 'text'). Calling again
+    reconfigures.
+    """
+    global _LISTENER, _HANDLER
+    level = (level or os.getenv('LOG_LEVEL') or 'INFO').upper()
+    fmt = (fmt or os.getenv('LOG_FORMAT') or 'json').lower()
+
+    shutdown_logging()
+
+    out = logging.StreamHandler(stream or sys.stdout)
+    out.setFormatter(TextFormatter() if fmt == 'text' else JSONFormatter())
+
+    records: 'queue.Queue[logging.LogRecord]' = queue.Queue(-1)
+    _HANDLER = _StructuredQueueHandler(records)
+    _HANDLER.addFilter(SamplingFilter())
+
+    logger = logging.getLogger(ROOT_LOGGER)
+    logger.addHandler(_HANDLER)
+    logger.setLevel(getattr(logging, level, logging.INFO))
+    logger.propagate = False
+
+    _LISTENER = QueueListener(records, out, respect_handler_level=False)
+    _LISTENER.start()
+    return logger
+
+
+def shutdown_logging() -> None:
+    """Flush queued records and stop the writer thread."""
+    global _LISTENER, _HANDLER
+    if _HANDLER is not None:
+        logging.getLogger(ROOT_LOGGER).removeHandler(_HANDLER)
+        _HANDLER = None
+    if _LISTENER is not None:
+        _LISTENER.stop()
+        _LISTENER = None
+
+
+atexit.register(shutdown_logging)
@@ -0,0 +1,221 @@
+import calendar
+import re
+import time
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+_MONTHS = {m: i for i, m in enumerate(
+    ['jan', 'feb', 'mar', 'apr', 'may', 'jun', 'jul', 'aug', 'sep', 'oct', 'nov', 'dec'], start=1)}
+
+_SYSLOG_RE = re.compile(r'^(?:(\d{4})\s+)?(\w{3})\s+(\d{1,2})\s+(\d{2}):(\d{2}):(\d{2})(?:\.(\d+))?')
+_ISO_RE = re.compile(r'^(\d{4})-(\d{2})-(\d{2})[T\s](\d{2}):(\d{2}):(\d{2})(?:\.(\d+))?(Z|[+-]\d{2}:?\d{2})?')
+
+
+def parse_timestamp(text: Optional[str], year: Optional[int] = None) -> Optional[float]:
+    """Parse a syslog (``[YYYY ]Mon DD HH:MM:SS[.fff]``) or ISO timestamp to epoch seconds (UTC).
+
+    Syslog timestamps without a year use ``year``, defaulting to the current
+    one. ISO UTC offsets are applied; naive timestamps are taken as UTC.
+    Returns None for anything unrecognized.
+    """
+    if not text:
+        return None
+    offset = 0
+    m = _ISO_RE.match(text)
+    if m:
+        y, mo, d, hh, mm, ss, frac, tz = m.groups()
+        if tz and tz != 'Z':
+            sign = -1 if tz[0] == '-' else 1
+            digits = tz[1:].replace(':', '')
+            offset = sign * (int(digits[:2]) * 3600 + int(digits[2:]) * 60)
+    else:
+        m = _SYSLOG_RE.match(text)
+        if not m:
+            return None
+        y, mon, d, hh, mm, ss, frac = m.groups()
+        mo = _MONTHS.get(mon.lower())
+        if mo is None:
+            return None
+        y = y or year or time.gmtime().tm_year
+    try:
+        seconds = calendar.timegm((int(y), int(mo), int(d), int(hh), int(mm), int(ss), 0, 0, 0))
+    except (ValueError, OverflowError):
+        return None
+    seconds -= offset
+    if frac:
+        seconds += float('0.' + frac)
+    return float(seconds)
+
+
+# Sentinel for lines without a parseable timestamp in epoch-ms columns
+MISSING_MS = np.iinfo(np.int64).min
+
+_DAY_MS = 86400 * 1000
+
+# Optional fraction and whatever follows the seconds (UTC offset, 'Z', or the rest of the line)
+_TAIL_RE = re.compile(r'(?:\.(\d+))?(.*)$')
+
+
+class TimestampNormalizer:
+    """Convert timestamp text columns to int64 epoch-milliseconds.
+
+    Consecutive log lines share everything up to the minute, so the
+    expensive part (date arithmetic, month lookup, year inference, UTC
+    offset) is done once per distinct ``...HH:MM`` prefix and cached.
+
+    Columns are converted in chunks. Within a chunk, lines of equal length
+    that share the first line's layout are handled as a NumPy code-point
+    matrix: seconds and fraction are read straight out of fixed columns and
+    the cached prefix value is only looked up where the prefix changes.
+    Anything that does not fit the layout falls back to a per-line loop.
+
+    Year-less syslog timestamps get the reference year, or the year before
+    when that would put them more than a day after ``reference`` (e.g. a
+    December line pasted in January).
+    """
+
+    def __init__(self, reference: Optional[float] = None, max_cache: int = 65536,
+                 chunk_lines: int = 65536, min_vector_lines: int = 64):
+        self.reference_ms = int((reference if reference is not None else time.time()) * 1000)
+        self.reference_year = time.gmtime(self.reference_ms / 1000).tm_year
+        self.max_cache = max_cache
+        self.chunk_lines = chunk_lines
+        self.min_vector_lines = min_vector_lines
+        self._prefix_ms: Dict[str, int] = {}
+
+    def to_epoch_ms(self, values: Sequence[Optional[str]]) -> np.ndarray:
+        """Return an int64 array of epoch-ms (``MISSING_MS`` where unparseable)."""
+        values = list(values)
+        out = np.full(len(values), MISSING_MS, dtype=np.int64)
+        for start in range(0, len(values), self.chunk_lines):
+            chunk = values[start:start + self.chunk_lines]
+            if len(chunk) < self.min_vector_lines:
+                out[start:start + len(chunk)] = self._convert_lines(chunk)
+            else:
+                out[start:start + len(chunk)] = self._convert_chunk(chunk)
+        return out
+
+    def _convert_chunk(self, values: List[Optional[str]]) -> np.ndarray:
+        text = np.array([v if isinstance(v, str) else '' for v in values], dtype=str)
+        n = len(values)
+        width = text.dtype.itemsize // 4
+        out = np.full(n, MISSING_MS, dtype=np.int64)
+        if width == 0:
+            return out
+        matrix = text.view(np.uint32).reshape(n, width)
+        lengths = np.char.str_len(text)
+        for length in np.unique(lengths):
+            if length == 0:
+                continue
+            rows = np.flatnonzero(lengths == length)
+            ok, result = self._convert_group(values, rows, matrix[rows, :length])
+            out[rows[ok]] = result[ok]
+            bad = rows[~ok]
+            if len(bad):
+                out[bad] = self._convert_lines([values[i] for i in bad])
+        return out
+
+    def _convert_group(self, values: List[Optional[str]], rows: np.ndarray,
+                       sub: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Vectorized conversion for equal-length lines laid out like the first one."""
+        first = values[rows[0]]
+        length = len(first)
+        colon = first.find(':')
+        ok = np.zeros(len(rows), dtype=bool)
+        if colon < 2 or length < colon + 6:
+            return ok, np.zeros(len(rows), dtype=np.int64)
+        minute_end = colon + 3
+
+        def digit(col: int) -> Tuple[np.ndarray, np.ndarray]:
+            d = sub[:, col].astype(np.int64) - 48
+            return d, (d >= 0) & (d <= 9)
+
+        ok = (sub[:, colon] == 58) & (sub[:, minute_end] == 58)
+        tens, valid = digit(minute_end + 1)
+        ok &= valid
+        ones, valid = digit(minute_end + 2)
+        ok &= valid
+        ms = (tens * 10 + ones) * 1000
+
+        tail_start = minute_end + 3
+        if tail_start < length and first[tail_start] == '.':
+            ok &= sub[:, tail_start] == 46
+            tail_start += 1
+            place = 100
+            while tail_start < length and first[tail_start].isdigit():
+                d, valid = digit(tail_start)
+                ok &= valid
+                if place:
+                    ms += d * place
+                    place //= 10
+                tail_start += 1
+        if tail_start < length:
+            # The fraction must end where the first line's does
+            _, valid = digit(tail_start)
+            ok &= ~valid
+            ok &= sub[:, tail_start] != 46
+
+        key_cols = np.r_[0:minute_end, tail_start:length]
+        keys = sub[:, key_cols]
+        changed = np.ones(len(rows), dtype=bool)
+        changed[1:] = (keys[1:] != keys[:-1]).any(axis=1)
+        starts = np.flatnonzero(changed)
+        bases = np.empty(len(starts), dtype=np.int64)
+        for j, i in enumerate(starts):
+            line = values[rows[i]]
+            bases[j] = self._base_ms(line[:minute_end], line[tail_start:])
+        base = bases[np.cumsum(changed) - 1]
+        ok &= base != MISSING_MS
+        return ok, base + ms
+
+    def _convert_lines(self, values: Sequence[Optional[str]]) -> List[int]:
+        """Per-line conversion used for short inputs and irregular lines."""
+        out = []
+        append = out.append
+        prev_text = None
+        prev_ms = MISSING_MS
+        for text in values:
+            if text == prev_text:
+                append(prev_ms)
+                continue
+            prev_text = text
+            prev_ms = MISSING_MS
+            if text and isinstance(text, str):
+                colon = text.find(':')
+                if colon >= 2:
+                    minute_end = colon + 3
+                    seconds = text[minute_end + 1:minute_end + 3]
+                    m = _TAIL_RE.match(text, minute_end + 3)
+                    frac, tz = m.groups()
+                    if text[minute_end:minute_end + 1] == ':' and len(seconds) == 2 and seconds.isdigit():
+                        base = self._base_ms(text[:minute_end], tz)
+                        if base != MISSING_MS:
+                            prev_ms = base + int(seconds) * 1000 + (int((frac + '00')[:3]) if frac else 0)
+            append(prev_ms)
+        return out
+
+    def _base_ms(self, prefix: str, tz: str) -> int:
+        key = prefix + tz
+        base = self._prefix_ms.get(key)
+        if base is None:
+            if len(self._prefix_ms) >= self.max_cache:
+                self._prefix_ms.clear()
+            base = self._prefix_ms[key] = self._prefix_base_ms(prefix, tz)
+        return base
+
+    def _prefix_base_ms(self, prefix: str, tz: str) -> int:
+        text = prefix + ':00' + tz
+        epoch = parse_timestamp(text, year=self.reference_year)
+        if epoch is None:
+            return MISSING_MS
+        ms = int(epoch * 1000)
+        if not text[:4].isdigit() and ms > self.reference_ms + _DAY_MS:
+            epoch = parse_timestamp(text, year=self.reference_year - 1)
+            ms = int(epoch * 1000) if epoch is not None else MISSING_MS
+        return ms
+
+
+def to_epoch_ms(values: Sequence[Optional[str]], reference: Optional[float] = None) -> np.ndarray:
+    """Convenience wrapper around ``TimestampNormalizer.to_epoch_ms``."""
+    return TimestampNormalizer(reference=reference).to_epoch_ms(values)
@@ -0,0 +1,46 @@
+"""Benchmark the analyzer's deterministic paths: rule-based analysis and input classification.
+
+Run from backend/:  python -m benchmarks.bench_analyzer [--sizes 1000,10000,100000]
+"""
+import argparse
+from typing import Dict, Sequence
+
+from app.agents.analyzer_agent import AnalyzerAgent
+from app.agents.parser_agent import parse_log_text
+
+from .common import dump, measure
+from .loggen import generate_logs
+
+_QUESTION = 'Why does GigabitEthernet0/1 keep flapping and what should I check first?'
+
+
+def run(sizes: Sequence[int] = (1000, 10000, 100000), devices: int = 20, repeat: int = 3) -> Dict:
+    agent = AnalyzerAgent()
+    rules = []
+    classify = []
+    for size in sizes:
+        text = generate_logs(size, devices, flap_rate=0.01)
+        parsed = parse_log_text(text)
+        timing = measure(lambda: agent._rule_based_analysis(parsed), repeat=repeat)
+        rules.append({
+            'lines': size,
+            'rule_based_analysis': timing,
+            'lines_per_s': round(size / (timing['median_ms'] / 1000)),
+            'anomalies': len(agent._rule_based_analysis(parsed)['anomalies']),
+        })
+
+        for kind, payload in (('logs', text), ('logs_and_question', text + '\n' + _QUESTION),
+                              ('question_padded', 'x ' * (len(text) // 2) + _QUESTION)):
+            timing = measure(lambda: agent.input_classifier.classify(payload), repeat=repeat)
+            classify.append({'lines': size, 'input': kind, 'bytes': len(payload), 'classify': timing})
+    return {'benchmark': 'analyzer', 'devices': devices, 'repeat': repeat,
+            'rule_based_analysis': rules, 'classification': classify}
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--sizes', default='1000,10000,100000')
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--output')
+    args = parser.parse_args()
+    dump(run([int(s) for s in args.sizes.split(',')], repeat=args.repeat), args.output)
@@ -0,0 +1,135 @@
+"""HTTP load test for app.main:app with a fake LLM injected through ``LLMClient(llm=...)``.
+
+By default requests go through httpx's in-process ASGI transport (no
+sockets, measures the app itself). ``--server`` starts uvicorn on a local
+port in a background thread and drives it over real HTTP.
+
+Run from backend/:  python -m benchmarks.bench_api [--requests 500] [--concurrency 32] [--server]
+"""
+import argparse
+import asyncio
+import socket
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+import httpx
+
+from app.agents import analyzer_agent as analyzer_module
+from app.utils.llm_client import LLMClient
+from app.utils.llm_governor import get_governor
+
+from .common import FakeLLM, dump, summarize_ms
+from .loggen import generate_logs
+
+_QUESTION = 'Why are these interfaces flapping and what should I check first?'
+
+
+def _scenarios(log_lines: int) -> Dict[str, Tuple[str, Dict, Dict]]:
+    paste = generate_logs(log_lines, 10, flap_rate=0.02)
+    key = {'X-Cerebras-Api-Key': 'bench-key'}
+    return {
+        'analyze_logs_llm': ('/api/analyze', {'content': paste + '\n' + _QUESTION}, key),
+        'analyze_logs_rules': ('/api/analyze', {'content': paste}, {}),
+        'analyze_question_llm': ('/api/analyze', {'content': _QUESTION}, key),
+        'interactive_logs': ('/api/analyze/interactive', {'content': paste}, {}),
+    }
+
+
+def _install_fake_llm(latency: float) -> FakeLLM:
+    fake = FakeLLM(latency)
+    analyzer_module.LLMClient = lambda api_key=None, llm=None: LLMClient(api_key=api_key, llm=fake)
+    # Every scenario shares one key; the per-key rate limit would measure itself, not the app
+    get_governor().rate_per_key = 0
+    return fake
+
+
+async def _drive(client: httpx.AsyncClient, path: str, body: Dict, headers: Dict, requests: int,
+                 concurrency: int) -> Dict:
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies: List[float] = []
+    errors = 0
+
+    async def one() -> None:
+        nonlocal errors
+        async with semaphore:
+            t0 = time.perf_counter()
+            try:
+                resp = await client.post(path, json=body, headers=headers)
+                if resp.status_code != 200:
+                    errors += 1
+            except httpx.HTTPError:
+                errors += 1
+            latencies.append(time.perf_counter() - t0)
+
+    start = time.perf_counter()
+    await asyncio.gather(*[one() for _ in range(requests)])
+    elapsed = time.perf_counter() - start
+    return {'requests': requests, 'errors': errors, 'requests_per_s': round(requests / elapsed, 1),
+            'latency': summarize_ms(latencies)}
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def _start_server(app) -> Tuple[object, str]:
+    import uvicorn
+
+    port = _free_port()
+    server = uvicorn.Server(uvicorn.Config(app, host='127.0.0.1', port=port, log_level='warning'))
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    deadline = time.time() + 10
+    while not server.started and time.time() < deadline:
+        time.sleep(0.05)
+    return server, f'http://127.0.0.1:{port}'
+
+
+async def _run(requests: int, concurrency: int, log_lines: int, server_url: Optional[str]) -> List[Dict]:
+    from app.main import app
+
+    if server_url:
+        client = httpx.AsyncClient(base_url=server_url, timeout=60,
+                                   limits=httpx.Limits(max_connections=concurrency))
+    else:
+        client = httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url='http://bench', timeout=60)
+    results = []
+    async with client:
+        for name, (path, body, headers) in _scenarios(log_lines).items():
+            await client.post(path, json=body, headers=headers)  # warm-up
+            stats = await _drive(client, path, body, headers, requests, concurrency)
+            results.append(dict(scenario=name, path=path, **stats))
+    return results
+
+
+def run(requests: int = 200, concurrency: int = 16, log_lines: int = 200, llm_latency: float = 0.05,
+        server: bool = False) -> Dict:
+    fake = _install_fake_llm(llm_latency)
+    uv = None
+    url = None
+    if server:
+        from app.main import app
+        uv, url = _start_server(app)
+    try:
+        results = asyncio.run(_run(requests, concurrency, log_lines, url))
+    finally:
+        if uv is not None:
+            uv.should_exit = True
+    return {'benchmark': 'api', 'transport': 'uvicorn' if server else 'asgi', 'concurrency': concurrency,
+            'log_lines': log_lines, 'llm_latency_ms': llm_latency * 1000, 'llm_calls': fake.calls,
+            'results': results}
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--requests', type=int, default=200)
+    parser.add_argument('--concurrency', type=int, default=16)
+    parser.add_argument('--log-lines', type=int, default=200)
+    parser.add_argument('--llm-latency', type=float, default=0.05, help='seconds per fake LLM call')
+    parser.add_argument('--server', action='store_true', help='drive a real uvicorn server over HTTP')
+    parser.add_argument('--output')
+    args = parser.parse_args()
+    dump(run(args.requests, args.concurrency, args.log_lines, args.llm_latency, args.server), args.output)
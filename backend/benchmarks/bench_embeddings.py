@@ -0,0 +1,88 @@
+"""Benchmark local embedding backends: torch vs ONNX (fp32 and int8), with and without length bucketing.
+
+Reports sentences/s per backend and the cosine agreement of each ONNX
+variant with the torch embeddings on the same corpus. The corpus is
+generated log lines with every 20th entry a multi-line snippet, like the
+mix of lines and pasted excerpts the KB ingests. Exports the model on
+first run (needs torch, sentence-transformers, onnxruntime, tokenizers).
+
+Run from backend/:  python -m benchmarks.bench_embeddings [--sentences 2000] [--threads 0,1,4]
+"""
+import argparse
+import json
+import os
+import time
+from typing import Dict, List, Sequence
+
+from app.knowledge.embeddings import EmbeddingManager
+from app.knowledge.onnx_embeddings import (CONFIG_FILE, FP32_FILE, INT8_FILE, OnnxEmbeddingManager,
+                                           cosine_agreement, default_model_dir, load_onnx_manager)
+
+from .common import dump
+from .loggen import iter_logs
+
+
+def corpus(sentences: int, seed: int = 0) -> List[str]:
+    lines = list(iter_logs(lines=sentences * 2, devices=20, seed=seed))
+    texts = []
+    for i in range(sentences):
+        texts.append('\n'.join(lines[i:i + 12]) if i % 20 == 0 else lines[i])
+    return texts
+
+
+def _throughput(encode, texts: Sequence[str], repeat: int) -> Dict:
+    encode(list(texts[:32]))  # warm-up
+    best = None
+    vectors = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        vectors = encode(list(texts))
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return {'sentences_per_s': round(len(texts) / best, 1), 'vectors': vectors}
+
+
+def run(model_name: str = 'all-MiniLM-L6-v2', sentences: int = 2000, threads: Sequence[int] = (0,),
+        batch_size: int = 32, repeat: int = 3) -> Dict:
+    texts = corpus(sentences)
+    load_onnx_manager(model_name)  # exports on first run
+    model_dir = default_model_dir(model_name)
+
+    torch_manager = EmbeddingManager(model_name)
+    torch_run = _throughput(lambda t: torch_manager.model.encode(t, batch_size=batch_size), texts, repeat)
+    reference = torch_run.pop('vectors')
+    results = [{'backend': 'torch', **torch_run}]
+
+    with open(os.path.join(model_dir, CONFIG_FILE), encoding='utf-8') as f:
+        config = json.load(f)
+    for n_threads in threads:
+        for model_file in (FP32_FILE, INT8_FILE):
+            for bucket in (False, True):
+                manager = OnnxEmbeddingManager(model_dir, threads=n_threads, batch_size=batch_size,
+                                               config={**config, 'model_file': model_file}, bucket=bucket)
+                measured = _throughput(manager.embed, texts, repeat)
+                agreement = cosine_agreement(reference, measured.pop('vectors'))
+                results.append({
+                    'backend': 'onnx',
+                    'model_file': model_file,
+                    'threads': n_threads,
+                    'bucketed': bucket,
+                    **measured,
+                    'cosine_mean': agreement['mean'],
+                    'cosine_min': agreement['min'],
+                })
+    return {'benchmark': 'embeddings', 'model': model_name, 'sentences': sentences, 'batch_size': batch_size,
+            'results': results}
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--model', default='all-MiniLM-L6-v2')
+    parser.add_argument('--sentences', type=int, default=2000)
+    parser.add_argument('--threads', default='0')
+    parser.add_argument('--batch-size', type=int, default=32)
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--output')
+    args = parser.parse_args()
+    dump(run(args.model, args.sentences, [int(t) for t in args.threads.split(',')], args.batch_size, args.repeat),
+         args.output)
@@ -0,0 +1,65 @@
+"""Benchmark incident-fingerprint lookups against a growing LSH index.
+
+Incidents are drawn from a fixed vocabulary of templates/mnemonics in
+clusters (variations of a few hundred "failure patterns"), so queries hit
+real candidate buckets. Reports add and query latency in microseconds.
+
+Run from backend/:  python -m benchmarks.bench_incidents [--sizes 1000,10000,100000]
+"""
+import argparse
+import time
+from typing import Dict, List, Sequence, Set
+
+import numpy as np
+
+from app.utils.fingerprint import IncidentIndex
+
+from .common import dump, percentile
+
+
+def _incidents(count: int, patterns: int = 300, vocabulary: int = 5000, seed: int = 0) -> List[Set[str]]:
+    """``count`` variations of the same ``patterns`` base sets; ``seed`` only changes the variations."""
+    base_rng = np.random.default_rng(0)
+    bases = [base_rng.choice(vocabulary, size=base_rng.integers(20, 60), replace=False) for _ in range(patterns)]
+    rng = np.random.default_rng(seed)
+    incidents = []
+    for i in range(count):
+        base = bases[i % patterns]
+        keep = base[rng.random(len(base)) > 0.2]
+        noise = rng.choice(vocabulary, size=rng.integers(0, 8), replace=False)
+        incidents.append({f't:{t}' for t in np.concatenate([keep, noise])})
+    return incidents
+
+
+def _us(samples: Sequence[float]) -> Dict[str, float]:
+    us = [s * 1e6 for s in samples]
+    return {'median_us': round(percentile(us, 50), 1), 'p99_us': round(percentile(us, 99), 1)}
+
+
+def run(sizes: Sequence[int] = (1000, 10000, 100000), queries: int = 1000) -> Dict:
+    results = []
+    for size in sizes:
+        index = IncidentIndex(max_incidents=size)
+        add_samples = []
+        for features in _incidents(size):
+            start = time.perf_counter()
+            index.add(features, {'summary': 'incident'})
+            add_samples.append(time.perf_counter() - start)
+        query_samples, hits = [], 0
+        for features in _incidents(queries, seed=1):
+            start = time.perf_counter()
+            found = index.query(features, k=3)
+            query_samples.append(time.perf_counter() - start)
+            hits += bool(found)
+        results.append({'incidents': size, 'add': _us(add_samples), 'query': _us(query_samples),
+                        'query_per_s': round(queries / sum(query_samples), 1), 'hit_rate': round(hits / queries, 3)})
+    return {'benchmark': 'incidents', 'results': results}
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--sizes', default='1000,10000,100000')
+    parser.add_argument('--queries', type=int, default=1000)
+    parser.add_argument('--output')
+    args = parser.parse_args()
+    dump(run([int(s) for s in args.sizes.split(',')], args.queries), args.output)
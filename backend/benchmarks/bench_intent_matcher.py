@@ -0,0 +1,146 @@
+"""Benchmark the trie-compiled intent matcher against the original keyword cascade.
+
+Run from backend/:  python -m benchmarks.bench_intent_matcher
+"""
+import json
+import sys
+import timeit
+
+from app.utils.intent_matcher import IntentMatcher
+
+SAMPLES = [
+    "hello",
+    "I have a BGP connectivity problem with my upstream peer, the session keeps going down",
+    "how do I configure OSPF areas on a core router?",
+    "what is the best way to design a campus network with redundant switches and routers",
+    "xyz " * 200 + "is my switch broken?",
+    "qwerty uiop asdf " * 300,
+]
+
+
+class _LegacyResponder:
+    def _generate_fallback_response(self, text: str) -> str:
+        """Original any(word in text_lower) cascade, kept verbatim for comparison."""
+        text_lower = text.lower()
+        
+        # Greetings and casual conversation
+        if any(greeting in text_lower for greeting in ['hi', 'hello', 'hey', 'good morning', 'good afternoon']):
+            return "Hello! I'm your networking assistant. I can help you with BGP, OSPF, switching, routing, troubleshooting, and network configuration questions. For enhanced AI responses, you can provide a Cerebras API key. How can I assist you today?"
+        
+        # BGP related questions
+        if 'bgp' in text_lower:
+            if any(word in text_lower for word in ['connectivity', 'connection', 'issue', 'problem', 'trouble', 'down', 'not working']):
+                return """BGP connectivity issues are common. Here are the key troubleshooting steps:
+
+1. **Check BGP neighbor status**: `show ip bgp summary`
+2. **Verify connectivity**: Ping the neighbor IP
+3. **Check routing**: Ensure routes to neighbor exist
+4. **Verify configuration**: AS numbers, router IDs, authentication
+5. **Check BGP state**: Look for Idle, Connect, Active states
+6. **Review logs**: Look for BGP error messages
+
+Common causes:
+- Incorrect AS numbers
+- Authentication mismatch  
+- Network connectivity issues
+- Firewall blocking TCP 179
+- BGP timers mismatch
+
+Would you like me to help with specific BGP configuration or provide more detailed troubleshooting steps?"""
+            else:
+                return """BGP (Border Gateway Protocol) is the routing protocol of the internet. I can help with:
+
+- BGP configuration and setup
+- Neighbor relationships and peering
+- Route advertisement and filtering
+- Troubleshooting connectivity issues
+- Best path selection
+- Route maps and policies
+
+What specific BGP topic would you like help with?"""
+        
+        # OSPF related
+        if 'ospf' in text_lower:
+            return """OSPF (Open Shortest Path First) is a link-state routing protocol. Common topics include:
+
+- OSPF areas and hierarchy
+- LSA types and database synchronization  
+- Neighbor adjacencies and DR/BDR election
+- Authentication and security
+- Troubleshooting convergence issues
+
+What OSPF topic can I help you with?"""
+        
+        # General networking issues
+        if any(word in text_lower for word in ['issue', 'problem', 'trouble', 'help', 'broken', 'not working']):
+            return """I'm here to help with networking issues! To provide better assistance, please tell me:
+
+1. What type of network problem are you experiencing?
+2. What devices/protocols are involved? (routers, switches, BGP, OSPF, etc.)
+3. Any error messages or symptoms you're seeing?
+
+Common networking issues I can help with:
+- Routing protocol problems (BGP, OSPF, EIGRP)
+- Switching issues (VLANs, STP, trunking)
+- Connectivity troubleshooting
+- Configuration questions
+- Performance optimization
+
+For enhanced troubleshooting with AI analysis, you can provide a Cerebras API key."""
+        
+        # Configuration questions
+        if any(word in text_lower for word in ['configure', 'configuration', 'setup', 'config']):
+            return """I can help with network device configuration! Common configuration topics include:
+
+- Router configuration (BGP, OSPF, static routes)
+- Switch configuration (VLANs, trunking, port security)
+- Interface configuration and IP addressing
+- Access control lists (ACLs)
+- Quality of Service (QoS)
+- Security features
+
+What specific configuration do you need help with?"""
+        
+        # Generic networking question
+        if any(word in text_lower for word in ['network', 'networking', 'router', 'switch', 'protocol']):
+            return """I'm a networking expert assistant! I can help with:
+
+**Routing Protocols**: BGP, OSPF, EIGRP, RIP
+**Switching**: VLANs, STP, trunking, port security  
+**Troubleshooting**: Connectivity, performance, configuration issues
+**Configuration**: Router/switch setup, security, QoS
+**Network Design**: Architecture, best practices, optimization
+
+What networking topic would you like to explore?"""
+        
+        # Default response for unclear questions
+        return """I'm your networking assistant! I can help with network troubleshooting, configuration, and technical questions about:
+
+• Routing protocols (BGP, OSPF, EIGRP)
+• Switching technologies (VLANs, STP, trunking)
+• Network troubleshooting and diagnostics
+• Device configuration and best practices
+• Performance optimization
+
+Please feel free to ask any networking question or describe the issue you're facing. For enhanced AI-powered responses, you can optionally provide a Cerebras API key."""
+
+
+def run(number: int = 2000) -> dict:
+    matcher = IntentMatcher.from_file()
+    legacy = _LegacyResponder()
+    results = []
+    for text in SAMPLES:
+        assert matcher.respond(text) == legacy._generate_fallback_response(text), text[:40]
+        cascade = timeit.timeit(lambda: legacy._generate_fallback_response(text), number=number)
+        trie = timeit.timeit(lambda: matcher.respond(text), number=number)
+        results.append({
+            "chars": len(text),
+            "cascade_us": round(cascade / number * 1e6, 2),
+            "trie_us": round(trie / number * 1e6, 2),
+        })
+    return {"benchmark": "intent_matcher", "iterations": number, "results": results}
+
+
+if __name__ == '__main__':
+    json.dump(run(), sys.stdout, indent=2)
+    print()
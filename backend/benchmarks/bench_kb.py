@@ -0,0 +1,104 @@
+"""Benchmark KnowledgeAgent add/search at growing index sizes with fake embeddings.
+
+The index is bulk-loaded to each size through the writer's batch apply,
+then single adds (through the real single-writer queue), concurrent
+searches, searches with 10% of documents tombstoned and a compaction are
+timed against it. Requires faiss.
+
+Run from backend/:  python -m benchmarks.bench_kb [--sizes 1000,10000,100000,1000000] [--dim 128]
+"""
+import argparse
+import asyncio
+import time
+from typing import Dict, Sequence
+
+import numpy as np
+
+from app.agents.knowledge_agent import KnowledgeAgent
+
+from .common import FakeEmbeddings, dump, summarize_ms
+
+
+async def _bulk_load(agent: KnowledgeAgent, size: int, dim: int, chunk: int = 100000) -> float:
+    rng = np.random.default_rng(0)
+    start = time.perf_counter()
+    loaded = 0
+    while loaded < size:
+        n = min(chunk, size - loaded)
+        vecs = rng.standard_normal((n, dim)).astype(np.float32)
+        batch = [('add', (f'doc-{loaded + i}', vecs[i], 'doc', None), None) for i in range(n)]
+        await agent._apply_ops(batch)
+        loaded += n
+    return time.perf_counter() - start
+
+
+async def _bench_size(size: int, dim: int, adds: int, searches: int, concurrency: int) -> Dict:
+    agent = KnowledgeAgent()
+    embeddings = FakeEmbeddings(dim)
+    agent._make_embeddings = lambda api_key: embeddings
+    load_s = await _bulk_load(agent, size, dim)
+
+    add_samples = []
+    for i in range(adds):
+        start = time.perf_counter()
+        await agent.add_to_kb(f'new interface flap on rtr{i}', api_key='bench')
+        add_samples.append(time.perf_counter() - start)
+
+    # Concurrent burst of adds, exercising write batching
+    start = time.perf_counter()
+    await asyncio.gather(*[agent.add_to_kb(f'burst doc {i}', api_key='bench') for i in range(adds)])
+    burst_s = time.perf_counter() - start
+
+    semaphore = asyncio.Semaphore(concurrency)
+    search_samples = []
+
+    async def _search(i: int) -> None:
+        async with semaphore:
+            t0 = time.perf_counter()
+            await agent.search_kb(f'query {i}', api_key='bench', k=3)
+            search_samples.append(time.perf_counter() - t0)
+
+    start = time.perf_counter()
+    await asyncio.gather(*[_search(i) for i in range(searches)])
+    search_s = time.perf_counter() - start
+
+    # Tombstone 10% of the documents, then time search over tombstones and the rebuild
+    agent.compact_min_tombstones = size + 1  # keep automatic compaction out of the way
+    await agent.delete_from_kb(list(range(0, size, 10)), api_key='bench')
+    tombstoned_samples = []
+    for i in range(min(searches, 50)):
+        t0 = time.perf_counter()
+        await agent.search_kb(f'tombstoned query {i}', api_key='bench', k=3)
+        tombstoned_samples.append(time.perf_counter() - t0)
+    start = time.perf_counter()
+    await agent.compact()
+    compact_s = time.perf_counter() - start
+
+    return {
+        'vectors': size,
+        'dim': dim,
+        'bulk_load_vectors_per_s': round(size / load_s),
+        'add': summarize_ms(add_samples),
+        'add_burst_per_s': round(adds / burst_s, 1),
+        'search': summarize_ms(search_samples),
+        'search_per_s': round(searches / search_s, 1),
+        'search_tombstoned': summarize_ms(tombstoned_samples),
+        'compact_ms': round(compact_s * 1000, 2),
+    }
+
+
+def run(sizes: Sequence[int] = (1000, 10000, 100000), dim: int = 128, adds: int = 20, searches: int = 200,
+        concurrency: int = 16) -> Dict:
+    results = [asyncio.run(_bench_size(size, dim, adds, searches, concurrency)) for size in sizes]
+    return {'benchmark': 'kb', 'concurrency': concurrency, 'results': results}
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--sizes', default='1000,10000,100000')
+    parser.add_argument('--dim', type=int, default=128)
+    parser.add_argument('--adds', type=int, default=20)
+    parser.add_argument('--searches', type=int, default=200)
+    parser.add_argument('--output')
+    args = parser.parse_args()
+    dump(run([int(s) for s in args.sizes.split(',')], args.dim, args.adds, args.searches), args.output)
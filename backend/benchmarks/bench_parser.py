@@ -0,0 +1,42 @@
+"""Benchmark ParserAgent.process_logs on synthetic fleet logs.
+
+Run from backend/:  python -m benchmarks.bench_parser [--sizes 1000,10000,100000]
+"""
+import argparse
+import asyncio
+from typing import Dict, Sequence
+
+from app.agents.parser_agent import ParserAgent, parse_log_text
+
+from .common import dump, measure, measure_async
+from .loggen import VENDORS, generate_logs
+
+
+def run(sizes: Sequence[int] = (1000, 10000, 100000), devices: int = 20, repeat: int = 3) -> Dict:
+    agent = ParserAgent()
+    results = []
+    for vendor in VENDORS + ('mixed',):
+        vendors = VENDORS if vendor == 'mixed' else (vendor,)
+        for size in sizes:
+            text = generate_logs(size, devices, vendors=vendors, flap_rate=0.01)
+            # Inline parse (no offload), then the agent path as the API calls it
+            inline = measure(lambda: parse_log_text(text), repeat=repeat)
+            agent_ms = asyncio.run(measure_async(lambda: agent.process_logs(text), repeat=repeat))
+            results.append({
+                'vendor': vendor,
+                'lines': size,
+                'bytes': len(text),
+                'parse_inline': inline,
+                'process_logs': agent_ms,
+                'lines_per_s': round(size / (inline['median_ms'] / 1000)),
+            })
+    return {'benchmark': 'parser', 'devices': devices, 'repeat': repeat, 'results': results}
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--sizes', default='1000,10000,100000')
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--output')
+    args = parser.parse_args()
+    dump(run([int(s) for s in args.sizes.split(',')], repeat=args.repeat), args.output)
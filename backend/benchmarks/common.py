@@ -0,0 +1,123 @@
+"""Shared timing helpers and test doubles for the benchmark suite.
+
+Metric naming convention (used by ``benchmarks.compare``): keys ending in
+``_ms`` or ``_us`` are lower-is-better, keys ending in ``_per_s`` are higher-is-better,
+anything else is informational.
+"""
+import asyncio
+import json
+import os
+import platform
+import statistics
+import subprocess
+import time
+import zlib
+from typing import Any, Awaitable, Callable, Dict, List, Sequence
+
+import numpy as np
+
+
+def percentile(values: Sequence[float], q: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    idx = min(len(ordered) - 1, max(0, int(round(q / 100.0 * (len(ordered) - 1)))))
+    return ordered[idx]
+
+
+def summarize_ms(samples_s: Sequence[float]) -> Dict[str, float]:
+    ms = [s * 1000 for s in samples_s]
+    return {
+        'min_ms': round(min(ms), 3),
+        'median_ms': round(statistics.median(ms), 3),
+        'p90_ms': round(percentile(ms, 90), 3),
+        'p99_ms': round(percentile(ms, 99), 3),
+    }
+
+
+def measure(fn: Callable[[], Any], repeat: int = 5, warmup: int = 1) -> Dict[str, float]:
+    for _ in range(warmup):
+        fn()
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    return summarize_ms(samples)
+
+
+async def measure_async(fn: Callable[[], Awaitable[Any]], repeat: int = 5, warmup: int = 1) -> Dict[str, float]:
+    for _ in range(warmup):
+        await fn()
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        await fn()
+        samples.append(time.perf_counter() - start)
+    return summarize_ms(samples)
+
+
+def environment() -> Dict[str, Any]:
+    """Where and on what code the numbers were taken."""
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                                timeout=10).stdout.strip() or None
+    except Exception:
+        commit = None
+    return {
+        'commit': commit,
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+    }
+
+
+def dump(result: Dict[str, Any], path: str = None) -> None:
+    text = json.dumps(result, indent=2)
+    if path:
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(text + '\n')
+    else:
+        print(text)
+
+
+class FakeLLM:
+    """Async stand-in for the Cerebras wrapper; injected via ``LLMClient(llm=...)``.
+
+    Sleeps ``latency`` seconds to model network time and returns a canned,
+    valid JSON analysis so every parsing path downstream is exercised.
+    """
+
+    def __init__(self, latency: float = 0.05):
+        self.latency = latency
+        self.calls = 0
+
+    async def __call__(self, prompt: str) -> str:
+        self.calls += 1
+        await asyncio.sleep(self.latency)
+        return json.dumps({
+            'summary': 'Interface flaps on several devices.',
+            'findings': ['GigabitEthernet0/1 flapped 6 times'],
+            'recommendations': ['Check optics and cabling'],
+            'severity': 'warning',
+            'root_cause': 'Physical layer instability',
+        })
+
+
+class FakeEmbeddings:
+    """Deterministic hash-seeded embeddings with the LangChain embeddings interface."""
+
+    def __init__(self, dim: int = 128):
+        self.dim = dim
+
+    def _vec(self, text: str) -> List[float]:
+        rng = np.random.default_rng(zlib.crc32(text.encode('utf-8')))
+        return rng.standard_normal(self.dim).astype(np.float32).tolist()
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return [self._vec(t) for t in texts]
+
+    def embed_query(self, text: str) -> List[float]:
+        return self._vec(text)
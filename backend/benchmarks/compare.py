@@ -0,0 +1,77 @@
+"""Compare two benchmark result files and flag regressions.
+
+Run from backend/:  python -m benchmarks.compare old.json new.json [--threshold 0.10]
+
+Metrics are matched by path (list entries are keyed by their identifying
+fields, e.g. vendor/lines). Keys ending in ``_ms``/``_us`` regress when they grow,
+keys ending in ``_per_s`` regress when they shrink. Exits 1 if any metric
+regressed by more than the threshold.
+"""
+import argparse
+import json
+import sys
+from typing import Any, Dict, Iterator, Tuple
+
+# Fields that identify a row inside a result list rather than measure it
+_ID_FIELDS = ('scenario', 'vendor', 'input', 'lines', 'vectors', 'chars', 'backend', 'model_file', 'threads',
+              'bucketed', 'incidents')
+
+
+def _row_key(row: Dict[str, Any], index: int) -> str:
+    parts = [f'{k}={row[k]}' for k in _ID_FIELDS if k in row]
+    return ','.join(parts) if parts else str(index)
+
+
+def flatten(node: Any, prefix: str = '') -> Iterator[Tuple[str, float]]:
+    if isinstance(node, dict):
+        for key, value in node.items():
+            yield from flatten(value, f'{prefix}.{key}' if prefix else key)
+    elif isinstance(node, list):
+        for i, item in enumerate(node):
+            key = _row_key(item, i) if isinstance(item, dict) else str(i)
+            yield from flatten(item, f'{prefix}[{key}]')
+    elif isinstance(node, (int, float)) and not isinstance(node, bool):
+        yield prefix, float(node)
+
+
+def compare(old: Dict, new: Dict, threshold: float = 0.10) -> Dict[str, Any]:
+    before = dict(flatten(old.get('benchmarks', old)))
+    after = dict(flatten(new.get('benchmarks', new)))
+    rows = []
+    for path, new_value in after.items():
+        leaf = path.rsplit('.', 1)[-1]
+        lower_is_better = leaf.endswith(('_ms', '_us'))
+        if path not in before or not (lower_is_better or leaf.endswith('_per_s')):
+            continue
+        old_value = before[path]
+        if old_value == 0:
+            continue
+        change = (new_value - old_value) / old_value
+        worse = change if lower_is_better else -change
+        rows.append({'metric': path, 'old': old_value, 'new': new_value, 'change': round(change, 4),
+                     'regressed': worse > threshold})
+    return {'threshold': threshold, 'compared': len(rows),
+            'regressions': [r for r in rows if r['regressed']], 'rows': rows}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument('old')
+    parser.add_argument('new')
+    parser.add_argument('--threshold', type=float, default=0.10, help='relative change treated as a regression')
+    args = parser.parse_args()
+    with open(args.old, encoding='utf-8') as f:
+        old = json.load(f)
+    with open(args.new, encoding='utf-8') as f:
+        new = json.load(f)
+    report = compare(old, new, args.threshold)
+    for row in report['rows']:
+        flag = 'REGRESSED' if row['regressed'] else ''
+        print(f"{row['change']:+8.1%}  {row['old']:>12.3f} -> {row['new']:<12.3f} {row['metric']} {flag}")
+    print(f"{len(report['regressions'])} regression(s) over {report['threshold']:.0%} "
+          f"in {report['compared']} metrics")
+    sys.exit(1 if report['regressions'] else 0)
+
+
+if __name__ == '__main__':
+    main()
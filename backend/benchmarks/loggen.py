@@ -0,0 +1,147 @@
+"""Synthetic network-log generator for benchmarks.
+
+Produces Cisco IOS, Junos and RFC3164 syslog lines for a fleet of devices,
+with steady background chatter plus interface-flap / BGP-reset bursts at a
+configurable rate. Output is deterministic for a given seed.
+
+Run from backend/:  python -m benchmarks.loggen --lines 100000 --devices 20 > /tmp/fleet.log
+"""
+import argparse
+import random
+import sys
+import time
+from typing import Iterator, List, Optional, Sequence
+
+VENDORS = ('cisco_ios', 'junos', 'syslog')
+
+_MONTHS = ['Jan', 'Feb', 'Mar', 'Apr', 'May', 'Jun', 'Jul', 'Aug', 'Sep', 'Oct', 'Nov', 'Dec']
+
+_CISCO_BACKGROUND = [
+    '%SYS-5-CONFIG_I: Configured from console by admin on vty0 ({ip})',
+    '%SEC-6-IPACCESSLOGP: list 101 denied tcp {ip}({port}) -> 10.0.0.1(22), 1 packet',
+    '%SYS-6-LOGGINGHOST_STARTSTOP: Logging to host {ip} port 514 started - CLI initiated',
+    '%OSPF-5-ADJCHG: Process 1, Nbr {ip} on GigabitEthernet0/{n} from LOADING to FULL, Loading Done',
+    '%SNMP-3-AUTHFAIL: Authentication failure for SNMP req from host {ip}',
+]
+_CISCO_FLAP = [
+    '%LINK-3-UPDOWN: Interface GigabitEthernet0/{n}, changed state to down',
+    '%LINEPROTO-5-UPDOWN: Line protocol on Interface GigabitEthernet0/{n}, changed state to down',
+    '%LINK-3-UPDOWN: Interface GigabitEthernet0/{n}, changed state to up',
+    '%LINEPROTO-5-UPDOWN: Line protocol on Interface GigabitEthernet0/{n}, changed state to up',
+]
+_CISCO_BGP = ['%BGP-5-ADJCHANGE: neighbor {ip} Down BGP Notification sent',
+              '%BGP-5-ADJCHANGE: neighbor {ip} Up']
+
+_JUNOS_BACKGROUND = [
+    'mgd[{pid}]: UI_COMMIT: User \'admin\' requested \'commit\' operation',
+    'sshd[{pid}]: SSHD_LOGIN_FAILED: Login failed for user \'root\' from host \'{ip}\'',
+    'rpd[{pid}]: RPD_OSPF_NBRUP: OSPF neighbor {ip} (realm ospf-v2 ge-0/0/{n}.0 area 0.0.0.0) state changed from Init to ExStart',
+    'chassisd[{pid}]: CHASSISD_SNMP_TRAP7: SNMP trap generated: Fan/Blower OK',
+]
+_JUNOS_FLAP = [
+    'mib2d[{pid}]: SNMP_TRAP_LINK_DOWN: ifIndex {port}, ifAdminStatus up(1), ifOperStatus down(2), ifName ge-0/0/{n}',
+    'mib2d[{pid}]: SNMP_TRAP_LINK_UP: ifIndex {port}, ifAdminStatus up(1), ifOperStatus up(1), ifName ge-0/0/{n}',
+]
+_JUNOS_BGP = ['rpd[{pid}]: BGP_IO_ERROR_CLOSE_SESSION: BGP peer {ip} (External AS 65001): Error event Operation timed out',
+              'rpd[{pid}]: RPD_BGP_NEIGHBOR_STATE_CHANGED: BGP peer {ip} (External AS 65001) changed state from OpenConfirm to Established']
+
+_SYSLOG_BACKGROUND = [
+    'kernel: [{port}.123456] eth{n}: link is up at 1000 Mbps, full duplex',
+    'sshd[{pid}]: Accepted publickey for netops from {ip} port {port} ssh2',
+    'ntpd[{pid}]: synchronized to {ip}, stratum 2',
+    'systemd[1]: Started Session {port} of user netops.',
+]
+_SYSLOG_FLAP = ['kernel: eth{n}: link down', 'kernel: eth{n}: link up']
+_SYSLOG_BGP = ['bgpd[{pid}]: %ADJCHANGE: neighbor {ip} Down Hold Timer Expired',
+               'bgpd[{pid}]: %ADJCHANGE: neighbor {ip} Up']
+
+_TEMPLATES = {
+    'cisco_ios': (_CISCO_BACKGROUND, _CISCO_FLAP, _CISCO_BGP),
+    'junos': (_JUNOS_BACKGROUND, _JUNOS_FLAP, _JUNOS_BGP),
+    'syslog': (_SYSLOG_BACKGROUND, _SYSLOG_FLAP, _SYSLOG_BGP),
+}
+
+
+def _stamp(epoch: float, millis: bool) -> str:
+    t = time.gmtime(epoch)
+    base = f'{_MONTHS[t.tm_mon - 1]} {t.tm_mday:2d} {t.tm_hour:02d}:{t.tm_min:02d}:{t.tm_sec:02d}'
+    return base + f'.{int(epoch * 1000) % 1000:03d}' if millis else base
+
+
+def _line(vendor: str, device: str, epoch: float, body: str, seq: int) -> str:
+    if vendor == 'cisco_ios':
+        # Relay timestamp + host, sequence number, device timestamp, then the %FAC-SEV-MNEMONIC body
+        return f'{_stamp(epoch, False)} {device} {seq}: *{_stamp(epoch, True)}: {body}'
+    if vendor == 'junos':
+        return f'{_stamp(epoch, False)} {device} {body}'
+    return f'<30>{_stamp(epoch, False)} {device} {body}'
+
+
+def iter_logs(lines: int = 10000, devices: int = 10, vendors: Sequence[str] = VENDORS,
+              flap_rate: float = 0.01, bgp_rate: float = 0.002, burst_lines: int = 12,
+              start: Optional[float] = None, lines_per_second: float = 50.0,
+              seed: int = 0) -> Iterator[str]:
+    """Yield ``lines`` log lines in time order.
+
+    Each device is assigned a vendor round-robin. At each step a random
+    device emits one background line, or with probability ``flap_rate``
+    (``bgp_rate``) starts an interface-flap (BGP reset) burst of
+    ``burst_lines`` lines within a few seconds.
+    """
+    rng = random.Random(seed)
+    vendors = [v for v in vendors if v in _TEMPLATES] or list(VENDORS)
+    fleet = [(f'{vendors[i % len(vendors)].split("_")[0]}-rtr{i:03d}', vendors[i % len(vendors)])
+             for i in range(max(1, devices))]
+    epoch = start if start is not None else 1709251200.0  # 2024-03-01 00:00:00 UTC
+    step = 1.0 / lines_per_second
+    emitted = 0
+    seq = 0
+
+    def fields():
+        return {
+            'ip': f'10.{rng.randrange(256)}.{rng.randrange(256)}.{rng.randrange(1, 255)}',
+            'port': rng.randrange(1024, 65535),
+            'pid': rng.randrange(100, 9999),
+            'n': rng.randrange(48),
+        }
+
+    while emitted < lines:
+        device, vendor = fleet[rng.randrange(len(fleet))]
+        background, flap, bgp = _TEMPLATES[vendor]
+        roll = rng.random()
+        if roll < flap_rate or roll < flap_rate + bgp_rate:
+            pattern = flap if roll < flap_rate else bgp
+            f = fields()
+            for i in range(min(burst_lines, lines - emitted)):
+                seq += 1
+                epoch += rng.uniform(0.05, 0.4)
+                yield _line(vendor, device, epoch, pattern[i % len(pattern)].format(**f), seq)
+                emitted += 1
+        else:
+            seq += 1
+            epoch += rng.expovariate(1.0 / step)
+            yield _line(vendor, device, epoch, rng.choice(background).format(**fields()), seq)
+            emitted += 1
+
+
+def generate_logs(lines: int = 10000, devices: int = 10, vendors: Sequence[str] = VENDORS, **kwargs) -> str:
+    """``iter_logs`` joined into one paste-sized string."""
+    return '\n'.join(iter_logs(lines=lines, devices=devices, vendors=vendors, **kwargs))
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--lines', type=int, default=10000)
+    parser.add_argument('--devices', type=int, default=10)
+    parser.add_argument('--vendors', default=','.join(VENDORS), help='comma-separated: ' + ','.join(VENDORS))
+    parser.add_argument('--flap-rate', type=float, default=0.01)
+    parser.add_argument('--bgp-rate', type=float, default=0.002)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args(argv)
+    for line in iter_logs(args.lines, args.devices, args.vendors.split(','), args.flap_rate, args.bgp_rate,
+                          seed=args.seed):
+        sys.stdout.write(line + '\n')
+
+
+if __name__ == '__main__':
+    main()
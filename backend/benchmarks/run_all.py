@@ -0,0 +1,63 @@
+"""Run the benchmark suite and write one JSON result file.
+
+Run from backend/:
+    python -m benchmarks.run_all --quick                      # small sizes, ~1 min
+    python -m benchmarks.run_all --only parser,kb --output /tmp/bench.json
+Defaults to benchmarks/results/<commit>.json; compare two runs with
+``python -m benchmarks.compare old.json new.json``.
+"""
+import argparse
+import os
+import time
+
+from . import (bench_analyzer, bench_api, bench_embeddings, bench_incidents, bench_intent_matcher, bench_kb,
+               bench_parser)
+from .common import dump, environment
+
+RESULTS_DIR = os.path.join(os.path.dirname(__file__), 'results')
+
+PRESETS = {
+    'quick': {
+        'parser': lambda: bench_parser.run(sizes=(1000, 10000), repeat=2),
+        'analyzer': lambda: bench_analyzer.run(sizes=(1000, 10000), repeat=2),
+        'kb': lambda: bench_kb.run(sizes=(1000, 10000), searches=100),
+        'api': lambda: bench_api.run(requests=50, concurrency=8),
+        'intent_matcher': lambda: bench_intent_matcher.run(number=200),
+        'embeddings': lambda: bench_embeddings.run(sentences=500, repeat=1),
+        'incidents': lambda: bench_incidents.run(sizes=(1000, 10000), queries=200),
+    },
+    'full': {
+        'parser': lambda: bench_parser.run(sizes=(1000, 10000, 100000, 1000000), repeat=3),
+        'analyzer': lambda: bench_analyzer.run(sizes=(1000, 10000, 100000, 1000000), repeat=3),
+        'kb': lambda: bench_kb.run(sizes=(1000, 10000, 100000, 1000000)),
+        'api': lambda: bench_api.run(requests=1000, concurrency=32),
+        'intent_matcher': lambda: bench_intent_matcher.run(),
+        'embeddings': lambda: bench_embeddings.run(sentences=5000, threads=(1, 0)),
+        'incidents': lambda: bench_incidents.run(),
+    },
+}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description='Run the wizraven benchmark suite.')
+    parser.add_argument('--quick', action='store_true', help='small sizes for a fast smoke run')
+    parser.add_argument('--only', help='comma-separated subset: ' + ','.join(PRESETS['full']))
+    parser.add_argument('--output', help='result file (default benchmarks/results/<commit>.json)')
+    args = parser.parse_args()
+
+    preset = PRESETS['quick' if args.quick else 'full']
+    names = args.only.split(',') if args.only else list(preset)
+    env = environment()
+    result = {'environment': env, 'preset': 'quick' if args.quick else 'full', 'benchmarks': {}}
+    for name in names:
+        start = time.perf_counter()
+        result['benchmarks'][name] = preset[name]()
+        result['benchmarks'][name]['wall_s'] = round(time.perf_counter() - start, 2)
+
+    output = args.output or os.path.join(RESULTS_DIR, f"{env['commit'] or 'local'}-{result['preset']}.json")
+    dump(result, output)
+    print(output)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,73 @@
+import asyncio
+import json
+
+import pytest
+
+from app.agents import analyzer_agent as analyzer_module
+from app.agents.analyzer_agent import AnalyzerAgent
+from app.utils.llm_client import LLMClient
+
+
+class ConcurrencyTrackingLLM:
+    def __init__(self):
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.calls = 0
+
+    async def __call__(self, prompt: str) -> str:
+        self.calls += 1
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        await asyncio.sleep(0.01)
+        self.in_flight -= 1
+        severity = 'critical' if 'Merge the per-slice' in prompt else 'warning'
+        return json.dumps({"summary": "slice ok", "findings": ["flaps seen"],
+                           "recommendations": ["check optics"], "severity": severity})
+
+
+def _structured(n_devices: int, lines_per_device: int):
+    messages, timestamps, devices = [], [], []
+    for d in range(n_devices):
+        for i in range(lines_per_device):
+            messages.append(f"Interface GigabitEthernet0/{i % 4}, changed state to down")
+            timestamps.append(f"Mar  1 00:00:{i % 60:02d}")
+            devices.append(f"rtr{d}")
+    return {"message": messages, "timestamp": timestamps, "device": devices}
+
+
+@pytest.mark.asyncio
+async def test_hierarchical_analysis_caps_concurrency_and_reports_progress(monkeypatch):
+    llm = ConcurrencyTrackingLLM()
+    monkeypatch.setattr(analyzer_module, 'LLMClient', lambda api_key=None: LLMClient(llm=llm))
+
+    agent = AnalyzerAgent()
+    agent.mapreduce_concurrency = 2
+    progress = []
+
+    result = await agent.analyze_logs_hierarchical(
+        _structured(6, 10),
+        request_context={"cerebras_api_key": "k"},
+        progress_callback=lambda done, total, chunk: progress.append((done, total)),
+    )
+
+    assert llm.max_in_flight <= 2
+    assert llm.calls == 7  # six device chunks plus one reduce call
+    assert progress[-1] == (6, 6)
+    assert result["severity"] == "critical"
+    assert result["progress"] == {"total": 6, "completed": 6, "llm_failed": 0}
+    assert {c["label"].split()[0] for c in result["chunks"]} == {f"rtr{d}" for d in range(6)}
+    assert all("elapsed_ms" in c for c in result["chunks"])
+    assert result["patterns"] == ["Interface <IF>, changed state to down"]
+
+
+@pytest.mark.asyncio
+async def test_hierarchical_analysis_without_key_merges_rule_results():
+    agent = AnalyzerAgent()
+    agent.mapreduce_chunk_lines = 25
+
+    result = await agent.analyze_logs(_structured(1, 100), request_context={"analysis_mode": "hierarchical"})
+
+    assert result["progress"]["total"] == 4
+    assert all(c["source"] == "rules" for c in result["chunks"])
+    assert result["severity"] == "critical"
+    assert set(result) >= {"summary", "findings", "recommendations", "severity", "patterns"}
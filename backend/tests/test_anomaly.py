@@ -0,0 +1,77 @@
+import pytest
+
+from app.agents.analyzer_agent import AnalyzerAgent
+from app.utils.anomaly import RateAnomalyDetector
+from app.utils.timestamps import parse_timestamp
+
+
+def test_parse_timestamp_handles_syslog_and_iso():
+    assert parse_timestamp("Mar  1 00:01:02.500", year=2024) == parse_timestamp("2024-03-01 00:01:02") + 0.5
+    assert parse_timestamp("not a time") is None
+
+
+def test_detector_flags_burst_against_baseline():
+    detector = RateAnomalyDetector(window_seconds=60, burst_count=50)
+    # Steady one event per minute for ten minutes, then a 12-event flap storm
+    for minute in range(10):
+        detector.observe("rtr1", "LINK-3-UPDOWN", minute * 60 + 5)
+    for i in range(12):
+        detector.observe("rtr1", "LINK-3-UPDOWN", 600 + i)
+    detector.observe("rtr1", "LINK-3-UPDOWN", 700)
+    detector.flush()
+
+    assert len(detector.anomalies) == 1
+    anomaly = detector.anomalies[0]
+    assert anomaly["window_start"] == 600
+    assert anomaly["count"] == 12
+    assert anomaly["reason"] == "zscore"
+    assert anomaly["type"] == "interface_flap"
+
+
+def test_detector_state_is_bounded_by_keys():
+    detector = RateAnomalyDetector(max_keys=10)
+    for i in range(1000):
+        detector.observe(f"rtr{i % 50}", "BGP-5-ADJCHANGE", i)
+    assert len(detector._state) == 10
+
+
+def test_evicted_keys_have_their_open_window_evaluated():
+    detector = RateAnomalyDetector(max_keys=1, burst_count=10)
+    for i in range(12):
+        detector.observe("rtr1", "LINK-3-UPDOWN", i)
+    flagged = detector.observe("rtr2", "LINK-3-UPDOWN", 20)
+    assert [(a["device"], a["count"]) for a in flagged] == [("rtr1", 12)]
+    assert list(detector.anomalies) == flagged
+
+
+def test_anomaly_list_is_a_bounded_ring():
+    detector = RateAnomalyDetector(burst_count=2, max_anomalies=5)
+    for i in range(20):
+        detector.observe(f"rtr{i}", "LINK-3-UPDOWN", 0)
+        detector.observe(f"rtr{i}", "LINK-3-UPDOWN", 1)
+    detector.flush()
+    assert [a["device"] for a in detector.anomalies] == [f"rtr{i}" for i in range(15, 20)]
+
+
+def test_steady_high_rate_is_not_a_burst():
+    detector = RateAnomalyDetector(window_seconds=60, burst_count=10)
+    for minute in range(30):
+        for i in range(20):
+            detector.observe("rtr1", "LINK-3-UPDOWN", minute * 60 + i)
+    detector.flush()
+    # The first window has nothing to compare with; from then on 20/min is the baseline
+    assert [(a["window_start"], a["reason"]) for a in detector.anomalies] == [(0, "burst")]
+
+
+@pytest.mark.asyncio
+async def test_identify_anomalies_is_deterministic_without_llm():
+    structured = {
+        "message": ["Interface Gi0/1, changed state to down"] * 15,
+        "timestamp": [f"Mar  1 00:00:{i:02d}" for i in range(15)],
+        "device": ["rtr1"] * 15,
+        "mnemonic": ["LINK-3-UPDOWN"] * 15,
+    }
+    anomalies = await AnalyzerAgent().identify_anomalies(structured)
+    assert len(anomalies) == 1
+    assert anomalies[0]["device"] == "rtr1"
+    assert "15 interface_flap events" in anomalies[0]["description"]
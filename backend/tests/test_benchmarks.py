@@ -0,0 +1,25 @@
+from app.agents.parser_agent import parse_log_text
+from benchmarks.compare import compare
+from benchmarks.loggen import generate_logs
+
+
+def test_generator_is_deterministic_and_parseable():
+    text = generate_logs(500, devices=6, flap_rate=0.05, seed=3)
+    assert text == generate_logs(500, devices=6, flap_rate=0.05, seed=3)
+    assert len(text.splitlines()) == 500
+
+    for vendor in ("cisco_ios", "junos", "syslog"):
+        parsed = parse_log_text(generate_logs(200, devices=3, vendors=[vendor], seed=1))
+        assert parsed["format"] == vendor
+        assert all(parsed["device"])
+        assert len(set(parsed["device"])) == 3
+
+
+def test_compare_flags_regressions_by_metric_direction():
+    old = {"benchmarks": {"parser": {"results": [{"vendor": "junos", "lines": 1000, "lines_per_s": 1000,
+                                                  "parse_inline": {"median_ms": 10.0}}]}}}
+    new = {"benchmarks": {"parser": {"results": [{"vendor": "junos", "lines": 1000, "lines_per_s": 700,
+                                                  "parse_inline": {"median_ms": 9.0}}]}}}
+    report = compare(old, new, threshold=0.1)
+    assert report["compared"] == 2
+    assert [r["metric"] for r in report["regressions"]] == ["parser.results[vendor=junos,lines=1000].lines_per_s"]
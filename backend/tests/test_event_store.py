@@ -0,0 +1,190 @@
+import asyncio
+import os
+import shutil
+
+import numpy as np
+import pytest
+
+pytest.importorskip("pyarrow")
+
+from app.agents.analyzer_agent import AnalyzerAgent
+from app.agents.parser_agent import parse_log_text
+from app.utils.event_store import EventStore
+from app.utils.timestamps import MISSING_MS
+from benchmarks.loggen import generate_logs
+
+DAY_MS = 86400000
+T0 = 1709251200000  # 2024-03-01T00:00:00Z
+
+
+def _parsed(rows, text="paste"):
+    """rows of (epoch_ms or None, device, mnemonic, message)."""
+    return {
+        "clean_logs": text,
+        "format": "cisco_ios",
+        "epoch_ms": np.array([MISSING_MS if e is None else e for e, _, _, _ in rows], dtype=np.int64),
+        "timestamp": [None if e is None else str(e) for e, _, _, _ in rows],
+        "device": [d for _, d, _, _ in rows],
+        "mnemonic": [m for _, _, m, _ in rows],
+        "message": [msg for _, _, _, msg in rows],
+    }
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = EventStore(str(tmp_path / "events"))
+    store.append(_parsed([
+        (T0 + 5000, "rtr1", "LINK-3-UPDOWN", "Gi0/1 down"),
+        (T0 + 1000, "rtr1", "LINK-3-UPDOWN", "Gi0/1 up"),
+        (T0 + DAY_MS + 10, "rtr1", "BGP-5-ADJCHANGE", "neighbor down"),
+        (T0 + 2000, "sw/2", "SYS-5-CONFIG_I", "configured"),
+        (None, None, None, "no timestamp or host"),
+    ]))
+    return store
+
+
+def test_append_partitions_by_day_and_device_and_is_idempotent(store):
+    root = store.root
+    assert sorted(os.listdir(root)) == ["day=2024-03-01", "day=2024-03-02", "day=undated"]
+    assert sorted(os.listdir(os.path.join(root, "day=2024-03-01"))) == ["device=rtr1", "device=sw%2F2"]
+    assert store.append(_parsed([(T0, "rtr1", "X", "y")])) == 0  # same paste content
+
+
+def test_query_prunes_partitions_and_columns(store):
+    assert len(store.files(start_ms=T0, end_ms=T0 + 3000, devices=["rtr1"])) == 1
+
+    result = store.query(start_ms=T0, end_ms=T0 + DAY_MS, devices=["rtr1"], columns=["epoch_ms", "message"])
+    assert result == {"epoch_ms": [T0 + 1000, T0 + 5000], "message": ["Gi0/1 up", "Gi0/1 down"]}
+
+    everything = store.query(columns=["device", "message"])
+    assert len(everything["message"]) == 5 and None in everything["device"]
+    assert store.query(devices=["sw/2"], columns=["device"]) == {"device": ["sw/2"]}
+    assert store.query(mnemonics=["BGP-5-ADJCHANGE"], columns=["day"]) == {"day": ["2024-03-02"]}
+    assert store.query(devices=["nope"], columns=["message"]) == {"message": []}
+    assert store.query(columns=["epoch_ms"], limit=1) == {"epoch_ms": [T0 + DAY_MS + 10]}
+
+
+def test_compaction_merges_part_files_without_double_counting(store):
+    for i in range(3):
+        store.append(_parsed([(T0 + 100 + i, "rtr1", "LINK-3-UPDOWN", f"flap {i}")], text=f"paste {i}"))
+    partition = os.path.join(store.root, "day=2024-03-01", "device=rtr1")
+    before = store.query(columns=["epoch_ms", "message"])
+    assert len(os.listdir(partition)) == 4
+
+    assert store.compact(min_files=4) == 4
+    assert store.query(columns=["epoch_ms", "message"]) == before
+    assert len(store.files(devices=["rtr1"], start_ms=T0, end_ms=T0 + 1)) == 1
+    # Appends already merged stay no-ops; later ones are merged with the merged file
+    assert store.append(_parsed([(T0 + 100, "rtr1", "X", "y")], text="paste 0")) == 0
+    store.append(_parsed([(T0 + 200, "rtr1", "X", "late")], text="paste 4"))
+    assert store.compact() == 2
+    assert len(store.query(devices=["rtr1"], columns=["message"])["message"]) == 7
+    assert sorted(os.listdir(partition))[0].startswith("merged-") and len(os.listdir(partition)) == 2
+
+
+def test_compaction_skips_locked_partitions_and_hides_replaced_files(store):
+    store.append(_parsed([(T0 + 100, "rtr1", "X", "more")], text="paste 1"))
+    partition = os.path.join(store.root, "day=2024-03-01", "device=rtr1")
+    open(os.path.join(partition, ".compact.lock"), "w").close()
+    assert store.compact_partition(partition) == 0
+    os.remove(os.path.join(partition, ".compact.lock"))
+
+    # A crash between publishing the merged file and removing its inputs
+    files = sorted(store.files(devices=["rtr1"], start_ms=T0, end_ms=T0 + 1))
+    for path in files:
+        shutil.copy(path, path + ".keep")
+    assert store.compact_partition(partition) == 2
+    for path in files:
+        os.replace(path + ".keep", path)
+    assert len(store.query(devices=["rtr1"], columns=["message"])["message"]) == 4
+    assert store.compact_partition(partition) == 0  # just removes the leftovers
+    assert len(os.listdir(partition)) == 2
+
+
+def test_append_racing_a_compaction_is_kept(store, monkeypatch):
+    store.append(_parsed([(T0 + 100, "rtr1", "X", "more")], text="paste 1"))
+    partition = os.path.join(store.root, "day=2024-03-01", "device=rtr1")
+    listing = store._partition_files
+    raced = []
+
+    def list_then_append(directory):
+        files = listing(directory)
+        if not raced:
+            raced.append(True)
+            store.append(_parsed([(T0 + 200, "rtr1", "RACE", "written mid-compaction")], text="paste 2"))
+        return files
+
+    monkeypatch.setattr(store, "_partition_files", list_then_append)
+    assert store.compact_partition(partition) == 2
+    monkeypatch.undo()
+
+    assert store.query(mnemonics=["RACE"], columns=["message"]) == {"message": ["written mid-compaction"]}
+    assert store.compact_partition(partition) == 2
+    assert len(store.query(devices=["rtr1"], columns=["message"])["message"]) == 5
+
+
+def test_query_limit_reads_only_the_newest_days(store, monkeypatch):
+    reads = []
+    read = store._read
+    monkeypatch.setattr(store, "_read", lambda files, *args: reads.append(files) or read(files, *args))
+
+    assert store.query(columns=["message"], limit=1) == {"message": ["neighbor down"]}
+    assert len(reads) == 1 and "day=2024-03-02" in reads[0][0]
+    assert store.query(columns=["message"], limit=4)["message"][-1] == "neighbor down"
+    assert len(store.query(columns=["message"], limit=100)["message"]) == 5
+
+
+def test_device_history_counts_by_mnemonic(store):
+    history = store.device_history(["rtr1"], start_ms=T0, end_ms=T0 + DAY_MS)
+    assert history == {"rtr1": {"LINK-3-UPDOWN": {"count": 2, "first_ms": T0 + 1000, "last_ms": T0 + 5000}}}
+
+
+@pytest.mark.asyncio
+async def test_analyzer_reports_recurring_events_from_the_store(tmp_path, monkeypatch):
+    monkeypatch.setenv("WIZRAVEN_EVENT_STORE", str(tmp_path / "events"))
+    from app.utils.event_store import get_event_store
+
+    start = T0 / 1000
+    old = parse_log_text(generate_logs(300, devices=2, vendors=["cisco_ios"], flap_rate=0.2, seed=1, start=start))
+    new = parse_log_text(generate_logs(300, devices=2, vendors=["cisco_ios"], flap_rate=0.2, seed=1,
+                                       start=start + 3 * 86400))
+    agent = AnalyzerAgent()
+    assert (await agent.rule_results(old))["history"] is None
+    get_event_store().append(old)
+
+    rules = await agent.rule_results(new)
+    history = rules["history"]
+    assert history["days"] == 30 and history["recurring"]
+    assert set(history["devices"]) <= {d for d in new["device"] if d}
+    assert any("also seen" in f for f in rules["findings"])
+
+
+def test_events_endpoint(store, monkeypatch):
+    from fastapi.testclient import TestClient
+
+    from app import main
+
+    monkeypatch.setenv("WIZRAVEN_EVENT_STORE", store.root)
+    client = TestClient(main.app)
+    resp = client.get("/api/events", params={"device": "rtr1,sw/2", "fields": "device,mnemonic",
+                                             "start_ms": T0, "end_ms": T0 + 3000})
+    assert resp.json() == {"device": ["rtr1", "sw/2"], "mnemonic": ["LINK-3-UPDOWN", "SYS-5-CONFIG_I"]}
+    assert client.get("/api/events", params={"fields": "nope"}).status_code == 400
+
+
+@pytest.mark.asyncio
+async def test_mixed_input_path_reads_history_and_persists(tmp_path, monkeypatch):
+    monkeypatch.setenv("WIZRAVEN_EVENT_STORE", str(tmp_path / "events"))
+    from app.utils import event_store
+
+    start = T0 / 1000
+    agent = AnalyzerAgent()
+    old = generate_logs(300, devices=2, vendors=["cisco_ios"], flap_rate=0.2, seed=1, start=start)
+    first = await agent.analyze_mixed_input(old, api_key=None)
+    assert first["log_analysis"]["history"] is None
+    await asyncio.gather(*event_store._PERSIST_TASKS)
+    assert event_store.get_event_store().files()
+
+    new = generate_logs(300, devices=2, vendors=["cisco_ios"], flap_rate=0.2, seed=1, start=start + 3 * 86400)
+    second = await agent.analyze_mixed_input(new, api_key=None)
+    assert second["log_analysis"]["history"]["recurring"]
@@ -0,0 +1,76 @@
+import asyncio
+import time
+
+import pytest
+
+from app.agents.parser_agent import parse_log_text
+from app.utils.executors import ExecutionLayer, WorkPool
+
+
+def _sleep(seconds):
+    time.sleep(seconds)
+    return seconds
+
+
+@pytest.mark.asyncio
+async def test_pool_reports_queue_depth_and_wait_time():
+    pool = WorkPool("io", "thread", max_workers=2)
+    try:
+        tasks = [asyncio.ensure_future(pool.run(_sleep, 0.05)) for _ in range(6)]
+        await asyncio.sleep(0.01)
+        assert pool.in_flight == 6
+        assert pool.queue_depth == 4
+
+        await asyncio.gather(*tasks)
+        stats = pool.stats()
+        assert stats["completed"] == 6 and stats["queue_depth"] == 0
+        # Later calls queued behind the first two
+        assert stats["wait_ms_max"] >= 40
+        assert stats["run_ms_avg"] >= 40
+    finally:
+        pool.shutdown()
+
+
+@pytest.mark.asyncio
+async def test_event_loop_stays_responsive_while_pool_works():
+    pool = WorkPool("cpu", "thread", max_workers=1)
+    try:
+        blocking = asyncio.ensure_future(pool.run(_sleep, 0.2))
+        started = time.perf_counter()
+        await asyncio.sleep(0.01)
+        assert time.perf_counter() - started < 0.1
+        await blocking
+    finally:
+        pool.shutdown()
+
+
+@pytest.mark.asyncio
+async def test_process_pool_parses_logs_and_counts_failures():
+    layer = ExecutionLayer(sizes={"cpu": 1})
+    try:
+        raw = "\n".join(f"Mar  1 00:00:{i:02d} rtr1 %LINK-3-UPDOWN: Interface Gi0/{i}, changed state to down"
+                        for i in range(20))
+        parsed = await layer.run("cpu", parse_log_text, raw)
+        inline = parse_log_text(raw)
+        assert parsed["message"] == inline["message"]
+        assert parsed["templates"] == inline["templates"]
+        assert (parsed["epoch_ms"] == inline["epoch_ms"]).all()
+
+        with pytest.raises(ValueError):
+            await layer.run("nope", len, "x")
+        with pytest.raises(TypeError):
+            await layer.run("io", len, 5)
+        assert layer.stats()["io"]["failed"] == 1
+        assert layer.stats()["cpu"]["completed"] == 1
+    finally:
+        layer.shutdown()
+
+
+@pytest.mark.asyncio
+async def test_warm_starts_process_workers_at_the_configured_size():
+    layer = ExecutionLayer(sizes={"cpu": 2})
+    try:
+        assert await layer.warm() == {"cpu": 2, "embedding": 0, "faiss": 0, "io": 0}
+        assert layer.stats()["cpu"]["submitted"] == 0
+    finally:
+        layer.shutdown()
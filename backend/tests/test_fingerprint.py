@@ -0,0 +1,109 @@
+import numpy as np
+import pytest
+
+from app.agents.knowledge_agent import KnowledgeAgent
+from app.agents.parser_agent import parse_log_text
+from app.utils.fingerprint import IncidentIndex, MinHasher, incident_features, trim_analysis
+from app.utils.kb_service import KBClient, KBServer
+from benchmarks.loggen import generate_logs
+
+
+def _features(n, prefix="f"):
+    return {f"{prefix}{i}" for i in range(n)}
+
+
+def test_minhash_estimates_jaccard():
+    hasher = MinHasher(num_perm=256)
+    a, b = _features(100), _features(150) - _features(50)  # overlap 50 of 150
+    estimate = np.mean(hasher.signature(a) == hasher.signature(b))
+    assert estimate == pytest.approx(50 / 150, abs=0.08)
+    assert np.array_equal(hasher.signature(a), MinHasher(num_perm=256).signature(set(a)))
+
+
+def test_features_come_from_mnemonics_and_templates():
+    parsed = parse_log_text(generate_logs(500, devices=2, vendors=["cisco_ios"], flap_rate=0.2, seed=1))
+    features = incident_features(parsed)
+    assert any(f.startswith("m:") for f in features)
+    assert "e:Interface <IF>, changed state to <*>" in features  # "down" only in the samples
+    assert "e:m:LINK-3-UPDOWN" in features and "e:m:SYS-5-CONFIG_I" not in features
+
+
+def test_index_returns_similar_incidents_with_their_analysis():
+    index = IncidentIndex(min_similarity=0.3)
+    flap = _features(40, "t:flap")
+    bgp = _features(40, "t:bgp")
+    index.add(flap, {"summary": "Gi0/1 flapping", "findings": ["optics"], "fleet": {"shards": "big"}})
+    index.add(bgp, {"summary": "BGP session reset"})
+
+    similar = flap - _features(8, "t:flap") | _features(5, "t:noise")
+    results = index.query(similar, k=3)
+    assert [r["analysis"]["summary"] for r in results] == ["Gi0/1 flapping"]
+    assert "fleet" not in results[0]["analysis"]
+    assert results[0]["similarity"] == pytest.approx(32 / 45, abs=1e-3)
+    assert index.query(_features(40, "t:other")) == []
+
+
+def test_same_fingerprint_updates_and_old_incidents_are_evicted():
+    index = IncidentIndex(max_incidents=2)
+    first = index.add(_features(10, "a"), {"summary": "one"})
+    assert index.add(_features(10, "a"), {"summary": "again"}) == first
+    assert index.query(_features(10, "a"))[0]["seen"] == 2
+
+    index.add(_features(10, "b"))
+    index.add(_features(10, "c"))
+    assert len(index) == 2
+    assert index.query(_features(10, "b"))[0]["id"] != first
+    assert index.query(_features(10, "a")) == []  # evicted and out of its LSH buckets too
+    assert all(first not in members for band in index._buckets for members in band.values())
+
+
+def test_trim_analysis():
+    assert trim_analysis({"summary": "s", "findings": list(range(20)), "anomalies": [1]}, max_items=3) == {
+        "summary": "s", "findings": [0, 1, 2]}
+
+
+@pytest.mark.asyncio
+async def test_incidents_over_the_kb_socket(tmp_path):
+    server = KBServer(agent=KnowledgeAgent(), socket_path=str(tmp_path / "kb.sock"))
+    await server.start()
+    client = KBClient(socket_path=server.socket_path)
+    try:
+        features = sorted(_features(20, "m:LINK"))
+        assert (await client.record_incident(features, {"summary": "flap"}, {"lines": 20}))["ok"]
+        results = await client.similar_incidents(features[:18])
+        assert results[0]["analysis"] == {"summary": "flap"} and results[0]["meta"] == {"lines": 20}
+        assert (await client.stats())["incidents"] == 1
+    finally:
+        await client.close()
+        await server.close()
+
+
+@pytest.mark.asyncio
+async def test_mixed_input_path_matches_and_records_incidents():
+    from app.agents.analyzer_agent import AnalyzerAgent
+
+    agent = AnalyzerAgent(incident_store=KnowledgeAgent())
+    logs = generate_logs(300, devices=2, vendors=["cisco_ios"], flap_rate=0.2, seed=1)
+    first = await agent.analyze_mixed_input(logs, api_key=None)
+    assert first["log_analysis"]["similar_incidents"] == []
+    assert len(agent.incident_store.incidents) == 1
+
+    again = generate_logs(300, devices=2, vendors=["cisco_ios"], flap_rate=0.2, seed=2)
+    similar = (await agent.analyze_mixed_input(again, api_key=None))["log_analysis"]["similar_incidents"]
+    assert similar and similar[0]["analysis"]["root_cause"] == first["log_analysis"]["root_cause"]
+    assert similar[0]["meta"]["lines"] > 0
+    assert AnalyzerAgent().incident_store is None
+
+
+@pytest.mark.asyncio
+async def test_only_the_trimmed_analysis_is_sent_to_the_incident_store():
+    from app.agents.analyzer_agent import AnalyzerAgent
+
+    class Store:
+        async def record_incident(self, features, analysis, meta):
+            self.sent = analysis
+
+    store = Store()
+    analysis = {"summary": "flap", "findings": ["optics"], "fleet": {"shards": [{"templates": {}}]}}
+    await AnalyzerAgent(incident_store=store).record_incident(["m:LINK"], analysis, {"device": ["rtr1"]})
+    assert store.sent == {"summary": "flap", "findings": ["optics"]}
@@ -0,0 +1,56 @@
+import pytest
+
+from app.agents.analyzer_agent import AnalyzerAgent
+from app.utils import input_classifier
+from app.utils.input_classifier import InputClassifier
+
+CISCO = "*Mar  1 00:01:02.123: %LINK-3-UPDOWN: Interface GigabitEthernet0/1, changed state to down"
+
+
+def test_small_inputs_keep_existing_semantics():
+    clf = InputClassifier()
+    assert clf.classify("hello")["question_present"] is True
+    result = clf.classify(f"{CISCO}\n{CISCO}")
+    assert result["logs_present"] is True
+    assert result["vendor"] == "cisco_ios"
+    assert result["confidence"] == 1.0
+    assert result["sampled"] is False
+
+
+class _CountingPattern:
+    def __init__(self, pattern):
+        self.pattern = pattern
+        self.calls = 0
+
+    def search(self, line):
+        self.calls += 1
+        return self.pattern.search(line)
+
+
+def test_large_input_is_sampled_and_short_circuits(monkeypatch):
+    clf = InputClassifier()
+    text = "\n".join([CISCO] * 1_000_000)
+    counting = _CountingPattern(input_classifier._LOG_LINE_RE)
+    monkeypatch.setattr(input_classifier, "_LOG_LINE_RE", counting)
+    result = clf.classify(text)
+
+    assert result["logs_present"] is True
+    assert result["sampled"] is True
+    assert result["lines_scanned"] == clf.min_log_hits
+    # Only the sampled windows are read, and line matching stops at min_log_hits
+    assert sum(len(w) for w in clf._windows(text)) <= clf.sample_windows * clf.sample_chars
+    assert counting.calls == clf.min_log_hits
+
+
+def test_vendor_probes():
+    clf = InputClassifier()
+    assert clf.detect_vendor("2024-01-01 10:00:00 mx1 rpd[1234]: BGP_IO_ERROR_CLOSE_SESSION: peer") == "junos"
+    assert clf.detect_vendor("Mar 1 00:00:00 sw1 Ebra: %LINEPROTO-5-UPDOWN: Line protocol on Interface Ethernet1") == "arista_eos"
+    assert clf.detect_vendor("<34>1 2024-01-01T10:00:00Z host app - - - msg") == "rfc5424"
+
+
+@pytest.mark.asyncio
+async def test_analyze_mixed_input_reports_classification():
+    out = await AnalyzerAgent().analyze_mixed_input(f"{CISCO}\n{CISCO}\n{CISCO}", api_key=None)
+    assert out["input_classification"]["logs_present"] is True
+    assert out["log_analysis"] is not None
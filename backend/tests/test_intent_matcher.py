@@ -0,0 +1,36 @@
+import json
+
+from app.agents.analyzer_agent import AnalyzerAgent
+from app.utils.intent_matcher import IntentMatcher, KeywordTrie
+
+
+def test_trie_matches_like_substring_checks():
+    keywords = ["hi", "issue", "bgp", "problem", "config", "configure", "configuration", "down"]
+    trie = KeywordTrie(keywords)
+    for text in ["this bgp issue", "bgproblem", "reconfiguration", "hissue", "nothing here", "shutdown"]:
+        assert trie.find(text) == {k for k in keywords if k in text}
+
+
+def test_intent_priority_and_all_any_rules():
+    matcher = IntentMatcher([
+        {"name": "bgp_trouble", "all": ["bgp"], "any": ["down", "issue"], "response": "trouble"},
+        {"name": "bgp", "all": ["BGP"], "response": "general"},
+    ], default="default")
+    assert matcher.respond("BGP session down") == "trouble"
+    assert matcher.respond("tell me about bgp") == "general"
+    assert matcher.respond("ospf") == "default"
+
+
+def test_intents_load_from_file(tmp_path):
+    path = tmp_path / "intents.json"
+    path.write_text(json.dumps({"intents": [{"name": "vlan", "any": ["vlan"], "response": "VLANs!"}],
+                                "default": "?"}))
+    matcher = IntentMatcher.from_file(str(path))
+    assert matcher.respond("Add a VLAN") == "VLANs!"
+
+
+def test_fallback_responses_use_intent_table():
+    agent = AnalyzerAgent()
+    assert agent._generate_fallback_response("hello").startswith("Hello! I'm your networking assistant.")
+    assert "show ip bgp summary" in agent._generate_fallback_response("my bgp session is down")
+    assert agent._generate_fallback_response("qwerty").startswith("I'm your networking assistant!")
@@ -0,0 +1,26 @@
+from app.utils.json_extract import JSONExtractor, extract_json
+
+
+def test_plain_fenced_and_prose_wrapped_json():
+    assert extract_json('{"summary": "ok"}') == {"summary": "ok"}
+    fenced = 'Here is the analysis:\n```json\n{"summary": "flaps", "findings": ["Gi0/1"]}\n```\nLet me know.'
+    assert extract_json(fenced) == {"summary": "flaps", "findings": ["Gi0/1"]}
+    assert extract_json('Interfaces like {Gi0/1} flapped. {"severity": "warning"}') == {"severity": "warning"}
+    assert extract_json("no json here") is None
+    assert extract_json('["a", "b"]') is None
+    assert extract_json('Explanations: ["a", "b"]', expect=list) == ["a", "b"]
+
+
+def test_truncated_output_is_closed():
+    assert extract_json('{"summary": "x", "findings": ["a", "b') == {"summary": "x", "findings": ["a", "b"]}
+    assert extract_json('```json\n{"summary": "x", "severity": tr') == {"summary": "x"}
+    assert extract_json('{"summary": "cut mid\\') == {}
+
+
+def test_incremental_feed():
+    extractor = JSONExtractor()
+    assert extractor.feed('Sure: {"summ') == {}
+    assert extractor.feed('ary": "link down", "findings": [') == {"summary": "link down", "findings": []}
+    assert not extractor.complete
+    assert extractor.feed('"Gi0/1"]} trailing') == {"summary": "link down", "findings": ["Gi0/1"]}
+    assert extractor.complete
@@ -0,0 +1,117 @@
+import asyncio
+import json
+
+import pytest
+
+from app.utils.kb_service import KBClient, KBServer
+
+
+class FakeKnowledgeAgent:
+    """Exact-substring 'index' standing in for FAISS + embeddings."""
+
+    def __init__(self):
+        self.documents = []
+
+    async def add_to_kb(self, log_text, api_key):
+        if not api_key:
+            raise ValueError('Cerebras API key is required for KnowledgeAgent operations')
+        self.documents.append(log_text)
+        return {"ok": True, "id": len(self.documents) - 1}
+
+    async def search_kb(self, query, api_key, k=3):
+        await asyncio.sleep(0.001)
+        return '\n\n'.join([d for d in self.documents if query in d][:k])
+
+    async def stats(self):
+        return {"documents": len(self.documents)}
+
+
+@pytest.mark.asyncio
+async def test_workers_share_one_index_over_the_socket(tmp_path):
+    server = KBServer(agent=FakeKnowledgeAgent(), socket_path=str(tmp_path / "kb.sock"))
+    await server.start()
+    worker_a = KBClient(socket_path=server.socket_path)
+    worker_b = KBClient(socket_path=server.socket_path)
+    try:
+        added = await worker_a.add_to_kb("rtr1 BGP neighbor down", api_key="k")
+        assert added == {"ok": True, "id": 0}
+
+        # A different worker sees the add immediately
+        assert await worker_b.search_kb("BGP", api_key="k") == "rtr1 BGP neighbor down"
+        assert await worker_b.query_knowledge_base("BGP", context={"cerebras_api_key": "k"}) == [
+            "rtr1 BGP neighbor down"]
+        assert (await worker_b.stats())["documents"] == 1
+
+        with pytest.raises(ValueError, match="API key is required"):
+            await worker_b.add_to_kb("x", api_key=None)
+    finally:
+        await worker_a.close()
+        await worker_b.close()
+        await server.close()
+
+
+@pytest.mark.asyncio
+async def test_concurrent_calls_are_pipelined_into_batches(tmp_path):
+    agent = FakeKnowledgeAgent()
+    agent.documents = [f"doc {i}" for i in range(50)]
+    server = KBServer(agent=agent, socket_path=str(tmp_path / "kb.sock"))
+    await server.start()
+    client = KBClient(socket_path=server.socket_path)
+    try:
+        await client.stats()
+        frames_before = client.frames_sent
+        results = await asyncio.gather(*[client.search_kb(f"doc {i}", api_key="k", k=1) for i in range(50)])
+        assert results == [f"doc {i}" for i in range(50)]
+        assert client.frames_sent - frames_before < 5
+    finally:
+        await client.close()
+        await server.close()
+
+
+@pytest.mark.asyncio
+async def test_client_reports_missing_service(tmp_path):
+    client = KBClient(socket_path=str(tmp_path / "missing.sock"))
+    with pytest.raises(ValueError, match="KB service unavailable"):
+        await client.search_kb("x", api_key="k")
+    assert await client.query_knowledge_base("x", context={"cerebras_api_key": "k"}) == []
+
+
+@pytest.mark.asyncio
+async def test_bad_frames_and_unserializable_payloads_fail_instead_of_hanging(tmp_path):
+    agent = FakeKnowledgeAgent()
+    agent.stats = lambda: asyncio.sleep(0, result={"documents": {1, 2}})  # not JSON-serializable
+    server = KBServer(agent=agent, socket_path=str(tmp_path / "kb.sock"))
+    await server.start()
+    client = KBClient(socket_path=server.socket_path, timeout=5)
+    try:
+        with pytest.raises(ValueError, match="Unserializable KB reply"):
+            await client.stats()
+        bad, good = await asyncio.gather(client.record_incident(["m:X"], {"when": object()}),
+                                         client.add_to_kb("rtr1 up", api_key="k"), return_exceptions=True)
+        assert isinstance(bad, ValueError) and "Unserializable KB request" in str(bad)
+        assert good == {"ok": True, "id": 0}
+
+        reader, writer = await asyncio.open_unix_connection(server.socket_path)
+        writer.write(b'[{"id": 7, "op": "stats"}, {"id": 8, oops\n')
+        reply = await asyncio.wait_for(reader.readline(), 5)
+        assert [r["id"] for r in json.loads(reply)] == [7, 8]
+        writer.close()
+    finally:
+        await client.close()
+        await server.close()
+
+
+@pytest.mark.asyncio
+async def test_unanswered_calls_time_out(tmp_path):
+    agent = FakeKnowledgeAgent()
+    agent.stats = lambda: asyncio.sleep(10)
+    server = KBServer(agent=agent, socket_path=str(tmp_path / "kb.sock"))
+    await server.start()
+    client = KBClient(socket_path=server.socket_path, timeout=0.05)
+    try:
+        with pytest.raises(ValueError, match="did not answer stats"):
+            await client.stats()
+        assert not client._pending
+    finally:
+        await client.close()
+        await server.close()
@@ -0,0 +1,217 @@
+import asyncio
+import threading
+import time
+import zlib
+
+import numpy as np
+import pytest
+
+pytest.importorskip("faiss")
+
+from app.agents import knowledge_agent as knowledge_module
+from app.agents.knowledge_agent import KnowledgeAgent, parse_retention
+from app.utils import executors
+from app.utils.executors import ExecutionLayer
+
+
+class FakeEmbeddings:
+    """Deterministic 16-d embeddings so identical text maps to identical vectors."""
+
+    def _vec(self, text):
+        rng = np.random.default_rng(zlib.crc32(text.encode()))
+        return rng.standard_normal(16).tolist()
+
+    def embed_documents(self, texts):
+        return [self._vec(t) for t in texts]
+
+    def embed_query(self, text):
+        return self._vec(text)
+
+
+@pytest.fixture
+def agent(monkeypatch):
+    agent = KnowledgeAgent()
+    monkeypatch.setattr(agent, "_make_embeddings", lambda api_key: FakeEmbeddings())
+    return agent
+
+
+@pytest.mark.asyncio
+async def test_concurrent_adds_keep_ids_and_index_aligned(agent):
+    docs = [f"rtr{i} %LINK-3-UPDOWN: Interface Gi0/{i} down" for i in range(100)]
+    results = await asyncio.gather(*[agent.add_to_kb(d, api_key="k") for d in docs])
+
+    ids = sorted(r["id"] for r in results)
+    assert ids == list(range(100))
+    assert agent.index.ntotal == len(agent.documents) == 100
+    for result, doc in zip(results, docs):
+        assert agent.documents[result["id"]] == doc
+    # Each document is its own nearest neighbour, so ordering survived batching
+    for doc in docs[::10]:
+        assert await agent.search_kb(doc, api_key="k", k=1) == doc
+
+
+@pytest.mark.asyncio
+async def test_writes_never_touch_an_index_a_search_is_reading(agent):
+    await agent.add_to_kb("first", api_key="k")
+    view = agent._view
+    with view.buffer.reading():
+        await agent.add_to_kb("second", api_key="k")  # appended to the other copy
+        third = asyncio.ensure_future(agent.add_to_kb("third", api_key="k"))
+        await asyncio.sleep(0.05)
+        assert not third.done()  # needs the copy being read
+        assert view.index.ntotal == 1
+    await third
+
+    assert agent.index.ntotal == 3
+    assert agent.documents == {0: "first", 1: "second", 2: "third"}
+    assert await agent.search_kb("first", api_key="k", k=1) == "first"
+
+
+@pytest.mark.asyncio
+async def test_dimension_mismatch_fails_only_the_offending_add(agent, monkeypatch):
+    await agent.add_to_kb("ok", api_key="k")
+
+    class Short(FakeEmbeddings):
+        def embed_documents(self, texts):
+            return [[0.0] * 8]
+
+    monkeypatch.setattr(agent, "_make_embeddings", lambda api_key: Short())
+    with pytest.raises(ValueError, match="dimension mismatch"):
+        await agent.add_to_kb("bad", api_key="k")
+    assert agent.documents == {0: "ok"}
+
+
+@pytest.mark.asyncio
+async def test_delete_and_update_keep_ids_stable(agent):
+    ids = [(await agent.add_to_kb(d, api_key="k"))["id"] for d in ("alpha", "beta", "gamma")]
+
+    assert await agent.delete_from_kb([ids[1], 99], api_key="k") == {"ok": True, "deleted": [1], "missing": [99]}
+    assert "beta" not in await agent.search_kb("beta", api_key="k", k=3)
+    assert (await agent.update_kb(ids[0], "alpha v2", api_key="k"))["id"] == ids[0]
+    assert await agent.search_kb("alpha v2", api_key="k", k=1) == "alpha v2"
+    assert agent.documents == {0: "alpha v2", 2: "gamma"}
+    assert (await agent.stats())["tombstones"] == 2
+    with pytest.raises(ValueError, match="Unknown document id"):
+        await agent.update_kb(1, "gone", api_key="k")
+
+
+@pytest.mark.asyncio
+async def test_search_filters_tombstoned_and_expired_documents_inside_faiss(agent):
+    agent.compact_min_tombstones = 10 ** 6  # keep compaction out of the way
+    results = await asyncio.gather(*[agent.add_to_kb(f"doc {i}", api_key="k") for i in range(40)])
+    await agent.add_to_kb("expiring", api_key="k", ttl_days=0)
+    await agent.delete_from_kb([r["id"] for r in results[:30]], api_key="k")
+
+    found = (await agent.search_kb("doc 0", api_key="k", k=10)).split("\n\n")
+    assert sorted(found) == sorted(f"doc {i}" for i in range(30, 40))
+    assert agent._view.search_filter[0] is not None
+
+
+@pytest.mark.asyncio
+async def test_compaction_drops_tombstones_once_the_ratio_is_crossed(agent):
+    agent.compact_ratio, agent.compact_min_tombstones = 0.5, 1
+    docs = [f"doc {i}" for i in range(8)]
+    for doc in docs:
+        await agent.add_to_kb(doc, api_key="k")
+    await agent.delete_from_kb([0, 1, 2], api_key="k")
+    assert agent._compaction is None
+    await agent.delete_from_kb([3], api_key="k")
+    await agent._compaction
+
+    assert agent.index.ntotal == 4 and not agent._dead
+    assert agent.compactions == 1
+    for doc_id in range(4, 8):
+        assert await agent.search_kb(docs[doc_id], api_key="k", k=1) == docs[doc_id]
+
+
+@pytest.mark.asyncio
+async def test_background_compaction_failures_are_logged(agent, monkeypatch):
+    warnings = []
+    monkeypatch.setattr(knowledge_module.log, "warning", lambda event, **fields: warnings.append((event, fields)))
+
+    def fail(*args):
+        raise MemoryError("no room")
+
+    monkeypatch.setattr(KnowledgeAgent, "_build_compacted", staticmethod(fail))
+    agent.compact_ratio, agent.compact_min_tombstones = 0.1, 1
+    await agent.add_to_kb("doc", api_key="k")
+    await agent.add_to_kb("other", api_key="k")
+    await agent.delete_from_kb([0], api_key="k")
+    await asyncio.wait([agent._compaction])
+    await asyncio.sleep(0)
+
+    assert warnings == [("kb.compaction_failed", {"error": "no room"})]
+
+
+@pytest.mark.asyncio
+async def test_writes_during_compaction_are_replayed(agent):
+    for i in range(4):
+        await agent.add_to_kb(f"doc {i}", api_key="k")
+    await agent.delete_from_kb([0], api_key="k")
+    base = agent._view
+    dead_keys = agent._dead_at(base.version)
+    vectors, keys = knowledge_module._live_vectors(base.index, dead_keys)
+    copies = tuple(KnowledgeAgent._build_compacted(vectors, keys, agent.dim) for _ in range(2))
+
+    await agent.add_to_kb("late doc", api_key="k")
+    await agent.delete_from_kb([1], api_key="k")
+    assert await agent._submit("compact", (base, dead_keys, copies)) == 1
+
+    assert agent.index.ntotal == 4  # docs 1-3 (1 tombstoned meanwhile) + the late add
+    assert set(agent._dead) == {1}  # doc 1's vector, deleted after the rebuild started
+    assert await agent.search_kb("late doc", api_key="k", k=1) == "late doc"
+    assert agent.documents == {2: "doc 2", 3: "doc 3", 4: "late doc"}
+
+
+@pytest.mark.asyncio
+async def test_writes_finish_while_a_compaction_rebuilds(agent, monkeypatch):
+    agent.compact_min_tombstones = 10 ** 6
+    for i in range(6):
+        await agent.add_to_kb(f"doc {i}", api_key="k")
+    await agent.delete_from_kb([0, 1], api_key="k")
+
+    building, release = threading.Event(), threading.Event()
+    build = KnowledgeAgent._build_compacted
+
+    def slow_build(*args):
+        building.set()
+        release.wait(5)
+        return build(*args)
+
+    monkeypatch.setattr(KnowledgeAgent, "_build_compacted", staticmethod(slow_build))
+    layer = ExecutionLayer(sizes={"faiss": 4})  # the blocked rebuild holds one thread
+    monkeypatch.setattr(executors, "_LAYER", layer)
+    compaction = asyncio.ensure_future(agent.compact())
+    try:
+        await asyncio.get_running_loop().run_in_executor(None, building.wait, 5)
+        # Each add publishes the other copy, so two in a row need the compacted base drained
+        for doc in ("during 1", "during 2"):
+            await asyncio.wait_for(agent.add_to_kb(doc, api_key="k"), 2)
+        assert not compaction.done()
+    finally:
+        release.set()
+    assert await compaction == 2
+    layer.shutdown()
+
+    assert agent.index.ntotal == 6 and agent._spare is not None  # no clone on the next write
+    await agent.add_to_kb("after", api_key="k")
+    assert agent._spare.index.ntotal == 6 and agent.index.ntotal == 7
+    for doc in ("doc 5", "during 2", "after"):
+        assert await agent.search_kb(doc, api_key="k", k=1) == doc
+
+
+@pytest.mark.asyncio
+async def test_retention_expires_documents_by_kind(agent):
+    agent.retention = parse_retention("incident=1")
+    await agent.add_to_kb("incident log", api_key="k", kind="incident")
+    await agent.add_to_kb("runbook", api_key="k")
+    await agent.add_to_kb("already stale", api_key="k", ttl_days=0)
+
+    assert "already stale" not in await agent.search_kb("already stale", api_key="k", k=3)
+    assert await agent.apply_retention(now=time.time() + 2 * 86400) == [0, 2]
+    assert agent.documents == {1: "runbook"}
+
+
+def test_parse_retention():
+    assert parse_retention("incident=30, log=0.5") == {"incident": 30 * 86400, "log": 43200}
+    assert parse_retention(None) == {}
@@ -22,3 +22,100 @@ async def test_analyze_text_without_key_raises():
     llm = LLMClient(api_key=None, llm=None)
     with pytest.raises(ValueError):
         await llm.analyze_text('test')
+
+
+FENCED = 'Sure!\n```json\n{"summary": "Gi0/1 flapping", "severity": "High", "findings": ["6 flaps"]}\n```'
+
+
+class FencedLLM:
+    def __init__(self):
+        self.calls = []
+
+    def __call__(self, prompt: str) -> str:
+        self.calls.append(('plain', None))
+        return FENCED
+
+    def complete_json(self, prompt: str, schema=None) -> str:
+        self.calls.append(('json', schema))
+        return FENCED
+
+
+@pytest.mark.asyncio
+async def test_analyze_json_uses_structured_mode_and_tolerates_fences():
+    llm = FencedLLM()
+    out = await LLMClient(llm=llm).analyze_json('logs', schema={"type": "object"})
+    assert out["summary"] == "Gi0/1 flapping"
+    assert llm.calls[0] == ('json', {"type": "object"})
+
+
+@pytest.mark.asyncio
+async def test_analyze_json_raises_with_raw_text_when_no_json():
+    from app.utils.llm_client import StructuredOutputError
+
+    with pytest.raises(StructuredOutputError) as info:
+        await LLMClient(llm=DummyLLM()).analyze_json('logs')
+    assert info.value.raw.startswith('SUMMARY:')
+
+
+@pytest.mark.asyncio
+async def test_analyze_logs_makes_one_call_for_fenced_json(monkeypatch):
+    from app.agents import analyzer_agent as analyzer_module
+    from app.agents.analyzer_agent import AnalyzerAgent
+
+    llm = FencedLLM()
+    monkeypatch.setattr(analyzer_module, 'LLMClient', lambda api_key=None: LLMClient(llm=llm))
+    structured = {"message": ["Interface Gi0/1, changed state to down"] * 3,
+                  "timestamp": ["Mar  1 00:00:01"] * 3, "device": ["rtr1"] * 3}
+    result = await AnalyzerAgent().analyze_logs(structured, request_context={"cerebras_api_key": "k"})
+    assert [kind for kind, _ in llm.calls] == ['json']
+    assert llm.calls[0][1]["required"][-1] == "patterns"
+    assert result["summary"] == "Gi0/1 flapping"
+    assert result["severity"] == "critical"
+    assert result["findings"] == ["6 flaps"]
+
+
+class RejectedFormat(Exception):
+    status_code = 400
+
+
+class FakeCerebras:
+    """SDK double: rejects ``response_format`` and counts completions."""
+
+    calls = []
+
+    def __init__(self, api_key, max_retries=None):
+        self.chat = self
+        self.completions = self
+
+    def create(self, **kwargs):
+        FakeCerebras.calls.append('response_format' in kwargs)
+        if 'response_format' in kwargs:
+            raise RejectedFormat('response_format is not supported for this model')
+
+        class Message:
+            content = '{"summary": "ok"}'
+
+        class Choice:
+            message = Message()
+
+        class Response:
+            choices = [Choice()]
+
+        return Response()
+
+
+@pytest.mark.asyncio
+async def test_rejected_json_mode_is_remembered_per_model_across_clients(monkeypatch):
+    from app.utils import llm_client
+
+    monkeypatch.setattr(llm_client, 'load_cerebras_sdk', lambda: FakeCerebras)
+    monkeypatch.setattr(llm_client, '_JSON_MODE_UNSUPPORTED', set())
+    monkeypatch.setenv('CEREBRAS_MODEL', 'no-schema-model')
+    FakeCerebras.calls = []
+
+    for _ in range(3):
+        out = await LLMClient(api_key='k').analyze_json('logs', schema={"type": "object"})
+        assert out == {"summary": "ok"}
+    # One rejected structured call, then prompt-only JSON for every later client
+    assert FakeCerebras.calls == [True, False, False, False]
+    assert llm_client._JSON_MODE_UNSUPPORTED == {'no-schema-model'}
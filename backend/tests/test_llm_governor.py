@@ -0,0 +1,186 @@
+import asyncio
+import json
+import threading
+import time
+from email.utils import formatdate
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import httpx
+import pytest
+
+from app.agents import analyzer_agent as analyzer_module
+from app.agents.analyzer_agent import AnalyzerAgent
+from app.utils import llm_governor
+from app.utils.llm_client import LLMClient
+from app.utils.llm_governor import (AIMDLimiter, CircuitBreaker, CircuitOpenError, LLMGovernor, TokenBucket,
+                                    UpstreamError, parse_retry_after)
+
+
+class FakeProvider:
+    """Local chat-completions server; ``script`` holds (status, delay_s, headers) per request, last repeats."""
+
+    def __init__(self, script):
+        self.script = list(script)
+        self.requests = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self._lock = threading.Lock()
+        provider = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def do_POST(self):
+                self.rfile.read(int(self.headers.get("Content-Length") or 0))
+                with provider._lock:
+                    step = provider.script[min(provider.requests, len(provider.script) - 1)]
+                    provider.requests += 1
+                    provider.in_flight += 1
+                    provider.max_in_flight = max(provider.max_in_flight, provider.in_flight)
+                status, delay, headers = step
+                time.sleep(delay)
+                body = json.dumps({"choices": [{"message": {"content": '{"summary": "ok"}'}}]}).encode()
+                self.send_response(status)
+                for k, v in headers.items():
+                    self.send_header(k, v)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+                with provider._lock:
+                    provider.in_flight -= 1
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}/v1/chat/completions"
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def llm(self, prompt: str) -> str:
+        """Sync callable in the shape of the SDK wrapper."""
+        resp = httpx.post(self.url, json={"messages": [{"role": "user", "content": prompt}]}, timeout=5)
+        resp.raise_for_status()
+        return resp.json()["choices"][0]["message"]["content"]
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+@pytest.fixture
+def governor(monkeypatch):
+    gov = LLMGovernor(limiter=AIMDLimiter(initial=4, max_limit=8), breaker=CircuitBreaker(2, reset_seconds=60),
+                      rate_per_key=0, max_attempts=3, backoff_base=0.01, backoff_cap=1.0)
+    monkeypatch.setattr(llm_governor, "_GOVERNOR", gov)
+    return gov
+
+
+def test_parse_retry_after_seconds_and_http_date():
+    assert parse_retry_after("2") == 2.0
+    assert 0 < parse_retry_after(formatdate(time.time() + 30, usegmt=True)) <= 30
+    assert parse_retry_after("soon") is None
+
+
+def test_aimd_grows_on_success_and_halves_on_overload():
+    limiter = AIMDLimiter(initial=4, max_limit=8, latency_target_ms=100, cooldown=0)
+    for _ in range(4):
+        limiter.on_success(10)
+    assert limiter.limit == pytest.approx(5, abs=0.1)
+    limiter.on_overload()
+    assert limiter.limit == pytest.approx(2.5, abs=0.1)
+    limiter.on_success(500)  # slower than target counts as overload
+    assert limiter.limit == pytest.approx(1.25, abs=0.1)
+
+
+@pytest.mark.asyncio
+async def test_token_bucket_paces_bursts():
+    bucket = TokenBucket(rate=20, burst=1)
+    start = time.perf_counter()
+    for _ in range(3):
+        await bucket.acquire()
+    assert time.perf_counter() - start >= 0.09
+
+
+@pytest.mark.asyncio
+async def test_429_is_retried_after_retry_after(governor):
+    provider = FakeProvider([(429, 0, {"Retry-After": "0.2"}), (200, 0, {})])
+    try:
+        start = time.perf_counter()
+        out = await LLMClient(llm=provider.llm).analyze_text("logs")
+        assert json.loads(out) == {"summary": "ok"}
+        assert provider.requests == 2
+        assert time.perf_counter() - start >= 0.2
+        assert governor.limiter.limit < 4
+    finally:
+        provider.close()
+
+
+@pytest.mark.asyncio
+async def test_client_errors_are_not_retried(governor):
+    provider = FakeProvider([(401, 0, {})])
+    try:
+        with pytest.raises(UpstreamError) as info:
+            await LLMClient(llm=provider.llm).analyze_text("logs")
+        assert info.value.status == 401 and provider.requests == 1
+        assert governor.breaker.state == "closed"
+    finally:
+        provider.close()
+
+
+@pytest.mark.asyncio
+async def test_concurrency_is_capped_by_the_limiter(governor):
+    governor.limiter = AIMDLimiter(initial=2, max_limit=2)
+    provider = FakeProvider([(200, 0.05, {})])
+    try:
+        await asyncio.gather(*[LLMClient(llm=provider.llm).analyze_text(f"logs {i}") for i in range(6)])
+        assert provider.requests == 6
+        assert provider.max_in_flight <= 2
+    finally:
+        provider.close()
+
+
+@pytest.mark.asyncio
+async def test_breaker_opens_and_analyzer_falls_back_to_rules(governor, monkeypatch):
+    provider = FakeProvider([(503, 0, {})])
+    try:
+        with pytest.raises(UpstreamError):
+            await LLMClient(llm=provider.llm).analyze_text("logs")
+        assert governor.breaker.state == "open"
+        seen = provider.requests
+
+        with pytest.raises(CircuitOpenError):
+            await LLMClient(llm=provider.llm).analyze_text("logs")
+
+        monkeypatch.setattr(analyzer_module, "LLMClient", lambda api_key=None: LLMClient(llm=provider.llm))
+        structured = {"message": ["Interface Gi0/1, changed state to down"] * 3,
+                      "timestamp": ["Mar  1 00:00:01"] * 3, "device": ["rtr1"] * 3}
+        result = await AnalyzerAgent().analyze_logs(structured, request_context={"cerebras_api_key": "k"})
+        assert result["findings"]
+        assert provider.requests == seen
+    finally:
+        provider.close()
+
+
+@pytest.mark.asyncio
+async def test_cancelled_probe_releases_the_half_open_breaker(governor):
+    governor.breaker.record_failure()
+    governor.breaker.record_failure()
+    governor.breaker.opened_at -= governor.breaker.reset_seconds
+    assert governor.breaker.state == "half_open"
+
+    started = asyncio.Event()
+
+    async def hang():
+        started.set()
+        await asyncio.sleep(60)
+
+    probe = asyncio.ensure_future(governor.call(hang))
+    await started.wait()
+    probe.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await probe
+    assert governor.limiter.in_flight == 0
+
+    async def ok():
+        return "ok"
+
+    assert await governor.call(ok) == "ok"
+    assert governor.breaker.state == "closed"
@@ -0,0 +1,46 @@
+import pytest
+
+from app.agents.parser_agent import ParserAgent
+from app.utils.log_formats import detect_format, get_format
+
+SAMPLES = {
+    "cisco_ios": "*Mar  1 00:01:02.123: %LINK-3-UPDOWN: Interface GigabitEthernet0/1, changed state to down",
+    "cisco_nxos": "2024 Mar  1 00:01:02 n9k-1 %ETHPORT-5-IF_DOWN_LINK_FAILURE: Interface Ethernet1/1 is down",
+    "arista_eos": "Mar  1 00:01:02 sw1 Ebra: %LINEPROTO-5-UPDOWN: Line protocol on Interface Ethernet1, changed state to down",
+    "junos": "Mar  1 00:01:02 mx1 rpd[1234]: BGP_IO_ERROR_CLOSE_SESSION: BGP peer 10.0.0.1 closed",
+    "rfc5424": "<165>1 2024-03-01T00:01:02.003Z edge1 bgpd - BGP_RESET [origin ip=\"10.0.0.9\"] peer 10.0.0.1 reset",
+    "syslog": "<189>Mar  1 00:01:02 edge2 kernel: eth0 link down",
+}
+
+
+@pytest.mark.parametrize("name,line", SAMPLES.items())
+def test_probe_detects_vendor(name, line):
+    assert detect_format(line).name == name
+
+
+def test_extractors_split_vendor_layouts():
+    assert get_format("cisco_nxos").extract(SAMPLES["cisco_nxos"]) == {
+        "timestamp": "2024 Mar  1 00:01:02", "device": "n9k-1",
+        "mnemonic": "ETHPORT-5-IF_DOWN_LINK_FAILURE", "message": "Interface Ethernet1/1 is down",
+    }
+    record = get_format("rfc5424").extract(SAMPLES["rfc5424"])
+    assert (record["device"], record["mnemonic"], record["message"]) == ("edge1", "BGP_RESET", "peer 10.0.0.1 reset")
+    relayed = get_format("cisco_ios").extract("Mar  1 00:01:04 core-rtr1 %BGP-5-ADJCHANGE: neighbor 10.0.0.1 Down")
+    assert (relayed["timestamp"], relayed["device"]) == ("Mar  1 00:01:04", "core-rtr1")
+
+
+@pytest.mark.asyncio
+async def test_parser_uses_plugin_and_falls_back_to_generic_cleaner():
+    raw = "\n".join([SAMPLES["junos"], "operator note: ge-0/0/1 optics replaced"])
+    parsed = await ParserAgent().process_logs(raw)
+    assert parsed["format"] == "junos"
+    assert parsed["message"] == ["BGP peer 10.0.0.1 closed", "operator note: ge-0/0/1 optics replaced"]
+    assert parsed["device"] == ["mx1", None]
+    assert parsed["mnemonic"] == ["BGP_IO_ERROR_CLOSE_SESSION", None]
+
+
+@pytest.mark.asyncio
+async def test_unknown_format_reports_unknown():
+    parser = ParserAgent()
+    assert (await parser.process_logs("just some text"))["format"] == "unknown"
+    assert await parser.identify_log_format("just some text") == "unknown"
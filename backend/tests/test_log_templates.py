@@ -0,0 +1,48 @@
+import pytest
+
+from app.agents.parser_agent import ParserAgent
+from app.utils.log_templates import TemplateMiner, mask_parameters
+
+
+def test_mask_parameters_replaces_network_tokens():
+    masked = mask_parameters("BGP neighbor 10.1.1.2 on GigabitEthernet0/1 reset after 3 retries")
+    assert masked == "BGP neighbor <IP> on <IF> reset after <NUM> retries"
+
+
+def test_miner_clusters_lines_and_tracks_stats():
+    miner = TemplateMiner()
+    for i in range(50):
+        miner.add(f"Interface GigabitEthernet0/{i % 4}, changed state to down", i)
+        miner.add(f"BGP neighbor 10.0.0.{i % 5} Down Hold timer expired", i)
+
+    templates = miner.to_dicts()
+    assert [t["template"] for t in templates] == [
+        "Interface <IF>, changed state to down",
+        "BGP neighbor <IP> Down Hold timer expired",
+    ]
+    assert templates[0]["count"] == 50
+    assert templates[0]["first_seen"] == 0
+    assert templates[0]["last_seen"] == 49
+    assert len(templates[0]["samples"]) == 3
+
+
+def test_miner_memory_is_bounded_by_templates():
+    miner = TemplateMiner(max_templates=5)
+    for i in range(20):
+        miner.add(f"event{chr(97 + i)} happened")
+        miner.add(f"unique {chr(97 + i)}word only{chr(97 + i)} here{chr(97 + i)} now{chr(97 + i)}")
+    assert len(miner) == 5
+    assert miner.total_lines == 40
+
+
+@pytest.mark.asyncio
+async def test_parser_populates_patterns():
+    raw = "\n".join([
+        "*Mar  1 00:01:02.123: %LINK-3-UPDOWN: Interface GigabitEthernet0/1, changed state to down",
+        "*Mar  1 00:01:05.456: %LINK-3-UPDOWN: Interface GigabitEthernet0/2, changed state to down",
+    ])
+    parsed = await ParserAgent().process_logs(raw)
+    assert parsed["patterns"] == ["Interface <IF>, changed state to down"]
+    assert parsed["templates"][0]["first_seen"] == "Mar  1 00:01:02.123"
+    assert parsed["templates"][0]["last_seen"] == "Mar  1 00:01:05.456"
+    assert len(parsed["message"]) == 2
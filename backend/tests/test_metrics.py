@@ -0,0 +1,82 @@
+import asyncio
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.utils.metrics import MetricsRegistry, span, start_trace
+
+
+def test_span_records_histogram_counters_and_trace():
+    registry = MetricsRegistry()
+    trace = start_trace()
+    with span("parse", registry=registry, bytes_in=120) as s:
+        s.set(lines=3, bytes_out=80)
+    with pytest.raises(RuntimeError):
+        with span("llm", registry=registry, tokens_in=50):
+            raise RuntimeError("boom")
+
+    hist = registry.histogram("wizraven_stage_duration_seconds", stage="parse")
+    assert hist.count == 1
+    assert registry.counter_value("wizraven_stage_lines_total", stage="parse") == 3
+    assert registry.counter_value("wizraven_stage_bytes_in_total", stage="parse") == 120
+    assert registry.counter_value("wizraven_stage_errors_total", stage="llm") == 1
+    assert [s.stage for s in trace.spans] == ["parse", "llm"]
+    assert trace.server_timing().startswith("parse;dur=")
+
+
+def test_render_is_prometheus_text():
+    registry = MetricsRegistry()
+    registry.observe("wizraven_stage_duration_seconds", 0.003, help="Time spent per processing stage.", stage="parse")
+    registry.inc("wizraven_stage_lines_total", 7, help="Per-stage lines.", stage="parse")
+    registry.register_collector(lambda: [("wizraven_pool_queue_depth", "Calls waiting.", {"pool": "cpu"}, 2)])
+    text = registry.render()
+
+    assert "# TYPE wizraven_stage_duration_seconds histogram" in text
+    assert 'wizraven_stage_duration_seconds_bucket{stage="parse",le="0.0025"} 0' in text
+    assert 'wizraven_stage_duration_seconds_bucket{stage="parse",le="0.005"} 1' in text
+    assert 'wizraven_stage_duration_seconds_bucket{stage="parse",le="+Inf"} 1' in text
+    assert 'wizraven_stage_duration_seconds_count{stage="parse"} 1' in text
+    assert 'wizraven_stage_lines_total{stage="parse"} 7' in text
+    assert 'wizraven_pool_queue_depth{pool="cpu"} 2' in text
+
+
+@pytest.mark.asyncio
+async def test_spans_from_child_tasks_join_the_request_trace():
+    trace = start_trace()
+
+    async def stage(name):
+        with span(name, registry=MetricsRegistry()):
+            await asyncio.sleep(0)
+
+    await asyncio.gather(stage("embedding"), stage("faiss"))
+    assert sorted(s.stage for s in trace.spans) == ["embedding", "faiss"]
+
+
+def test_metrics_endpoint_and_timing_header():
+    from app.main import app
+
+    client = TestClient(app)
+    resp = client.post("/api/analyze", json={"content": "Mar  1 00:00:01 rtr1 %LINK-3-UPDOWN: Interface Gi0/1, "
+                                                       "changed state to down\nwhy is it down?"},
+                       headers={"X-Wizraven-Timing": "1"})
+    assert resp.status_code == 200
+    assert "rules;dur=" in resp.headers["server-timing"]
+
+    text = client.get("/metrics").text
+    assert 'wizraven_request_duration_seconds_count{method="POST",path="/api/analyze",status="200"}' in text
+    assert 'wizraven_stage_duration_seconds_count{stage="rules"}' in text
+    assert 'wizraven_pool_queue_depth{pool="cpu"}' in text
+
+
+def test_request_latency_is_labelled_by_route_template():
+    from app.main import app
+
+    client = TestClient(app)
+    for i in range(3):
+        client.get(f"/api/sessions/conv-{i}/parsed")
+        client.get(f"/probe/{i}.php")
+
+    text = client.get("/metrics").text
+    assert 'path="/api/sessions/{conversation_id}/parsed"' in text
+    assert 'path="unmatched"' in text
+    assert "conv-1" not in text and ".php" not in text
@@ -0,0 +1,80 @@
+import numpy as np
+import pytest
+
+from app.knowledge import embeddings
+from app.knowledge.onnx_embeddings import OnnxEmbeddingManager, cosine_agreement
+
+
+class FakeEncoding:
+    def __init__(self, ids):
+        self.ids = ids
+
+
+class FakeTokenizer:
+    """One token per word, id = word length."""
+
+    def encode_batch(self, texts):
+        return [FakeEncoding([len(w) for w in t.split()]) for t in texts]
+
+
+class FakeInput:
+    def __init__(self, name):
+        self.name = name
+
+
+class FakeSession:
+    """Token embedding = [id, 1]; records the padded widths it was run with."""
+
+    def __init__(self):
+        self.widths = []
+
+    def get_inputs(self):
+        return [FakeInput("input_ids"), FakeInput("attention_mask")]
+
+    def run(self, outputs, feeds):
+        ids = feeds["input_ids"]
+        self.widths.append(ids.shape[1])
+        return [np.stack([ids, np.ones_like(ids)], axis=-1).astype(np.float32)]
+
+
+def _manager(**kwargs):
+    config = {"pooling": "mean", "normalize": False, "dim": 2}
+    return OnnxEmbeddingManager("unused", session=FakeSession(), tokenizer=FakeTokenizer(), config=config, **kwargs)
+
+
+def test_mean_pooling_ignores_padding_and_keeps_input_order():
+    manager = _manager(batch_size=2)
+    texts = ["a bb ccc " * 10, "dddd", "ee ffffff", "g"]
+    out = manager.embed(texts)
+    expected = [np.mean([len(w) for w in t.split()]) for t in texts]
+    assert np.allclose(out[:, 0], expected)
+    assert np.allclose(out[:, 1], 1.0)
+
+
+def test_length_bucketing_reduces_padding():
+    texts = ["w " * 50 if i % 4 == 0 else "w" for i in range(16)]
+    bucketed, plain = _manager(batch_size=4), _manager(batch_size=4, bucket=False)
+    assert np.allclose(bucketed.embed(texts), plain.embed(texts))
+    assert sum(bucketed.session.widths) < sum(plain.session.widths)
+    assert bucketed.session.widths == [1, 1, 1, 50]
+
+
+def test_normalized_output_and_single_text():
+    manager = _manager()
+    manager.config["normalize"] = True
+    vec = manager.encode_text("abc de")
+    assert np.isclose(np.linalg.norm(vec), 1.0)
+    assert manager.embed([]).shape == (0, 2)
+
+
+def test_cosine_agreement():
+    a = np.array([[1.0, 0.0], [0.0, 2.0]])
+    assert cosine_agreement(a, a * 3) == {"mean": 1.0, "min": 1.0, "n": 2}
+    assert cosine_agreement(a, [[1.0, 1.0], [0.0, 1.0]])["min"] == pytest.approx(0.70711, abs=1e-4)
+    with pytest.raises(ValueError):
+        cosine_agreement(a, a[:1])
+
+
+def test_unknown_backend_is_rejected():
+    with pytest.raises(ValueError):
+        embeddings.get_embedding_manager(backend="tensorrt")
@@ -0,0 +1,42 @@
+from app.utils.prompt_builder import PromptBuilder, estimate_tokens
+
+
+def _flap_logs(n: int) -> str:
+    lines = []
+    for i in range(n):
+        state = 'down' if i % 2 else 'up'
+        lines.append(f"Interface GigabitEthernet0/{i % 48}, changed state to {state}")
+        lines.append(f"BGP neighbor 10.0.{i % 200}.1 Down Hold timer expired")
+    return '\n'.join(lines)
+
+
+def test_small_input_passes_through_unchanged():
+    builder = PromptBuilder(token_budget=500)
+    text = "Interface Gi0/1, changed state to down\nhow do I fix this?"
+    assert builder.compact_text(text) == text
+
+
+def test_large_input_fits_budget_regardless_of_size():
+    builder = PromptBuilder(token_budget=400)
+    small = builder.compact_text(_flap_logs(1000))
+    large = builder.compact_text(_flap_logs(20000))
+
+    assert estimate_tokens(small) <= 400
+    assert estimate_tokens(large) <= 400
+    assert "40000 log lines collapsed into 2 templates" in large
+    assert "Representative lines:" in large
+
+
+def test_summarize_structured_skips_bulky_fields():
+    builder = PromptBuilder(token_budget=300)
+    structured = {
+        "format": "cisco",
+        "clean_logs": "x " * 10000,
+        "message": ["Interface Gi0/1, changed state to down"] * 3,
+        "templates": [{"template": "Interface <IF>, changed state to down", "count": 3,
+                       "first_seen": "Mar 1 00:00:01", "last_seen": "Mar 1 00:00:09", "samples": []}],
+    }
+    out = builder.summarize_structured(structured)
+    assert "format: cisco" in out
+    assert "[3x] (Mar 1 00:00:01 - Mar 1 00:00:09) Interface <IF>, changed state to down" in out
+    assert "x x x" not in out
@@ -0,0 +1,80 @@
+import gzip
+import json
+
+import numpy as np
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.utils import responses
+from app.utils.responses import CompressionMiddleware, FastJSONResponse, choose_encoding, shape_metadata
+
+
+def _app(minimum_size=100):
+    app = FastAPI()
+    app.add_middleware(CompressionMiddleware, minimum_size=minimum_size)
+
+    @app.get("/big")
+    async def big():
+        return FastJSONResponse({"lines": ["Interface Gi0/1 changed state to down"] * 200,
+                                 "epoch_ms": np.arange(3, dtype=np.int64)})
+
+    @app.get("/small")
+    async def small():
+        return {"ok": True}
+
+    return app
+
+
+def test_fast_json_response_serializes_numpy():
+    body = json.loads(FastJSONResponse({"a": np.int64(3), "b": np.arange(2)}).body)
+    assert body == {"a": 3, "b": [0, 1]}
+
+
+def test_gzip_negotiated_above_threshold_only():
+    client = TestClient(_app())
+    resp = client.get("/big", headers={"Accept-Encoding": "gzip"})
+    assert resp.headers["content-encoding"] == "gzip"
+    assert resp.headers["vary"] == "Accept-Encoding"
+    assert resp.json()["epoch_ms"] == [0, 1, 2]  # httpx decodes transparently
+    assert int(resp.headers["content-length"]) < len(json.dumps(resp.json()))
+
+    assert "content-encoding" not in client.get("/small", headers={"Accept-Encoding": "gzip"}).headers
+    assert "content-encoding" not in client.get("/big", headers={"Accept-Encoding": "identity"}).headers
+
+
+def test_choose_encoding_honours_q_values(monkeypatch):
+    monkeypatch.setattr(responses, "zstandard", None)
+    assert choose_encoding("gzip;q=0.5, br") == "gzip"
+    assert choose_encoding("gzip;q=0") is None
+    assert choose_encoding("*") == "gzip"
+    monkeypatch.setattr(responses, "zstandard", object())
+    assert choose_encoding("gzip, zstd") == "zstd"
+    assert choose_encoding("gzip, zstd;q=0.1") == "gzip"
+    assert gzip.decompress(responses.compress(b"x" * 1000, "gzip")) == b"x" * 1000
+
+
+def test_shape_metadata_omit_none_and_pages():
+    meta = {"conversation_id": "c1", "clean_logs": "big", "message": list(range(25)), "format": "cisco_ios"}
+    assert shape_metadata(meta, "none") == {"conversation_id": "c1"}
+    assert "clean_logs" not in shape_metadata(meta, omit=["clean_logs", "conversation_id"])
+    paged = shape_metadata(meta, page=2, page_size=10)
+    assert paged["message"] == list(range(20, 25))
+    assert paged["page"] == {"page": 2, "page_size": 10, "total": 25}
+    assert paged["format"] == "cisco_ios"
+
+
+def test_interactive_metadata_omitted_and_paged_from_session():
+    from app.main import app
+
+    client = TestClient(app)
+    logs = "\n".join(f"Mar  1 00:00:{i:02d} rtr1 %LINK-3-UPDOWN: Interface Gi0/1, changed state to down"
+                     for i in range(30))
+    first = client.post("/api/analyze/interactive?metadata=none", json={"content": logs}).json()
+    assert first[0]["metadata"].keys() == {"conversation_id"}
+    assert all(r["metadata"] is None for r in first[1:])
+
+    cid = first[0]["metadata"]["conversation_id"]
+    page = client.get(f"/api/sessions/{cid}/parsed?page=1&page_size=20&fields=message,device").json()
+    assert set(page) == {"message", "device", "page"}
+    assert len(page["message"]) == 10 and page["page"]["total"] == 30
+    assert client.get("/api/sessions/missing/parsed").status_code == 404
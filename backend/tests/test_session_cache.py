@@ -0,0 +1,77 @@
+import asyncio
+import os
+
+import numpy as np
+import pytest
+from fastapi.testclient import TestClient
+
+from app.utils.session_cache import SessionCache, estimate_bytes
+
+
+@pytest.mark.asyncio
+async def test_lru_count_bound_and_ttl():
+    cache = SessionCache(max_sessions=2, ttl_seconds=60)
+    await cache.put("a", {"n": 1})
+    await cache.put("b", {"n": 2})
+    assert (await cache.get("a"))["n"] == 1  # 'a' is now most recently used
+    await cache.put("c", {"n": 3})
+
+    assert await cache.get("b") is None
+    assert "a" in cache and "c" in cache
+    assert cache.stats()["evictions"] == 1
+
+    short = SessionCache(ttl_seconds=0.01)
+    await short.put("x", {"n": 1})
+    await asyncio.sleep(0.02)
+    assert await short.get("x") is None
+    assert short.stats()["expirations"] == 1 and short.bytes == 0
+
+
+@pytest.mark.asyncio
+async def test_byte_bound_and_update():
+    big = {"epoch_ms": np.zeros(1000, dtype=np.int64)}
+    cache = SessionCache(max_bytes=estimate_bytes(big) + 100)
+    await cache.put("a", big)
+    await cache.put("b", big)
+    assert "a" not in cache and "b" in cache
+
+    merged = await cache.update("b", rules={"severity": "info"})
+    assert merged["rules"]["severity"] == "info"
+    assert await cache.update("missing", rules={}) is None
+
+
+@pytest.mark.asyncio
+async def test_evicted_sessions_spill_to_disk_and_reload(tmp_path):
+    cache = SessionCache(max_sessions=1, spill_dir=str(tmp_path))
+    await cache.put("a", {"parsed_data": {"message": ["m1"]}})
+    await cache.put("b", {"parsed_data": {"message": ["m2"]}})
+    assert "a" not in cache and len(os.listdir(tmp_path)) == 1
+
+    restored = await cache.get("a")
+    assert restored["parsed_data"]["message"] == ["m1"]
+    stats = cache.stats()
+    assert stats["spills"] == 2 and stats["spill_loads"] == 1  # loading 'a' spilled 'b'
+
+    assert await cache.delete("b")
+    assert await cache.get("b") is None
+
+
+def test_follow_up_uses_cached_session_without_parsed_data():
+    from app.main import app, session_cache
+
+    client = TestClient(app)
+    logs = "\n".join([
+        "Mar  1 00:00:01 rtr1 %LINK-3-UPDOWN: Interface Gi0/1, changed state to down",
+        "Mar  1 00:00:02 rtr1 %LINK-3-UPDOWN: Interface Gi0/1, changed state to up",
+    ])
+    first = client.post("/api/analyze/interactive", json={"content": logs}).json()
+    conversation_id = first[0]["metadata"]["conversation_id"]
+    assert session_cache.stats()["sessions"] >= 1
+
+    hits = session_cache.hits
+    follow = client.post("/api/analyze/interactive",
+                         json={"content": "why is Gi0/1 flapping?", "context": {"conversation_id": conversation_id}})
+    assert follow.status_code == 200
+    analyzer = [r for r in follow.json() if r["agent_type"] == "analyzer"]
+    assert analyzer and analyzer[0]["metadata"].get("findings") is not None
+    assert session_cache.hits == hits + 1
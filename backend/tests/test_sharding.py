@@ -0,0 +1,80 @@
+import pytest
+
+from app.utils.executors import ExecutionLayer
+from app.utils.sharding import ShardedAnalyzer, analyze_shard, fleet_summary, merge_fleet, partition_by_device
+
+
+def _structured():
+    messages, timestamps, devices, mnemonics = [], [], [], []
+    for i in range(30):
+        messages.append(f"Interface GigabitEthernet0/{i % 2}, changed state to down")
+        timestamps.append(f"Mar  1 00:00:{i:02d}")
+        devices.append("edge1")
+        mnemonics.append("LINK-3-UPDOWN")
+    for i in range(5):
+        messages.append("Configured from console by admin")
+        timestamps.append(f"Mar  1 00:01:{i:02d}")
+        devices.append("core1")
+        mnemonics.append("SYS-5-CONFIG_I")
+    return {"message": messages, "timestamp": timestamps, "device": devices, "mnemonic": mnemonics}
+
+
+def test_merge_fleet_is_associative():
+    shards = partition_by_device(_structured())
+    edge = shards["edge1"]
+    half = {c: v[:15] for c, v in edge.items()}
+    rest = {c: v[15:] for c, v in edge.items()}
+    a = analyze_shard("edge1", half)
+    b = analyze_shard("edge1", rest)
+    c = analyze_shard("core1", shards["core1"])
+
+    left = merge_fleet(merge_fleet(a, b), c)
+    right = merge_fleet(a, merge_fleet(b, c))
+    assert left == right
+    assert left["edge1"]["lines"] == 30
+    assert left["edge1"]["templates"] == {"Interface <IF>, changed state to down": 30}
+
+
+@pytest.mark.asyncio
+async def test_sharded_analyzer_parallel_matches_inline():
+    data = _structured()
+    inline = await ShardedAnalyzer(ExecutionLayer(sizes={"cpu": 1})).analyze(data)
+    layer = ExecutionLayer(sizes={"cpu": 2})
+    try:
+        parallel = await ShardedAnalyzer(layer, min_parallel_lines=0).analyze(data)
+    finally:
+        layer.shutdown()
+    assert parallel == inline
+    assert layer.pool("cpu").completed == 2
+
+    summary = fleet_summary(parallel)
+    assert summary["devices"] == 2
+    assert summary["top_devices"][0]["device"] == "edge1"
+    assert summary["top_devices"][0]["anomalies"] == 1
+    assert [d["device"] for d in summary["top_devices"]] == ["edge1"]
+
+
+@pytest.mark.asyncio
+async def test_fleet_reuses_parser_templates_and_rule_anomalies(monkeypatch):
+    from app.agents.analyzer_agent import AnalyzerAgent
+    from app.agents.parser_agent import parse_log_text
+    from app.utils import sharding
+    from benchmarks.loggen import generate_logs
+
+    parsed = parse_log_text(generate_logs(400, devices=3, vendors=["cisco_ios"], flap_rate=0.2, seed=3))
+    expected = fleet_summary(await ShardedAnalyzer(ExecutionLayer(sizes={"cpu": 1})).analyze(parsed))
+
+    def no_rework(*args, **kwargs):
+        raise AssertionError("templates and anomalies should come from the parser and the rule pass")
+
+    monkeypatch.setattr(sharding, "TemplateMiner", no_rework)
+    monkeypatch.setattr(sharding, "RateAnomalyDetector", no_rework)
+    agent = AnalyzerAgent()
+    agent.sharded_analyzer = ShardedAnalyzer(ExecutionLayer(sizes={"cpu": 1}))
+    rules = await agent.rule_results(parsed)
+
+    fleet = rules["fleet"]
+    assert "shards" not in fleet
+    assert fleet["lines"] == expected["lines"] and fleet["anomalies"] == len(rules["anomalies"])
+    assert sum(t["count"] for d in fleet["top_devices"] for t in d["top_templates"]) > 0
+    assert "shards" in await agent.analyze_fleet(parsed, anomalies=rules["anomalies"], keep_shards=True)
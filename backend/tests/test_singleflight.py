@@ -0,0 +1,93 @@
+import asyncio
+import json
+
+import pytest
+
+from app.agents import analyzer_agent as analyzer_module
+from app.agents.analyzer_agent import AnalyzerAgent
+from app.utils.llm_client import LLMClient
+from app.utils.singleflight import SingleFlight, flight_key, normalize_text, scope_of
+
+
+class CountingLLM:
+    def __init__(self):
+        self.calls = 0
+
+    async def __call__(self, prompt: str) -> str:
+        self.calls += 1
+        await asyncio.sleep(0.02)
+        return json.dumps({"root_cause": "flap", "recommendations": ["check optics"], "severity": "Medium"})
+
+
+def test_key_normalizes_whitespace_and_scopes_by_api_key():
+    a = flight_key(normalize_text("line one  \r\nline two\n"), scope_of("k1"))
+    b = flight_key(normalize_text("line one\nline two"), scope_of("k1"))
+    c = flight_key(normalize_text("line one\nline two"), scope_of("k2"))
+    assert a == b
+    assert b != c
+
+
+@pytest.mark.asyncio
+async def test_concurrent_calls_share_one_computation_and_copies():
+    flights = SingleFlight("test", enabled=True)
+    calls = 0
+
+    async def work():
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.02)
+        return {"findings": ["x"]}
+
+    results = await asyncio.gather(*[flights.do("k", work) for _ in range(5)])
+    assert calls == 1
+    assert flights.shared == 4 and flights.in_flight() == 0
+    results[1]["findings"].append("y")
+    assert results[0]["findings"] == ["x"]
+
+    # Landed flights are not cached
+    await flights.do("k", work)
+    assert calls == 2
+
+
+@pytest.mark.asyncio
+async def test_leader_cancellation_does_not_cancel_followers():
+    flights = SingleFlight("test", enabled=True)
+
+    async def work():
+        await asyncio.sleep(0.05)
+        return "done"
+
+    leader = asyncio.ensure_future(flights.do("k", work))
+    await asyncio.sleep(0)
+    follower = asyncio.ensure_future(flights.do("k", work))
+    await asyncio.sleep(0)
+    leader.cancel()
+    assert await follower == "done"
+
+
+@pytest.mark.asyncio
+async def test_errors_reach_every_caller():
+    flights = SingleFlight("test", enabled=True)
+
+    async def boom():
+        await asyncio.sleep(0.01)
+        raise ValueError("upstream down")
+
+    results = await asyncio.gather(flights.do("k", boom), flights.do("k", boom), return_exceptions=True)
+    assert all(isinstance(r, ValueError) for r in results)
+
+
+@pytest.mark.asyncio
+async def test_identical_mixed_inputs_make_one_llm_call(monkeypatch):
+    llm = CountingLLM()
+    monkeypatch.setattr(analyzer_module, "LLMClient", lambda api_key=None: LLMClient(llm=llm))
+    agent = AnalyzerAgent()
+    agent._mixed_flights.enabled = True
+    paste = "\n".join(["Mar  1 00:00:01 rtr1 %LINK-3-UPDOWN: Interface Gi0/1, changed state to down"] * 3)
+
+    results = await asyncio.gather(*[agent.analyze_mixed_input(paste, api_key="k") for _ in range(4)])
+    assert llm.calls == 1
+    assert all(r == results[0] for r in results)
+
+    await agent.analyze_mixed_input(paste, api_key="other")
+    assert llm.calls == 2
@@ -0,0 +1,85 @@
+import asyncio
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.utils.startup import Lazy, StartupReport, configured_steps, lazy_import, warm_up
+
+
+def test_lazy_builds_once_on_first_use():
+    built = []
+
+    class Thing:
+        def __init__(self):
+            built.append(1)
+            self.value = 42
+
+    proxy = Lazy(Thing)
+    assert not proxy.loaded and built == []
+    assert proxy.value == 42 and proxy.value == 42
+    assert proxy.loaded and built == [1]
+
+
+def test_configured_steps():
+    assert configured_steps("off") == []
+    assert configured_steps("agents, faiss") == ["agents", "faiss"]
+
+
+@pytest.mark.asyncio
+async def test_warm_up_runs_steps_in_parallel_and_records_outcomes():
+    report = StartupReport()
+
+    def slow():
+        import time
+        time.sleep(0.1)
+
+    async def also_slow():
+        await asyncio.sleep(0.1)
+
+    def broken():
+        raise ImportError("no module named torch")
+
+    steps = {"a": slow, "b": also_slow, "c": broken, "d": lambda: False}
+    await warm_up(steps, ["a", "b", "c", "d", "nope"], report=report)
+
+    data = report.as_dict()
+    assert data["ready"]
+    assert data["warmup_ms"] < 190  # a and b overlapped
+    assert data["steps"]["a"]["ok"] and data["steps"]["a"]["ms"] >= 100
+    assert data["steps"]["c"] == {"ms": data["steps"]["c"]["ms"], "ok": False, "error": "no module named torch"}
+    assert data["steps"]["d"]["skipped"]
+    assert data["steps"]["nope"]["error"] == "unknown warm-up step"
+
+
+def test_lazy_import_records_timing(monkeypatch):
+    import sys
+
+    from app.utils.startup import REPORT
+
+    monkeypatch.delitem(sys.modules, "colorsys", raising=False)
+    assert lazy_import("colorsys").rgb_to_hsv
+    assert "colorsys" in REPORT.imports_ms
+
+
+def test_ready_endpoint_after_lifespan_warm_up(monkeypatch):
+    from app import main
+
+    monkeypatch.setenv("WIZRAVEN_WARMUP", "agents")
+    monkeypatch.setattr(main, "_WARMUP_BLOCKING", True)
+    monkeypatch.setattr(main.STARTUP, "ready", False)
+
+    with TestClient(main.app) as client:
+        resp = client.get("/ready")
+        assert resp.status_code == 200
+        body = resp.json()
+        assert body["steps"]["agents"]["ok"]
+        assert "app.main" in body["imports_ms"]
+        assert main.analyzer_agent.loaded
+        assert client.get("/").status_code == 200
+        assert "wizraven_startup_warmup_ms" in client.get("/metrics").text
+
+
+def test_pool_warm_up_is_opt_in(monkeypatch):
+    monkeypatch.delenv("WIZRAVEN_WARMUP", raising=False)
+    assert "pools" not in configured_steps()
+    assert configured_steps("agents,pools") == ["agents", "pools"]
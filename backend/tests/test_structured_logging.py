@@ -0,0 +1,45 @@
+import io
+import json
+
+from app.utils.structured_logging import configure_logging, get_logger, mask_secret, shutdown_logging
+
+
+def _lines(stream):
+    return [json.loads(line) for line in stream.getvalue().splitlines()]
+
+
+def test_json_output_with_fields_level_and_sampling():
+    stream = io.StringIO()
+    configure_logging(level="INFO", fmt="json", stream=stream)
+    log = get_logger("app.test")
+    try:
+        log.debug("hidden.debug", x=1)
+        log.info("kb.add", doc_id=3, api_key=mask_secret("sk-1234567890"))
+        for i in range(10):
+            log.info("hot.path", i=i, sample=4)
+        try:
+            raise ValueError("bad")
+        except ValueError:
+            log.exception("failed.op")
+    finally:
+        shutdown_logging()
+
+    records = _lines(stream)
+    events = [r["event"] for r in records]
+    assert "hidden.debug" not in events
+    assert records[0]["level"] == "info" and records[0]["doc_id"] == 3 and records[0]["api_key"] == "sk-...890"
+    hot = [r for r in records if r["event"] == "hot.path"]
+    assert [r["i"] for r in hot] == [0, 4, 8]
+    assert all(r["sample_rate"] == 4 for r in hot)
+    assert "ValueError: bad" in records[-1]["exc"]
+
+
+def test_log_level_env_and_text_format(monkeypatch):
+    monkeypatch.setenv("LOG_LEVEL", "DEBUG")
+    stream = io.StringIO()
+    configure_logging(fmt="text", stream=stream)
+    try:
+        get_logger("app.test").debug("llm.construct", model="llama")
+    finally:
+        shutdown_logging()
+    assert "DEBUG app.test llm.construct model=llama" in stream.getvalue()
@@ -0,0 +1,54 @@
+import numpy as np
+import pytest
+
+from app.agents.parser_agent import ParserAgent
+from app.utils.timestamps import MISSING_MS, TimestampNormalizer, parse_timestamp, to_epoch_ms
+
+REFERENCE = parse_timestamp("2025-01-01T12:00:00Z")
+
+
+def _expected_ms(text, year):
+    return int(round(parse_timestamp(text, year=year) * 1000))
+
+
+def test_vectorized_and_per_line_paths_agree():
+    values = [f"Mar {1 + i // 3600:2d} {(i // 60) % 24:02d}:{i % 60:02d}:{(i * 7) % 60:02d}.{i % 1000:03d}"
+              for i in range(5000)]
+    values += ["2024-03-01T00:01:02.5+02:00", "2024-03-01T00:01:02.123456Z", "2024 Mar  1 00:01:02",
+               "Mar  1 00:01:02 UTC", "Mar  1 00:01:0x", None, "", "garbage"] * 50
+
+    fast = TimestampNormalizer(reference=REFERENCE).to_epoch_ms(values)
+    slow = TimestampNormalizer(reference=REFERENCE, min_vector_lines=10 ** 9).to_epoch_ms(values)
+
+    assert fast.dtype == np.int64
+    assert (fast == slow).all()
+    assert fast[0] == _expected_ms(values[0], 2024)
+    assert fast[4999] == _expected_ms(values[4999], 2024)
+    assert list(fast[5000:5008]) == [
+        _expected_ms("2024-03-01T00:01:02.5+02:00", None),
+        _expected_ms("2024-03-01T00:01:02.123Z", None),
+        _expected_ms("2024 Mar  1 00:01:02", None),
+        _expected_ms("Mar  1 00:01:02", 2024),
+        MISSING_MS, MISSING_MS, MISSING_MS, MISSING_MS,
+    ]
+
+
+def test_year_inference_rolls_back_across_new_year():
+    ms = to_epoch_ms(["Dec 31 23:59:59", "Jan  1 00:00:01", "2025 Dec 31 23:59:59"], reference=REFERENCE)
+    assert ms[0] == _expected_ms("Dec 31 23:59:59", 2024)
+    assert ms[1] == _expected_ms("Jan  1 00:00:01", 2025)
+    # An explicit year is never second-guessed
+    assert ms[2] == _expected_ms("2025 Dec 31 23:59:59", None)
+
+
+@pytest.mark.asyncio
+async def test_parser_emits_epoch_column():
+    raw = "\n".join([
+        "Mar  1 00:01:02 rtr1 %LINK-3-UPDOWN: Interface Gi0/1, changed state to down",
+        "free-form line without a timestamp",
+    ])
+    parsed = await ParserAgent().process_logs(raw)
+    assert parsed["epoch_ms"].dtype == np.int64
+    assert len(parsed["epoch_ms"]) == len(parsed["message"]) == 2
+    assert parsed["epoch_ms"][0] != MISSING_MS
+    assert parsed["epoch_ms"][1] == MISSING_MS